@@ -420,7 +420,7 @@ if (Test-Path (Join-Path $ProjectDir "openapi")) {
     $pythonCmd = Get-Command python -ErrorAction SilentlyContinue
     if ($pythonCmd) {
         Push-Location $ProjectDir
-        python scripts\merge-openapi.py --openapi-dir openapi --output src\openapi-merged.yaml
+        python scripts\merge-openapi.py --openapi-dir openapi --output src\openapi-merged.yaml --endpoints-output scripts\lambda\authorizer_endpoints.json
         Pop-Location
         
         if ($LASTEXITCODE -eq 0) {
@@ -546,10 +546,14 @@ $AuthorizerLambdaName = $AuthorizerLambdaArn.Split(':')[-1]
 $AuthorizerTempDir = Join-Path $TempDir "authorizer"
 New-Item -ItemType Directory -Path $AuthorizerTempDir | Out-Null
 Copy-Item (Join-Path $ProjectDir "scripts\lambda\authorizer.py") -Destination (Join-Path $AuthorizerTempDir "index.py")
+# Endpoints evaluated in one batch_is_authorized call (generated by merge-openapi.py)
+Copy-Item (Join-Path $ProjectDir "scripts\lambda\authorizer_endpoints.json") -Destination $AuthorizerTempDir
 
 # Install dependencies for Authorizer directly to the temp directory
 if (Test-Path (Join-Path $ProjectDir "scripts\lambda\requirements.txt")) {
-    pip install -r (Join-Path $ProjectDir "scripts\lambda\requirements.txt") -t $AuthorizerTempDir | Out-Null
+    # Linux wheels for the Lambda runtime (cedarpy is a compiled extension)
+    pip install -r (Join-Path $ProjectDir "scripts\lambda\requirements.txt") -t $AuthorizerTempDir `
+        --platform manylinux2014_x86_64 --python-version 3.12 --implementation cp --only-binary=:all: | Out-Null
 }
 
 $AuthorizerZip = Join-Path $TempDir "authorizer.zip"
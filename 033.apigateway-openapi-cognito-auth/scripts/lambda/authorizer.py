@@ -2,31 +2,393 @@
 Lambda Authorizer for API Gateway OpenAPI Cognito Auth
 
 This function handles custom authorization for API Gateway endpoints.
-It extracts the user role from the Cognito ID token and enforces role-based access control.
+It verifies the Cognito token against the user pool JWKS, extracts the user role
+and enforces role-based access control.
 """
 
 import json
 import logging
 import os
 import base64
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
-from jose import jwt
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+
+try:
+    import cedarpy
+except ImportError:
+    cedarpy = None
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 POLICY_STORE_ID = os.environ.get("POLICY_STORE_ID", "")
 PRINCIPAL_ENTITY_TYPE = os.environ.get("PRINCIPAL_ENTITY_TYPE", "User")
+# Decoded claims and AVP decisions are kept for warm invocations of the same container
+DECISION_CACHE_TTL_SECONDS = int(os.environ.get("DECISION_CACHE_TTL_SECONDS", "300"))
+DECISION_CACHE_MAX_ENTRIES = int(os.environ.get("DECISION_CACHE_MAX_ENTRIES", "1024"))
+# Endpoints protected by this authorizer, exported from the merged OpenAPI spec by
+# scripts/merge-openapi.py --endpoints-output and packaged next to the handler
+AUTHORIZER_ENDPOINTS_FILE = os.environ.get(
+    "AUTHORIZER_ENDPOINTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "authorizer_endpoints.json")
+)
+# batch_is_authorized accepts up to 30 requests per call
+AVP_BATCH_SIZE = 30
+# "avp" asks Verified Permissions for every decision; "local" evaluates the Cedar
+# policies in-process with cedarpy and falls back to AVP when they cannot be loaded
+AUTHORIZATION_MODE = os.environ.get("AUTHORIZATION_MODE", "avp").lower()
+# Cedar policy file or directory of *.cedar files; unset downloads the policy store's policies
+LOCAL_POLICY_PATH = os.environ.get("LOCAL_POLICY_PATH", "")
+LOCAL_POLICY_REFRESH_SECONDS = int(os.environ.get("LOCAL_POLICY_REFRESH_SECONDS", "300"))
+# Cognito user pool whose JWKS verifies the tokens; unset keeps the unverified decode
+USER_POOL_ID = os.environ.get("USER_POOL_ID", "")
+# App client the tokens must be issued for (aud / client_id); unset accepts any client
+CLIENT_ID = os.environ.get("CLIENT_ID", "")
+JWKS_REFRESH_SECONDS = int(os.environ.get("JWKS_REFRESH_SECONDS", "3600"))
+# Unknown key IDs trigger a refresh at most this often, so forged kids cannot flood Cognito
+JWKS_MIN_REFRESH_SECONDS = 60
 vp = boto3.client("verifiedpermissions")
 
 
+class ExpiringLRUCache:
+    """Bounded LRU cache whose entries expire at their own time (epoch seconds)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, expires_at):
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+claims_cache = ExpiringLRUCache(DECISION_CACHE_MAX_ENTRIES)
+decision_cache = ExpiringLRUCache(DECISION_CACHE_MAX_ENTRIES)
+
+
 def map_action(path: str, method: str) -> str:
     """Map HTTP path to Cedar action ID (path itself)."""
     normalized_path = path.rstrip('/') or '/'
     return f"{method.upper()} {normalized_path}"
 
 
+def cache_expiry(claims):
+    """Entries derived from a token expire at its exp claim, or after the TTL if sooner."""
+    expires_at = time.time() + DECISION_CACHE_TTL_SECONDS
+    exp = claims.get('exp')
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    return expires_at
+
+
+class JwksCache:
+    """Signing keys of the user pool by key ID, fetched once per container and refreshed in the background."""
+
+    def __init__(self, url, refresh_seconds):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.fetched_at = 0.0
+        # Time of the last fetch attempt, failed or not: the minimum refresh interval counts from it
+        self.attempted_at = 0.0
+        self._keys = {}
+        # Held by whoever is fetching, so one fetch runs at a time
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        with urllib.request.urlopen(self.url, timeout=5) as response:
+            return json.loads(response.read())
+
+    def refresh(self):
+        self.attempted_at = time.time()
+        keys = {}
+        for key in self.fetch().get('keys', []):
+            if key.get('kid'):
+                keys[key['kid']] = jwk.construct(key, key.get('alg', 'RS256'))
+        self._keys = keys
+        self.fetched_at = time.time()
+        logger.info(f"Fetched JWKS: {len(keys)} keys")
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"JWKS background refresh failed, keeping the cached keys: {e}")
+        finally:
+            self._lock.release()
+
+    def get(self, kid):
+        """Key for kid, refreshing synchronously for an unknown kid and in the background when stale."""
+        key = self._keys.get(kid)
+        if key is None:
+            # First token of the container, or a key rotated in since the last fetch
+            with self._lock:
+                # A fetch that finished while waiting for the lock may have brought the key
+                key = self._keys.get(kid)
+                if key is None and time.time() - self.attempted_at >= JWKS_MIN_REFRESH_SECONDS:
+                    self.refresh()
+                    key = self._keys.get(kid)
+            return key
+        now = time.time()
+        stale = now - self.fetched_at >= self.refresh_seconds and now - self.attempted_at >= JWKS_MIN_REFRESH_SECONDS
+        # The background thread releases the lock once its fetch is done
+        if stale and self._lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return key
+
+
+def cognito_issuer(user_pool_id):
+    """Issuer (iss) of the tokens of a user pool; its ID starts with the region."""
+    region = user_pool_id.split('_', 1)[0]
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+
+
+ISSUER = cognito_issuer(USER_POOL_ID) if USER_POOL_ID else ""
+jwks = JwksCache(f"{ISSUER}/.well-known/jwks.json", JWKS_REFRESH_SECONDS) if USER_POOL_ID else None
+
+
+def verify_claims(token):
+    """Claims of a token signed by the user pool, checked for expiry, issuer, token use and client."""
+    kid = jwt.get_unverified_header(token).get('kid')
+    key = jwks.get(kid)
+    if key is None:
+        raise JWTError(f"Unknown signing key: {kid}")
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=['RS256'],
+        issuer=ISSUER,
+        options={'verify_aud': False, 'verify_at_hash': False}
+    )
+    if claims.get('token_use') not in ('id', 'access'):
+        raise JWTError(f"Unexpected token_use: {claims.get('token_use')}")
+    # ID tokens carry the app client in aud, access tokens in client_id
+    if CLIENT_ID and claims.get('aud', claims.get('client_id')) != CLIENT_ID:
+        raise JWTError("Token was issued for another app client")
+    return claims
+
+
+def decode_claims(token):
+    """Decode the token claims, reusing the claims of a token seen before."""
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = verify_claims(token) if jwks is not None else jwt.get_unverified_claims(token)
+        claims_cache.put(token, claims, cache_expiry(claims))
+    return claims
+
+
+def load_endpoints(path):
+    """Action IDs of the endpoints listed in the endpoints file (empty if it is missing)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            endpoints = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Endpoint list not loaded ({e}); only the requested endpoint is evaluated")
+        return []
+    action_ids = []
+    for endpoint in endpoints:
+        method, path = endpoint.split(' ', 1)
+        action_ids.append(map_action(path, method))
+    return action_ids
+
+
+ENDPOINT_ACTIONS = load_endpoints(AUTHORIZER_ENDPOINTS_FILE)
+
+
+def endpoint_arn(method_arn, action_id):
+    """Method ARN of an endpoint ("METHOD /path") in the API and stage of method_arn."""
+    method, path = action_id.split(' ', 1)
+    # methodArn format: arn:aws:execute-api:region:account-id:api-id/stage/VERB/resource-path
+    api_stage = '/'.join(method_arn.split('/')[:2])
+    path = re.sub(r'\{[^/]+\}', '*', path)
+    return f"{api_stage}/{method}{path}"
+
+
+def avp_batch_is_authorized(principal_id, username, user_role, action_ids):
+    """Ask AVP for the decisions on several endpoints and return them by action ID."""
+    principal = {
+        'entityType': f'App::{PRINCIPAL_ENTITY_TYPE}',
+        'entityId': principal_id
+    }
+    entities = {
+        'entityList': [
+            {
+                'identifier': principal,
+                'attributes': {
+                    'custom': {
+                        'record': {
+                            'role': {
+                                'string': user_role
+                            }
+                        }
+                    },
+                    'username': {
+                        'string': username
+                    }
+                }
+            }
+        ]
+    }
+    decisions = {}
+    for start in range(0, len(action_ids), AVP_BATCH_SIZE):
+        response = vp.batch_is_authorized(
+            policyStoreId=POLICY_STORE_ID,
+            entities=entities,
+            requests=[
+                {
+                    'principal': principal,
+                    'action': {'actionType': 'App::Action', 'actionId': action_id},
+                    'resource': {'entityType': 'App::Endpoint', 'entityId': action_id}
+                }
+                for action_id in action_ids[start:start + AVP_BATCH_SIZE]
+            ]
+        )
+        for result in response.get('results', []):
+            action_id = result['request']['action']['actionId']
+            decisions[action_id] = result.get('decision', '').upper()
+    return decisions
+
+
+local_policies = {'policy_set': None, 'loaded_at': 0.0}
+
+
+def read_policy_file(path):
+    """Cedar policy text of a file, or of every *.cedar file in a directory."""
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.cedar')]
+    else:
+        paths = [path]
+    texts = []
+    for policy_path in paths:
+        with open(policy_path, encoding='utf-8') as f:
+            texts.append(f.read())
+    return '\n'.join(texts)
+
+
+def download_policies():
+    """Cedar policy text of the static policies in the policy store."""
+    statements = []
+    for page in vp.get_paginator('list_policies').paginate(policyStoreId=POLICY_STORE_ID):
+        for policy in page.get('policies', []):
+            if policy.get('policyType') != 'STATIC':
+                raise ValueError(f"{policy.get('policyType')} policy {policy.get('policyId')} cannot be evaluated locally")
+            detail = vp.get_policy(policyStoreId=POLICY_STORE_ID, policyId=policy['policyId'])
+            statements.append(detail['definition']['static']['statement'])
+    return '\n'.join(statements)
+
+
+def local_policy_set():
+    """Parsed Cedar policies for local evaluation (None if unavailable), reloaded after the refresh interval."""
+    if cedarpy is None:
+        return None
+    now = time.time()
+    if now - local_policies['loaded_at'] >= LOCAL_POLICY_REFRESH_SECONDS:
+        local_policies['loaded_at'] = now
+        source = LOCAL_POLICY_PATH or f"policy store {POLICY_STORE_ID}"
+        try:
+            text = read_policy_file(LOCAL_POLICY_PATH) if LOCAL_POLICY_PATH else download_policies()
+            local_policies['policy_set'] = cedarpy.PolicySet.from_str(text)
+            logger.info(f"Loaded Cedar policies for local evaluation from {source}")
+        except (OSError, ValueError, BotoCoreError, ClientError) as e:
+            # Unreadable or unparsable policies: AVP decides until the next reload
+            logger.error(f"Failed to load Cedar policies from {source}, falling back to AVP: {e}")
+            local_policies['policy_set'] = None
+    return local_policies['policy_set']
+
+
+def local_batch_is_authorized(policy_set, principal_id, username, user_role, action_ids):
+    """Evaluate the decisions on several endpoints with cedarpy and return them by action ID."""
+    principal = {'type': f'App::{PRINCIPAL_ENTITY_TYPE}', 'id': principal_id}
+    entities = [
+        {
+            'uid': principal,
+            'attrs': {
+                'custom': {'role': user_role},
+                'username': username
+            },
+            'parents': []
+        }
+    ]
+    requests = [
+        {
+            'principal': principal,
+            'action': {'type': 'App::Action', 'id': action_id},
+            'resource': {'type': 'App::Endpoint', 'id': action_id},
+            'context': {}
+        }
+        for action_id in action_ids
+    ]
+    results = cedarpy.is_authorized_batch(requests, policy_set, entities)
+    return {action_id: 'ALLOW' if result.allowed else 'DENY' for action_id, result in zip(action_ids, results)}
+
+
+def batch_decisions(principal_id, username, user_role, action_ids):
+    """Decisions by action ID, evaluated locally in local mode and by AVP otherwise."""
+    if AUTHORIZATION_MODE == 'local':
+        policy_set = local_policy_set()
+        if policy_set is not None:
+            logger.info(f"Evaluating Cedar policies locally: {len(action_ids)} endpoints")
+            return local_batch_is_authorized(policy_set, principal_id, username, user_role, action_ids)
+    logger.info(f"Calling AVP batch_is_authorized: {len(action_ids)} endpoints, policyStore={POLICY_STORE_ID}")
+    return avp_batch_is_authorized(principal_id, username, user_role, action_ids)
+
+
+if AUTHORIZATION_MODE == 'local':
+    if cedarpy is None:
+        logger.error("AUTHORIZATION_MODE=local requires cedarpy; falling back to AVP")
+    else:
+        # Load the policies during the cold start rather than on the first request
+        local_policy_set()
+
+
+def authorize(claims, principal_id, username, user_role, action_ids):
+    """Decisions for the principal by action ID, served from the decision cache while valid."""
+    decisions = {}
+    pending = []
+    for action_id in action_ids:
+        decision = decision_cache.get((principal_id, user_role, action_id))
+        if decision is None:
+            pending.append(action_id)
+        else:
+            decisions[action_id] = decision
+    if not pending:
+        logger.info("Decision cache hit")
+        return decisions
+
+    evaluated = batch_decisions(principal_id, username, user_role, pending)
+    expires_at = cache_expiry(claims)
+    for action_id in pending:
+        # An endpoint without a result is treated as denied
+        decision = evaluated.get(action_id, 'DENY')
+        decision_cache.put((principal_id, user_role, action_id), decision, expires_at)
+        decisions[action_id] = decision
+    return decisions
+
+
 def lambda_handler(event, context):
     """Lambda Authorizer handler"""
     logger.info(f"Authorizer event: {json.dumps(event)}")
@@ -52,9 +414,9 @@ def lambda_handler(event, context):
         if token.startswith('Bearer '):
             token = token[7:]
         
-        # Decode the token (without verification, as it's already verified by Cognito)
+        # Verify the token with the user pool JWKS (decode only when USER_POOL_ID is unset)
         try:
-            decoded = jwt.get_unverified_claims(token)
+            decoded = decode_claims(token)
             logger.info(f"Decoded token: {json.dumps(decoded)}")
         except Exception as e:
             logger.error(f"Failed to decode token: {str(e)}")
@@ -78,66 +440,34 @@ def lambda_handler(event, context):
         
         logger.info(f"User: {username}, role: {user_role}")
 
-        if not POLICY_STORE_ID:
+        if not POLICY_STORE_ID and not (AUTHORIZATION_MODE == 'local' and LOCAL_POLICY_PATH):
             logger.error("POLICY_STORE_ID not configured")
             raise Exception('Unauthorized')
 
         action_id = map_action(path, http_method)
-        resource_id = f"{http_method.upper()} {path or '/'}"
-
-        logger.info(f"Calling AVP: action={action_id}, resource={resource_id}, policyStore={POLICY_STORE_ID}")
+        # The first request of a principal evaluates every endpoint at once; the policy
+        # below then covers them all, so API Gateway can cache one policy per token
+        action_ids = ENDPOINT_ACTIONS if action_id in ENDPOINT_ACTIONS else ENDPOINT_ACTIONS + [action_id]
 
+        principal_id = decoded.get('sub', 'user')
         try:
-            # Use is_authorized with explicit principal and attributes
-            principal_id = decoded.get('sub', 'user')
-            decision = vp.is_authorized(
-                policyStoreId=POLICY_STORE_ID,
-                principal={
-                    'entityType': f'App::{PRINCIPAL_ENTITY_TYPE}',
-                    'entityId': principal_id
-                },
-                action={'actionType': 'App::Action', 'actionId': action_id},
-                resource={'entityType': 'App::Endpoint', 'entityId': resource_id},
-                entities={
-                    'entityList': [
-                        {
-                            'identifier': {
-                                'entityType': f'App::{PRINCIPAL_ENTITY_TYPE}',
-                                'entityId': principal_id
-                            },
-                            'attributes': {
-                                'custom': {
-                                    'record': {
-                                        'role': {
-                                            'string': user_role
-                                        }
-                                    }
-                                },
-                                'username': {
-                                    'string': username
-                                }
-                            }
-                        }
-                    ]
-                }
-            )
+            decisions = authorize(decoded, principal_id, username, user_role, action_ids)
         except (BotoCoreError, ClientError) as e:
             logger.error(f"AVP call failed: {e}")
             raise Exception('Unauthorized')
 
-        if decision.get('decision', '').upper() != 'ALLOW':
-            logger.warning(f"AVP denied access for {username} on {resource_id}")
+        if decisions.get(action_id) != 'ALLOW':
+            logger.warning(f"Access denied for {username} on {action_id}")
             raise Exception('Unauthorized')
 
-        logger.info(f"AVP decision: {decision.get('decision')}")
-        
-        # Generate the authorization response
-        principal_id = decoded.get('sub', 'user')
+        allowed = [allowed_id for allowed_id in action_ids if decisions.get(allowed_id) == 'ALLOW']
+        logger.info(f"Allowed endpoints: {allowed}")
         
-        # Build resource ARN pattern - restrict to this method/path
-        # methodArn format: arn:aws:execute-api:region:account-id:api-id/stage/VERB/resource-path
-        # resource_arn = method_arn or '*'
-        resource_arn = '*'
+        # List the method ARN of every allowed endpoint (the requested one as sent, as its
+        # path may carry parameter values); '*' would also open the denied endpoints
+        resource_arns = [method_arn or '*']
+        if method_arn:
+            resource_arns += [endpoint_arn(method_arn, allowed_id) for allowed_id in allowed if allowed_id != action_id]
         
         auth_response = {
             'principalId': principal_id,
@@ -147,7 +477,7 @@ def lambda_handler(event, context):
                     {
                         'Action': 'execute-api:Invoke',
                         'Effect': 'Allow',
-                        'Resource': resource_arn
+                        'Resource': resource_arns
                     }
                 ]
             },
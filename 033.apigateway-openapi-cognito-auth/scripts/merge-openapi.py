@@ -7,17 +7,19 @@ OpenAPI仕様書マージスクリプト
 - components/schemas.yml: スキーマ定義
 - paths/*.yml: エンドポイント定義
 
-また、CloudFormationのプレースホルダーを置換する機能も提供します。
+また、CloudFormationのプレースホルダーを置換する機能と、
+Lambda Authorizer が一括認可するエンドポイント一覧を出力する機能も提供します。
 """
 
 import os
 import sys
+import json
 import yaml
 import argparse
 import logging
 import re
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +27,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch")
+
 
 def load_yaml_file(file_path: Path) -> Dict[str, Any]:
     try:
@@ -62,7 +66,7 @@ def merge_openapi_files(
     openapi_dir: Path, 
     output_file: Path, 
     replacements: Optional[Dict[str, str]] = None
-) -> None:
+) -> Dict[str, Any]:
     logger.info("OpenAPI仕様書のマージを開始します")
     
     base_file = openapi_dir / "base.yml"
@@ -109,6 +113,32 @@ def merge_openapi_files(
         f.write(yaml_content)
     
     logger.info("OpenAPI仕様書のマージが完了しました")
+    return merged_spec
+
+
+def extract_authorizer_endpoints(spec: Dict[str, Any], authorizer: str = "LambdaAuthorizer") -> List[str]:
+    endpoints = []
+    global_security = spec.get("security", [])
+
+    for path, operations in (spec.get("paths") or {}).items():
+        for method, operation in operations.items():
+            if method not in HTTP_METHODS or not isinstance(operation, dict):
+                continue
+            security = operation.get("security", global_security)
+            if any(authorizer in requirement for requirement in security or []):
+                endpoints.append(f"{method.upper()} {path}")
+
+    return endpoints
+
+
+def write_authorizer_endpoints(spec: Dict[str, Any], output_file: Path) -> None:
+    endpoints = extract_authorizer_endpoints(spec)
+    logger.info(f"Lambda Authorizer のエンドポイント一覧を出力: {output_file} ({len(endpoints)} 件)")
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(endpoints, f, indent=2)
+        f.write("\n")
 
 
 def load_replacements_from_env() -> Dict[str, str]:
@@ -159,6 +189,12 @@ def main():
         help="環境変数からプレースホルダーを置換する"
     )
     
+    parser.add_argument(
+        "--endpoints-output",
+        type=Path,
+        help="Lambda Authorizer で保護されたエンドポイント一覧 (JSON) の出力先"
+    )
+    
     args = parser.parse_args()
     
     try:
@@ -166,7 +202,9 @@ def main():
         if args.replace_placeholders:
             replacements = load_replacements_from_env()
         
-        merge_openapi_files(args.openapi_dir, args.output, replacements)
+        merged_spec = merge_openapi_files(args.openapi_dir, args.output, replacements)
+        if args.endpoints_output:
+            write_authorizer_endpoints(merged_spec, args.endpoints_output)
         logger.info("処理が正常に完了しました")
     except Exception as e:
         logger.error(f"エラーが発生しました: {e}")
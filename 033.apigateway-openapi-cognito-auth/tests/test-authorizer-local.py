@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Lambda Authorizer Local Evaluation Test Script
+
+このスクリプトは、Lambda Authorizer のローカル Cedar 評価モード（AUTHORIZATION_MODE=local）と
+JWKS によるトークン検証を AWS に接続せずにテストするためのものです。
+ローカルのポリシーファイルで各ロール・エンドポイントの認可結果を確認し、
+ポリシーの解析エラー時に AVP へフォールバックすること、評価のレイテンシを計測します。
+また、ローカルで生成した RSA 鍵の JWKS でトークンの検証・拒否を確認し、
+検証付きデコードと検証なしデコードのレイテンシを比較します。
+
+前提:
+    pip install boto3 python-jose cedarpy cryptography
+
+使用方法:
+    python tests/test-authorizer-local.py [--policies <POLICY_FILE_OR_DIR>] [--iterations <N>]
+
+例:
+    python tests/test-authorizer-local.py --policies src/avp-policies --iterations 1000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_USER_POOL_ID = 'ap-northeast-1_LocalTest'
+TEST_CLIENT_ID = 'local-test-client'
+
+# (role, endpoint, expected decision) for the endpoints protected by the authorizer
+EXPECTED_DECISIONS = [
+    ('admin', 'POST /admin', True),
+    ('admin', 'PATCH /update', True),
+    ('admin', 'GET /user', False),
+    ('admin', 'POST /auth/revoke', False),
+    ('user', 'GET /user', True),
+    ('user', 'PATCH /update', True),
+    ('user', 'POST /admin', False),
+    ('unknown', 'GET /user', False),
+    ('unknown', 'PATCH /update', False),
+]
+
+
+class FakeVerifiedPermissions:
+    """Stands in for the AVP client so that fallbacks are recorded instead of sent."""
+
+    def __init__(self):
+        self.batch_calls = 0
+
+    def batch_is_authorized(self, **kwargs):
+        self.batch_calls += 1
+        return {
+            'results': [
+                {'request': request, 'decision': 'DENY'}
+                for request in kwargs['requests']
+            ]
+        }
+
+
+def load_authorizer(policy_path):
+    """authorizer.py を ローカル評価モードで読み込む"""
+    os.environ['AUTHORIZATION_MODE'] = 'local'
+    os.environ['LOCAL_POLICY_PATH'] = policy_path
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    os.environ['AUTHORIZER_ENDPOINTS_FILE'] = os.path.join(PROJECT_DIR, 'scripts', 'lambda', 'authorizer_endpoints.json')
+    sys.path.insert(0, os.path.join(PROJECT_DIR, 'scripts', 'lambda'))
+
+    import authorizer
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    authorizer.vp = FakeVerifiedPermissions()
+    return authorizer
+
+
+def make_event(role, endpoint):
+    """指定したロールのトークンでエンドポイントを呼び出す REQUEST オーソライザーイベント"""
+    from jose import jwt
+
+    method, path = endpoint.split(' ', 1)
+    token = jwt.encode(
+        {
+            'sub': f'sub-{role}',
+            'cognito:username': f'test-{role}',
+            'custom:role': role,
+            'exp': int(time.time()) + 3600
+        },
+        'local-test',
+        algorithm='HS256'
+    )
+    return {
+        'headers': {'Authorization': f'Bearer {token}'},
+        'methodArn': f'arn:aws:execute-api:ap-northeast-1:123456789012:local-api/dev/{method}{path}',
+        'httpMethod': method,
+        'path': path
+    }
+
+
+def test_decisions(authorizer):
+    """ロール・エンドポイント毎の認可結果がポリシー通りであることを確認"""
+    failures = 0
+    for role, endpoint, expected in EXPECTED_DECISIONS:
+        try:
+            response = authorizer.lambda_handler(make_event(role, endpoint), None)
+            allowed = True
+            resources = response['policyDocument']['Statement'][0]['Resource']
+        except Exception:
+            allowed = False
+            resources = []
+        status = 'OK' if allowed == expected else 'NG'
+        if allowed != expected:
+            failures += 1
+        print(f"  [{status}] {role:8} {endpoint:18} allowed={allowed} resources={len(resources)}")
+
+    if authorizer.vp.batch_calls:
+        print(f"  [NG] AVP was called {authorizer.vp.batch_calls} times in local mode")
+        failures += 1
+    return failures
+
+
+def test_parse_error_fallback(authorizer):
+    """ポリシーの解析エラー時に AVP へフォールバックすることを確認"""
+    failures = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        broken = os.path.join(temp_dir, 'broken.cedar')
+        with open(broken, 'w', encoding='utf-8') as f:
+            f.write('permit (principal, action == App::Action::"GET /user"')
+
+        authorizer.LOCAL_POLICY_PATH = broken
+        authorizer.local_policies['loaded_at'] = 0.0
+        authorizer.decision_cache.clear()
+        calls_before = authorizer.vp.batch_calls
+        authorizer.batch_decisions('sub-user', 'test-user', 'user', ['GET /user'])
+
+        if authorizer.local_policies['policy_set'] is not None:
+            print("  [NG] broken policy was loaded")
+            failures += 1
+        elif authorizer.vp.batch_calls != calls_before + 1:
+            print("  [NG] AVP was not called after the parse error")
+            failures += 1
+        else:
+            print("  [OK] parse error fell back to AVP")
+    return failures
+
+
+def benchmark(authorizer, policy_path, iterations):
+    """キャッシュを使わないローカル評価のレイテンシを計測"""
+    authorizer.LOCAL_POLICY_PATH = policy_path
+    authorizer.local_policies['loaded_at'] = 0.0
+    authorizer.local_policy_set()
+
+    action_ids = authorizer.ENDPOINT_ACTIONS
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        authorizer.batch_decisions('sub-user', 'test-user', 'user', action_ids)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"  {len(action_ids)} endpoints x {iterations} iterations: "
+          f"mean={statistics.mean(timings):.3f}ms p50={statistics.median(timings):.3f}ms p99={p99:.3f}ms")
+
+
+def build_jwks(kid):
+    """RSA 鍵ペアを生成し、秘密鍵（PEM）と公開鍵の JWKS を返す"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    public_jwk = jwk.construct(private_pem, 'RS256').public_key().to_dict()
+    public_jwk.update({'kid': kid, 'use': 'sig'})
+    return private_pem, {'keys': [public_jwk]}
+
+
+def sign_token(private_pem, kid, **overrides):
+    """テスト用ユーザープールのアクセストークンを署名"""
+    from jose import jwt
+
+    claims = {
+        'sub': 'sub-user',
+        'username': 'test-user',
+        'cognito:groups': ['api-users'],
+        'iss': f'https://cognito-idp.ap-northeast-1.amazonaws.com/{TEST_USER_POOL_ID}',
+        'token_use': 'access',
+        'client_id': TEST_CLIENT_ID,
+        'exp': int(time.time()) + 3600
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': kid})
+
+
+def test_jwks_verification(authorizer, iterations):
+    """JWKS による検証・拒否と、検証付きデコードのレイテンシを確認"""
+    from jose import jwt
+
+    failures = 0
+    private_pem, jwks = build_jwks('local-key-1')
+    other_pem, _ = build_jwks('local-key-1')
+    fetches = []
+
+    def fetch():
+        fetches.append(time.time())
+        return jwks
+
+    authorizer.ISSUER = authorizer.cognito_issuer(TEST_USER_POOL_ID)
+    authorizer.CLIENT_ID = TEST_CLIENT_ID
+    authorizer.jwks = authorizer.JwksCache('https://example.invalid/jwks.json', 3600)
+    authorizer.jwks.fetch = fetch
+
+    token = sign_token(private_pem, 'local-key-1')
+    cases = [
+        ('valid access token', token, True),
+        ('valid ID token', sign_token(private_pem, 'local-key-1', token_use='id', aud=TEST_CLIENT_ID), True),
+        ('tampered signature', sign_token(other_pem, 'local-key-1'), False),
+        ('expired', sign_token(private_pem, 'local-key-1', exp=int(time.time()) - 60), False),
+        ('other issuer', sign_token(private_pem, 'local-key-1', iss='https://example.com/pool'), False),
+        ('other app client', sign_token(private_pem, 'local-key-1', client_id='other-client'), False),
+        ('unknown kid', sign_token(private_pem, 'local-key-2'), False),
+    ]
+    for name, case_token, expected in cases:
+        try:
+            authorizer.verify_claims(case_token)
+            verified = True
+        except Exception:
+            verified = False
+        status = 'OK' if verified == expected else 'NG'
+        if verified != expected:
+            failures += 1
+        print(f"  [{status}] {name:20} verified={verified}")
+
+    # The unknown kid is within the minimum refresh interval: no second fetch
+    if len(fetches) != 1:
+        print(f"  [NG] JWKS fetched {len(fetches)} times, expected once per container")
+        failures += 1
+    else:
+        print("  [OK] JWKS fetched once")
+
+    # A stale JWKS still verifies with the cached keys while it is refetched in the background
+    authorizer.jwks.fetched_at -= 3600
+    authorizer.jwks.attempted_at -= 3600
+    authorizer.verify_claims(token)
+    for _ in range(50):
+        if len(fetches) == 2:
+            break
+        time.sleep(0.01)
+    if len(fetches) != 2:
+        print("  [NG] stale JWKS was not refreshed in the background")
+        failures += 1
+    else:
+        print("  [OK] stale JWKS refreshed in the background")
+
+    def measure(decode):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            decode(token)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.mean(timings)
+
+    unverified = measure(jwt.get_unverified_claims)
+    verified = measure(authorizer.verify_claims)
+    authorizer.claims_cache.clear()
+    cached = measure(authorizer.decode_claims)
+    print(f"  get_unverified_claims: {unverified:.3f}ms, verify_claims: {verified:.3f}ms, "
+          f"decode_claims (claims cache): {cached:.3f}ms  ({iterations} iterations)")
+    return failures
+
+
+def test_jwks_fetch_failures(authorizer):
+    """JWKS の取得に失敗しても、未知の kid ごとに取得が繰り返されないことを確認"""
+    failures = 0
+    fetches = []
+
+    def fetch():
+        fetches.append(time.time())
+        time.sleep(0.05)
+        raise OSError('JWKS endpoint timed out')
+
+    cache = authorizer.JwksCache('https://example.invalid/jwks.json', 3600)
+    cache.fetch = fetch
+
+    def get_key(kid):
+        try:
+            cache.get(kid)
+        except OSError:
+            pass
+
+    # A burst of tokens with new kids, then more requests after the failure
+    threads = [threading.Thread(target=get_key, args=(f'rotated-{i}',)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i in range(10):
+        get_key(f'later-{i}')
+
+    if len(fetches) != 1:
+        print(f"  [NG] failing JWKS endpoint fetched {len(fetches)} times, expected once")
+        failures += 1
+    else:
+        print("  [OK] failing JWKS endpoint fetched once within the minimum refresh interval")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lambda Authorizer local Cedar evaluation test')
+    parser.add_argument('--policies', default=os.path.join(PROJECT_DIR, 'src', 'avp-policies'),
+                        help='Cedar policy file or directory (default: src/avp-policies)')
+    parser.add_argument('--iterations', type=int, default=1000, help='benchmark iterations (default: 1000)')
+    args = parser.parse_args()
+
+    authorizer = load_authorizer(args.policies)
+    if authorizer.cedarpy is None:
+        print("cedarpy is not installed: pip install cedarpy")
+        sys.exit(1)
+
+    print("=== Local Cedar decisions ===")
+    failures = test_decisions(authorizer)
+    print("\n=== Parse error fallback ===")
+    failures += test_parse_error_fallback(authorizer)
+    print("\n=== Local evaluation latency ===")
+    benchmark(authorizer, args.policies, args.iterations)
+    print("\n=== JWKS verification ===")
+    failures += test_jwks_verification(authorizer, args.iterations)
+    failures += test_jwks_fetch_failures(authorizer)
+
+    if failures:
+        print(f"\n{failures} check(s) failed")
+        sys.exit(1)
+    print("\nAll checks passed")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1067 @@
+#!/usr/bin/env python3
+"""
+benchmark_network_connectivity.py
+
+Benchmark / load test for check_network_connectivity.py against synthetic
+clouds. Every check type runs over a generated AWS / Azure / GCP inventory of
+configurable size, served by in-process stand-ins for the boto3,
+googleapiclient and Azure SDK clients, and is reported with the API calls it
+issued, its wall time and its peak memory.
+
+Usage:
+  python benchmark_network_connectivity.py
+  python benchmark_network_connectivity.py --sg-rules 10000 --target-groups 2000 --backend-services 500
+  python benchmark_network_connectivity.py --checks aws.ec2,gcp.cloudrun --samples 50 --repeat 3 --json
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+import check_network_connectivity as cnc
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Inventory sizes
+# ─────────────────────────────────────────────────────────────────────────────
+
+DEFAULT_SIZES: Dict[str, int] = {
+    # AWS
+    "instances": 200,  # EC2 instances (also GCP Compute instances)
+    "subnets": 8,
+    "sg_rules": 1000,  # ingress rules across the security groups attached to each instance / DB
+    "target_groups": 200,
+    "db_instances": 20,
+    # Azure
+    "vms": 200,
+    "nsg_rules": 500,  # rules of each subnet NSG
+    # GCP
+    "firewall_rules": 1000,
+    "cloudrun_services": 50,
+    "backend_services": 100,
+    "path_rules": 50,  # path rules of each URL map path matcher
+    "sql_instances": 20,
+}
+
+SECURITY_GROUPS_PER_INSTANCE = 5  # AWS default quota of security groups per network interface
+TARGETS_PER_TARGET_GROUP = 3
+TARGET_GROUPS_PER_LOAD_BALANCER = 10
+BACKEND_SERVICES_PER_URL_MAP = 4
+
+ELBV2_PAGE_SIZE = 400  # describe_target_groups maximum page size
+GCP_PAGE_SIZE = 500  # Compute API default maxResults
+
+AWS_REGION = "us-east-1"
+AWS_ACCOUNT = "123456789012"
+AZURE_SUBSCRIPTION = "00000000-0000-0000-0000-000000000000"
+AZURE_RESOURCE_GROUP = "bench-rg"
+GCP_PROJECT = "bench-proj"
+GCP_REGION = "us-central1"
+GCP_OTHER_REGION = "europe-west1"
+GCP_ZONE = "us-central1-a"
+
+_GCP_COMPUTE = "https://www.googleapis.com/compute/v1/projects/" + GCP_PROJECT
+
+
+# Fake clients are called from checker worker threads: Counter updates are not atomic.
+_CALLS_LOCK = threading.Lock()
+
+
+def _count_call(calls: Counter, api: str) -> None:
+    with _CALLS_LOCK:
+        calls[api] += 1
+
+
+def _random_cidr(rng: random.Random) -> str:
+    """A source range as found in real rule sets: mostly private, some public, rarely the internet."""
+    roll = rng.random()
+    if roll < 0.02:
+        return "0.0.0.0/0"
+    if roll < 0.5:
+        return f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/{rng.choice((16, 20, 24))}"
+    if roll < 0.7:
+        return f"172.{rng.randrange(16, 32)}.{rng.randrange(256)}.0/24"
+    return f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}/32"
+
+
+def _random_ports(rng: random.Random) -> Tuple[int, int]:
+    if rng.random() < 0.7:
+        port = rng.choice((22, 80, 443, 3306, 5432, 6379, 8080, 8443, rng.randrange(1024, 65536)))
+        return port, port
+    low = rng.randrange(1024, 60000)
+    return low, low + rng.randrange(1, 5000)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Synthetic AWS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def synthetic_aws(sizes: Dict[str, int], seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate an AWS region: subnets alternating public (IGW route) and private
+    (NAT route), instances attached to SECURITY_GROUPS_PER_INSTANCE groups that
+    hold sg_rules ingress rules together, target groups spread over load
+    balancers, and RDS instances sharing the security groups.
+    """
+    rng = random.Random(seed)
+    vpc_id = "vpc-0bench"
+
+    subnets: Dict[str, Dict[str, Any]] = {}
+    route_tables: List[Dict[str, Any]] = [
+        {
+            "RouteTableId": "rtb-main",
+            "VpcId": vpc_id,
+            "Associations": [{"Main": True}],
+            "Routes": [{"DestinationCidrBlock": "10.0.0.0/8", "GatewayId": "local"}],
+        }
+    ]
+    for i in range(sizes["subnets"]):
+        subnet_id = f"subnet-{i:08x}"
+        public = i % 2 == 0
+        subnets[subnet_id] = {"SubnetId": subnet_id, "VpcId": vpc_id, "CidrBlock": f"10.{i}.0.0/16"}
+        default_route = (
+            {"DestinationCidrBlock": "0.0.0.0/0", "GatewayId": "igw-0bench"}
+            if public
+            else {"DestinationCidrBlock": "0.0.0.0/0", "NatGatewayId": "nat-0bench"}
+        )
+        route_tables.append(
+            {
+                "RouteTableId": f"rtb-{i:08x}",
+                "VpcId": vpc_id,
+                "Associations": [{"Main": False, "SubnetId": subnet_id}],
+                "Routes": [
+                    {"DestinationCidrBlock": "10.0.0.0/8", "GatewayId": "local"},
+                    {"DestinationCidrBlock": "192.168.0.0/16", "VpcPeeringConnectionId": "pcx-0bench"},
+                    default_route,
+                ],
+            }
+        )
+
+    security_groups: Dict[str, Dict[str, Any]] = {}
+    group_ids = [f"sg-{i:08x}" for i in range(SECURITY_GROUPS_PER_INSTANCE)]
+    for group_id in group_ids:
+        security_groups[group_id] = {
+            "GroupId": group_id,
+            "GroupName": f"bench-{group_id}",
+            "VpcId": vpc_id,
+            "IpPermissions": [],
+            "IpPermissionsEgress": [{"IpProtocol": "-1", "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}],
+        }
+    for i in range(sizes["sg_rules"]):
+        from_port, to_port = _random_ports(rng)
+        permission: Dict[str, Any] = {
+            "IpProtocol": rng.choice(("tcp", "tcp", "tcp", "udp")),
+            "FromPort": from_port,
+            "ToPort": to_port,
+            "IpRanges": [{"CidrIp": _random_cidr(rng)}],
+        }
+        if rng.random() < 0.1:
+            permission["Ipv6Ranges"] = [{"CidrIpv6": f"2001:db8:{rng.randrange(65536):x}::/48"}]
+        security_groups[group_ids[i % len(group_ids)]]["IpPermissions"].append(permission)
+
+    instances: Dict[str, Dict[str, Any]] = {}
+    subnet_ids = list(subnets)
+    for i in range(sizes["instances"]):
+        instance_id = f"i-{i:017x}"
+        subnet_id = subnet_ids[i % len(subnet_ids)]
+        instance: Dict[str, Any] = {
+            "InstanceId": instance_id,
+            "State": {"Name": "running" if i % 10 else "stopped"},
+            "SubnetId": subnet_id,
+            "VpcId": vpc_id,
+            "PrivateIpAddress": f"10.{i % len(subnet_ids)}.{i // 250 % 256}.{i % 250 + 4}",
+            "SecurityGroups": [{"GroupId": group_id} for group_id in group_ids],
+        }
+        if i % 4 == 0:
+            instance["PublicIpAddress"] = f"198.51.{i // 250 % 256}.{i % 250 + 4}"
+        instances[instance_id] = instance
+
+    load_balancers: Dict[str, Dict[str, Any]] = {}
+    target_groups: List[Dict[str, Any]] = []
+    target_health: Dict[str, List[Dict[str, Any]]] = {}
+    instance_ids = list(instances)
+    for i in range(sizes["target_groups"]):
+        lb_index = i // TARGET_GROUPS_PER_LOAD_BALANCER
+        lb_arn = f"arn:aws:elasticloadbalancing:{AWS_REGION}:{AWS_ACCOUNT}:loadbalancer/app/lb-{lb_index}/{lb_index:016x}"
+        load_balancers.setdefault(
+            lb_arn,
+            {
+                "LoadBalancerArn": lb_arn,
+                "LoadBalancerName": f"lb-{lb_index}",
+                "Scheme": "internet-facing" if lb_index % 2 == 0 else "internal",
+            },
+        )
+        tg_arn = f"arn:aws:elasticloadbalancing:{AWS_REGION}:{AWS_ACCOUNT}:targetgroup/tg-{i}/{i:016x}"
+        target_type = "ip" if i % 10 == 9 else "instance"
+        target_groups.append(
+            {"TargetGroupArn": tg_arn, "TargetType": target_type, "LoadBalancerArns": [lb_arn]}
+        )
+        targets = rng.sample(instance_ids, min(TARGETS_PER_TARGET_GROUP, len(instance_ids)))
+        target_health[tg_arn] = [
+            {"Target": {"Id": target_id, "Port": 80}, "TargetHealth": {"State": "healthy"}} for target_id in targets
+        ]
+
+    db_instances: Dict[str, Dict[str, Any]] = {}
+    for i in range(sizes["db_instances"]):
+        name = f"bench-db-{i}"
+        db_instances[name] = {
+            "DBInstanceIdentifier": name,
+            "DBInstanceStatus": "available",
+            "PubliclyAccessible": i % 5 == 0,
+            "Endpoint": {"Address": f"{name}.abc.{AWS_REGION}.rds.amazonaws.com", "Port": 5432},
+            "DBSubnetGroup": {
+                "DBSubnetGroupName": "bench-db-subnets",
+                "VpcId": vpc_id,
+                "Subnets": [{"SubnetIdentifier": subnet_id} for subnet_id in subnet_ids[1::2]],
+            },
+            "VpcSecurityGroups": [{"VpcSecurityGroupId": group_id, "Status": "active"} for group_id in group_ids],
+        }
+
+    return {
+        "subnets": subnets,
+        "route_tables": route_tables,
+        "security_groups": security_groups,
+        "instances": instances,
+        "target_groups": target_groups,
+        "target_health": target_health,
+        "load_balancers": load_balancers,
+        "db_instances": db_instances,
+    }
+
+
+class _FakeAwsClient:
+    """boto3 client stand-in answering from a synthetic inventory; every call is counted."""
+
+    def __init__(self, service: str, inventory: Dict[str, Any], calls: Counter):
+        self._service = service
+        self._inventory = inventory
+        self._calls = calls
+
+    def _count(self, operation: str) -> None:
+        _count_call(self._calls, f"{self._service}.{operation}")
+
+
+class FakeEc2(_FakeAwsClient):
+    def describe_instances(self, InstanceIds=None, **kwargs):
+        self._count("DescribeInstances")
+        found = [self._inventory["instances"][i] for i in InstanceIds or [] if i in self._inventory["instances"]]
+        return {"Reservations": [{"Instances": [instance]} for instance in found]}
+
+    def describe_security_groups(self, GroupIds=None, **kwargs):
+        self._count("DescribeSecurityGroups")
+        return {"SecurityGroups": [self._inventory["security_groups"][g] for g in GroupIds or []]}
+
+    def describe_subnets(self, SubnetIds=None, **kwargs):
+        self._count("DescribeSubnets")
+        return {"Subnets": [self._inventory["subnets"][s] for s in SubnetIds or []]}
+
+    def describe_route_tables(self, Filters=None, **kwargs):
+        self._count("DescribeRouteTables")
+        wanted = {f["Name"]: set(f["Values"]) for f in Filters or []}
+
+        def matches(rt):
+            associations = rt.get("Associations", [])
+            if "association.subnet-id" in wanted and not any(
+                a.get("SubnetId") in wanted["association.subnet-id"] for a in associations
+            ):
+                return False
+            if "vpc-id" in wanted and rt["VpcId"] not in wanted["vpc-id"]:
+                return False
+            if "association.main" in wanted and not any(a.get("Main") for a in associations):
+                return False
+            return True
+
+        return {"RouteTables": [rt for rt in self._inventory["route_tables"] if matches(rt)]}
+
+
+class FakeElbv2(_FakeAwsClient):
+    def describe_target_groups(self, Marker=None, **kwargs):
+        self._count("DescribeTargetGroups")
+        start = int(Marker or 0)
+        page = self._inventory["target_groups"][start:start + ELBV2_PAGE_SIZE]
+        response: Dict[str, Any] = {"TargetGroups": page}
+        if start + ELBV2_PAGE_SIZE < len(self._inventory["target_groups"]):
+            response["NextMarker"] = str(start + ELBV2_PAGE_SIZE)
+        return response
+
+    def describe_target_health(self, TargetGroupArn, **kwargs):
+        self._count("DescribeTargetHealth")
+        return {"TargetHealthDescriptions": self._inventory["target_health"].get(TargetGroupArn, [])}
+
+    def describe_load_balancers(self, LoadBalancerArns=None, **kwargs):
+        self._count("DescribeLoadBalancers")
+        return {"LoadBalancers": [self._inventory["load_balancers"][arn] for arn in LoadBalancerArns or []]}
+
+
+class FakeRds(_FakeAwsClient):
+    def describe_db_instances(self, DBInstanceIdentifier=None, **kwargs):
+        self._count("DescribeDBInstances")
+        db = self._inventory["db_instances"].get(DBInstanceIdentifier)
+        return {"DBInstances": [db] if db else []}
+
+
+def fake_aws_clients(inventory: Dict[str, Any], calls: Counter) -> Dict[str, _FakeAwsClient]:
+    """service name -> fake client, as returned by _get_boto3_client."""
+    return {
+        "ec2": FakeEc2("ec2", inventory, calls),
+        "elbv2": FakeElbv2("elbv2", inventory, calls),
+        "rds": FakeRds("rds", inventory, calls),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Synthetic GCP
+# ─────────────────────────────────────────────────────────────────────────────
+
+def synthetic_gcp(sizes: Dict[str, int], seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate a GCP project: Compute instances with network tags and firewall
+    rules targeting them, Cloud Run services behind serverless NEGs, backend
+    services, URL maps, proxies and forwarding rules (a third of them in
+    another region), and Cloud SQL instances.
+
+    Compute resources are kept as kind -> scope ("global", "regions/<r>",
+    "zones/<z>") -> items, the shape of aggregatedList responses.
+    """
+    rng = random.Random(seed)
+    network = f"{_GCP_COMPUTE}/global/networks/default"
+    tags = [f"tier-{i}" for i in range(10)]
+    service_accounts = [f"sa-{i}@{GCP_PROJECT}.iam.gserviceaccount.com" for i in range(5)]
+    compute: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+    def add(kind: str, scope: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        compute.setdefault(kind, {}).setdefault(scope, []).append(item)
+        return item
+
+    for i in range(sizes["instances"]):
+        nic: Dict[str, Any] = {
+            "network": network,
+            "subnetwork": f"{_GCP_COMPUTE}/regions/{GCP_REGION}/subnetworks/default",
+            "networkIP": f"10.128.{i // 250 % 256}.{i % 250 + 2}",
+        }
+        if i % 2 == 0:
+            nic["accessConfigs"] = [{"natIP": f"34.{i // 250 % 256}.{i % 250}.1"}]
+        add("instances", f"zones/{GCP_ZONE}", {
+            "name": f"vm-{i}",
+            "status": "RUNNING" if i % 10 else "TERMINATED",
+            "tags": {"items": [tags[i % len(tags)], "web" if i % 3 == 0 else "internal"]},
+            "networkInterfaces": [nic],
+            "serviceAccounts": [{"email": service_accounts[i % len(service_accounts)]}],
+        })
+
+    for i in range(sizes["firewall_rules"]):
+        low, high = _random_ports(rng)
+        rule: Dict[str, Any] = {
+            "name": f"fw-{i}",
+            "network": network,
+            "priority": rng.randrange(100, 65535),
+            "direction": "EGRESS" if i % 20 == 19 else "INGRESS",
+            "sourceRanges": [_random_cidr(rng)],
+            "disabled": i % 50 == 49,
+        }
+        ports = [str(low)] if low == high else [f"{low}-{high}"]
+        rule["denied" if i % 8 == 7 else "allowed"] = [{"IPProtocol": "tcp", "ports": ports}]
+        roll = rng.random()
+        if roll < 0.6:
+            rule["targetTags"] = [rng.choice(tags + ["web", "internal"])]
+        elif roll < 0.8:
+            rule["targetServiceAccounts"] = [rng.choice(service_accounts)]
+        add("firewalls", "global", rule)
+
+    services = [f"run-svc-{i}" for i in range(sizes["cloudrun_services"])]
+    for i, name in enumerate(services):
+        region = GCP_OTHER_REGION if i % 3 == 2 else GCP_REGION
+        add("networkEndpointGroups", f"regions/{region}", {
+            "name": f"neg-{name}",
+            "selfLink": f"{_GCP_COMPUTE}/regions/{region}/networkEndpointGroups/neg-{name}",
+            "networkEndpointType": "SERVERLESS",
+            "cloudRun": {"service": name},
+        })
+
+    backend_links: List[Tuple[str, str]] = []  # (scope, selfLink)
+    for i in range(sizes["backend_services"]):
+        name = services[i % len(services)] if services else "none"
+        neg_region = GCP_OTHER_REGION if services and services.index(name) % 3 == 2 else GCP_REGION
+        scope = "global" if i % 2 == 0 else f"regions/{neg_region}"
+        prefix = f"{_GCP_COMPUTE}/global" if scope == "global" else f"{_GCP_COMPUTE}/{scope}"
+        link = f"{prefix}/backendServices/be-{i}"
+        add("backendServices", scope, {
+            "name": f"be-{i}",
+            "selfLink": link,
+            "loadBalancingScheme": "EXTERNAL_MANAGED" if scope == "global" else "INTERNAL_MANAGED",
+            "backends": [{"group": f"{_GCP_COMPUTE}/regions/{neg_region}/networkEndpointGroups/neg-{name}"}],
+        })
+        backend_links.append((scope, link))
+
+    by_scope: Dict[str, List[str]] = {}
+    for scope, link in backend_links:
+        by_scope.setdefault(scope, []).append(link)
+    map_index = 0
+    for scope, links in by_scope.items():
+        prefix = f"{_GCP_COMPUTE}/global" if scope == "global" else f"{_GCP_COMPUTE}/{scope}"
+        for start in range(0, len(links), BACKEND_SERVICES_PER_URL_MAP):
+            group = links[start:start + BACKEND_SERVICES_PER_URL_MAP]
+            url_map_link = f"{prefix}/urlMaps/um-{map_index}"
+            add("urlMaps", scope, {
+                "name": f"um-{map_index}",
+                "selfLink": url_map_link,
+                "defaultService": group[0],
+                "hostRules": [{"hosts": [f"h{n}.example.com"], "pathMatcher": f"pm{n}"} for n in range(len(group))],
+                "pathMatchers": [
+                    {
+                        "name": f"pm{n}",
+                        "defaultService": link,
+                        "pathRules": [
+                            {"paths": [f"/api/v{k}/*"], "service": group[(n + k) % len(group)]}
+                            for k in range(sizes["path_rules"])
+                        ],
+                        "routeRules": [{
+                            "priority": 1,
+                            "matchRules": [{"prefixMatch": "/canary/"}],
+                            "routeAction": {"weightedBackendServices": [{"backendService": link, "weight": 100}]},
+                        }],
+                    }
+                    for n, link in enumerate(group)
+                ],
+            })
+            proxy_link = f"{prefix}/targetHttpsProxies/px-{map_index}"
+            add("targetHttpsProxies", scope, {"name": f"px-{map_index}", "selfLink": proxy_link, "urlMap": url_map_link})
+            add("targetHttpProxies", scope, {
+                "name": f"px-http-{map_index}",
+                "selfLink": f"{prefix}/targetHttpProxies/px-http-{map_index}",
+                "urlMap": url_map_link,
+            })
+            add("forwardingRules", scope, {
+                "name": f"fr-{map_index}",
+                "target": proxy_link,
+                "loadBalancingScheme": "EXTERNAL_MANAGED" if scope == "global" else "INTERNAL_MANAGED",
+            })
+            map_index += 1
+
+    run_services = {
+        f"projects/{GCP_PROJECT}/locations/{GCP_OTHER_REGION if i % 3 == 2 else GCP_REGION}/services/{name}": {
+            "metadata": {
+                "name": name,
+                "labels": {"cloud.googleapis.com/location": GCP_OTHER_REGION if i % 3 == 2 else GCP_REGION},
+                "annotations": {"run.googleapis.com/ingress": ("all", "internal")[i % 2]},
+            },
+            "status": {"url": f"https://{name}-abc.a.run.app"},
+        }
+        for i, name in enumerate(services)
+    }
+    run_policies = {
+        resource: {"bindings": [{"role": "roles/run.invoker", "members": ["allUsers"]}]} for resource in run_services
+    }
+
+    add("networks", "global", {
+        "name": "default",
+        "selfLink": f"{_GCP_COMPUTE}/global/networks/default",
+        "peerings": [{
+            "name": "servicenetworking-googleapis-com",
+            "network": "https://www.googleapis.com/compute/v1/projects/tenant-proj/global/networks/servicenetworking",
+            "state": "ACTIVE",
+        }],
+    })
+    sql_instances = {}
+    for i in range(sizes["sql_instances"]):
+        ip_config: Dict[str, Any] = {
+            "ipv4Enabled": i % 2 == 0,
+            "privateNetwork": f"projects/{GCP_PROJECT}/global/networks/default",
+            "authorizedNetworks": [{"value": _random_cidr(rng)} for _ in range(3)],
+        }
+        sql_instances[f"sql-{i}"] = {
+            "name": f"sql-{i}",
+            "state": "RUNNABLE",
+            "settings": {"ipConfiguration": ip_config},
+            "ipAddresses": [{"type": "PRIVATE", "ipAddress": f"10.10.0.{i % 250 + 2}"}]
+            + ([{"type": "PRIMARY", "ipAddress": f"35.0.0.{i % 250 + 2}"}] if i % 2 == 0 else []),
+        }
+
+    return {
+        "compute": compute,
+        "effective_firewalls": {"default": {"firewalls": [], "firewallPolicys": []}},
+        "run_services": run_services,
+        "run_policies": run_policies,
+        "sql_instances": sql_instances,
+    }
+
+
+class _FakeGcpRequest:
+    """googleapiclient HttpRequest stand-in; the call is counted when executed."""
+
+    def __init__(self, calls: Counter, api: str, respond: Callable[[], Dict[str, Any]], page_kwargs=None):
+        self._calls = calls
+        self._api = api
+        self._respond = respond
+        self.page_kwargs = page_kwargs
+
+    def execute(self):
+        _count_call(self._calls, self._api)
+        return self._respond()
+
+
+def _page(items: List[Any], token: Optional[str], max_results: Optional[int]) -> Tuple[List[Any], Optional[str]]:
+    start = int(token or 0)
+    size = min(max_results or GCP_PAGE_SIZE, GCP_PAGE_SIZE)
+    end = start + size
+    return items[start:end], (str(end) if end < len(items) else None)
+
+
+# Compute collection -> resource kind it serves (regional and global collections share a kind)
+_GCP_COLLECTION_KINDS = {
+    "instances": "instances",
+    "firewalls": "firewalls",
+    "networkEndpointGroups": "networkEndpointGroups",
+    "regionNetworkEndpointGroups": "networkEndpointGroups",
+    "globalNetworkEndpointGroups": "networkEndpointGroups",
+    "backendServices": "backendServices",
+    "regionBackendServices": "backendServices",
+    "urlMaps": "urlMaps",
+    "regionUrlMaps": "urlMaps",
+    "targetHttpProxies": "targetHttpProxies",
+    "regionTargetHttpProxies": "targetHttpProxies",
+    "targetHttpsProxies": "targetHttpsProxies",
+    "regionTargetHttpsProxies": "targetHttpsProxies",
+    "forwardingRules": "forwardingRules",
+    "globalForwardingRules": "forwardingRules",
+}
+
+
+class FakeComputeCollection:
+    """Compute collection answering get / list / aggregatedList (paginated) from scoped items."""
+
+    def __init__(self, name: str, scoped: Dict[str, List[Dict[str, Any]]], calls: Counter, extra=None):
+        self._name = name
+        self._scoped = scoped
+        self._calls = calls
+        self._extra = extra or {}
+
+    def get(self, project, zone=None, **kwargs):
+        scope = f"zones/{zone}" if zone else "global"
+        name = kwargs.get(self._name[:-1]) or kwargs.get("resource")
+        item = next((i for i in self._scoped.get(scope, []) if i["name"] == name), None)
+
+        def respond():
+            if item is None:
+                raise LookupError(f"404 {self._name}/{name} not found")
+            return item
+
+        return _FakeGcpRequest(self._calls, f"compute.{self._name}.get", respond)
+
+    def list(self, project, region=None, zone=None, pageToken=None, maxResults=None, **kwargs):
+        if self._name.startswith("global") or not (region or zone):
+            scope = "global"
+        else:
+            scope = f"regions/{region}" if region else f"zones/{zone}"
+        items, next_token = _page(self._scoped.get(scope, []), pageToken, maxResults)
+        kwargs = dict(project=project, region=region, zone=zone, maxResults=maxResults)
+
+        def respond():
+            response: Dict[str, Any] = {"items": items}
+            if next_token:
+                response["nextPageToken"] = next_token
+            return response
+
+        return _FakeGcpRequest(self._calls, f"compute.{self._name}.list", respond, (kwargs, next_token))
+
+    def list_next(self, request, response):
+        kwargs, next_token = request.page_kwargs
+        return self.list(pageToken=next_token, **kwargs) if next_token else None
+
+    def aggregatedList(self, project, pageToken=None, maxResults=None, returnPartialSuccess=None, **kwargs):
+        flat = [(scope, item) for scope in sorted(self._scoped) for item in self._scoped[scope]]
+        entries, next_token = _page(flat, pageToken, maxResults)
+
+        def respond():
+            grouped: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+            for scope, item in entries:
+                grouped.setdefault(scope, {}).setdefault(self._name, []).append(item)
+            response: Dict[str, Any] = {"items": grouped}
+            if next_token:
+                response["nextPageToken"] = next_token
+            return response
+
+        return _FakeGcpRequest(
+            self._calls, f"compute.{self._name}.aggregatedList", respond, (dict(project=project), next_token)
+        )
+
+    def aggregatedList_next(self, request, response):
+        kwargs, next_token = request.page_kwargs
+        return self.aggregatedList(pageToken=next_token, **kwargs) if next_token else None
+
+    def getEffectiveFirewalls(self, project, network):
+        return _FakeGcpRequest(
+            self._calls,
+            f"compute.{self._name}.getEffectiveFirewalls",
+            lambda: self._extra["effective_firewalls"].get(network, {}),
+        )
+
+
+class FakeComputeService:
+    """Compute v1 service stand-in: each collection attribute returns its fake collection."""
+
+    def __init__(self, inventory: Dict[str, Any], calls: Counter):
+        self._inventory = inventory
+        self._calls = calls
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        kind = _GCP_COLLECTION_KINDS.get(name, name)
+        collection = FakeComputeCollection(
+            name, self._inventory["compute"].get(kind, {}), self._calls, extra=self._inventory
+        )
+        return lambda: collection
+
+
+class _FakeRunServices:
+    def __init__(self, inventory: Dict[str, Any], calls: Counter):
+        self._inventory = inventory
+        self._calls = calls
+
+    def get(self, name):
+        return _FakeGcpRequest(self._calls, "run.services.get", lambda: self._inventory["run_services"][name])
+
+    def getIamPolicy(self, resource):
+        return _FakeGcpRequest(self._calls, "run.services.getIamPolicy", lambda: self._inventory["run_policies"][resource])
+
+    def list(self, parent, continue_=None, limit=None, **kwargs):
+        items, next_token = _page(list(self._inventory["run_services"].values()), continue_, limit)
+
+        def respond():
+            response: Dict[str, Any] = {"items": items, "metadata": {}}
+            if next_token:
+                response["metadata"]["continue"] = next_token
+            return response
+
+        return _FakeGcpRequest(self._calls, "run.services.list", respond)
+
+
+class FakeRunService:
+    """Cloud Run admin v1 stand-in (projects().locations().services() and namespaces().services())."""
+
+    def __init__(self, inventory: Dict[str, Any], calls: Counter):
+        self._services = _FakeRunServices(inventory, calls)
+
+    def projects(self):
+        return self
+
+    def namespaces(self):
+        return self
+
+    def locations(self):
+        return self
+
+    def services(self):
+        return self._services
+
+
+class _FakeSqlInstances:
+    def __init__(self, inventory: Dict[str, Any], calls: Counter):
+        self._inventory = inventory
+        self._calls = calls
+
+    def get(self, project, instance):
+        return _FakeGcpRequest(self._calls, "sqladmin.instances.get", lambda: self._inventory["sql_instances"][instance])
+
+    def list(self, project, pageToken=None, maxResults=None, **kwargs):
+        items, next_token = _page(list(self._inventory["sql_instances"].values()), pageToken, maxResults)
+
+        def respond():
+            response: Dict[str, Any] = {"items": items}
+            if next_token:
+                response["nextPageToken"] = next_token
+            return response
+
+        return _FakeGcpRequest(self._calls, "sqladmin.instances.list", respond, (dict(project=project), next_token))
+
+    def list_next(self, previous_request, previous_response):
+        kwargs, next_token = previous_request.page_kwargs
+        return self.list(pageToken=next_token, **kwargs) if next_token else None
+
+
+class FakeSqlAdminService:
+    """Cloud SQL Admin v1beta4 stand-in."""
+
+    def __init__(self, inventory: Dict[str, Any], calls: Counter):
+        self._instances = _FakeSqlInstances(inventory, calls)
+
+    def instances(self):
+        return self._instances
+
+
+def fake_gcp_services(inventory: Dict[str, Any], calls: Counter) -> Dict[str, Any]:
+    """API name -> fake service, as returned by _build_gcp_service."""
+    return {
+        "compute": FakeComputeService(inventory, calls),
+        "run": FakeRunService(inventory, calls),
+        "sqladmin": FakeSqlAdminService(inventory, calls),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Synthetic Azure
+# ─────────────────────────────────────────────────────────────────────────────
+
+_AZURE_PREFIX = f"/subscriptions/{AZURE_SUBSCRIPTION}/resourceGroups/{AZURE_RESOURCE_GROUP}/providers"
+
+
+def synthetic_azure(sizes: Dict[str, int], seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate an Azure subscription as ARM JSON: VMs with one NIC each, public
+    IPs on half of them, subnets with an NSG of nsg_rules rules and a route
+    table, and load balancers whose backend pools hold every third NIC.
+    Resources are wrapped in the SDK models the checker receives.
+    """
+    rng = random.Random(seed)
+    network = f"{_AZURE_PREFIX}/Microsoft.Network"
+    subnet_count = max(1, sizes["subnets"])
+    arm: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in cnc._AZURE_MODEL_NAMES if kind != "subnets"}
+
+    def security_rule(n: int, count: int) -> Dict[str, Any]:
+        low, high = _random_ports(rng)
+        return {
+            "name": f"rule-{n}",
+            "properties": {
+                "access": "Deny" if n % 8 == 7 else "Allow",
+                "direction": "Inbound",
+                "priority": 100 + n * 4000 // max(count, 1),
+                "protocol": rng.choice(("Tcp", "Udp", "*")),
+                "sourceAddressPrefix": rng.choice(("Internet", "VirtualNetwork", _random_cidr(rng))),
+                "destinationAddressPrefix": "*",
+                "destinationPortRange": str(low) if low == high else f"{low}-{high}",
+            },
+        }
+
+    subnets = []
+    for k in range(subnet_count):
+        nsg_id = f"{network}/networkSecurityGroups/subnet-nsg-{k}"
+        arm["network_security_groups"].append({
+            "id": nsg_id,
+            "name": f"subnet-nsg-{k}",
+            "properties": {"securityRules": [security_rule(n, sizes["nsg_rules"]) for n in range(sizes["nsg_rules"])]},
+        })
+        rt_id = f"{network}/routeTables/rt-{k}"
+        next_hop = "VirtualAppliance" if k % 2 else "Internet"
+        arm["route_tables"].append({
+            "id": rt_id,
+            "name": f"rt-{k}",
+            "properties": {"routes": [
+                {"name": "lo", "properties": {"addressPrefix": "0.0.0.0/1", "nextHopType": next_hop}},
+                {"name": "hi", "properties": {"addressPrefix": "128.0.0.0/1", "nextHopType": next_hop}},
+            ]},
+        })
+        subnets.append({
+            "id": f"{network}/virtualNetworks/vnet/subnets/snet-{k}",
+            "name": f"snet-{k}",
+            "properties": {"networkSecurityGroup": {"id": nsg_id}, "routeTable": {"id": rt_id}},
+        })
+    arm["virtual_networks"].append({"id": f"{network}/virtualNetworks/vnet", "name": "vnet", "properties": {"subnets": subnets}})
+
+    nic_nsg_id = f"{network}/networkSecurityGroups/nic-nsg"
+    arm["network_security_groups"].append({
+        "id": nic_nsg_id, "name": "nic-nsg", "properties": {"securityRules": [security_rule(n, 10) for n in range(10)]},
+    })
+
+    lb_count = max(1, sizes["vms"] // 30)
+    for n in range(lb_count):
+        arm["load_balancers"].append({
+            "id": f"{network}/loadBalancers/lb-{n}",
+            "name": f"lb-{n}",
+            "sku": {"name": "Standard"},
+            "properties": {
+                "backendAddressPools": [{"id": f"{network}/loadBalancers/lb-{n}/backendAddressPools/pool", "name": "pool"}],
+                "frontendIPConfigurations": [{"id": f"{network}/loadBalancers/lb-{n}/frontendIPConfigurations/fe", "name": "fe"}],
+            },
+        })
+
+    vms_with_view = []
+    for i in range(sizes["vms"]):
+        vm_id = f"{_AZURE_PREFIX}/Microsoft.Compute/virtualMachines/vm-{i}"
+        nic_id = f"{network}/networkInterfaces/nic-{i}"
+        ip_config: Dict[str, Any] = {
+            "privateIPAddress": f"10.1.{i // 250 % 256}.{i % 250 + 4}",
+            "subnet": {"id": subnets[i % subnet_count]["id"]},
+        }
+        if i % 2 == 0:
+            pip_id = f"{network}/publicIPAddresses/pip-{i}"
+            ip_config["publicIPAddress"] = {"id": pip_id}
+            arm["public_ip_addresses"].append(
+                {"id": pip_id, "name": f"pip-{i}", "properties": {"ipAddress": f"20.{i // 250 % 256}.{i % 250}.1"}}
+            )
+        if i % 3 == 0:
+            ip_config["loadBalancerBackendAddressPools"] = [
+                {"id": f"{network}/loadBalancers/lb-{i % lb_count}/backendAddressPools/pool"}
+            ]
+        arm["network_interfaces"].append({
+            "id": nic_id,
+            "name": f"nic-{i}",
+            "properties": {
+                "ipConfigurations": [{"name": "ipconfig1", "properties": ip_config}],
+                "networkSecurityGroup": {"id": nic_nsg_id} if i % 5 == 0 else None,
+            },
+        })
+        power = {"statuses": [{"code": "PowerState/running" if i % 10 else "PowerState/deallocated"}]}
+        vm = {"id": vm_id, "name": f"vm-{i}", "location": "japaneast",
+              "properties": {"networkProfile": {"networkInterfaces": [{"id": nic_id}]}}}
+        arm["virtual_machines"].append(vm)
+        arm["vm_statuses"].append({"id": vm_id, "name": f"vm-{i}", "properties": {"instanceView": power}})
+        vms_with_view.append({**vm, "properties": {**vm["properties"], "instanceView": power}})
+
+    models = {kind: cnc._azure_model_from_json(kind, items) for kind, items in arm.items()}
+    models["subnets"] = cnc._azure_model_from_json("subnets", subnets)
+    models["vm_views"] = cnc._azure_model_from_json("virtual_machines", vms_with_view)
+    return {"arm": arm, "models": models}
+
+
+class _FakeAzureOperations:
+    """
+    SDK operations group stand-in: get by resource name, list / list_all over
+    every model (listed, when given, is what list_all returns instead of items;
+    statuses what list_all(status_only="true") returns).
+    """
+
+    def __init__(self, client: str, group: str, items: List[Any], calls: Counter, listed=None, statuses=None):
+        self._api = f"{client}.{group}"
+        self._by_name = {item.name.lower(): item for item in items}
+        self._items = items if listed is None else listed
+        self._statuses = statuses
+        self._calls = calls
+
+    def get(self, *names, **kwargs):
+        _count_call(self._calls, f"{self._api}.get")
+        item = self._by_name.get(names[-1].lower())
+        if item is None:
+            raise LookupError(f"ResourceNotFound: {names[-1]}")
+        return item
+
+    def list_all(self, status_only=None, **kwargs):
+        _count_call(self._calls, f"{self._api}.list_all")
+        return iter(self._statuses if status_only == "true" else self._items)
+
+    def list(self, resource_group_name=None, **kwargs):
+        _count_call(self._calls, f"{self._api}.list")
+        return iter(self._items)
+
+
+def fake_azure_clients(inventory: Dict[str, Any], calls: Counter) -> Tuple[Any, Any]:
+    """(compute_client, network_client), as returned by _get_azure_clients."""
+    from types import SimpleNamespace
+
+    models = inventory["models"]
+    compute = SimpleNamespace(
+        virtual_machines=_FakeAzureOperations(
+            "compute", "virtual_machines", models["vm_views"], calls,
+            listed=models["virtual_machines"], statuses=models["vm_statuses"],
+        )
+    )
+    network = SimpleNamespace(
+        **{
+            kind: _FakeAzureOperations("network", kind, models[kind], calls)
+            for kind in (
+                "network_interfaces", "public_ip_addresses", "virtual_networks", "subnets",
+                "network_security_groups", "route_tables", "load_balancers",
+            )
+        }
+    )
+    return compute, network
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scenarios
+# ─────────────────────────────────────────────────────────────────────────────
+
+def build_inventories(sizes: Dict[str, int], seed: int = 0, providers=("aws", "azure", "gcp")) -> Dict[str, Any]:
+    builders = {"aws": synthetic_aws, "azure": synthetic_azure, "gcp": synthetic_gcp}
+    return {provider: builders[provider](sizes, seed) for provider in providers}
+
+
+def _sample(items: List[str], count: int) -> List[str]:
+    """Evenly spread sample of count items (all of them when count covers the list)."""
+    if count >= len(items):
+        return list(items)
+    step = len(items) / count
+    return [items[int(n * step)] for n in range(count)]
+
+
+def check_requests(inventories: Dict[str, Any], samples: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Check type -> check() keyword arguments of the sampled resources."""
+    requests: Dict[str, List[Dict[str, Any]]] = {}
+    aws = inventories.get("aws")
+    if aws is not None:
+        requests["aws.ec2"] = [
+            {"provider": "aws", "resource_type": "ec2", "resource_id": i, "region": AWS_REGION}
+            for i in _sample(list(aws["instances"]), samples)
+        ]
+        requests["aws.rds"] = [
+            {"provider": "aws", "resource_type": "rds", "resource_id": i, "region": AWS_REGION}
+            for i in _sample(list(aws["db_instances"]), samples)
+        ]
+    azure = inventories.get("azure")
+    if azure is not None:
+        vm_ids = _sample([vm["id"] for vm in azure["arm"]["virtual_machines"]], samples)
+        requests["azure.vm"] = [{"provider": "azure", "resource_type": "vm", "resource_id": i} for i in vm_ids]
+        requests["azure.vm_inventory"] = [
+            {"provider": "azure", "resource_type": "vm", "resource_id": i, "azure_inventory": True} for i in vm_ids
+        ]
+    gcp = inventories.get("gcp")
+    if gcp is not None:
+        instances = gcp["compute"].get("instances", {}).get(f"zones/{GCP_ZONE}", [])
+        requests["gcp.compute"] = [
+            {"provider": "gcp", "resource_type": "compute",
+             "resource_id": f"projects/{GCP_PROJECT}/zones/{GCP_ZONE}/instances/{i['name']}"}
+            for i in _sample(instances, samples)
+        ]
+        requests["gcp.cloudrun"] = [
+            {"provider": "gcp", "resource_type": "cloudrun", "resource_id": name}
+            for name in _sample(list(gcp["run_services"]), samples)
+        ]
+        requests["gcp.cloudsql"] = [
+            {"provider": "gcp", "resource_type": "cloudsql", "resource_id": f"projects/{GCP_PROJECT}/instances/{name}"}
+            for name in _sample(list(gcp["sql_instances"]), samples)
+        ]
+    return requests
+
+
+def fake_clouds(inventories: Dict[str, Any], calls: Counter) -> Any:
+    """Patch the checker's client factories to serve the synthetic inventories."""
+    aws = fake_aws_clients(inventories["aws"], calls) if "aws" in inventories else {}
+    gcp = fake_gcp_services(inventories["gcp"], calls) if "gcp" in inventories else {}
+    azure = fake_azure_clients(inventories["azure"], calls) if "azure" in inventories else None
+    return mock.patch.multiple(
+        cnc,
+        _get_boto3_client=lambda service, region=None, profile=None: aws[service],
+        _build_gcp_service=lambda service_name, version: gcp[service_name],
+        _get_azure_clients=lambda subscription_id: azure,
+    )
+
+
+def _run_checks(requests: List[Dict[str, Any]]) -> Counter:
+    verdicts: Counter = Counter()
+    cnc.reset_run_state()
+    for request in requests:
+        result = cnc.check(**request)
+        verdicts[result["internet_reachability"]] += 1
+    return verdicts
+
+
+def benchmark_check_type(
+    inventories: Dict[str, Any], requests: List[Dict[str, Any]], repeat: int = 1, measure_memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Run the checks of one check type as a single run (run caches shared, as
+    in a batch) repeat times. API calls are those of one run, wall time the
+    best run; peak memory is measured in an extra run under tracemalloc and
+    excludes the synthetic inventory itself.
+    """
+    calls: Counter = Counter()
+    timings: List[float] = []
+    with fake_clouds(inventories, calls):
+        for _ in range(max(1, repeat)):
+            calls.clear()
+            start = time.perf_counter()
+            verdicts = _run_checks(requests)
+            timings.append(time.perf_counter() - start)
+        api_calls = dict(calls)
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                _run_checks(requests)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    cnc.reset_run_state()
+    wall = min(timings)
+    total = sum(api_calls.values())
+    return {
+        "checks": len(requests),
+        "api_calls": total,
+        "calls_per_check": total / len(requests) if requests else 0.0,
+        "api": dict(sorted(api_calls.items())),
+        "wall_s": wall,
+        "ms_per_check": wall * 1000 / len(requests) if requests else 0.0,
+        "peak_mib": None if peak is None else peak / 2 ** 20,
+        "internet_reachability": dict(verdicts),
+    }
+
+
+def run_benchmark(
+    sizes: Dict[str, int],
+    check_types: Optional[List[str]] = None,
+    samples: int = 20,
+    repeat: int = 1,
+    seed: int = 0,
+    measure_memory: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """Generate the inventories and benchmark every (selected) check type."""
+    providers = sorted({t.split(".", 1)[0] for t in check_types}) if check_types else ("aws", "azure", "gcp")
+    inventories = build_inventories(sizes, seed, providers)
+    requests = check_requests(inventories, samples)
+    unknown = set(check_types or []) - set(requests)
+    if unknown:
+        raise ValueError(f"Unknown check types: {', '.join(sorted(unknown))}. Available: {', '.join(requests)}")
+    return {
+        check_type: benchmark_check_type(inventories, reqs, repeat, measure_memory)
+        for check_type, reqs in requests.items()
+        if not check_types or check_type in check_types
+    }
+
+
+def format_report(report: Dict[str, Dict[str, Any]]) -> str:
+    header = f"{'check':<20}{'checks':>8}{'api calls':>11}{'calls/check':>13}{'wall (s)':>10}{'ms/check':>10}{'peak MiB':>10}"
+    lines = [header, "-" * len(header)]
+    for check_type, row in report.items():
+        peak = "-" if row["peak_mib"] is None else f"{row['peak_mib']:.1f}"
+        lines.append(
+            f"{check_type:<20}{row['checks']:>8}{row['api_calls']:>11}{row['calls_per_check']:>13.1f}"
+            f"{row['wall_s']:>10.3f}{row['ms_per_check']:>10.2f}{peak:>10}"
+        )
+    return "\n".join(lines)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark check_network_connectivity.py against synthetic AWS / Azure / GCP inventories"
+    )
+    for name, default in DEFAULT_SIZES.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=int, default=default, dest=name,
+            help=f"Synthetic inventory size (default: {default})",
+        )
+    parser.add_argument(
+        "--checks",
+        help="Comma-separated check types to run (aws.ec2, aws.rds, azure.vm, azure.vm_inventory, "
+        "gcp.compute, gcp.cloudrun, gcp.cloudsql; default: all)",
+    )
+    parser.add_argument("--samples", type=int, default=20, help="Resources checked per check type (default: 20)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per check type; the best wall time is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic inventories")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run (peak memory)")
+    parser.add_argument("--json", action="store_true", help="Print the report, with per-API call counts, as JSON")
+    args = parser.parse_args()
+
+    sizes = {name: getattr(args, name) for name in DEFAULT_SIZES}
+    check_types = [t.strip() for t in args.checks.split(",") if t.strip()] if args.checks else None
+    try:
+        report = run_benchmark(sizes, check_types, args.samples, args.repeat, args.seed, not args.no_memory)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.json:
+        print(json.dumps({"sizes": sizes, "samples": args.samples, "results": report}, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
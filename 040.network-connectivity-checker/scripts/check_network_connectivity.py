@@ -21,12 +21,51 @@ Usage:
       --resource-id projects/<proj>/locations/<region>/services/<name>
   python check_network_connectivity.py --provider gcp --resource-type cloudsql \
       --resource-id projects/<proj>/instances/<name>
+
+Every Cloud Run service of a project (one load balancer discovery for all of them):
+  python check_network_connectivity.py --provider gcp --resource-type cloudrun \
+      --resource-id projects/<proj> --format ndjson
+
+Every Cloud SQL instance of a project (one paged instances.list):
+  python check_network_connectivity.py --provider gcp --resource-type cloudsql \
+      --resource-id projects/<proj> --format ndjson
+
+Every EC2 instance of several accounts (profiles or IAM role ARNs) and regions:
+  python check_network_connectivity.py --provider aws --resource-type ec2 --account prod \
+      --account arn:aws:iam::111122223333:role/NetworkAudit --regions us-east-1,eu-west-1 --format ndjson
+
+Can these instances reach a database on 5432 (every source x every --path-to, from region-wide listings):
+  python check_network_connectivity.py --provider aws --resource-type ec2 --resource-id i-aaaaaaaaaaaaaaaaa \
+      --resource-id i-bbbbbbbbbbbbbbbbb --path-to rds:mydbinstance --port 5432 --format ndjson
+
+Daemon mode (keeps the cloud SDKs loaded between checks):
+  python check_network_connectivity.py --serve /tmp/cnc.sock &
+  python check_network_connectivity.py --daemon-socket /tmp/cnc.sock --provider aws --resource-type ec2 \
+      --resource-id i-xxxxxxxxxxxxxxxxx
 """
 
 import argparse
+import asyncio
+import bisect
+import datetime
+import functools
+import gzip
+import hashlib
+import importlib
+import ipaddress
 import json
+import multiprocessing
+import os
+import random
+import socket
+import socketserver
+import sqlite3
 import sys
-from typing import Any, Dict, List, Optional, Set, Tuple
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -37,6 +76,12 @@ REACHABLE = "reachable"
 NOT_REACHABLE = "not_reachable"
 UNKNOWN = "unknown"
 
+# Files persisted between runs (e.g. compact GCP discovery documents).
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "check_network_connectivity",
+)
+
 
 def _build_result(
     provider: str,
@@ -58,23 +103,1150 @@ def _build_result(
     }
 
 
+# Caches shared by every check made during one run (one CLI invocation or one
+# batch of check() calls). Created with _run_cache() and emptied together by
+# reset_run_state().
+_RUN_CACHES: List[Dict[Any, Any]] = []
+# Bumped on every reset so that per-thread caches (see _thread_cache) notice it.
+_RUN_GENERATION = [0]
+_THREAD_STATE = threading.local()
+
+
+def _run_cache() -> Dict[Any, Any]:
+    cache: Dict[Any, Any] = {}
+    _RUN_CACHES.append(cache)
+    return cache
+
+
+def reset_run_state(keep_clients: bool = False) -> None:
+    """
+    Start a new run: drop the SDK clients, credentials and API data (e.g. GCP
+    firewall indexes) cached by earlier check() calls. main() calls it once per
+    invocation; library callers that keep the module loaded should call it
+    between independent batches of check() calls so that later checks do not
+    see stale cloud configuration. keep_clients=True only drops the API data,
+    which is what the daemon (see serve) does before every request.
+    """
+    for cache in _RUN_CACHES:
+        if keep_clients and cache is _CLIENTS:
+            continue
+        cache.clear()
+    if not keep_clients:
+        _RUN_GENERATION[0] += 1
+
+
+def _thread_cache() -> Dict[Any, Any]:
+    """
+    Return a cache private to the calling thread for the current run. It is
+    released together with the thread, so short-lived worker threads do not
+    accumulate entries in the shared run caches.
+    """
+    state = _THREAD_STATE.__dict__
+    if state.get("generation") != _RUN_GENERATION[0]:
+        state["generation"] = _RUN_GENERATION[0]
+        state["cache"] = {}
+    return state["cache"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Client registry
+# ─────────────────────────────────────────────────────────────────────────────
+
+# HTTP connection pool size of each boto3 / Azure client. Sized so that
+# concurrent checks sharing one client do not queue for connections.
+CLIENT_POOL_SIZE = 32
+
+# (provider, service, region, profile/subscription) -> SDK client, session or
+# credential, reused for the lifetime of a run.
+_CLIENTS: Dict[Tuple[str, str, Optional[str], Optional[str]], Any] = _run_cache()
+_CLIENTS_LOCK = threading.RLock()
+
+
+def _registry_get(key: Tuple[str, str, Optional[str], Optional[str]], factory) -> Any:
+    """Return the registered object for key, creating it with factory() on first use."""
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = factory()
+            _CLIENTS[key] = client
+        return client
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# API call profiling
+# ─────────────────────────────────────────────────────────────────────────────
+# Every cloud API call of the checker (boto3 operations, googleapiclient
+# request executions, Azure SDK calls) can be accounted per API: calls, result
+# pages, cache hits, errors, retries and latency. Lookup helpers decorated
+# with _profiled are accounted as spans. The accounting of each check is
+# attached to its result as "api_profile" (see _profiled_check) and all calls
+# of the run can be written as a Chrome trace event file (see write_trace).
+# Disabled by default; enabled by --api-profile / --trace or enable_profiling().
+# API names are those of the response cache (e.g. ec2.DescribeInstances,
+# compute.firewalls.list, azure.network_interfaces.get).
+
+# run: API accounting of the whole run; trace: trace events, or None when not tracing
+_PROFILE: Dict[str, Any] = {"enabled": False, "run": {"apis": {}, "spans": {}}, "trace": None}
+_PROFILE_LOCK = threading.Lock()
+# perf_counter() value trace timestamps are relative to. The clock is
+# system-wide, so fan-out processes share the origin of the parent.
+_PROFILE_ORIGIN = [0.0]
+
+# boto3 parameters carrying the token of a follow-up result page
+_AWS_PAGE_TOKEN_PARAMS = ("NextToken", "Marker", "ContinuationToken", "PaginationToken", "nextToken")
+
+
+def enable_profiling(enabled: bool = True, trace: bool = False, origin: Optional[float] = None) -> None:
+    """Start (or stop) accounting API calls, recording trace events too with trace."""
+    with _PROFILE_LOCK:
+        _PROFILE.update(enabled=enabled or trace, run={"apis": {}, "spans": {}}, trace=[] if trace else None)
+        _PROFILE_ORIGIN[0] = time.perf_counter() if origin is None else origin
+
+
+def _profile_collectors() -> List[Dict[str, Any]]:
+    collectors = [_PROFILE["run"]]
+    check_collector = getattr(_THREAD_STATE, "profile", None)
+    if check_collector is not None:
+        collectors.append(check_collector)
+    return collectors
+
+
+def _profile_trace(name: str, category: str, start: float, end: float, args: Optional[Dict[str, Any]] = None) -> None:
+    if _PROFILE["trace"] is None:
+        return
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": round((start - _PROFILE_ORIGIN[0]) * 1e6),
+        "dur": round((end - start) * 1e6),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    if args:
+        event["args"] = args
+    with _PROFILE_LOCK:
+        _PROFILE["trace"].append(event)
+
+
+def _profile_record(
+    provider: str,
+    api: str,
+    start: float,
+    end: float,
+    page: bool = False,
+    pages: int = 1,
+    cached: bool = False,
+    error: bool = False,
+    retries: int = 0,
+) -> None:
+    """
+    Account one API call. A call fetching a follow-up page (page) only adds to
+    the pages of the listing it continues; pages > 1 is a call that followed
+    the pagination itself (Azure SDK iterators).
+    """
+    elapsed_ms = (end - start) * 1000
+    with _PROFILE_LOCK:
+        for collector in _profile_collectors():
+            stats = collector["apis"].setdefault(
+                api, {"calls": 0, "pages": 0, "cached": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            stats["calls"] += 0 if page else 1
+            stats["pages"] += pages
+            stats["cached"] += cached
+            stats["errors"] += error
+            stats["retries"] += retries
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    _profile_trace(api, provider, start, end, {"page": page, "pages": pages, "cached": cached, "error": error})
+
+
+def _profiled_call(provider: str, api: str, fetch, page: bool = False) -> Any:
+    """
+    Return fetch() (one SDK call), accounted in the profile. HTTP responses
+    received meanwhile by the calling thread count as its pages (see
+    _profile_http_page) and a response served from the response cache or a
+    dump marks it cached (see _profile_cached).
+    """
+    if not _PROFILE["enabled"]:
+        return fetch()
+    call = {"pages": 0, "cached": False}
+    previous = getattr(_THREAD_STATE, "profile_call", None)
+    _THREAD_STATE.profile_call = call
+    start = time.perf_counter()
+    error = False
+    try:
+        return fetch()
+    except Exception:
+        error = True
+        raise
+    finally:
+        _THREAD_STATE.profile_call = previous
+        _profile_record(
+            provider, api, start, time.perf_counter(),
+            page=page, pages=max(call["pages"], 1), cached=call["cached"], error=error,
+        )
+
+
+def _profile_cached() -> None:
+    """Mark the call being accounted on this thread as answered without an API request."""
+    call = getattr(_THREAD_STATE, "profile_call", None)
+    if call is not None:
+        call["cached"] = True
+
+
+def _profile_http_page(response: Any, *args, **kwargs) -> None:
+    """requests response hook: one more page for the call being accounted on this thread."""
+    call = getattr(_THREAD_STATE, "profile_call", None)
+    if call is not None:
+        call["pages"] += 1
+
+
+def _register_boto3_profiler(client) -> None:
+    """Account every operation of the client, retries and response cache hits included."""
+    service = client.meta.service_model.endpoint_prefix
+
+    def start(params, model, context, **kwargs):
+        if _PROFILE["enabled"]:
+            page = any(params.get(name) for name in _AWS_PAGE_TOKEN_PARAMS)
+            context["profile"] = (f"{service}.{model.name}", time.perf_counter(), page)
+
+    def finish(context, http_response=None, parsed=None, exception=None, **kwargs):
+        if "profile" not in context:
+            return
+        api, started, page = context.pop("profile")
+        retries = (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        error = exception is not None or http_response is None or http_response.status_code >= 300
+        _profile_record(
+            "aws", api, started, time.perf_counter(),
+            page=page, cached=bool(context.get("response_cache_hit")), error=error, retries=retries,
+        )
+
+    client.meta.events.register("before-parameter-build", start)
+    client.meta.events.register("after-call", finish)
+    client.meta.events.register("after-call-error", finish)
+
+
+def _profiled(func):
+    """Account the time spent in a lookup helper as a span of the check calling it."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _PROFILE["enabled"]:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            with _PROFILE_LOCK:
+                for collector in _profile_collectors():
+                    span = collector["spans"].setdefault(func.__name__, {"calls": 0, "total_ms": 0.0})
+                    span["calls"] += 1
+                    span["total_ms"] += (end - start) * 1000
+            _profile_trace(func.__name__, "span", start, end)
+
+    return wrapper
+
+
+def _profile_bind(func):
+    """func running with the check profile of the calling thread, for work handed to pool threads."""
+    collector = getattr(_THREAD_STATE, "profile", None)
+    if collector is None:
+        return func
+
+    def bound(*args, **kwargs):
+        previous = getattr(_THREAD_STATE, "profile", None)
+        _THREAD_STATE.profile = collector
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _THREAD_STATE.profile = previous
+
+    return bound
+
+
+def _profile_summary(collector: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON form of a profile: totals, then APIs and spans by decreasing time."""
+    apis = {
+        api: {**stats, "total_ms": round(stats["total_ms"], 3), "max_ms": round(stats["max_ms"], 3)}
+        for api, stats in sorted(collector["apis"].items(), key=lambda item: -item[1]["total_ms"])
+    }
+    summary: Dict[str, Any] = {}
+    if "wall_ms" in collector:
+        summary["wall_ms"] = round(collector["wall_ms"], 3)
+    summary.update(
+        api_calls=sum(stats["calls"] for stats in apis.values()),
+        api_pages=sum(stats["pages"] for stats in apis.values()),
+        api_ms=round(sum(stats["total_ms"] for stats in apis.values()), 3),
+        apis=apis,
+        spans={
+            name: {**span, "total_ms": round(span["total_ms"], 3)}
+            for name, span in sorted(collector["spans"].items(), key=lambda item: -item[1]["total_ms"])
+        },
+    )
+    return summary
+
+
+def _profiled_check(label: str, run) -> Any:
+    """run() (one check), with its API profile attached as "api_profile" while profiling is enabled."""
+    if not _PROFILE["enabled"]:
+        return run()
+    collector: Dict[str, Any] = {"apis": {}, "spans": {}}
+    previous = getattr(_THREAD_STATE, "profile", None)
+    _THREAD_STATE.profile = collector
+    start = time.perf_counter()
+    try:
+        result = run()
+    finally:
+        end = time.perf_counter()
+        _THREAD_STATE.profile = previous
+        collector["wall_ms"] = (end - start) * 1000
+        _profile_trace(label, "check", start, end)
+    if isinstance(result, dict):
+        result["api_profile"] = _profile_summary(collector)
+    return result
+
+
+def profile_stats() -> Dict[str, Any]:
+    """API accounting of the run so far (see _profile_summary)."""
+    with _PROFILE_LOCK:
+        run = {kind: {name: dict(stats) for name, stats in _PROFILE["run"][kind].items()} for kind in ("apis", "spans")}
+    return _profile_summary(run)
+
+
+def _profile_merge(profile: Dict[str, Any]) -> None:
+    """Add the run accounting and trace events returned by a fan-out process (see _profile_export)."""
+    with _PROFILE_LOCK:
+        for kind in ("apis", "spans"):
+            for name, stats in profile["run"][kind].items():
+                mine = _PROFILE["run"][kind].setdefault(name, dict.fromkeys(stats, 0))
+                for field, value in stats.items():
+                    mine[field] = max(mine[field], value) if field == "max_ms" else mine[field] + value
+        if _PROFILE["trace"] is not None:
+            _PROFILE["trace"].extend(profile["trace"] or [])
+
+
+def _profile_export() -> Dict[str, Any]:
+    """Run accounting and trace events of this process, reset for the next fan-out unit."""
+    with _PROFILE_LOCK:
+        exported = {"run": _PROFILE["run"], "trace": _PROFILE["trace"]}
+        _PROFILE["run"] = {"apis": {}, "spans": {}}
+        if _PROFILE["trace"] is not None:
+            _PROFILE["trace"] = []
+    return exported
+
+
+def write_trace(path: str) -> int:
+    """
+    Write the trace events of the run to path (gzip-compressed for .gz) in
+    the Chrome trace event format, viewable in Perfetto or chrome://tracing.
+    Returns the number of events.
+    """
+    with _PROFILE_LOCK:
+        events = list(_PROFILE["trace"] or [])
+    with _open_output(path) as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"api_profile": profile_stats()}}, f)
+    return len(events)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Response cache
+# ─────────────────────────────────────────────────────────────────────────────
+# Read-only describe / get / list responses persisted in SQLite under the cache
+# directory, so that repeated audits of the same network skip the cloud APIs.
+# Entries are content addressed by (provider, credential scope, API, arguments)
+# and accepted while younger than the TTL of their API. Enabled by the CLI
+# (see main) or configure_response_cache(); library callers get live data.
+
+# Seconds a cached response is reused, by API. Resource state (instances, power
+# state) changes more often than network configuration.
+RESPONSE_CACHE_TTLS: Dict[str, int] = {
+    "ec2.DescribeInstances": 60,
+    "rds.DescribeDBInstances": 60,
+    "elasticloadbalancing.DescribeTargetHealth": 60,
+    "compute.instances.get": 60,
+    "compute.instances.aggregatedList": 60,
+    "sqladmin.instances.get": 60,
+    "sqladmin.instances.list": 60,
+    "azure.virtual_machines.get": 60,
+    "azure.virtual_machines.list_all": 60,
+}
+RESPONSE_CACHE_DEFAULT_TTL = 300
+
+_RESPONSE_CACHE_CONFIG: Dict[str, Any] = {"enabled": False, "max_age": None}
+# hits / misses / stores of the current run
+_RESPONSE_CACHE_STATS: Dict[str, int] = _run_cache()
+_RESPONSE_CACHE_DBS: Dict[str, Any] = {}
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+
+def configure_response_cache(enabled: bool = True, max_age: Optional[int] = None) -> None:
+    """
+    Enable or disable the response cache (stored under CACHE_DIR). max_age
+    (seconds) replaces the per-API TTLs; 0 forces fresh responses, which are
+    still stored for later runs.
+    """
+    _RESPONSE_CACHE_CONFIG.update(enabled=enabled, max_age=max_age)
+
+
+def response_cache_stats() -> Dict[str, int]:
+    """Cache hits, misses and stored responses of the current run."""
+    return {name: _RESPONSE_CACHE_STATS.get(name, 0) for name in ("hits", "misses", "stores")}
+
+
+def _response_cache_count(name: str) -> None:
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE_STATS[name] = _RESPONSE_CACHE_STATS.get(name, 0) + 1
+
+
+def _response_cache_db():
+    """SQLite connection of the configured cache directory, opened once per process."""
+    path = os.path.join(CACHE_DIR, "responses.sqlite3")
+    db = _RESPONSE_CACHE_DBS.get(path)
+    if db is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")  # concurrent checker processes
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, api TEXT NOT NULL, stored_at REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        _RESPONSE_CACHE_DBS[path] = db
+    return db
+
+
+def _response_cache_key(provider: str, scope: Any, api: str, params: Any) -> str:
+    canonical = json.dumps([provider, scope, api, params], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    if hasattr(value, "read"):  # streaming bodies are never cached
+        raise TypeError("streaming body")
+    return str(value)
+
+
+def _json_object_hook(value: Dict[str, Any]) -> Any:
+    if set(value) == {"__datetime__"}:
+        return datetime.datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+def _response_cache_get(key: str, api: str, count: bool = True) -> Optional[Any]:
+    """
+    Return the cached response for key if it is fresh enough, else None.
+    count=False looks ahead without counting a hit or miss.
+    """
+    max_age = _RESPONSE_CACHE_CONFIG["max_age"]
+    ttl = max_age if max_age is not None else RESPONSE_CACHE_TTLS.get(api, RESPONSE_CACHE_DEFAULT_TTL)
+    try:
+        with _RESPONSE_CACHE_LOCK:
+            row = _response_cache_db().execute(
+                "SELECT stored_at, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+    except Exception:
+        row = None  # unusable cache directory: behave as a miss
+    if row is None or time.time() - row[0] > ttl:
+        if count:
+            _response_cache_count("misses")
+        return None
+    if count:
+        _response_cache_count("hits")
+    return json.loads(row[1], object_hook=_json_object_hook)
+
+
+def _response_cache_put(key: str, api: str, response: Any) -> None:
+    try:
+        body = json.dumps(response, default=_json_default, separators=(",", ":"))
+        with _RESPONSE_CACHE_LOCK:
+            _response_cache_db().execute(
+                "INSERT OR REPLACE INTO responses (key, api, stored_at, body) VALUES (?, ?, ?, ?)",
+                (key, api, time.time(), body),
+            )
+    except Exception:
+        return  # not serializable or cache not writable: the response is still used
+    _response_cache_count("stores")
+
+
+# Response dumps. Every response of a run can be recorded into a JSON file
+# (see record_responses) and later runs evaluated from that file alone (see
+# load_response_dump), without credentials or network access. Dumps are plain
+# JSON, so recorded responses can be edited for what-if evaluations.
+
+RESPONSE_DUMP_VERSION = 1
+
+# mode: None, "record" or "replay". recorded: cache key -> dump entry;
+# replay: (provider, api, params) -> [(scope, response JSON text)]
+_RESPONSE_DUMP: Dict[str, Any] = {"mode": None, "path": None, "recorded": {}, "replay": {}}
+_RESPONSE_DUMP_LOCK = threading.Lock()
+
+
+def _plain_json(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=_json_default))
+
+
+def _dump_call_key(provider: str, api: str, params: Any) -> Tuple[str, str, str]:
+    return provider, api, json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def record_responses(enabled: bool = True) -> None:
+    """Start (or stop) recording every cloud API response for save_response_dump."""
+    with _RESPONSE_DUMP_LOCK:
+        _RESPONSE_DUMP.update(mode="record" if enabled else None, path=None, recorded={}, replay={})
+
+
+def save_response_dump(path: str) -> int:
+    """Write the recorded responses to path (gzip-compressed for .gz) and return how many there are."""
+    with _RESPONSE_DUMP_LOCK:
+        entries = list(_RESPONSE_DUMP["recorded"].values())
+    with _open_output(path) as f:
+        json.dump({"version": RESPONSE_DUMP_VERSION, "responses": entries}, f, ensure_ascii=False, indent=1)
+    return len(entries)
+
+
+def load_response_dump(path: str) -> None:
+    """
+    Answer every cloud API call from the responses recorded in path: no
+    credentials or network are used, and a call missing from the dump fails.
+    """
+    if path.endswith(".gz"):
+        stream = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        stream = open(path, encoding="utf-8")
+    with stream:
+        data = json.load(stream)
+    if data.get("version") != RESPONSE_DUMP_VERSION:
+        raise ValueError(f"Unsupported response dump version in {path}: {data.get('version')}")
+    replay: Dict[Tuple[str, str, str], List[Tuple[Any, str]]] = {}
+    for entry in data.get("responses", []):
+        key = _dump_call_key(entry["provider"], entry["api"], entry["params"])
+        replay.setdefault(key, []).append((entry.get("scope"), json.dumps(entry["response"])))
+    with _RESPONSE_DUMP_LOCK:
+        _RESPONSE_DUMP.update(mode="replay", path=path, recorded={}, replay=replay)
+
+
+def _offline() -> bool:
+    return _RESPONSE_DUMP["mode"] == "replay"
+
+
+def _dump_record(provider: str, scope: Any, api: str, params: Any, response: Any) -> None:
+    if _RESPONSE_DUMP["mode"] != "record":
+        return
+    try:
+        entry = {
+            "provider": provider,
+            "scope": _plain_json(scope),
+            "api": api,
+            "params": _plain_json(params),
+            "response": _plain_json(response),
+        }
+    except Exception:
+        return  # not JSON data (e.g. a streaming body)
+    key = _response_cache_key(provider, scope, api, params)
+    with _RESPONSE_DUMP_LOCK:
+        _RESPONSE_DUMP["recorded"][key] = entry
+
+
+def _dump_replay(provider: str, scope: Any, api: str, params: Any) -> Any:
+    """
+    Recorded response of a call. When the call was recorded for several
+    scopes (accounts, regions), the recording sharing most of its scope wins.
+    """
+    params = _plain_json(params)
+    candidates = _RESPONSE_DUMP["replay"].get(_dump_call_key(provider, api, params))
+    if not candidates:
+        raise LookupError(f"offline: no recorded response for {api} {json.dumps(params, sort_keys=True)}")
+    scope = _plain_json(scope)
+
+    def shared(candidate: Tuple[Any, str]) -> int:
+        if isinstance(scope, list) and isinstance(candidate[0], list):
+            return sum(mine == theirs for mine, theirs in zip(scope, candidate[0]))
+        return int(scope == candidate[0])
+
+    return json.loads(max(candidates, key=shared)[1], object_hook=_json_object_hook)
+
+
+def _cached_response(provider: str, scope: Any, api: str, params: Any, fetch, encode=None, decode=None) -> Any:
+    """
+    Return fetch() through the response cache (a no-op while it is disabled)
+    and the response dump being recorded or replayed. encode / decode convert
+    responses that are not plain JSON data.
+    """
+    if _offline():
+        _profile_cached()
+        body = _dump_replay(provider, scope, api, params)
+        return decode(body) if decode else body
+    key = None
+    if _RESPONSE_CACHE_CONFIG["enabled"]:
+        key = _response_cache_key(provider, scope, api, params)
+        cached = _response_cache_get(key, api)
+        if cached is not None:
+            _profile_cached()
+            _dump_record(provider, scope, api, params, cached)
+            return decode(cached) if decode else cached
+    response = fetch()
+    if key is None and _RESPONSE_DUMP["mode"] != "record":
+        return response
+    try:
+        body = encode(response) if encode else response
+    except Exception:
+        return response  # not cacheable, still used
+    _dump_record(provider, scope, api, params, body)
+    if key is not None:
+        _response_cache_put(key, api, body)
+    return response
+
+
+def _register_boto3_response_cache(client, scope: Any) -> None:
+    """
+    Serve the client's read-only calls (Describe*, List*, Get*) from the
+    response cache or the replayed response dump: botocore uses the response
+    returned by a before-call handler instead of signing and sending the
+    request. Responses are also recorded into the dump being recorded.
+    """
+    service = client.meta.service_model.endpoint_prefix
+
+    def read_only(model) -> bool:
+        return model.name.startswith(("Describe", "List", "Get"))
+
+    def remember_key(params, model, context, **kwargs):
+        if read_only(model) and (_RESPONSE_CACHE_CONFIG["enabled"] or _RESPONSE_DUMP["mode"]):
+            api = f"{service}.{model.name}"
+            context["response_cache"] = (_response_cache_key("aws", scope, api, params), api)
+            context["response_dump"] = (api, params)
+
+    def serve_cached(model, context, **kwargs):
+        if "response_cache" not in context:
+            return None
+        if _offline():
+            cached = _dump_replay("aws", scope, *context["response_dump"])
+        else:
+            cached = _response_cache_get(*context["response_cache"]) if _RESPONSE_CACHE_CONFIG["enabled"] else None
+            if cached is None:
+                return None
+            _dump_record("aws", scope, *context["response_dump"], cached)
+        context["response_cache_hit"] = True
+        return SimpleNamespace(status_code=200, headers={}), cached
+
+    def store(http_response, parsed, context, **kwargs):
+        if "response_cache" in context and not context.get("response_cache_hit") and http_response.status_code < 300:
+            _dump_record("aws", scope, *context["response_dump"], parsed)
+            if _RESPONSE_CACHE_CONFIG["enabled"]:
+                _response_cache_put(*context["response_cache"], parsed)
+
+    client.meta.events.register("before-parameter-build", remember_key)
+    client.meta.events.register("before-call", serve_cached)
+    client.meta.events.register("after-call", store)
+
+
+def _gcp_cached_request_class():
+    """
+    googleapiclient request class whose GET requests go through the response
+    cache, keyed by the request URI (which carries the project and arguments),
+    and are answered by the response _gcp_prefetch fetched for their URI, if any.
+    """
+    import httplib2  # type: ignore
+    from googleapiclient.http import HttpRequest  # type: ignore
+
+    class CachedHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            def send():
+                with _GCP_PREFETCHED_LOCK:
+                    prefetched = _GCP_PREFETCHED.pop(self.uri, None)
+                if prefetched is None:
+                    return super(CachedHttpRequest, self).execute(http=http, num_retries=num_retries)
+                status, headers, content = prefetched
+                return self.postproc(httplib2.Response({**headers, "status": str(status)}), content)
+
+            if self.method != "GET":
+                fetch = send
+            else:
+                fetch = lambda: _cached_response("gcp", None, self.methodId or "", self.uri, send)  # noqa: E731
+            return _profiled_call("gcp", self.methodId or "", fetch, page="pageToken=" in self.uri)
+
+    return CachedHttpRequest
+
+
+def _azure_model_json(value: Any) -> Any:
+    """ARM JSON of an Azure SDK model (or list of models) for the response cache."""
+    if isinstance(value, list):
+        return [_azure_model_json(item) for item in value]
+    if hasattr(value, "serialize"):  # msrest models
+        return value.serialize(keep_readonly=True)
+    return json.loads(json.dumps(value, default=dict))
+
+
+# Azure resource kind -> SDK model class name (azure.mgmt.compute for VMs, else azure.mgmt.network)
+_AZURE_MODEL_NAMES = {
+    "virtual_machines": "VirtualMachine",
+    "vm_statuses": "VirtualMachine",
+    "network_interfaces": "NetworkInterface",
+    "public_ip_addresses": "PublicIPAddress",
+    "virtual_networks": "VirtualNetwork",
+    "subnets": "Subnet",
+    "network_security_groups": "NetworkSecurityGroup",
+    "route_tables": "RouteTable",
+    "load_balancers": "LoadBalancer",
+}
+
+
+def _azure_model_from_json(kind: str, value: Any) -> Any:
+    """Build the SDK model of a resource kind (or a list of them) from ARM JSON."""
+    if isinstance(value, list):
+        return [_azure_model_from_json(kind, item) for item in value]
+
+    model_name = _AZURE_MODEL_NAMES[kind]
+    package = "compute" if model_name == "VirtualMachine" else "network"
+    model = getattr(importlib.import_module(f"azure.mgmt.{package}.models"), model_name)
+    # msrest models deserialize; newer SDK models are mappings over the JSON
+    return model.deserialize(value) if hasattr(model, "deserialize") else model(value)
+
+
+def _azure_cached(api: str, params: Any, kind: str, fetch) -> Any:
+    """
+    Return fetch() (an Azure SDK model of kind, or a list of them) through the
+    response cache, rebuilding the models from the cached ARM JSON.
+    """
+    return _profiled_call(
+        "azure",
+        f"azure.{api}",
+        lambda: _cached_response(
+            "azure", None, f"azure.{api}", params, fetch,
+            encode=_azure_model_json, decode=lambda value: _azure_model_from_json(kind, value),
+        ),
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Address / port range engine
+# ─────────────────────────────────────────────────────────────────────────────
+# CIDRs and port specs are evaluated as integer intervals. Merged intervals are
+# kept as sorted parallel lists of starts and ends ("range tables"), so that
+# containment and overlap queries are bisect lookups instead of scans over
+# every rule, and split ranges such as 0.0.0.0/1 + 128.0.0.0/1 are recognized
+# as covering the whole address space.
+
+# IP protocol numbers (and wildcards) accepted in place of protocol names.
+_IP_PROTOCOL_NAMES = {
+    "-1": "all", "*": "all", "1": "icmp", "4": "ipip", "6": "tcp", "17": "udp", "50": "esp", "51": "ah", "132": "sctp",
+}
+_PORT_PROTOCOLS = ("tcp", "udp", "sctp")
+_FULL_PORT_RANGE = [(0, 65535)]
+_ADDRESS_SPACE = {4: (0, 2 ** 32 - 1), 6: (0, 2 ** 128 - 1)}
+# Address blocks that are never reachable from the internet.
+_NON_INTERNET_CIDRS = (
+    "0.0.0.0/8", "10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16", "172.16.0.0/12",
+    "192.168.0.0/16", "::1/128", "fc00::/7", "fe80::/10",
+)
+
+RangeTable = Tuple[List[int], List[int]]
+# (ip version, protocol) -> [(port_low, port_high, allowed source range table)], sorted by port
+ReachIndex = Dict[Tuple[int, str], List[Tuple[int, int, RangeTable]]]
+
+
+def _normalize_protocol(protocol: Any) -> str:
+    value = str(protocol or "all").lower()
+    return _IP_PROTOCOL_NAMES.get(value, value)
+
+
+def _cidr_range(cidr: str) -> Optional[Tuple[int, int, int]]:
+    """Return (ip version, first address, last address) of a CIDR, or None if it is not one."""
+    try:
+        network = ipaddress.ip_network(cidr.strip(), strict=False)
+    except (ValueError, AttributeError):
+        return None
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _cidr_ranges(cidrs: List[str], version: int) -> List[Tuple[int, int]]:
+    """Address ranges of the CIDRs of one IP version; other entries are ignored."""
+    ranges: List[Tuple[int, int]] = []
+    for cidr in cidrs:
+        parsed = _cidr_range(cidr)
+        if parsed and parsed[0] == version:
+            ranges.append((parsed[1], parsed[2]))
+    return ranges
+
+
+def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping and adjacent integer intervals."""
+    merged: List[List[int]] = []
+    for low, high in sorted(intervals):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return [(low, high) for low, high in merged]
+
+
+def _subtract_intervals(intervals: List[Tuple[int, int]], removed: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    result: List[Tuple[int, int]] = []
+    removed = _merge_intervals(removed)
+    for low, high in _merge_intervals(intervals):
+        for cut_low, cut_high in removed:
+            if cut_high < low or cut_low > high:
+                continue
+            if cut_low > low:
+                result.append((low, cut_low - 1))
+            low = cut_high + 1
+            if low > high:
+                break
+        if low <= high:
+            result.append((low, high))
+    return result
+
+
+def _range_table(intervals: List[Tuple[int, int]]) -> RangeTable:
+    merged = _merge_intervals(intervals)
+    return [low for low, _ in merged], [high for _, high in merged]
+
+
+def _table_contains(table: RangeTable, low: int, high: int) -> bool:
+    """True when [low, high] lies entirely within the table's ranges."""
+    starts, ends = table
+    i = bisect.bisect_right(starts, low) - 1
+    return i >= 0 and ends[i] >= high
+
+
+def _table_overlaps(table: RangeTable, low: int, high: int) -> bool:
+    starts, ends = table
+    i = bisect.bisect_right(starts, high) - 1
+    return i >= 0 and ends[i] >= low
+
+
+_NON_INTERNET_TABLES = {
+    version: _range_table(_cidr_ranges(list(_NON_INTERNET_CIDRS), version)) for version in (4, 6)
+}
+
+
+def _cidr_reaches_internet(cidr: str) -> bool:
+    """True when a CIDR covers internet addresses (anything outside _NON_INTERNET_CIDRS)."""
+    parsed = _cidr_range(cidr)
+    return parsed is not None and not _table_contains(_NON_INTERNET_TABLES[parsed[0]], parsed[1], parsed[2])
+
+
+def _port_intervals(ports: List[str]) -> List[Tuple[int, int]]:
+    """Convert port specs ("443", "8000-9000", "*") to intervals; no ports means all ports."""
+    intervals: List[Tuple[int, int]] = []
+    for spec in ports:
+        spec = str(spec).strip()
+        if spec in ("", "*"):
+            return list(_FULL_PORT_RANGE)
+        low, _, high = spec.partition("-")
+        intervals.append((int(low), int(high or low)))
+    return intervals or list(_FULL_PORT_RANGE)
+
+
+def _format_port_intervals(intervals: List[Tuple[int, int]]) -> str:
+    return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in intervals)
+
+
+def _build_reach_index(entries: List[Tuple[str, str, List[Tuple[int, int]]]]) -> ReachIndex:
+    """
+    Index allow entries (protocol, source CIDR, port intervals). For every
+    protocol the port axis is cut into segments at each rule boundary and each
+    segment stores the merged source ranges allowed on all of its ports.
+    """
+    grouped: Dict[Tuple[int, str], List[Tuple[int, int, int, int]]] = {}
+    for protocol, cidr, ports in entries:
+        parsed = _cidr_range(cidr)
+        if parsed is None:
+            continue
+        version, addr_low, addr_high = parsed
+        for port_low, port_high in ports:
+            grouped.setdefault((version, _normalize_protocol(protocol)), []).append(
+                (port_low, port_high, addr_low, addr_high)
+            )
+
+    index: ReachIndex = {}
+    for key, items in grouped.items():
+        adds: Dict[int, List[int]] = {}
+        removes: Dict[int, List[int]] = {}
+        for i, (port_low, port_high, _, _) in enumerate(items):
+            adds.setdefault(port_low, []).append(i)
+            removes.setdefault(port_high + 1, []).append(i)
+        cuts = sorted(set(adds) | set(removes))
+        active: Set[int] = set()
+        segments: List[Tuple[int, int, RangeTable]] = []
+        for cut, next_cut in zip(cuts, cuts[1:]):
+            active.difference_update(removes.get(cut, []))
+            active.update(adds.get(cut, []))
+            if not active:
+                continue
+            table = _range_table([(items[i][2], items[i][3]) for i in active])
+            if segments and segments[-1][1] == cut - 1 and segments[-1][2] == table:
+                segments[-1] = (segments[-1][0], next_cut - 1, table)
+            else:
+                segments.append((cut, next_cut - 1, table))
+        index[key] = segments
+    return index
+
+
+def _reach_allows(index: ReachIndex, source: str, protocol: str, port: int) -> bool:
+    """True when traffic from source (address or CIDR) on protocol/port is allowed for every source address."""
+    parsed = _cidr_range(source)
+    return parsed is not None and _reach_allows_range(index, parsed, protocol, port)
+
+
+def _reach_allows_range(index: ReachIndex, source: Tuple[int, int, int], protocol: str, port: int) -> bool:
+    """_reach_allows for a parsed source (see _cidr_range)."""
+    version, low, high = source
+    for key in {(version, "all"), (version, _normalize_protocol(protocol))}:
+        segments = index.get(key, [])
+        i = bisect.bisect_right(segments, port, key=lambda segment: segment[0]) - 1
+        if i >= 0 and segments[i][1] >= port and _table_contains(segments[i][2], low, high):
+            return True
+    return False
+
+
+def _reach_internet_exposure(index: ReachIndex) -> Tuple[List[str], List[str]]:
+    """
+    Return (open, partial) "protocol[:ports]" entries: open when the whole IPv4
+    or IPv6 address space is allowed, partial when only some internet
+    (non-private) addresses are, e.g. a lone 0.0.0.0/1.
+    """
+    open_ports: Dict[str, List[Tuple[int, int]]] = {}
+    partial_ports: Dict[str, List[Tuple[int, int]]] = {}
+    for (version, protocol), segments in index.items():
+        space_low, space_high = _ADDRESS_SPACE[version]
+        for port_low, port_high, table in segments:
+            if _table_contains(table, space_low, space_high):
+                open_ports.setdefault(protocol, []).append((port_low, port_high))
+            elif any(not _table_contains(_NON_INTERNET_TABLES[version], low, high) for low, high in zip(*table)):
+                partial_ports.setdefault(protocol, []).append((port_low, port_high))
+
+    def entries(by_protocol: Dict[str, List[Tuple[int, int]]]) -> List[str]:
+        result: List[str] = []
+        for protocol in sorted(by_protocol):
+            merged = _merge_intervals(by_protocol[protocol])
+            if not merged:
+                continue
+            if merged == _FULL_PORT_RANGE or protocol not in _PORT_PROTOCOLS:
+                result.append(protocol)
+            else:
+                result.append(f"{protocol}:{_format_port_intervals(merged)}")
+        return result
+
+    partial_only = {p: _subtract_intervals(ivs, open_ports.get(p, [])) for p, ivs in partial_ports.items()}
+    return entries(open_ports), entries(partial_only)
+
+
+def _ranges_cover_address_space(cidrs: List[str]) -> bool:
+    """True when the CIDRs together cover every IPv4 or every IPv6 address (a default route)."""
+    return any(
+        _table_contains(_range_table(_cidr_ranges(cidrs, version)), *_ADDRESS_SPACE[version])
+        for version in (4, 6)
+    )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # AWS helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
+# AWS request scheduling. Every HTTP attempt of a client first takes a token
+# from the bucket of its API and a slot of the concurrency limit shared by all
+# clients of the same credentials, region and service. A throttled attempt
+# halves both the limit and the API's rate; successful attempts grow them back
+# (additive increase, multiplicative decrease). Throttled calls themselves are
+# retried with backoff by botocore's standard retry mode.
+
+# (requests per second, burst) by "<service>.<Operation>", falling back to the
+# "<service>" entry (services by endpoint prefix, e.g. elbv2 is
+# elasticloadbalancing), then to AWS_DEFAULT_API_RATE.
+AWS_API_RATES: Dict[str, Tuple[float, int]] = {
+    "ec2": (20.0, 100),  # EC2 non-mutating actions: 100-token bucket refilled at 20/s
+    "elasticloadbalancing": (10.0, 20),
+    "rds": (10.0, 20),
+}
+AWS_DEFAULT_API_RATE = (10.0, 20)
+AWS_MIN_API_RATE = 0.5
+AWS_MAX_CONCURRENCY = CLIENT_POOL_SIZE
+AWS_RETRY_ATTEMPTS = 8
+
+_AWS_THROTTLING_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException", "RequestThrottled",
+    "RequestLimitExceeded", "TooManyRequestsException", "ProvisionedThroughputExceededException",
+    "SlowDown", "EC2ThrottledException", "PriorRequestNotComplete", "BandwidthLimitExceeded",
+}
+_AWS_PERMISSION_CODES = {"AccessDenied", "AccessDeniedException", "UnauthorizedOperation", "UnauthorizedAccess"}
+
+# (credential scope..., region, service) -> scheduler state. Learned limits are
+# kept for the life of the process (e.g. across daemon requests).
+_AWS_SCHEDULERS: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+_AWS_SCHEDULERS_LOCK = threading.Lock()
+
+
+def _aws_scheduler(key: Tuple[Any, ...]) -> Dict[str, Any]:
+    with _AWS_SCHEDULERS_LOCK:
+        state = _AWS_SCHEDULERS.get(key)
+        if state is None:
+            state = {
+                "condition": threading.Condition(),
+                "limit": float(AWS_MAX_CONCURRENCY),
+                "in_flight": 0,
+                "buckets": {},
+                "throttled": 0,
+            }
+            _AWS_SCHEDULERS[key] = state
+        return state
+
+
+def _aws_bucket(state: Dict[str, Any], service: str, operation: str) -> Dict[str, float]:
+    bucket = state["buckets"].get(operation)
+    if bucket is None:
+        rate, burst = AWS_API_RATES.get(f"{service}.{operation}") or AWS_API_RATES.get(service) or AWS_DEFAULT_API_RATE
+        bucket = {"rate": rate, "max_rate": rate, "burst": burst, "tokens": burst, "updated": time.monotonic()}
+        state["buckets"][operation] = bucket
+    return bucket
+
+
+def _aws_acquire(state: Dict[str, Any], service: str, operation: str) -> None:
+    """Block until a concurrency slot and a token of the operation's bucket are available."""
+    condition = state["condition"]
+    with condition:
+        while state["in_flight"] >= int(state["limit"]):
+            condition.wait()
+        state["in_flight"] += 1
+        bucket = _aws_bucket(state, service, operation)
+        while True:
+            now = time.monotonic()
+            bucket["tokens"] = min(bucket["burst"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+            bucket["updated"] = now
+            if bucket["tokens"] >= 1:
+                bucket["tokens"] -= 1
+                return
+            condition.wait((1 - bucket["tokens"]) / bucket["rate"])
+
+
+def _aws_release(state: Dict[str, Any], service: str, operation: str, throttled: bool) -> None:
+    """Free the slot of a finished attempt and adapt the limits to its outcome."""
+    condition = state["condition"]
+    with condition:
+        state["in_flight"] -= 1
+        bucket = _aws_bucket(state, service, operation)
+        if throttled:
+            state["throttled"] += 1
+            state["limit"] = max(1.0, state["limit"] / 2)
+            bucket["rate"] = max(AWS_MIN_API_RATE, bucket["rate"] / 2)
+        else:
+            state["limit"] = min(float(AWS_MAX_CONCURRENCY), state["limit"] + 1 / state["limit"])
+            bucket["rate"] = min(bucket["max_rate"], bucket["rate"] + bucket["max_rate"] / 20)
+        condition.notify_all()
+
+
+def _aws_error_code(exc: Exception) -> str:
+    return (getattr(exc, "response", None) or {}).get("Error", {}).get("Code", "")
+
+
+def _aws_error_reason(exc: Exception, api: str) -> str:
+    """Reason recorded when an AWS lookup fails: throttled / permission_denied / api_error."""
+    code = _aws_error_code(exc)
+    if code in _AWS_THROTTLING_CODES:
+        return f"throttled:{api}"
+    if code in _AWS_PERMISSION_CODES:
+        return f"permission_denied:{api}"
+    return f"api_error:{api}"
+
+
+def _register_boto3_scheduler(client, scope: Any) -> None:
+    """Make every HTTP attempt of the client go through the scheduler of its scope."""
+    service = client.meta.service_model.endpoint_prefix
+    state = _aws_scheduler((*scope, service))
+
+    def acquire(event_name: str, **kwargs):
+        _aws_acquire(state, service, event_name.rsplit(".", 1)[-1])
+
+    def release(event_name: str, response=None, **kwargs):
+        throttled = False
+        if response is not None:
+            http_response, parsed = response
+            throttled = http_response.status_code == 429 or (
+                parsed.get("Error", {}).get("Code") in _AWS_THROTTLING_CODES
+            )
+        _aws_release(state, service, event_name.rsplit(".", 1)[-1], throttled)
+
+    client.meta.events.register("before-send", acquire)
+    client.meta.events.register("needs-retry", release)
+
+
+# Session name of the roles assumed for a profile given as an IAM role ARN.
+AWS_ROLE_SESSION_NAME = "network-connectivity-checker"
+
+
+def _is_aws_role_arn(profile: Optional[str]) -> bool:
+    return bool(profile) and profile.startswith("arn:") and ":role/" in profile
+
+
+def _get_boto3_session(profile: str):
+    """
+    Return the boto3 session of a named profile or, when profile is an IAM
+    role ARN, of that role assumed with the default credential chain. Assumed
+    credentials are refreshed before they expire.
+    """
+    import boto3  # type: ignore
+
+    def _create_session():
+        if not _is_aws_role_arn(profile):
+            return boto3.Session(profile_name=profile)
+        import botocore.session  # type: ignore
+        from botocore.credentials import AssumeRoleCredentialFetcher, DeferredRefreshableCredentials  # type: ignore
+
+        source = botocore.session.get_session()
+        fetcher = AssumeRoleCredentialFetcher(
+            client_creator=source.create_client,
+            source_credentials=source.get_credentials(),
+            role_arn=profile,
+            extra_args={"RoleSessionName": AWS_ROLE_SESSION_NAME},
+        )
+        role_session = botocore.session.get_session()
+        role_session._credentials = DeferredRefreshableCredentials(
+            refresh_using=fetcher.fetch_credentials, method="assume-role"
+        )
+        return boto3.Session(botocore_session=role_session)
+
+    return _registry_get(("aws", "session", None, profile), _create_session)
+
+
 def _get_boto3_client(service: str, region: Optional[str] = None, profile: Optional[str] = None):
-    """Return a boto3 client, importing boto3 lazily."""
+    """
+    Return a boto3 client, importing boto3 lazily. profile is a named profile
+    or an IAM role ARN (see _get_boto3_session). Clients (and the session of
+    the profile) are created once per run and shared between checks.
+    """
     try:
         import boto3  # type: ignore
+        from botocore.config import Config  # type: ignore
     except ImportError as exc:
         raise ImportError("boto3 is required for AWS checks. Install with: pip install boto3") from exc
-    kwargs: Dict[str, Any] = {}
-    if region:
-        kwargs["region_name"] = region
-    if profile:
-        session = boto3.Session(profile_name=profile)
-        return session.client(service, **kwargs)
-    return boto3.client(service, **kwargs)
+
+    def _create_client():
+        config = Config(
+            max_pool_connections=CLIENT_POOL_SIZE,
+            retries={"mode": "standard", "max_attempts": AWS_RETRY_ATTEMPTS},
+        )
+        kwargs: Dict[str, Any] = {"config": config}
+        if region:
+            kwargs["region_name"] = region
+        elif _offline() and not (os.environ.get("AWS_DEFAULT_REGION") or os.environ.get("AWS_REGION")):
+            kwargs["region_name"] = "us-east-1"  # replayed calls are never sent anywhere
+        if profile and not _offline():  # offline, the profile only selects recorded responses
+            client = _get_boto3_session(profile).client(service, **kwargs)
+        else:
+            client = boto3.client(service, **kwargs)
+        # cached responses are only shared by the same credentials and region
+        scope = [profile or os.environ.get("AWS_PROFILE"), os.environ.get("AWS_ACCESS_KEY_ID"), client.meta.region_name]
+        _register_boto3_response_cache(client, scope)
+        _register_boto3_scheduler(client, scope)
+        _register_boto3_profiler(client)
+        return client
+
+    # Sessions are not thread-safe, so clients are always created under the lock.
+    return _registry_get(("aws", service, region, profile), _create_client)
 
 
 def _sg_rules_summary(sg_list: List[Dict]) -> Tuple[List[str], List[str]]:
@@ -159,6 +1331,30 @@ def _sg_rules_with_ports(sg_list: List[Dict]) -> Tuple[List[Dict[str, Any]], Lis
     return ingress_rules, egress_rules
 
 
+def _sg_rule_ports(protocol: str, from_port: Optional[int], to_port: Optional[int]) -> List[Tuple[int, int]]:
+    """Port intervals of a security group rule of a normalized protocol."""
+    if protocol in _PORT_PROTOCOLS and from_port is not None and from_port >= 0:
+        return [(from_port, to_port if to_port is not None else from_port)]
+    return list(_FULL_PORT_RANGE)  # all traffic, or ICMP type/code
+
+
+def _sg_reach_index(sg_list: List[Dict]) -> ReachIndex:
+    """Index the ingress rules of security groups for source / port lookups."""
+    ingress_rules, _ = _sg_rules_with_ports(sg_list)
+    entries = []
+    for rule in ingress_rules:
+        protocol = _normalize_protocol(rule["protocol"])
+        entries.append((protocol, rule["cidr"], _sg_rule_ports(protocol, rule["from_port"], rule["to_port"])))
+    return _build_reach_index(entries)
+
+
+def _sg_internet_reasons(internet_open: List[str], internet_partial: List[str]) -> List[str]:
+    reasons = [f"sg_internet_ingress={','.join(internet_open) if internet_open else 'none'}"]
+    if internet_partial:
+        reasons.append(f"sg_partial_internet_ingress={','.join(internet_partial)}")
+    return reasons
+
+
 def _sg_observed(sg: Dict[str, Any]) -> Dict[str, Any]:
     ingress_rules, egress_rules = _sg_rules_with_ports([sg])
     return {
@@ -169,66 +1365,87 @@ def _sg_observed(sg: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _is_public_subnet(ec2_client, subnet_id: str) -> bool:
+# (ec2 client, subnet id) -> route tables of the subnet, or the lookup error
+_SUBNET_ROUTE_TABLES: Dict[Tuple[Any, str], Any] = _run_cache()
+
+
+@_profiled
+def _subnet_route_tables(ec2_client, subnet_id: str) -> List[Dict[str, Any]]:
     """
-    A subnet is considered public when its associated route table has a route
-    to an Internet Gateway (destination 0.0.0.0/0 or ::/0 via igw-*).
+    Route tables applying to a subnet: its associated table, or the main table
+    of the VPC. Looked up once per run; a failed lookup raises every time.
     """
-    try:
-        resp = ec2_client.describe_route_tables(
-            Filters=[{"Name": "association.subnet-id", "Values": [subnet_id]}]
-        )
-        route_tables = resp.get("RouteTables", [])
-        if not route_tables:
-            # Fall back to the main route table of the VPC
-            subnet_resp = ec2_client.describe_subnets(SubnetIds=[subnet_id])
-            vpc_id = subnet_resp["Subnets"][0]["VpcId"]
+    key = (ec2_client, subnet_id)
+    if key not in _SUBNET_ROUTE_TABLES:
+        try:
             resp = ec2_client.describe_route_tables(
-                Filters=[
-                    {"Name": "vpc-id", "Values": [vpc_id]},
-                    {"Name": "association.main", "Values": ["true"]},
-                ]
+                Filters=[{"Name": "association.subnet-id", "Values": [subnet_id]}]
             )
             route_tables = resp.get("RouteTables", [])
-        for rt in route_tables:
-            for route in rt.get("Routes", []):
-                gw = route.get("GatewayId", "")
-                dest = route.get("DestinationCidrBlock", route.get("DestinationIpv6CidrBlock", ""))
-                if gw.startswith("igw-") and dest in ("0.0.0.0/0", "::/0"):
-                    return True
-    except Exception:
-        pass
-    return False
+            if not route_tables:
+                # Fall back to the main route table of the VPC
+                subnet_resp = ec2_client.describe_subnets(SubnetIds=[subnet_id])
+                vpc_id = subnet_resp["Subnets"][0]["VpcId"]
+                resp = ec2_client.describe_route_tables(
+                    Filters=[
+                        {"Name": "vpc-id", "Values": [vpc_id]},
+                        {"Name": "association.main", "Values": ["true"]},
+                    ]
+                )
+                route_tables = resp.get("RouteTables", [])
+            _SUBNET_ROUTE_TABLES[key] = route_tables
+        except Exception as exc:
+            _SUBNET_ROUTE_TABLES[key] = exc
+    value = _SUBNET_ROUTE_TABLES[key]
+    if isinstance(value, Exception):
+        raise value
+    return value
 
 
-def _has_nat_route(ec2_client, subnet_id: str) -> bool:
-    """Check whether the subnet's route table contains a NAT Gateway route."""
+def _subnet_routes_cover_address_space(ec2_client, subnet_id: str, target) -> Optional[bool]:
+    """
+    Whether the routes whose target matches target(route) cover the whole IPv4
+    or IPv6 address space; None when the route tables could not be read.
+    """
     try:
-        resp = ec2_client.describe_route_tables(
-            Filters=[{"Name": "association.subnet-id", "Values": [subnet_id]}]
-        )
-        route_tables = resp.get("RouteTables", [])
-        if not route_tables:
-            subnet_resp = ec2_client.describe_subnets(SubnetIds=[subnet_id])
-            vpc_id = subnet_resp["Subnets"][0]["VpcId"]
-            resp = ec2_client.describe_route_tables(
-                Filters=[
-                    {"Name": "vpc-id", "Values": [vpc_id]},
-                    {"Name": "association.main", "Values": ["true"]},
-                ]
-            )
-            route_tables = resp.get("RouteTables", [])
-        for rt in route_tables:
-            for route in rt.get("Routes", []):
-                nat = route.get("NatGatewayId", "")
-                dest = route.get("DestinationCidrBlock", route.get("DestinationIpv6CidrBlock", ""))
-                if nat and dest in ("0.0.0.0/0", "::/0"):
-                    return True
+        route_tables = _subnet_route_tables(ec2_client, subnet_id)
     except Exception:
-        pass
-    return False
+        return None
+    destinations = [
+        route.get("DestinationCidrBlock", route.get("DestinationIpv6CidrBlock", ""))
+        for rt in route_tables
+        for route in rt.get("Routes", [])
+        if target(route)
+    ]
+    return _ranges_cover_address_space(destinations)
+
+
+def _is_public_subnet(ec2_client, subnet_id: str) -> Optional[bool]:
+    """
+    A subnet is considered public when its associated route table routes the
+    whole IPv4 or IPv6 address space (0.0.0.0/0, ::/0, or split routes such as
+    0.0.0.0/1 + 128.0.0.0/1) to an Internet Gateway (igw-*). None when the
+    route tables could not be read.
+    """
+    return _subnet_routes_cover_address_space(
+        ec2_client, subnet_id, lambda route: route.get("GatewayId", "").startswith("igw-")
+    )
+
 
+def _has_nat_route(ec2_client, subnet_id: str) -> Optional[bool]:
+    """
+    Check whether the subnet's route table routes the whole address space to a
+    NAT Gateway. None when the route tables could not be read.
+    """
+    return _subnet_routes_cover_address_space(ec2_client, subnet_id, lambda route: bool(route.get("NatGatewayId")))
+
+
+def _bool_reason(value: Optional[bool]) -> str:
+    """true / false, or unknown for a lookup that failed."""
+    return "unknown" if value is None else str(value).lower()
 
+
+@_profiled
 def _find_ec2_load_balancers(elbv2_client, instance_id: str) -> List[Dict[str, str]]:
     """
     Find ELBv2 (ALB/NLB) load balancers that have the given EC2 instance as a
@@ -300,15 +1517,28 @@ def check_aws_ec2(resource_id: str, region: Optional[str] = None, profile: Optio
     sg_resp = ec2.describe_security_groups(GroupIds=sg_ids) if sg_ids else {"SecurityGroups": []}
     sgs = sg_resp.get("SecurityGroups", [])
     ingress_cidrs, egress_cidrs = _sg_rules_summary(sgs)
+    internet_open, internet_partial = _reach_internet_exposure(_sg_reach_index(sgs))
 
-    # Subnet / routing
+    # Subnet / routing (None: the route tables could not be read)
+    lookup_errors: List[str] = []
     public_subnet = _is_public_subnet(ec2, subnet_id) if subnet_id else False
     nat_route = _has_nat_route(ec2, subnet_id) if subnet_id else False
+    if public_subnet is None:
+        try:
+            _subnet_route_tables(ec2, subnet_id)
+        except Exception as exc:
+            lookup_errors.append(_aws_error_reason(exc, "ec2.DescribeRouteTables"))
     public_ip_assigned = bool(public_ip)
 
     # Load balancers (ELBv2) associated with this instance
-    load_balancers = _find_ec2_load_balancers(elbv2, resource_id)
-    has_internet_facing_lb = any(lb["scheme"] == "internet-facing" for lb in load_balancers)
+    try:
+        load_balancers: Optional[List[Dict[str, str]]] = _find_ec2_load_balancers(elbv2, resource_id)
+    except Exception as exc:
+        load_balancers = None
+        lookup_errors.append(_aws_error_reason(exc, "elbv2.DescribeTargetGroups"))
+    has_internet_facing_lb: Optional[bool] = None
+    if load_balancers is not None:
+        has_internet_facing_lb = any(lb["scheme"] == "internet-facing" for lb in load_balancers)
 
     reasons: List[str] = []
     observed: Dict[str, Any] = {
@@ -320,19 +1550,23 @@ def check_aws_ec2(resource_id: str, region: Optional[str] = None, profile: Optio
         "public_ip": public_ip or None,
         "public_ip_assigned": public_ip_assigned,
         "security_groups": [_sg_observed(sg) for sg in sgs],
+        "sg_internet_ingress": internet_open,
+        "sg_partial_internet_ingress": internet_partial,
         "load_balancers": load_balancers,
     }
 
     # ── Reasons ──────────────────────────────────────────────────────────────
     reasons.append(f"instance_state={instance_state}")
-    reasons.append(f"public_subnet={str(public_subnet).lower()}")
-    reasons.append(f"nat_route={str(nat_route).lower()}")
+    reasons.append(f"public_subnet={_bool_reason(public_subnet)}")
+    reasons.append(f"nat_route={_bool_reason(nat_route)}")
     reasons.append(f"public_ip_assigned={str(public_ip_assigned).lower()}")
-    reasons.append(f"lb_internet_facing={str(has_internet_facing_lb).lower()}")
+    reasons.append(f"lb_internet_facing={_bool_reason(has_internet_facing_lb)}")
     if ingress_cidrs:
         reasons.append(f"sg_ingress_allows={','.join(sorted(set(ingress_cidrs)))}")
     if egress_cidrs:
         reasons.append(f"sg_egress_allows={','.join(sorted(set(egress_cidrs)))}")
+    reasons.extend(_sg_internet_reasons(internet_open, internet_partial))
+    reasons.extend(lookup_errors)
 
     # ── Reachability judgement ────────────────────────────────────────────────
     running = instance_state == "running"
@@ -340,10 +1574,13 @@ def check_aws_ec2(resource_id: str, region: Optional[str] = None, profile: Optio
     # Internet reachability: instance must be running, and either
     # (a) in a public subnet with a public IP assigned, or
     # (b) registered as a target of an internet-facing ELBv2 load balancer.
+    # A path that could not be looked up makes a negative answer unknown.
     if running and (public_ip_assigned and public_subnet or has_internet_facing_lb):
         internet_reachability = REACHABLE
     elif not running:
         internet_reachability = NOT_REACHABLE
+    elif (public_ip_assigned and public_subnet is None) or has_internet_facing_lb is None:
+        internet_reachability = UNKNOWN
     else:
         internet_reachability = NOT_REACHABLE
 
@@ -394,6 +1631,8 @@ def check_aws_rds(resource_id: str, region: Optional[str] = None, profile: Optio
     sg_resp = ec2.describe_security_groups(GroupIds=sg_ids) if sg_ids else {"SecurityGroups": []}
     sgs = sg_resp.get("SecurityGroups", [])
     ingress_cidrs, egress_cidrs = _sg_rules_summary(sgs)
+    sg_index = _sg_reach_index(sgs)
+    internet_open, internet_partial = _reach_internet_exposure(sg_index)
 
     # Subnet IDs in the DB subnet group
     subnet_ids = [s["SubnetIdentifier"] for s in db.get("DBSubnetGroup", {}).get("Subnets", [])]
@@ -408,6 +1647,8 @@ def check_aws_rds(resource_id: str, region: Optional[str] = None, profile: Optio
         "endpoint": endpoint_address,
         "port": endpoint_port,
         "security_groups": [_sg_observed(sg) for sg in sgs],
+        "sg_internet_ingress": internet_open,
+        "sg_partial_internet_ingress": internet_partial,
     }
 
     reasons.append(f"db_state={db_state}")
@@ -416,6 +1657,12 @@ def check_aws_rds(resource_id: str, region: Optional[str] = None, profile: Optio
         reasons.append(f"sg_ingress_allows={','.join(sorted(set(ingress_cidrs)))}")
     if egress_cidrs:
         reasons.append(f"sg_egress_allows={','.join(sorted(set(egress_cidrs)))}")
+    reasons.extend(_sg_internet_reasons(internet_open, internet_partial))
+    if endpoint_port:
+        port_open = _reach_allows(sg_index, "0.0.0.0/0", "tcp", endpoint_port) or _reach_allows(
+            sg_index, "::/0", "tcp", endpoint_port
+        )
+        reasons.append(f"sg_endpoint_port_internet_open={str(port_open).lower()}")
 
     available = db_state == "available"
 
@@ -489,8 +1736,24 @@ def _azure_collect_allow_rules(nsg: Any) -> List[Dict[str, Any]]:
     return rules
 
 
-def check_azure_vm(resource_id: str) -> Dict[str, Any]:
-    """Check network reachability for an Azure Virtual Machine."""
+def _create_azure_transport() -> Any:
+    """HTTP transport shared by all Azure clients, pooled for concurrent checks."""
+    import requests  # type: ignore
+    from azure.core.pipeline.transport import RequestsTransport  # type: ignore
+
+    session = requests.Session()
+    session.hooks["response"].append(_profile_http_page)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=CLIENT_POOL_SIZE, pool_maxsize=CLIENT_POOL_SIZE)
+    session.mount("https://", adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
+
+def _get_azure_clients(subscription_id: str) -> Tuple[Any, Any]:
+    """
+    Return (compute_client, network_client) for a subscription. The credential
+    is shared by all subscriptions and both clients share one HTTP transport
+    whose connection pool is sized for concurrent checks.
+    """
     try:
         from azure.identity import DefaultAzureCredential  # type: ignore
         from azure.mgmt.compute import ComputeManagementClient  # type: ignore
@@ -501,6 +1764,251 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
             "Install with: pip install azure-mgmt-compute azure-mgmt-network azure-identity"
         ) from exc
 
+    credential = _registry_get(("azure", "credential", None, None), DefaultAzureCredential)
+    transport = _registry_get(("azure", "transport", None, None), _create_azure_transport)
+    compute_client = _registry_get(
+        ("azure", "compute", None, subscription_id),
+        lambda: ComputeManagementClient(credential, subscription_id, transport=transport),
+    )
+    network_client = _registry_get(
+        ("azure", "network", None, subscription_id),
+        lambda: NetworkManagementClient(credential, subscription_id, transport=transport),
+    )
+    return compute_client, network_client
+
+
+def _azure_key(resource_id: str) -> str:
+    """ARM resource IDs are case-insensitive; normalize them for dictionary lookups."""
+    return resource_id.strip("/").lower()
+
+
+# (subscription, backend) -> inventory built by _azure_get_inventory
+_AZURE_INVENTORIES: Dict[Tuple[str, str], Dict[str, Any]] = _run_cache()
+_AZURE_INVENTORY_LOCK = threading.Lock()
+AZURE_BACKENDS = ("arm", "graph")
+
+
+def _azure_build_inventory(compute_client, network_client, subscription_id: str) -> Dict[str, Any]:
+    """
+    List the VMs and network resources of a subscription (each listing paged
+    by the SDK, all listings concurrently) and index them by resource ID.
+    A listing that fails is stored as None so lookups fall back to get calls.
+    """
+    listers = {
+        "virtual_machines": compute_client.virtual_machines.list_all,
+        "vm_statuses": lambda: compute_client.virtual_machines.list_all(status_only="true"),
+        "network_interfaces": network_client.network_interfaces.list_all,
+        "public_ip_addresses": network_client.public_ip_addresses.list_all,
+        "virtual_networks": network_client.virtual_networks.list_all,
+        "network_security_groups": network_client.network_security_groups.list_all,
+        "route_tables": network_client.route_tables.list_all,
+        "load_balancers": network_client.load_balancers.list_all,
+    }
+
+    def list_items(kind: str, lister) -> Optional[List[Any]]:
+        api = "virtual_machines.list_all" if kind == "vm_statuses" else f"{kind}.list_all"
+        try:
+            return _azure_cached(api, [subscription_id, kind], kind, lambda: list(lister()))
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(listers)) as pool:
+        futures = {kind: pool.submit(_profile_bind(list_items), kind, lister) for kind, lister in listers.items()}
+        listed = {kind: future.result() for kind, future in futures.items()}
+    inventory = _azure_index_inventory(listed)
+    inventory["errors"] = [f"api_error:{kind}.list_all" for kind, items in listed.items() if items is None]
+    return inventory
+
+
+def _azure_index_inventory(listed: Dict[str, Optional[List[Any]]]) -> Dict[str, Any]:
+    """Index listed resources by resource ID, adding subnets and LBs by backend pool."""
+    inventory: Dict[str, Any] = {
+        kind: None if items is None else {_azure_key(item.id): item for item in items}
+        for kind, items in listed.items()
+    }
+    vnets = listed["virtual_networks"]
+    inventory["subnets"] = (
+        None if vnets is None else {_azure_key(s.id): s for vnet in vnets for s in vnet.subnets or []}
+    )
+    lbs = listed["load_balancers"]
+    inventory["lb_by_backend_pool"] = (
+        None if lbs is None else {_azure_key(p.id): lb for lb in lbs for p in lb.backend_address_pools or []}
+    )
+    return inventory
+
+
+# Resource Graph projections: only the fields check_azure_vm reads, in the
+# ARM JSON shape so that rows can be wrapped in the SDK models of the ARM path.
+_AZURE_GRAPH_QUERIES: Dict[str, str] = {
+    "virtual_machines": (
+        "resources | where type =~ 'microsoft.compute/virtualmachines' "
+        "| project id, name, properties = pack("
+        "'networkProfile', pack('networkInterfaces', properties.networkProfile.networkInterfaces), "
+        "'instanceView', pack('statuses', pack_array(pack('code', properties.extended.instanceView.powerState.code))))"
+    ),
+    "network_interfaces": (
+        "resources | where type =~ 'microsoft.network/networkinterfaces' "
+        "| project id, name, properties = pack("
+        "'ipConfigurations', properties.ipConfigurations, 'networkSecurityGroup', properties.networkSecurityGroup)"
+    ),
+    "public_ip_addresses": (
+        "resources | where type =~ 'microsoft.network/publicipaddresses' "
+        "| project id, name, properties = pack('ipAddress', properties.ipAddress)"
+    ),
+    "virtual_networks": (
+        "resources | where type =~ 'microsoft.network/virtualnetworks' "
+        "| project id, name, properties = pack('subnets', properties.subnets)"
+    ),
+    "network_security_groups": (
+        "resources | where type =~ 'microsoft.network/networksecuritygroups' "
+        "| project id, name, properties = pack('securityRules', properties.securityRules)"
+    ),
+    "route_tables": (
+        "resources | where type =~ 'microsoft.network/routetables' "
+        "| project id, name, properties = pack('routes', properties.routes)"
+    ),
+    "load_balancers": (
+        "resources | where type =~ 'microsoft.network/loadbalancers' "
+        "| project id, name, sku, properties = pack('backendAddressPools', properties.backendAddressPools, "
+        "'frontendIPConfigurations', properties.frontendIPConfigurations)"
+    ),
+}
+AZURE_GRAPH_PAGE_SIZE = 1000  # Resource Graph maximum rows per page
+
+
+def _get_azure_graph_client() -> Any:
+    """Return the Resource Graph client, sharing the ARM credential and transport."""
+    try:
+        from azure.mgmt.resourcegraph import ResourceGraphClient  # type: ignore
+    except ImportError as exc:
+        raise ImportError(
+            "azure-mgmt-resourcegraph is required for the Azure Resource Graph backend. "
+            "Install with: pip install azure-mgmt-resourcegraph"
+        ) from exc
+    from azure.identity import DefaultAzureCredential  # type: ignore
+
+    credential = _registry_get(("azure", "credential", None, None), DefaultAzureCredential)
+    transport = _registry_get(("azure", "transport", None, None), _create_azure_transport)
+    return _registry_get(
+        ("azure", "resourcegraph", None, None),
+        lambda: ResourceGraphClient(credential, transport=transport),
+    )
+
+
+def _azure_graph_query(graph_client, subscription_id: str, query: str) -> List[Dict[str, Any]]:
+    """Run a Resource Graph query over one subscription and return the rows of all pages."""
+    from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions  # type: ignore
+
+    rows: List[Dict[str, Any]] = []
+    skip_token = None
+    while True:
+        response = graph_client.resources(
+            QueryRequest(
+                query=query,
+                subscriptions=[subscription_id],
+                options=QueryRequestOptions(
+                    top=AZURE_GRAPH_PAGE_SIZE, skip_token=skip_token, result_format="objectArray"
+                ),
+            )
+        )
+        rows.extend(response.data or [])
+        skip_token = response.skip_token
+        if not skip_token:
+            return rows
+
+
+def _azure_build_graph_inventory(graph_client, subscription_id: str) -> Dict[str, Any]:
+    """
+    Build the same inventory as _azure_build_inventory from Resource Graph:
+    one paged query per resource type (run concurrently) instead of the ARM
+    list calls. A query that fails is stored as None like a failed listing.
+    """
+    def query_items(kind: str) -> Optional[List[Any]]:
+        query = _AZURE_GRAPH_QUERIES[kind]
+        try:
+            rows = _profiled_call(
+                "azure",
+                "azure.resourcegraph.resources",
+                lambda: _cached_response(
+                    "azure", None, "azure.resourcegraph.resources", [subscription_id, query],
+                    lambda: _azure_graph_query(graph_client, subscription_id, query),
+                ),
+            )
+        except Exception:
+            return None
+        return _azure_model_from_json(kind, rows)
+
+    with ThreadPoolExecutor(max_workers=len(_AZURE_GRAPH_QUERIES)) as pool:
+        futures = {kind: pool.submit(_profile_bind(query_items), kind) for kind in _AZURE_GRAPH_QUERIES}
+        listed = {kind: future.result() for kind, future in futures.items()}
+    inventory = _azure_index_inventory(listed)
+    inventory["vm_statuses"] = inventory["virtual_machines"]  # the VM rows carry the power state
+    inventory["errors"] = [f"api_error:resourcegraph.{kind}" for kind, items in listed.items() if items is None]
+    return inventory
+
+
+@_profiled
+def _azure_get_inventory(
+    subscription_id: str, compute_client, network_client, backend: str = "arm"
+) -> Dict[str, Any]:
+    """
+    Return the subscription inventory, built only on the first call of the run
+    from ARM list calls (backend "arm") or Resource Graph queries ("graph").
+    """
+    if backend not in AZURE_BACKENDS:
+        raise ValueError(f"Unsupported Azure backend: {backend}. Supported: {', '.join(AZURE_BACKENDS)}")
+    with _AZURE_INVENTORY_LOCK:
+        inventory = _AZURE_INVENTORIES.get((subscription_id, backend))
+        if inventory is None:
+            if backend == "graph":
+                inventory = _azure_build_graph_inventory(_get_azure_graph_client(), subscription_id)
+            else:
+                inventory = _azure_build_inventory(compute_client, network_client, subscription_id)
+            _AZURE_INVENTORIES[(subscription_id, backend)] = inventory
+        return inventory
+
+
+def _azure_lookup(inventory: Optional[Dict[str, Any]], kind: str, resource_id: str, fetch) -> Any:
+    """
+    Resolve a resource from the inventory, or with fetch() (a per-resource get)
+    when no inventory is used, its listing failed or the ID is not in it.
+    """
+    if inventory is not None and inventory.get(kind) is not None:
+        item = inventory[kind].get(_azure_key(resource_id))
+        if item is not None:
+            return item
+    return _azure_cached(f"{kind}.get", _azure_key(resource_id), kind, fetch)
+
+
+def _azure_power_state(vm: Any) -> str:
+    statuses = vm.instance_view.statuses if vm.instance_view else []
+    for status in statuses or []:
+        if status.code and status.code.startswith("PowerState/"):
+            return status.code.split("/", 1)[1]
+    return "unknown"
+
+
+def _azure_default_route_next_hop(route_table: Any) -> Optional[str]:
+    """Next hop type of the routes that together cover the whole address space, if any."""
+    by_next_hop: Dict[str, List[str]] = {}
+    for route in route_table.routes or []:
+        if route.address_prefix:
+            # SDK models return RouteNextHopType members; report the wire value
+            next_hop = getattr(route.next_hop_type, "value", route.next_hop_type)
+            by_next_hop.setdefault(str(next_hop), []).append(route.address_prefix)
+    for next_hop, prefixes in by_next_hop.items():
+        if _ranges_cover_address_space(prefixes):
+            return next_hop
+    return None
+
+
+def check_azure_vm(resource_id: str, use_inventory: bool = False, backend: str = "arm") -> Dict[str, Any]:
+    """
+    Check network reachability for an Azure Virtual Machine. With
+    use_inventory the VM and its network resources are resolved from the
+    subscription inventory (see _azure_get_inventory) instead of per-VM gets;
+    the "graph" backend always uses the inventory, built from Resource Graph.
+    """
     parsed = _parse_azure_resource_id(resource_id)
     subscription_id = parsed.get("subscriptions", "")
     resource_group = parsed.get("resourcegroups", "")
@@ -513,20 +2021,25 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
             "/subscriptions/<sub>/resourceGroups/<rg>/providers/Microsoft.Compute/virtualMachines/<name>"
         )
 
-    credential = DefaultAzureCredential()
-    compute_client = ComputeManagementClient(credential, subscription_id)
-    network_client = NetworkManagementClient(credential, subscription_id)
+    compute_client, network_client = _get_azure_clients(subscription_id)
+    inventory = None
+    if use_inventory or backend != "arm":
+        inventory = _azure_get_inventory(subscription_id, compute_client, network_client, backend)
 
     # Get VM with instance view for power state
-    vm = compute_client.virtual_machines.get(resource_group, vm_name_parsed, expand="instanceView")
-
-    # Power state
-    statuses = vm.instance_view.statuses if vm.instance_view else []
-    power_state = "unknown"
-    for status in statuses:
-        if status.code and status.code.startswith("PowerState/"):
-            power_state = status.code.split("/", 1)[1]
-            break
+    vm = None
+    if inventory is not None and inventory["virtual_machines"] is not None and inventory["vm_statuses"] is not None:
+        vm = inventory["virtual_machines"].get(_azure_key(resource_id))
+        status_vm = inventory["vm_statuses"].get(_azure_key(resource_id))
+        power_state = _azure_power_state(status_vm) if status_vm is not None else "unknown"
+    if vm is None:
+        vm = _azure_cached(
+            "virtual_machines.get",
+            _azure_key(resource_id),
+            "virtual_machines",
+            lambda: compute_client.virtual_machines.get(resource_group, vm_name_parsed, expand="instanceView"),
+        )
+        power_state = _azure_power_state(vm)
 
     private_ips: List[str] = []
     public_ips: List[str] = []
@@ -534,10 +2047,10 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
     subnet_nsg_rules_info: List[Dict] = []
     subnet_ids: List[str] = []
     has_udr = False
+    udr_default_next_hops: List[str] = []
     seen_subnet_nsg_ids: set[str] = set()
     # Azure LB逆引き用
     nic_backend_pools: List[str] = []
-    lb_backend_pool_map: Dict[str, Dict[str, str]] = {}
     lb_associations: List[Dict[str, str]] = []
 
     # Iterate NICs
@@ -547,7 +2060,9 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
         nic_rg = nic_parts.get("resourcegroups", resource_group)
         nic_name = nic_parts.get("networkinterfaces", "")
 
-        nic = network_client.network_interfaces.get(nic_rg, nic_name)
+        nic = _azure_lookup(
+            inventory, "network_interfaces", nic_id, lambda: network_client.network_interfaces.get(nic_rg, nic_name)
+        )
 
         for ip_config in nic.ip_configurations or []:
             # Private IP
@@ -556,11 +2071,17 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
 
             # Public IP
             if ip_config.public_ip_address and ip_config.public_ip_address.id:
-                pip_parts = _parse_azure_resource_id(ip_config.public_ip_address.id)
+                pip_id = ip_config.public_ip_address.id
+                pip_parts = _parse_azure_resource_id(pip_id)
                 pip_rg = pip_parts.get("resourcegroups", resource_group)
                 pip_name = pip_parts.get("publicipaddresses", "")
                 try:
-                    pip = network_client.public_ip_addresses.get(pip_rg, pip_name)
+                    pip = _azure_lookup(
+                        inventory,
+                        "public_ip_addresses",
+                        pip_id,
+                        lambda: network_client.public_ip_addresses.get(pip_rg, pip_name),
+                    )
                     if pip.ip_address:
                         public_ips.append(pip.ip_address)
                 except Exception:
@@ -574,9 +2095,27 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
                 vnet_name = sub_parts.get("virtualnetworks", "")
                 subnet_name = sub_parts.get("subnets", "")
                 try:
-                    subnet_obj = network_client.subnets.get(sub_rg, vnet_name, subnet_name)
+                    subnet_obj = _azure_lookup(
+                        inventory,
+                        "subnets",
+                        ip_config.subnet.id,
+                        lambda: network_client.subnets.get(sub_rg, vnet_name, subnet_name),
+                    )
                     if subnet_obj.route_table:
                         has_udr = True
+                        rt_id = subnet_obj.route_table.id
+                        rt_parts = _parse_azure_resource_id(rt_id)
+                        route_table = _azure_lookup(
+                            inventory,
+                            "route_tables",
+                            rt_id,
+                            lambda: network_client.route_tables.get(
+                                rt_parts.get("resourcegroups", sub_rg), rt_parts.get("routetables", "")
+                            ),
+                        )
+                        next_hop = _azure_default_route_next_hop(route_table)
+                        if next_hop and next_hop not in udr_default_next_hops:
+                            udr_default_next_hops.append(next_hop)
 
                     if subnet_obj.network_security_group and subnet_obj.network_security_group.id:
                         subnet_nsg_id = subnet_obj.network_security_group.id
@@ -586,7 +2125,12 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
                             subnet_nsg_rg = subnet_nsg_parts.get("resourcegroups", sub_rg)
                             subnet_nsg_name = subnet_nsg_parts.get("networksecuritygroups", "")
                             if subnet_nsg_name:
-                                subnet_nsg = network_client.network_security_groups.get(subnet_nsg_rg, subnet_nsg_name)
+                                subnet_nsg = _azure_lookup(
+                                    inventory,
+                                    "network_security_groups",
+                                    subnet_nsg_id,
+                                    lambda: network_client.network_security_groups.get(subnet_nsg_rg, subnet_nsg_name),
+                                )
                                 subnet_allow_rules = _azure_collect_allow_rules(subnet_nsg)
                                 subnet_nsg_rules_info.append(
                                     {
@@ -605,11 +2149,17 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
 
         # NSG on NIC
         if nic.network_security_group and nic.network_security_group.id:
-            nsg_parts = _parse_azure_resource_id(nic.network_security_group.id)
+            nsg_id = nic.network_security_group.id
+            nsg_parts = _parse_azure_resource_id(nsg_id)
             nsg_rg = nsg_parts.get("resourcegroups", resource_group)
             nsg_name = nsg_parts.get("networksecuritygroups", "")
             try:
-                nsg = network_client.network_security_groups.get(nsg_rg, nsg_name)
+                nsg = _azure_lookup(
+                    inventory,
+                    "network_security_groups",
+                    nsg_id,
+                    lambda: network_client.network_security_groups.get(nsg_rg, nsg_name),
+                )
                 nsg_rules = _azure_collect_allow_rules(nsg)
                 nsg_rules_info.append({"nsg_name": nsg_name, "allow_rules": nsg_rules})
             except Exception:
@@ -617,19 +2167,37 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
 
     # Azure LB: 逆引き (LB名・プール名取得)
     if nic_backend_pools:
-        lbs = list(network_client.load_balancers.list(resource_group_name=resource_group))
-        for lb in lbs:
-            for pool in lb.backend_address_pools or []:
-                if pool.id in nic_backend_pools:
-                    lb_backend_pool_map[pool.id] = {
-                        "lb_name": lb.name,
-                        "pool_name": pool.name,
-                        "lb_type": lb.sku.name if lb.sku else "Unknown",
-                        "frontend": ",".join([fip.name for fip in lb.frontend_ip_configurations or []]),
-                    }
+        if inventory is not None and inventory["lb_by_backend_pool"] is not None:
+            lb_by_pool = {
+                pool_id: inventory["lb_by_backend_pool"][_azure_key(pool_id)]
+                for pool_id in nic_backend_pools
+                if _azure_key(pool_id) in inventory["lb_by_backend_pool"]
+            }
+        else:
+            lbs = _azure_cached(
+                "load_balancers.list",
+                [subscription_id.lower(), resource_group.lower()],
+                "load_balancers",
+                lambda: list(network_client.load_balancers.list(resource_group_name=resource_group)),
+            )
+            lb_by_pool = {
+                pool.id: lb for lb in lbs for pool in lb.backend_address_pools or [] if pool.id in nic_backend_pools
+            }
         for pool_id in nic_backend_pools:
-            if pool_id in lb_backend_pool_map:
-                lb_associations.append(lb_backend_pool_map[pool_id])
+            lb = lb_by_pool.get(pool_id)
+            if lb is None:
+                continue
+            pool_name = next(
+                (p.name for p in lb.backend_address_pools or [] if _azure_key(p.id) == _azure_key(pool_id)), ""
+            )
+            lb_associations.append(
+                {
+                    "lb_name": lb.name,
+                    "pool_name": pool_name,
+                    "lb_type": lb.sku.name if lb.sku else "Unknown",
+                    "frontend": ",".join([fip.name for fip in lb.frontend_ip_configurations or []]),
+                }
+            )
 
     reasons: List[str] = []
     observed: Dict[str, Any] = {
@@ -638,6 +2206,7 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
         "public_ips": public_ips,
         "subnet_ids": subnet_ids,
         "has_udr": has_udr,
+        "udr_default_next_hops": udr_default_next_hops,
         "nsg_rules": nsg_rules_info,
         "subnet_nsg_rules": subnet_nsg_rules_info,
         "azure_lb_backend_pools": lb_associations,
@@ -646,12 +2215,16 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
     reasons.append(f"power_state={power_state}")
     reasons.append(f"public_ip_assigned={str(bool(public_ips)).lower()}")
     reasons.append(f"has_udr={str(has_udr).lower()}")
+    if udr_default_next_hops:
+        reasons.append(f"udr_default_next_hop={','.join(udr_default_next_hops)}")
     reasons.append(f"nsg_rules_present_nic={str(bool(nsg_rules_info)).lower()}")
     reasons.append(f"nsg_rules_present_subnet={str(bool(subnet_nsg_rules_info)).lower()}")
     if nsg_rules_info or subnet_nsg_rules_info:
         reasons.append("nsg_rules_present=true")
     if lb_associations:
         reasons.append(f"azure_lb_backend_pools={','.join([f'{a['lb_name']}/{a['pool_name']}' for a in lb_associations])}")
+    if inventory is not None:
+        reasons.extend(inventory["errors"])
 
     running = power_state.lower() == "running"
     has_public_ip = bool(public_ips)
@@ -679,39 +2252,265 @@ def check_azure_vm(resource_id: str) -> Dict[str, Any]:
     )
 
 
+def _azure_subscription_vm_ids(subscription_id: str, backend: str = "arm") -> List[str]:
+    """Resource IDs of every VM in the subscription inventory."""
+    compute_client, network_client = _get_azure_clients(subscription_id)
+    inventory = _azure_get_inventory(subscription_id, compute_client, network_client, backend)
+    if inventory["virtual_machines"] is None:
+        raise RuntimeError(f"Could not list the virtual machines of subscription {subscription_id}")
+    return [vm.id for vm in inventory["virtual_machines"].values()]
+
+
+def check_azure_vms(subscription_id: str, backend: str = "arm") -> List[Dict[str, Any]]:
+    """
+    Check every VM of a subscription against its inventory: the subscription
+    is listed once and each VM is evaluated from the index.
+    """
+    return [
+        _profiled_check(vm_id, lambda: check_azure_vm(vm_id, use_inventory=True, backend=backend))
+        for vm_id in _azure_subscription_vm_ids(subscription_id, backend)
+    ]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # GCP helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
 def _get_gcp_credentials():
-    """Return GCP credentials using Application Default Credentials."""
+    """
+    Return (credentials, project) from Application Default Credentials,
+    resolved once per run so that token refreshes are shared by all checks.
+    """
     try:
         import google.auth  # type: ignore
-        credentials, project = google.auth.default(
-            scopes=["https://www.googleapis.com/auth/cloud-platform"]
-        )
-        return credentials, project
     except ImportError as exc:
         raise ImportError(
             "google-auth is required for GCP checks. "
             "Install with: pip install google-auth google-auth-httplib2 google-api-python-client"
         ) from exc
+    if _offline():
+        from google.auth.credentials import AnonymousCredentials  # type: ignore
+
+        return _registry_get(("gcp", "credentials", None, "offline"), lambda: (AnonymousCredentials(), None))
+    return _registry_get(
+        ("gcp", "credentials", None, None),
+        lambda: google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"]),
+    )
+
+
+# (service, version) -> compact discovery document (JSON text). Documents only
+# change with the google-api-python-client version, so they outlive runs.
+_GCP_DISCOVERY_DOCUMENTS: Dict[Tuple[str, str], str] = {}
+_GCP_DISCOVERY_LOCK = threading.Lock()
+
+
+def _gcp_compact_discovery_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drop what the client only uses for generated docstrings (descriptions and
+    schema bodies), which is about 80% of the compute v1 document.
+    """
+    def strip(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if k != "description"}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+
+    compact = strip(document)
+    compact["schemas"] = {name: {"id": name, "type": "object"} for name in document.get("schemas", {})}
+    return compact
+
+
+def _gcp_load_discovery_document(service_name: str, version: str) -> Optional[str]:
+    """
+    Read the compact discovery document persisted under CACHE_DIR, creating it
+    from the static document bundled with google-api-python-client on first
+    use. Returns None when the library has no static document for the API.
+    """
+    from googleapiclient import discovery_cache  # type: ignore
+    from googleapiclient.version import __version__ as client_version  # type: ignore
+
+    path = os.path.join(CACHE_DIR, "discovery", f"{service_name}.{version}.{client_version}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass
+
+    static_document = discovery_cache.get_static_doc(service_name, version)
+    if static_document is None:
+        return None
+    document = json.dumps(
+        _gcp_compact_discovery_document(json.loads(static_document)), separators=(",", ":")
+    )
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(document)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # read-only home: keep the document in memory only
+    return document
+
+
+def _gcp_discovery_document(service_name: str, version: str) -> Optional[str]:
+    key = (service_name, version)
+    with _GCP_DISCOVERY_LOCK:
+        if key not in _GCP_DISCOVERY_DOCUMENTS:
+            document = _gcp_load_discovery_document(service_name, version)
+            if document is None:
+                return None
+            _GCP_DISCOVERY_DOCUMENTS[key] = document
+        return _GCP_DISCOVERY_DOCUMENTS[key]
 
 
 def _build_gcp_service(service_name: str, version: str):
-    """Build a GCP API service client."""
+    """
+    Build a GCP API service client, reused for the rest of the run.
+
+    googleapiclient services wrap a non thread-safe httplib2.Http (which keeps
+    the HTTP connection alive), so each worker thread gets its own service.
+    """
     try:
         from googleapiclient import discovery  # type: ignore
-        import google.auth  # type: ignore
-        credentials, _ = google.auth.default(
-            scopes=["https://www.googleapis.com/auth/cloud-platform"]
-        )
-        return discovery.build(service_name, version, credentials=credentials, cache_discovery=False)
     except ImportError as exc:
         raise ImportError(
             "google-api-python-client is required for GCP checks. "
             "Install with: pip install google-auth google-auth-httplib2 google-api-python-client"
         ) from exc
+    credentials, _ = _get_gcp_credentials()
+    services = _thread_cache()
+    key = ("gcp", f"{service_name}/{version}", None, None)
+    service = services.get(key)
+    if service is None:
+        document = _gcp_discovery_document(service_name, version)
+        request_class = _gcp_cached_request_class()
+        if document is not None:
+            service = discovery.build_from_document(document, credentials=credentials, requestBuilder=request_class)
+        else:
+            service = discovery.build(
+                service_name, version, credentials=credentials, cache_discovery=False, requestBuilder=request_class
+            )
+        services[key] = service
+    return service
+
+
+# Requests in flight at once on the asyncio GCP transport (see --gcp-async).
+GCP_ASYNC_CONCURRENCY = 100
+# Retries of a prefetched request answered 429 / 5xx, with exponential backoff.
+GCP_ASYNC_RETRIES = 3
+_GCP_ASYNC_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# The transport is off by default; --gcp-async or configure_gcp_async() enable it.
+_GCP_ASYNC_CONFIG: Dict[str, Any] = {"enabled": False, "concurrency": GCP_ASYNC_CONCURRENCY}
+# concurrency -> transport. Connections carry no credentials (each request is
+# authorized when it is prefetched), so the transport outlives runs.
+_GCP_ASYNC_TRANSPORTS: Dict[int, Any] = {}
+_GCP_ASYNC_TRANSPORTS_LOCK = threading.Lock()
+# request URI -> (status, headers, content) fetched ahead by _gcp_prefetch and
+# consumed by the first execute() of that URI
+_GCP_PREFETCHED: Dict[str, Tuple[int, Dict[str, str], bytes]] = _run_cache()
+_GCP_PREFETCHED_LOCK = threading.Lock()
+
+
+def configure_gcp_async(enabled: bool = True, concurrency: int = GCP_ASYNC_CONCURRENCY) -> None:
+    """
+    Enable or disable the asyncio GCP transport (requires httpx), with up to
+    concurrency requests in flight over its keep-alive connections.
+    """
+    _GCP_ASYNC_CONFIG.update(enabled=enabled, concurrency=concurrency)
+
+
+def _create_gcp_async_transport(concurrency: int) -> Any:
+    """
+    An httpx.AsyncClient driven by an event loop on a thread of its own, so
+    that checks on any thread can submit requests to it and share its pool of
+    keep-alive connections.
+    """
+    try:
+        import httpx  # type: ignore
+    except ImportError as exc:
+        raise ImportError("httpx is required for --gcp-async. Install with: pip install httpx") from exc
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gcp-async", daemon=True).start()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def create_client():
+        return httpx.AsyncClient(limits=limits, timeout=60.0)
+
+    client = asyncio.run_coroutine_threadsafe(create_client(), loop).result()
+    return SimpleNamespace(loop=loop, client=client)
+
+
+def _gcp_async_transport() -> Any:
+    concurrency = _GCP_ASYNC_CONFIG["concurrency"]
+    with _GCP_ASYNC_TRANSPORTS_LOCK:
+        if concurrency not in _GCP_ASYNC_TRANSPORTS:
+            _GCP_ASYNC_TRANSPORTS[concurrency] = _create_gcp_async_transport(concurrency)
+        return _GCP_ASYNC_TRANSPORTS[concurrency]
+
+
+def _gcp_async_fetch_all(
+    transport: Any, sends: List[Tuple[str, str, Dict[str, str], Any]]
+) -> List[Optional[Tuple[int, Dict[str, str], bytes]]]:
+    """
+    Send (method, uri, headers, body) requests concurrently on the transport
+    and return (status, headers, content) for each, None where the request
+    failed. Requests beyond the connection limit wait for a free connection.
+    """
+    async def send(method, uri, headers, body):
+        for attempt in range(GCP_ASYNC_RETRIES + 1):
+            response = await transport.client.request(method, uri, headers=headers, content=body)
+            if response.status_code not in _GCP_ASYNC_RETRY_STATUSES or attempt == GCP_ASYNC_RETRIES:
+                return response.status_code, dict(response.headers), response.content
+            await asyncio.sleep(random.uniform(0, 2 ** attempt))
+
+    async def send_all():
+        return await asyncio.gather(*(send(*request) for request in sends), return_exceptions=True)
+
+    results = asyncio.run_coroutine_threadsafe(send_all(), transport.loop).result()
+    return [None if isinstance(result, BaseException) else result for result in results]
+
+
+def _gcp_prefetch(requests: Iterable[Any]) -> None:
+    """
+    Fetch googleapiclient GET requests concurrently over the asyncio transport
+    (while it is enabled) ahead of the code that executes them: their
+    execute() then returns the prefetched response instead of making its own
+    round trip, still through the response cache, dumps and profiling.
+    Requests answered offline or by the response cache are not sent, and
+    failed or non-2xx responses are dropped so that execute() sends the
+    request again and raises as usual.
+    """
+    if not _GCP_ASYNC_CONFIG["enabled"] or _offline():
+        return
+    pending = []
+    for request in requests:
+        if request.method != "GET":
+            continue
+        if _RESPONSE_CACHE_CONFIG["enabled"]:
+            key = _response_cache_key("gcp", None, request.methodId or "", request.uri)
+            if _response_cache_get(key, request.methodId or "", count=False) is not None:
+                continue
+        pending.append(request)
+    if not pending:
+        return
+    from google.auth.transport.requests import Request  # type: ignore
+
+    credentials, _ = _get_gcp_credentials()
+    auth_request = Request()
+    sends = []
+    for request in pending:
+        headers = dict(request.headers)
+        credentials.before_request(auth_request, request.method, request.uri, headers)
+        sends.append((request.method, request.uri, headers, request.body))
+    responses = _gcp_async_fetch_all(_gcp_async_transport(), sends)
+    with _GCP_PREFETCHED_LOCK:
+        for request, response in zip(pending, responses):
+            if response is not None and response[0] < 300:
+                _GCP_PREFETCHED[request.uri] = response
 
 
 def _parse_gcp_resource_id(resource_id: str) -> Dict[str, str]:
@@ -734,84 +2533,321 @@ def _parse_gcp_resource_id(resource_id: str) -> Dict[str, str]:
     return result
 
 
-def _gcp_get_firewall_rules_for_instance(
-    service, project: str, network_name: str, instance_tags: List[str], service_account: Optional[str]
-) -> List[Dict]:
-    """
-    Return firewall rules (ingress only) that apply to the given instance based on:
-    - target tags matching instance network tags
-    - target service accounts matching the instance service account
-    - rules with no target tags / no target service accounts (apply to all)
-    """
-    result = service.firewalls().list(project=project).execute()
-    rules = result.get("items", [])
+def _gcp_url_project(url: str) -> str:
+    """Return the project of a resource URL / partial path (".../projects/<p>/..."), or ""."""
+    parts = url.strip("/").split("/")
+    if "projects" in parts[:-1]:
+        return parts[parts.index("projects") + 1]
+    return ""
 
-    # Normalize network name (GCP returns full URL)
-    def _network_matches(fw_network: str) -> bool:
-        return fw_network.endswith("/" + network_name) or fw_network == network_name
 
-    applicable: List[Dict] = []
+def _gcp_network_key(network: str) -> str:
+    """Normalize a network reference (full URL or short name) to its short name."""
+    return network.rstrip("/").split("/")[-1]
+
+
+# project -> firewall index built by _gcp_get_firewall_index
+_GCP_FIREWALL_INDEXES: Dict[str, Dict[str, Any]] = _run_cache()
+
+
+def _gcp_list_firewalls(service, project: str) -> List[Dict[str, Any]]:
+    """List every VPC firewall rule of the project, following nextPageToken."""
+    rules: List[Dict[str, Any]] = []
+    list_kwargs: Dict[str, Any] = {"project": project, "maxResults": 500}
+    while True:
+        response = service.firewalls().list(**list_kwargs).execute()
+        rules.extend(response.get("items", []))
+        next_token = response.get("nextPageToken")
+        if not next_token:
+            return rules
+        list_kwargs = dict(list_kwargs, pageToken=next_token)
+
+
+def _gcp_build_firewall_index(rules: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Index enabled ingress firewall rules by network short name, then by
+    target tag / target service account. Rules without targets apply to every
+    instance of the network and are kept under "untargeted".
+    """
+    networks: Dict[str, Dict[str, Any]] = {}
     for rule in rules:
-        if rule.get("direction", "INGRESS") != "INGRESS":
+        if rule.get("direction", "INGRESS") != "INGRESS" or rule.get("disabled"):
             continue
-        if not _network_matches(rule.get("network", "")):
-            continue
-
+        entry = networks.setdefault(
+            _gcp_network_key(rule.get("network", "")),
+            {"untargeted": [], "by_tag": {}, "by_service_account": {}},
+        )
         target_tags = rule.get("targetTags", [])
         target_sas = rule.get("targetServiceAccounts", [])
-
         if not target_tags and not target_sas:
-            # Applies to all instances in the network
-            applicable.append(rule)
-        elif instance_tags and any(t in instance_tags for t in target_tags):
-            applicable.append(rule)
-        elif service_account and service_account in target_sas:
-            applicable.append(rule)
+            entry["untargeted"].append(rule)
+        for tag in target_tags:
+            entry["by_tag"].setdefault(tag, []).append(rule)
+        for sa in target_sas:
+            entry["by_service_account"].setdefault(sa, []).append(rule)
+    return networks
 
-    return applicable
 
+@_profiled
+def _gcp_get_firewall_index(service, project: str) -> Dict[str, Any]:
+    """
+    Return the firewall index of a project, listing its firewall rules only on
+    the first call of the run. Hierarchical / network firewall policies are
+    fetched lazily per network by _gcp_get_firewall_policies.
+    """
+    index = _GCP_FIREWALL_INDEXES.get(project)
+    if index is None:
+        index = {
+            "networks": _gcp_build_firewall_index(_gcp_list_firewalls(service, project)),
+            "policies": {},
+        }
+        _GCP_FIREWALL_INDEXES[project] = index
+    return index
 
-def _gcp_firewall_ingress_cidrs(fw_rules: List[Dict]) -> List[str]:
-    """Extract all source CIDR ranges from the given firewall rules."""
-    cidrs: List[str] = []
-    for rule in fw_rules:
-        cidrs.extend(rule.get("sourceRanges", []))
-    return cidrs
 
+@_profiled
+def _gcp_get_firewall_policies(
+    service, project: str, network_name: str, index: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Return (firewall_policies, error_codes) in effect for a network
+    (hierarchical policies inherited from the organization/folders plus
+    network firewall policies), cached in the project's firewall index.
+    """
+    cached = index["policies"].get(network_name)
+    if cached is None:
+        try:
+            response = service.networks().getEffectiveFirewalls(project=project, network=network_name).execute()
+            cached = (list(response.get("firewallPolicys", [])), [])
+        except Exception as exc:
+            if _is_permission_error(exc):
+                cached = ([], ["permission_denied:networks.getEffectiveFirewalls"])
+            else:
+                cached = ([], ["api_error:networks.getEffectiveFirewalls"])
+        index["policies"][network_name] = cached
+    return cached
 
-def _is_permission_error(exc: Exception) -> bool:
-    """Best-effort detection for GCP permission/authorization errors."""
-    msg = str(exc).lower()
-    return any(token in msg for token in ("permission", "forbidden", "403", "not authorized"))
 
+def _gcp_firewall_rule_sort_key(rule: Dict[str, Any]) -> Tuple[int, int, str]:
+    # Lower priority value wins; on a tie GCP applies deny before allow.
+    return (rule.get("priority", 1000), 0 if rule.get("denied") else 1, rule.get("name", ""))
 
-def _list_compute_collection(
-    compute_service,
-    collection_name: str,
-    project: str,
-    region: Optional[str] = None,
-) -> Tuple[List[Dict[str, Any]], List[str], bool]:
+
+def _gcp_get_firewall_rules_for_instance(
+    index: Dict[str, Any], network_name: str, instance_tags: List[str], service_account: Optional[str]
+) -> List[Dict]:
     """
-    List items for a Compute API collection with pagination support.
-    Returns (items, error_codes, permission_denied_flag).
+    Return firewall rules (ingress only) from a project's firewall index that
+    apply to the given instance based on:
+    - target tags matching instance network tags
+    - target service accounts matching the instance service account
+    - rules with no target tags / no target service accounts (apply to all)
+    Rules are returned in evaluation order (priority, deny before allow).
     """
-    items: List[Dict[str, Any]] = []
-    errors: List[str] = []
-    permission_denied = False
+    entry = index["networks"].get(network_name)
+    if entry is None:
+        return []
 
-    collection_factory = getattr(compute_service, collection_name, None)
-    if collection_factory is None:
-        return [], [f"api_error:{collection_name}_unsupported"], False
+    candidates: List[Dict] = list(entry["untargeted"])
+    for tag in instance_tags or []:
+        candidates.extend(entry["by_tag"].get(tag, []))
+    if service_account:
+        candidates.extend(entry["by_service_account"].get(service_account, []))
 
-    collection = collection_factory()
-    list_kwargs: Dict[str, Any] = {"project": project}
-    if region:
-        list_kwargs["region"] = region
+    applicable: List[Dict] = []
+    seen: Set[int] = set()
+    for rule in candidates:
+        if id(rule) not in seen:
+            seen.add(id(rule))
+            applicable.append(rule)
+    return sorted(applicable, key=_gcp_firewall_rule_sort_key)
 
-    try:
-        request = collection.list(**list_kwargs)
-        while request is not None:
-            response = request.execute()
+
+def _gcp_policy_rules_for_instance(
+    policies: List[Dict[str, Any]], network_name: str, service_account: Optional[str]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Flatten the ingress rules of firewall policies that apply to an instance,
+    hierarchical policies first, each policy's rules in priority order.
+    Returns (rules, skipped): rules targeting secure tags are not evaluated
+    (instance secure tags are not read) and only counted in skipped.
+    """
+    ordered = sorted(policies, key=lambda p: 0 if p.get("type") == "HIERARCHY" else 1)
+    result: List[Dict[str, Any]] = []
+    skipped = 0
+    for policy in ordered:
+        rules = sorted(policy.get("rules", []), key=lambda r: r.get("priority", 0))
+        for rule in rules:
+            if rule.get("direction", "INGRESS") != "INGRESS" or rule.get("disabled"):
+                continue
+            if rule.get("targetSecureTags"):
+                skipped += 1
+                continue
+            target_sas = rule.get("targetServiceAccounts", [])
+            if target_sas and service_account not in target_sas:
+                continue
+            target_resources = rule.get("targetResources", [])
+            if target_resources and network_name not in {_gcp_network_key(r) for r in target_resources}:
+                continue
+            match = rule.get("match", {})
+            result.append(
+                {
+                    "policy": policy.get("shortName") or policy.get("name", ""),
+                    "policy_type": policy.get("type", ""),
+                    "priority": rule.get("priority", 0),
+                    "action": rule.get("action", ""),
+                    "source_ranges": match.get("srcIpRanges", []),
+                    "layer4_configs": match.get("layer4Configs", []),
+                }
+            )
+    return result, skipped
+
+
+# Protocols an "all" allow is broken down into when a deny covers part of it.
+_GCP_ALL_PROTOCOLS = ("tcp", "udp", "icmp", "esp", "ah", "sctp", "ipip")
+
+
+def _gcp_open_ports(
+    protocol: str,
+    intervals: List[Tuple[int, int]],
+    denies: List[Tuple[str, List[Tuple[int, int]], List[Tuple[int, int]]]],
+    probe: Tuple[int, int],
+) -> List[Tuple[int, int]]:
+    """
+    Return the parts of intervals (ports of protocol) that the deny entries
+    evaluated so far do not block for the whole probe range. Source ranges of
+    different deny rules are merged, so split denies (e.g. two /1 ranges) count.
+    """
+    relevant = [(ivs, sources) for proto, ivs, sources in denies if proto in ("all", protocol)]
+    if not relevant:
+        return _merge_intervals(intervals)
+    # Cut the allowed intervals at every deny boundary, then test each piece.
+    cuts = sorted({low for ivs, _ in relevant for low, _ in ivs} | {high + 1 for ivs, _ in relevant for _, high in ivs})
+    pieces: List[Tuple[int, int]] = []
+    for low, high in _merge_intervals(intervals):
+        start = low
+        for cut in cuts:
+            if start < cut <= high:
+                pieces.append((start, cut - 1))
+                start = cut
+        pieces.append((start, high))
+    open_ports = [
+        (low, high)
+        for low, high in pieces
+        if not _table_contains(
+            _range_table([r for ivs, sources in relevant if any(a <= low and high <= b for a, b in ivs) for r in sources]),
+            *probe,
+        )
+    ]
+    return _merge_intervals(open_ports)
+
+
+def _gcp_effective_ingress(ordered_rules: List[Dict[str, Any]], probe_cidr: str = "0.0.0.0/0") -> List[str]:
+    """
+    Evaluate ingress rules in order for traffic coming from probe_cidr and
+    return the "protocol[:ports]" entries that remain allowed for the whole
+    probe range, i.e. allow entries minus what deny rules evaluated before
+    them block. An "all" allow that is partly denied is reported as the
+    protocols it still lets through.
+    Each rule is a normalized dict with action / source_ranges / layer4_configs.
+    """
+    version, probe_low, probe_high = _cidr_range(probe_cidr)  # type: ignore[misc]
+    probe = (probe_low, probe_high)
+    denies: List[Tuple[str, List[Tuple[int, int]], List[Tuple[int, int]]]] = []
+    effective: List[str] = []
+
+    def add(entry: str) -> None:
+        if entry not in effective:
+            effective.append(entry)
+
+    for rule in ordered_rules:
+        sources = _cidr_ranges(rule.get("source_ranges", []), version)
+        action = rule.get("action", "").lower()
+        for config in rule.get("layer4_configs", []):
+            protocol = _normalize_protocol(config.get("ipProtocol"))
+            ports = config.get("ports", [])
+            intervals = _port_intervals(ports)
+            if action == "deny":
+                covered = [(low, high) for low, high in sources if low <= probe_high and high >= probe_low]
+                if covered:
+                    denies.append((protocol, intervals, covered))
+                continue
+            if action != "allow" or not _table_contains(_range_table(sources), *probe):
+                continue
+            if protocol != "all":
+                open_ports = _gcp_open_ports(protocol, intervals, denies, probe)
+                if open_ports == _merge_intervals(intervals):
+                    add(f"{protocol}:{','.join(ports)}" if ports else protocol)
+                elif open_ports:
+                    add(f"{protocol}:{_format_port_intervals(open_ports)}")
+                continue
+            per_protocol = {p: _gcp_open_ports(p, _FULL_PORT_RANGE, denies, probe) for p in _GCP_ALL_PROTOCOLS}
+            if all(open_ports == _FULL_PORT_RANGE for open_ports in per_protocol.values()):
+                add("all")
+                continue
+            for p, open_ports in per_protocol.items():
+                if open_ports == _FULL_PORT_RANGE:
+                    add(p)
+                elif open_ports:
+                    add(f"{p}:{_format_port_intervals(open_ports)}")
+    return effective
+
+
+def _gcp_normalize_vpc_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    denied = rule.get("denied", [])
+    return {
+        "action": "deny" if denied else "allow",
+        "source_ranges": rule.get("sourceRanges", []),
+        "layer4_configs": [
+            {"ipProtocol": c.get("IPProtocol", "all"), "ports": c.get("ports", [])}
+            for c in (denied or rule.get("allowed", []))
+        ],
+    }
+
+
+def _gcp_firewall_ingress_cidrs(fw_rules: List[Dict]) -> List[str]:
+    """Extract all source CIDR ranges from the given allow firewall rules."""
+    cidrs: List[str] = []
+    for rule in fw_rules:
+        if rule.get("denied"):
+            continue
+        cidrs.extend(rule.get("sourceRanges", []))
+    return cidrs
+
+
+def _is_permission_error(exc: Exception) -> bool:
+    """Best-effort detection for GCP permission/authorization errors."""
+    msg = str(exc).lower()
+    return any(token in msg for token in ("permission", "forbidden", "403", "not authorized"))
+
+
+def _list_compute_collection(
+    compute_service,
+    collection_name: str,
+    project: str,
+    region: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], List[str], bool]:
+    """
+    List items for a Compute API collection with pagination support.
+    Returns (items, error_codes, permission_denied_flag).
+    """
+    items: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    permission_denied = False
+
+    collection_factory = getattr(compute_service, collection_name, None)
+    if collection_factory is None:
+        return [], [f"api_error:{collection_name}_unsupported"], False
+
+    collection = collection_factory()
+    list_kwargs: Dict[str, Any] = {"project": project}
+    if region:
+        list_kwargs["region"] = region
+
+    try:
+        request = collection.list(**list_kwargs)
+        while request is not None:
+            response = request.execute()
             items.extend(response.get("items", []))
             list_next = getattr(collection, "list_next", None)
             if list_next is not None:
@@ -835,34 +2871,296 @@ def _list_compute_collection(
     return items, errors, permission_denied
 
 
-def _backend_references_any_neg(backend: Dict[str, Any], neg_self_links: Set[str], neg_names: Set[str]) -> bool:
-    for backend_ref in backend.get("backends", []):
-        group = backend_ref.get("group", "")
-        if group in neg_self_links:
-            return True
-        for neg_name in neg_names:
-            if group.endswith(f"/networkEndpointGroups/{neg_name}"):
-                return True
-    return False
+# Regional Compute collection -> collection exposing the equivalent aggregatedList.
+# The aggregated response groups items per scope ("regions/<r>", "zones/<z>", "global")
+# under a key named after the aggregated collection.
+_REGIONAL_TO_AGGREGATED_COLLECTION: Dict[str, str] = {
+    "regionNetworkEndpointGroups": "networkEndpointGroups",
+    "regionBackendServices": "backendServices",
+    "regionUrlMaps": "urlMaps",
+    "regionTargetHttpProxies": "targetHttpProxies",
+    "regionTargetHttpsProxies": "targetHttpsProxies",
+    "forwardingRules": "forwardingRules",
+}
 
+# Regional Compute collection -> global counterpart whose items are returned
+# under the "global" scope of the same aggregatedList response.
+_REGIONAL_TO_GLOBAL_COLLECTION: Dict[str, str] = {
+    "regionBackendServices": "backendServices",
+    "regionUrlMaps": "urlMaps",
+    "regionTargetHttpProxies": "targetHttpProxies",
+    "regionTargetHttpsProxies": "targetHttpsProxies",
+}
 
-def _resource_references_any_backend(
-    resource: Dict[str, Any],
-    backend_self_links: Set[str],
-    backend_names: Set[str],
-) -> bool:
-    raw = json.dumps(resource, sort_keys=True)
-    for link in backend_self_links:
-        if link and link in raw:
-            return True
-    for name in backend_names:
-        if f"/backendServices/{name}" in raw:
-            return True
-        if f"/regionBackendServices/{name}" in raw:
-            return True
-    return False
+
+def _list_compute_aggregated(
+    compute_service,
+    collection_name: str,
+    project: str,
+    scopes: Set[str],
+) -> Tuple[List[Dict[str, Any]], List[str], bool, Set[str]]:
+    """
+    List items of a Compute API collection across all scopes with a single
+    paginated aggregatedList call, keeping only the requested scopes
+    ("regions/<r>" and/or "global").
+    Returns (items, error_codes, permission_denied_flag, unreachable_scopes),
+    where unreachable_scopes are requested scopes the API could not answer for.
+    """
+    items: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    permission_denied = False
+    unreachable: Set[str] = set()
+
+    collection_factory = getattr(compute_service, collection_name, None)
+    if collection_factory is None:
+        return [], [f"api_error:{collection_name}.aggregatedList_unsupported"], False, set()
+
+    collection = collection_factory()
+    if getattr(collection, "aggregatedList", None) is None:
+        return [], [f"api_error:{collection_name}.aggregatedList_unsupported"], False, set()
+
+    list_kwargs: Dict[str, Any] = {"project": project, "returnPartialSuccess": True}
+
+    try:
+        try:
+            request = collection.aggregatedList(**list_kwargs)
+        except TypeError:
+            # Discovery documents that do not declare returnPartialSuccess make
+            # the client reject it; unreachable scopes still carry a warning.
+            del list_kwargs["returnPartialSuccess"]
+            request = collection.aggregatedList(**list_kwargs)
+        while request is not None:
+            response = request.execute()
+            unreachable.update(scope for scope in response.get("unreachables", []) if scope in scopes)
+            for scope, scoped in (response.get("items") or {}).items():
+                if scope not in scopes:
+                    continue
+                if scoped.get("warning", {}).get("code") == "UNREACHABLE":
+                    unreachable.add(scope)
+                items.extend(scoped.get(collection_name, []))
+            list_next = getattr(collection, "aggregatedList_next", None)
+            if list_next is not None:
+                request = list_next(request, response)
+                continue
+
+            next_token = response.get("nextPageToken")
+            if not next_token:
+                request = None
+            else:
+                next_kwargs = dict(list_kwargs)
+                next_kwargs["pageToken"] = next_token
+                request = collection.aggregatedList(**next_kwargs)
+    except Exception as exc:
+        if _is_permission_error(exc):
+            permission_denied = True
+            errors.append(f"permission_denied:{collection_name}.aggregatedList")
+        else:
+            errors.append(f"api_error:{collection_name}.aggregatedList")
+
+    return items, errors, permission_denied, unreachable
+
+
+def _list_compute_scopes_individually(
+    compute_service,
+    collection_name: str,
+    project: str,
+    scopes: Set[str],
+) -> Tuple[List[Dict[str, Any]], List[str], bool]:
+    """List a regional collection (and its global counterpart for the "global" scope) scope by scope."""
+    items: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    permission_denied = False
+    for scope in sorted(scopes):
+        if scope == "global":
+            scope_items, scope_errors, scope_denied = _list_compute_collection(
+                compute_service, _REGIONAL_TO_GLOBAL_COLLECTION[collection_name], project
+            )
+        else:
+            scope_items, scope_errors, scope_denied = _list_compute_collection(
+                compute_service, collection_name, project, region=scope.split("/", 1)[1]
+            )
+        items.extend(scope_items)
+        errors.extend(scope_errors)
+        permission_denied = permission_denied or scope_denied
+    return items, errors, permission_denied
+
+
+def _list_compute_regional_collection(
+    compute_service,
+    collection_name: str,
+    project: str,
+    regions: Set[str],
+    include_global: bool = False,
+) -> Tuple[List[Dict[str, Any]], List[str], bool]:
+    """
+    List a regional Compute collection for the given regions, plus its global
+    counterpart (e.g. backendServices for regionBackendServices) when
+    include_global is set.
+
+    aggregatedList is used only when it replaces more than one list call
+    (several regions, or regions + global); a single scope is listed directly
+    so that other regions' items are not downloaded for nothing. Scopes the
+    aggregated call reports as unreachable are retried individually, and the
+    whole listing falls back to per-scope calls when the aggregated call is
+    denied or unsupported.
+    Returns (items, error_codes, permission_denied_flag).
+    """
+    scopes = {f"regions/{region}" for region in regions}
+    if include_global and collection_name in _REGIONAL_TO_GLOBAL_COLLECTION:
+        scopes.add("global")
+
+    aggregated_name = _REGIONAL_TO_AGGREGATED_COLLECTION.get(collection_name)
+    if aggregated_name and len(scopes) > 1:
+        items, errors, permission_denied, unreachable = _list_compute_aggregated(
+            compute_service, aggregated_name, project, scopes
+        )
+        fallback = permission_denied or any(e.endswith("_unsupported") for e in errors)
+        if not fallback:
+            if unreachable:
+                retry_items, retry_errors, retry_denied = _list_compute_scopes_individually(
+                    compute_service, collection_name, project, unreachable
+                )
+                items.extend(retry_items)
+                errors.extend(retry_errors)
+                permission_denied = permission_denied or retry_denied
+            return items, errors, permission_denied
+
+    return _list_compute_scopes_individually(compute_service, collection_name, project, scopes)
+
+
+def _gcp_link_key(link: str) -> str:
+    """
+    Compare key of a Compute resource URL: the path from "projects/" on, so
+    that full URLs of either API host and partial URLs of a resource match.
+    """
+    index = link.find("projects/")
+    return link[index:] if index >= 0 else link.strip("/")
+
+
+def _gcp_route_action_backend_links(route_action: Dict[str, Any]) -> Iterator[str]:
+    for weighted in route_action.get("weightedBackendServices", []):
+        yield weighted.get("backendService", "")
+    yield route_action.get("requestMirrorPolicy", {}).get("backendService", "")
+
+
+def _gcp_url_map_backend_links(url_map: Dict[str, Any]) -> Set[str]:
+    """
+    Keys (see _gcp_link_key) of every backend service a URL map routes to:
+    its defaultService / defaultRouteAction, and those of each path matcher,
+    path rule and route rule. Host rules only name path matchers, which are
+    all walked, so they add no backend of their own.
+    """
+    links: List[str] = [url_map.get("defaultService", "")]
+    links.extend(_gcp_route_action_backend_links(url_map.get("defaultRouteAction", {})))
+    for matcher in url_map.get("pathMatchers", []):
+        links.append(matcher.get("defaultService", ""))
+        links.extend(_gcp_route_action_backend_links(matcher.get("defaultRouteAction", {})))
+        for rule in matcher.get("pathRules", []) + matcher.get("routeRules", []):
+            links.append(rule.get("service", ""))
+            links.extend(_gcp_route_action_backend_links(rule.get("routeAction", {})))
+    return {_gcp_link_key(link) for link in links if link}
+
+
+# project -> resource ID -> Cloud Run service (see _gcp_project_cloudrun_services)
+_GCP_CLOUDRUN_SERVICE_LISTINGS: Dict[str, Dict[str, Dict[str, Any]]] = _run_cache()
+
+# (project, regions) -> load balancer graph of the project shared by the Cloud
+# Run checks of the run (see _gcp_cloudrun_lb_graph).
+_GCP_CLOUDRUN_LB_GRAPHS: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = _run_cache()
+_GCP_CLOUDRUN_LB_GRAPHS_LOCK = threading.Lock()
+
+# Stage of a load balancer graph -> (collection, include_global) listed for it,
+# in the order the reverse lookup walks them. include_global=None lists a
+# global-only collection.
+_GCP_CLOUDRUN_LB_GRAPH_STAGES: Dict[str, List[Tuple[str, Optional[bool]]]] = {
+    "negs": [("regionNetworkEndpointGroups", False)],
+    "backends": [("regionBackendServices", True)],
+    "url_maps": [("regionUrlMaps", True)],
+    "proxies": [("regionTargetHttpProxies", True), ("regionTargetHttpsProxies", True)],
+    "forwarding_rules": [("globalForwardingRules", None), ("forwardingRules", False)],
+}
+
+# Stage -> keys an item of the stage is found by: the Cloud Run service of a
+# serverless NEG, and the keys (see _gcp_link_key) of the previous stage's
+# resources the others reference.
+_GCP_CLOUDRUN_LB_GRAPH_EDGES: Dict[str, Any] = {
+    "negs": lambda neg: (
+        [neg.get("cloudRun", {}).get("service", "")] if neg.get("networkEndpointType") == "SERVERLESS" else []
+    ),
+    "backends": lambda backend: {_gcp_link_key(ref.get("group", "")) for ref in backend.get("backends", [])},
+    "url_maps": _gcp_url_map_backend_links,
+    "proxies": lambda proxy: [_gcp_link_key(proxy.get("urlMap", ""))],
+    "forwarding_rules": lambda fw_rule: [_gcp_link_key(fw_rule.get("target", ""))],
+}
+
+
+def _gcp_cloudrun_lb_graph(project: str, regions: Set[str]) -> Dict[str, Any]:
+    """
+    The load balancer graph (serverless NEG -> backend service -> URL map ->
+    proxy -> forwarding rule) of a project's regions, shared by every Cloud
+    Run service checked in the run. A graph registered for more regions (see
+    check_gcp_cloudruns) answers for any subset of them. Its stages are
+    listed and indexed on first use by _gcp_cloudrun_lb_graph_stage, so a
+    lookup that stops early (no NEG for the service) lists no further
+    collections.
+    """
+    wanted = set(regions)
+    with _GCP_CLOUDRUN_LB_GRAPHS_LOCK:
+        for (graph_project, graph_regions), graph in _GCP_CLOUDRUN_LB_GRAPHS.items():
+            if graph_project == project and wanted <= set(graph_regions):
+                return graph
+        graph = {"project": project, "regions": wanted, "stages": {}, "lock": threading.Lock()}
+        _GCP_CLOUDRUN_LB_GRAPHS[(project, tuple(sorted(wanted)))] = graph
+        return graph
 
 
+def _gcp_cloudrun_lb_graph_stage(
+    compute_service,
+    graph: Dict[str, Any],
+    stage: str,
+) -> Tuple[Dict[str, List[Tuple[int, Dict[str, Any]]]], List[str], bool]:
+    """
+    Items of one stage of a load balancer graph, with their position in the
+    listing, indexed by the keys they are found by (see
+    _GCP_CLOUDRUN_LB_GRAPH_EDGES). The stage is listed with the caller's
+    compute service (services are per thread) the first time it is needed.
+    Returns (index, error_codes, permission_denied_flag).
+    """
+    with graph["lock"]:
+        if stage not in graph["stages"]:
+            items: List[Dict[str, Any]] = []
+            errors: List[str] = []
+            permission_denied = False
+            for collection_name, include_global in _GCP_CLOUDRUN_LB_GRAPH_STAGES[stage]:
+                if include_global is None:
+                    listed = _list_compute_collection(compute_service, collection_name, graph["project"])
+                else:
+                    listed = _list_compute_regional_collection(
+                        compute_service, collection_name, graph["project"], graph["regions"],
+                        include_global=include_global,
+                    )
+                items.extend(listed[0])
+                errors.extend(listed[1])
+                permission_denied = permission_denied or listed[2]
+            index: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+            for position, item in enumerate(items):
+                for key in _GCP_CLOUDRUN_LB_GRAPH_EDGES[stage](item):
+                    if key:
+                        index.setdefault(key, []).append((position, item))
+            graph["stages"][stage] = (index, errors, permission_denied)
+        return graph["stages"][stage]
+
+
+def _gcp_item_region(item: Dict[str, Any]) -> Optional[str]:
+    """Region of a regional Compute resource (from its region or selfLink URL); None when not known."""
+    for url in (item.get("region", ""), item.get("selfLink", "")):
+        parts = url.strip("/").split("/")
+        if "regions" in parts[:-1]:
+            return parts[parts.index("regions") + 1]
+    return None
+
+
+@_profiled
 def _discover_gcp_cloudrun_load_balancers_for_regions(
     compute_service,
     project: str,
@@ -871,30 +3169,32 @@ def _discover_gcp_cloudrun_load_balancers_for_regions(
     lb_backend_service: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
-    Reverse lookup from Cloud Run service -> serverless NEG -> backend service -> load balancer.
+    Reverse lookup from Cloud Run service -> serverless NEG -> backend service -> load balancer,
+    answered from the project's shared load balancer graph.
     """
+    graph = _gcp_cloudrun_lb_graph(project, regions)
     errors: List[str] = []
     permission_denied = False
-    sorted_regions = sorted(regions)
-
-    regional_negs: List[Dict[str, Any]] = []
-    for region in sorted_regions:
-        region_items, region_errors, region_permission_denied = _list_compute_collection(
-            compute_service, "regionNetworkEndpointGroups", project, region=region
-        )
-        regional_negs.extend(region_items)
-        errors.extend(region_errors)
-        permission_denied = permission_denied or region_permission_denied
-
-    matched_negs = []
-    for neg in regional_negs:
-        if neg.get("networkEndpointType") != "SERVERLESS":
-            continue
-        cloud_run_config = neg.get("cloudRun", {})
-        if cloud_run_config.get("service") != cloudrun_service_name:
-            continue
-        matched_negs.append(neg)
 
+    def stage(name: str, keys: Iterable[str]) -> List[Dict[str, Any]]:
+        """Items of a stage found by any of keys, in the requested regions or global, in listing order."""
+        nonlocal permission_denied
+        index, stage_errors, stage_permission_denied = _gcp_cloudrun_lb_graph_stage(compute_service, graph, name)
+        errors.extend(stage_errors)
+        permission_denied = permission_denied or stage_permission_denied
+        found: Dict[int, Dict[str, Any]] = {}
+        for key in keys:
+            for position, item in index.get(key, []):
+                # A graph shared with other regions holds their regional resources too
+                if _gcp_item_region(item) in (None, *regions):
+                    found[position] = item
+        return [found[position] for position in sorted(found)]
+
+    def links(items: List[Dict[str, Any]]) -> Set[str]:
+        return {_gcp_link_key(item["selfLink"]) for item in items if item.get("selfLink")}
+
+    matched_negs = stage("negs", [cloudrun_service_name])
+    neg_names = {neg.get("name", "") for neg in matched_negs if neg.get("name")}
     if not matched_negs:
         return {
             "matched_neg_names": [],
@@ -905,31 +3205,11 @@ def _discover_gcp_cloudrun_load_balancers_for_regions(
             "permission_denied": permission_denied,
         }
 
-    neg_self_links = {neg.get("selfLink", "") for neg in matched_negs if neg.get("selfLink")}
-    neg_names = {neg.get("name", "") for neg in matched_negs if neg.get("name")}
-
-    global_backends, global_backend_errors, global_backend_permission_denied = _list_compute_collection(
-        compute_service, "backendServices", project
-    )
-    errors.extend(global_backend_errors)
-    permission_denied = permission_denied or global_backend_permission_denied
-
-    regional_backends: List[Dict[str, Any]] = []
-    for region in sorted_regions:
-        region_items, region_errors, region_permission_denied = _list_compute_collection(
-            compute_service, "regionBackendServices", project, region=region
-        )
-        regional_backends.extend(region_items)
-        errors.extend(region_errors)
-        permission_denied = permission_denied or region_permission_denied
-
-    matched_backends: List[Dict[str, Any]] = []
-    for backend in global_backends + regional_backends:
-        if lb_backend_service and backend.get("name") != lb_backend_service:
-            continue
-        if _backend_references_any_neg(backend, neg_self_links, neg_names):
-            matched_backends.append(backend)
-
+    matched_backends = [
+        backend
+        for backend in stage("backends", links(matched_negs))
+        if not lb_backend_service or backend.get("name") == lb_backend_service
+    ]
     if not matched_backends:
         return {
             "matched_neg_names": sorted(neg_names),
@@ -939,86 +3219,15 @@ def _discover_gcp_cloudrun_load_balancers_for_regions(
             "errors": errors,
             "permission_denied": permission_denied,
         }
-
-    backend_self_links = {
-        backend.get("selfLink", "") for backend in matched_backends if backend.get("selfLink")
-    }
     backend_names = {backend.get("name", "") for backend in matched_backends if backend.get("name")}
 
-    url_maps: List[Dict[str, Any]] = []
-    global_url_maps, global_url_map_errors, global_url_map_permission_denied = _list_compute_collection(
-        compute_service, "urlMaps", project
-    )
-    url_maps.extend(global_url_maps)
-    errors.extend(global_url_map_errors)
-    permission_denied = permission_denied or global_url_map_permission_denied
-
-    for region in sorted_regions:
-        region_items, region_errors, region_permission_denied = _list_compute_collection(
-            compute_service, "regionUrlMaps", project, region=region
-        )
-        url_maps.extend(region_items)
-        errors.extend(region_errors)
-        permission_denied = permission_denied or region_permission_denied
-
-    matched_url_map_links = {
-        url_map.get("selfLink", "")
-        for url_map in url_maps
-        if _resource_references_any_backend(url_map, backend_self_links, backend_names)
-        and url_map.get("selfLink")
-    }
-
-    proxies: List[Dict[str, Any]] = []
-    for collection_name in (
-        "targetHttpProxies",
-        "targetHttpsProxies",
-        "regionTargetHttpProxies",
-        "regionTargetHttpsProxies",
-    ):
-        if collection_name.startswith("region"):
-            for region in sorted_regions:
-                region_items, region_errors, region_permission_denied = _list_compute_collection(
-                    compute_service, collection_name, project, region=region
-                )
-                proxies.extend(region_items)
-                errors.extend(region_errors)
-                permission_denied = permission_denied or region_permission_denied
-        else:
-            global_items, global_errors, global_permission_denied = _list_compute_collection(
-                compute_service, collection_name, project
-            )
-            proxies.extend(global_items)
-            errors.extend(global_errors)
-            permission_denied = permission_denied or global_permission_denied
-
-    proxy_self_links = {
-        proxy.get("selfLink", "")
-        for proxy in proxies
-        if proxy.get("urlMap") in matched_url_map_links and proxy.get("selfLink")
-    }
-
-    forwarding_rules: List[Dict[str, Any]] = []
-    global_fw, global_fw_errors, global_fw_permission_denied = _list_compute_collection(
-        compute_service, "globalForwardingRules", project
-    )
-    forwarding_rules.extend(global_fw)
-    errors.extend(global_fw_errors)
-    permission_denied = permission_denied or global_fw_permission_denied
-
-    for region in sorted_regions:
-        region_items, region_errors, region_permission_denied = _list_compute_collection(
-            compute_service, "forwardingRules", project, region=region
-        )
-        forwarding_rules.extend(region_items)
-        errors.extend(region_errors)
-        permission_denied = permission_denied or region_permission_denied
+    matched_url_maps = stage("url_maps", links(matched_backends))
+    matched_proxies = stage("proxies", links(matched_url_maps))
+    forwarding_rules = stage("forwarding_rules", links(matched_proxies))
 
     matched_lb_details: List[Dict[str, str]] = []
     seen_lbs: Set[Tuple[str, str]] = set()
     for fw_rule in forwarding_rules:
-        target = fw_rule.get("target", "")
-        if target not in proxy_self_links:
-            continue
         lb_name = fw_rule.get("name", "")
         lb_scheme = fw_rule.get("loadBalancingScheme", "UNKNOWN")
         key = (lb_name, lb_scheme)
@@ -1084,6 +3293,7 @@ def check_gcp_compute(resource_id: str) -> Dict[str, Any]:
     private_ips: List[str] = []
     external_ips: List[str] = []
     network_name = ""
+    network_project = project
     subnetwork = ""
 
     for nic in network_interfaces:
@@ -1093,8 +3303,10 @@ def check_gcp_compute(resource_id: str) -> Dict[str, Any]:
             if ac.get("natIP"):
                 external_ips.append(ac["natIP"])
         if not network_name and nic.get("network"):
-            # Extract network short name from full URL
+            # Extract network short name from full URL; with Shared VPC the
+            # network (and its firewall configuration) lives in the host project.
             network_name = nic["network"].split("/")[-1]
+            network_project = _gcp_url_project(nic["network"]) or project
         if not subnetwork and nic.get("subnetwork"):
             subnetwork = nic["subnetwork"].split("/")[-1]
 
@@ -1103,17 +3315,29 @@ def check_gcp_compute(resource_id: str) -> Dict[str, Any]:
     service_account = sas[0].get("email", "") if sas else None
 
     # Firewall rules applicable to this instance
-    fw_rules = _gcp_get_firewall_rules_for_instance(
-        service, project, network_name, network_tags, service_account
-    )
+    fw_index = _gcp_get_firewall_index(service, network_project)
+    fw_rules = _gcp_get_firewall_rules_for_instance(fw_index, network_name, network_tags, service_account)
     ingress_cidrs = _gcp_firewall_ingress_cidrs(fw_rules)
 
+    # Hierarchical policies are evaluated before VPC firewall rules, network
+    # firewall policies after them (default enforcement order).
+    policies, fw_lookup_errors = _gcp_get_firewall_policies(service, network_project, network_name, fw_index)
+    policy_rules, secure_tag_rules_skipped = _gcp_policy_rules_for_instance(policies, network_name, service_account)
+    ordered_rules = (
+        [r for r in policy_rules if r["policy_type"] == "HIERARCHY"]
+        + [_gcp_normalize_vpc_rule(r) for r in fw_rules]
+        + [r for r in policy_rules if r["policy_type"] != "HIERARCHY"]
+    )
+    internet_ingress = _gcp_effective_ingress(ordered_rules)
+
     fw_summary = [
         {
             "name": r.get("name", ""),
             "priority": r.get("priority", 1000),
+            "action": "deny" if r.get("denied") else "allow",
             "source_ranges": r.get("sourceRanges", []),
             "allowed": r.get("allowed", []),
+            "denied": r.get("denied", []),
             "target_tags": r.get("targetTags", []),
         }
         for r in fw_rules
@@ -1123,11 +3347,15 @@ def check_gcp_compute(resource_id: str) -> Dict[str, Any]:
     observed: Dict[str, Any] = {
         "instance_state": instance_state,
         "network": network_name,
+        "network_project": network_project,
         "subnetwork": subnetwork,
         "private_ips": private_ips,
         "external_ips": external_ips,
         "network_tags": network_tags,
         "firewall_rules": fw_summary,
+        "firewall_policy_rules": policy_rules,
+        "effective_internet_ingress": internet_ingress,
+        "firewall_lookup_errors": fw_lookup_errors,
     }
 
     running = instance_state == "RUNNING"
@@ -1138,8 +3366,17 @@ def check_gcp_compute(resource_id: str) -> Dict[str, Any]:
     reasons.append(f"network_tags={','.join(network_tags) if network_tags else 'none'}")
     if ingress_cidrs:
         reasons.append(f"fw_ingress_allows={','.join(sorted(set(ingress_cidrs)))}")
+    reasons.append(f"fw_internet_ingress={','.join(internet_ingress) if internet_ingress else 'none'}")
+    if secure_tag_rules_skipped:
+        reasons.append(f"fw_secure_tag_rules_skipped={secure_tag_rules_skipped}")
+    reasons.extend(fw_lookup_errors)
 
-    if running and has_external_ip:
+    if not (running and has_external_ip):
+        internet_reachability = NOT_REACHABLE
+    elif fw_lookup_errors:
+        # Firewall policies could not be read, so the evaluation is incomplete.
+        internet_reachability = UNKNOWN
+    elif internet_ingress:
         internet_reachability = REACHABLE
     else:
         internet_reachability = NOT_REACHABLE
@@ -1166,10 +3403,16 @@ def check_gcp_compute(resource_id: str) -> Dict[str, Any]:
 # GCP Cloud Run
 # ─────────────────────────────────────────────────────────────────────────────
 
-def check_gcp_cloudrun(resource_id: str, lb_backend_service: Optional[str] = None) -> Dict[str, Any]:
+def check_gcp_cloudrun(
+    resource_id: str,
+    lb_backend_service: Optional[str] = None,
+    cr_service: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """
     Check network reachability for a GCP Cloud Run service.
     resource_id: projects/<proj>/locations/<region>/services/<name>
+    cr_service: the service as already listed, to skip its get call (services
+    listed by _gcp_project_cloudrun_services in this run are used as well)
     """
     parsed = _parse_gcp_resource_id(resource_id)
     project = parsed.get("projects", "")
@@ -1178,13 +3421,16 @@ def check_gcp_cloudrun(resource_id: str, lb_backend_service: Optional[str] = Non
 
     service = _build_gcp_service("run", "v1")
 
-    cr_service = (
-        service.projects()
-        .locations()
-        .services()
-        .get(name=f"projects/{project}/locations/{location}/services/{service_name}")
-        .execute()
-    )
+    if cr_service is None:
+        cr_service = _GCP_CLOUDRUN_SERVICE_LISTINGS.get(project, {}).get(resource_id)
+    if cr_service is None:
+        cr_service = (
+            service.projects()
+            .locations()
+            .services()
+            .get(name=f"projects/{project}/locations/{location}/services/{service_name}")
+            .execute()
+        )
 
     metadata = cr_service.get("metadata", {})
     annotations = metadata.get("annotations", {})
@@ -1308,10 +3554,133 @@ def check_gcp_cloudrun(resource_id: str, lb_backend_service: Optional[str] = Non
     )
 
 
+def _gcp_project_cloudrun_services(project: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Resource ID -> service of every Cloud Run service of the project, listed
+    once per run across regions through the v1 namespace endpoint (paged by
+    metadata.continue). The regions found are registered as one load balancer
+    graph so that the checks of all these services share a single discovery,
+    and the IAM policies the checks read are prefetched (see _gcp_prefetch).
+    """
+    if project in _GCP_CLOUDRUN_SERVICE_LISTINGS:
+        return _GCP_CLOUDRUN_SERVICE_LISTINGS[project]
+    run_service = _build_gcp_service("run", "v1")
+    services = run_service.namespaces().services()
+    found: Dict[str, Dict[str, Any]] = {}
+    list_kwargs: Dict[str, Any] = {"parent": f"namespaces/{project}"}
+    while True:
+        response = services.list(**list_kwargs).execute()
+        for item in response.get("items", []):
+            metadata = item.get("metadata", {})
+            location = metadata.get("labels", {}).get("cloud.googleapis.com/location", "")
+            found[f"projects/{project}/locations/{location}/services/{metadata.get('name', '')}"] = item
+        next_token = response.get("metadata", {}).get("continue")
+        if not next_token:
+            break
+        list_kwargs["continue_"] = next_token
+    regions = {_parse_gcp_resource_id(resource_id)["locations"] for resource_id in found}
+    if regions:
+        _gcp_cloudrun_lb_graph(project, regions)
+    _GCP_CLOUDRUN_SERVICE_LISTINGS[project] = found
+    located = run_service.projects().locations().services()
+    _gcp_prefetch(located.getIamPolicy(resource=resource_id) for resource_id in found)
+    return found
+
+
+def check_gcp_cloudruns(project: str, lb_backend_service: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Check every Cloud Run service of a project: the services are listed once
+    and all of them are matched against one load balancer graph, so the
+    Compute collections are listed once for the project, not per service.
+    """
+    return [
+        _profiled_check(
+            resource_id,
+            lambda: check_gcp_cloudrun(resource_id, lb_backend_service=lb_backend_service, cr_service=cr_service),
+        )
+        for resource_id, cr_service in _gcp_project_cloudrun_services(project).items()
+    ]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # GCP Cloud SQL
 # ─────────────────────────────────────────────────────────────────────────────
 
+# project -> resource ID -> Cloud SQL instance (see _gcp_project_sql_instances)
+_GCP_SQL_INSTANCE_LISTINGS: Dict[str, Dict[str, Dict[str, Any]]] = _run_cache()
+# VPC network -> private services access state (see _gcp_private_service_access)
+_GCP_PRIVATE_SERVICE_ACCESS: Dict[str, Tuple[str, Optional[str]]] = _run_cache()
+_GCP_PRIVATE_SERVICE_ACCESS_LOCK = threading.Lock()
+
+# Name of the VPC peering a private services access connection creates.
+_SERVICE_NETWORKING_PEERING = "servicenetworking-googleapis-com"
+
+
+def _gcp_project_sql_instances(project: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Resource ID -> instance for every Cloud SQL instance of the project,
+    listed once per run (following nextPageToken). check_gcp_cloudsql reads
+    listed instances from here instead of getting them one by one; the VPC
+    networks of their private IPs are prefetched (see _gcp_prefetch).
+    """
+    listing = _GCP_SQL_INSTANCE_LISTINGS.get(project)
+    if listing is None:
+        instances = _build_gcp_service("sqladmin", "v1beta4").instances()
+        listing = {}
+        request = instances.list(project=project)
+        while request is not None:
+            response = request.execute()
+            for item in response.get("items", []):
+                listing[f"projects/{project}/instances/{item.get('name', '')}"] = item
+            request = instances.list_next(request, response)
+        _GCP_SQL_INSTANCE_LISTINGS[project] = listing
+        networks = {
+            _gcp_link_key(item["settings"]["ipConfiguration"]["privateNetwork"])
+            for item in listing.values()
+            if item.get("settings", {}).get("ipConfiguration", {}).get("privateNetwork")
+        }
+        _gcp_prefetch(_gcp_network_request(network) for network in sorted(networks))
+    return listing
+
+
+def _gcp_network_request(network: str) -> Any:
+    """compute networks.get request of a VPC network given by (partial) URL."""
+    parts = _gcp_link_key(network).split("/")
+    project = parts[parts.index("projects") + 1] if "projects" in parts[:-1] else ""
+    return _build_gcp_service("compute", "v1").networks().get(project=project, network=parts[-1])
+
+
+def _gcp_private_service_access(private_network: str) -> Tuple[str, Optional[str]]:
+    """
+    State of the private services access connection of a VPC network, the
+    servicenetworking peering a Cloud SQL private IP is reached through:
+    "active", "inactive" or "missing", or "unknown" with an error code when
+    the network cannot be read. Each network is read once per run, so the
+    instances sharing a VPC (or a Shared VPC host network) share the lookup.
+    """
+    key = _gcp_link_key(private_network)
+    with _GCP_PRIVATE_SERVICE_ACCESS_LOCK:
+        if key not in _GCP_PRIVATE_SERVICE_ACCESS:
+            try:
+                network = _gcp_network_request(key).execute()
+            except Exception as exc:
+                error = "permission_denied" if _is_permission_error(exc) else "api_error"
+                _GCP_PRIVATE_SERVICE_ACCESS[key] = ("unknown", f"{error}:compute.networks.get")
+            else:
+                peerings = [
+                    peering for peering in network.get("peerings", [])
+                    if peering.get("name") == _SERVICE_NETWORKING_PEERING
+                ]
+                if not peerings:
+                    state = "missing"
+                elif any(peering.get("state") == "ACTIVE" for peering in peerings):
+                    state = "active"
+                else:
+                    state = "inactive"
+                _GCP_PRIVATE_SERVICE_ACCESS[key] = (state, None)
+        return _GCP_PRIVATE_SERVICE_ACCESS[key]
+
+
 def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
     """
     Check network reachability for a GCP Cloud SQL instance.
@@ -1321,9 +3690,10 @@ def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
     project = parsed.get("projects", "")
     instance_name = parsed.get("instances", "")
 
-    service = _build_gcp_service("sqladmin", "v1beta4")
-
-    sql_instance = service.instances().get(project=project, instance=instance_name).execute()
+    sql_instance = _GCP_SQL_INSTANCE_LISTINGS.get(project, {}).get(resource_id)
+    if sql_instance is None:
+        service = _build_gcp_service("sqladmin", "v1beta4")
+        sql_instance = service.instances().get(project=project, instance=instance_name).execute()
 
     db_state = sql_instance.get("state", "UNKNOWN")
     settings = sql_instance.get("settings", {})
@@ -1350,6 +3720,11 @@ def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
             cidr = net.get("value", "")
             if cidr:
                 authorized_networks.append(cidr)
+    public_authorized_networks = [cidr for cidr in authorized_networks if _cidr_reaches_internet(cidr)]
+
+    private_service_access, private_service_access_error = (
+        _gcp_private_service_access(private_network) if has_private_ip else (None, None)
+    )
 
     reasons: List[str] = []
     observed: Dict[str, Any] = {
@@ -1360,6 +3735,8 @@ def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
         "private_ip": private_ip or None,
         "private_network": private_network or None,
         "authorized_networks": authorized_networks,
+        "public_authorized_networks": public_authorized_networks,
+        "private_service_access": private_service_access,
     }
 
     reasons.append(f"db_state={db_state}")
@@ -1369,6 +3746,10 @@ def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
         reasons.append(f"authorized_networks={','.join(authorized_networks)}")
     if private_network:
         reasons.append(f"private_network={private_network.split('/')[-1]}")
+    if any(cidr.endswith("/0") for cidr in public_authorized_networks):
+        reasons.append("authorized_networks_open_to_any")
+    elif public_authorized_networks:
+        reasons.append("authorized_networks_public")
 
     runnable = db_state == "RUNNABLE"
 
@@ -1378,11 +3759,19 @@ def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
     else:
         internet_reachability = NOT_REACHABLE
 
-    # Private reachability: RUNNABLE and private IP configured
-    if runnable and has_private_ip:
+    # Private reachability: RUNNABLE, private IP configured and the VPC's
+    # private services access peering active
+    if not (runnable and has_private_ip):
+        private_reachability = NOT_REACHABLE
+    elif private_service_access == "active":
         private_reachability = REACHABLE
+    elif private_service_access == "unknown":
+        private_reachability = UNKNOWN
+        reasons.append(private_service_access_error)
+        reasons.append(private_service_access_error.split(":", 1)[0])
     else:
         private_reachability = NOT_REACHABLE
+        reasons.append(f"private_service_access_{private_service_access}")
 
     return _build_result(
         provider="gcp",
@@ -1395,6 +3784,18 @@ def check_gcp_cloudsql(resource_id: str) -> Dict[str, Any]:
     )
 
 
+def check_gcp_cloudsqls(project: str) -> List[Dict[str, Any]]:
+    """
+    Check every Cloud SQL instance of a project from one paged
+    instances.list, sharing the private services access lookups of their
+    VPC networks.
+    """
+    return [
+        _profiled_check(resource_id, lambda: check_gcp_cloudsql(resource_id))
+        for resource_id in _gcp_project_sql_instances(project)
+    ]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Dispatcher
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1416,10 +3817,16 @@ def check(
     region: Optional[str] = None,
     lb_backend_service: Optional[str] = None,
     profile: Optional[str] = None,
-) -> Dict[str, Any]:
+    azure_inventory: bool = False,
+    azure_backend: str = "arm",
+) -> Any:
     """
     Main entry point.  Dispatches to the appropriate provider/resource-type
-    checker and returns a result dictionary.
+    checker and returns a result dictionary.  With azure_inventory (implied by
+    the "graph" azure_backend) an Azure resource_id of just /subscriptions/<sub>
+    checks every VM of the subscription and returns a list of results, as
+    does a GCP Cloud Run / Cloud SQL resource_id of just projects/<proj> for
+    every service / instance of the project.
     """
     key = (provider.lower(), resource_type.lower())
     if key not in SUPPORTED:
@@ -1429,17 +3836,1010 @@ def check(
         )
     func = SUPPORTED[key]
     if key in {("aws", "ec2"), ("aws", "rds")}:
-        return func(resource_id, region=region, profile=profile)
+        return _profiled_check(resource_id, lambda: func(resource_id, region=region, profile=profile))
     if key == ("gcp", "cloudrun"):
-        return func(resource_id, lb_backend_service=lb_backend_service)
-    return func(resource_id)
+        parsed = _parse_gcp_resource_id(resource_id)
+        if set(parsed) == {"projects"}:
+            return check_gcp_cloudruns(parsed["projects"], lb_backend_service=lb_backend_service)
+        return _profiled_check(resource_id, lambda: func(resource_id, lb_backend_service=lb_backend_service))
+    if key == ("gcp", "cloudsql"):
+        parsed = _parse_gcp_resource_id(resource_id)
+        if set(parsed) == {"projects"}:
+            return check_gcp_cloudsqls(parsed["projects"])
+    if key == ("azure", "vm"):
+        parsed = _parse_azure_resource_id(resource_id)
+        use_inventory = azure_inventory or azure_backend != "arm"
+        if use_inventory and set(parsed) == {"subscriptions"}:
+            return check_azure_vms(parsed["subscriptions"], backend=azure_backend)
+        return _profiled_check(
+            resource_id, lambda: func(resource_id, use_inventory=use_inventory, backend=azure_backend)
+        )
+    return _profiled_check(resource_id, lambda: func(resource_id))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# CLI
+# Snapshot diff
 # ─────────────────────────────────────────────────────────────────────────────
+# A snapshot file keeps, for every checked resource, a fingerprint of the
+# inputs of its judgement and the result. On the next run a resource whose
+# fingerprint is unchanged reuses that result; the others are checked again
+# and their reachability transitions since the snapshot are reported. AWS
+# fingerprints are computed from region-wide listings fetched once per run
+# (instances, security groups, route tables, load balancer targets); other
+# resource types are always checked again and fingerprinted from the inputs
+# the check observed.
 
-def main() -> None:
+# Bumped when the judgement changes, so that older snapshots are re-evaluated.
+SNAPSHOT_VERSION = 1
+
+# Reasons of a result built on a failed lookup: such results are never reused.
+_LOOKUP_ERROR_PREFIXES = ("throttled:", "permission_denied:", "api_error:")
+
+# (kind, region, profile) -> region-wide listing (see _aws_region_listing)
+_AWS_REGION_LISTINGS: Dict[Tuple[str, Optional[str], Optional[str]], Any] = _run_cache()
+_AWS_REGION_LISTINGS_LOCK = threading.Lock()
+
+
+def _aws_paginate(client, operation: str, key: str) -> List[Dict[str, Any]]:
+    return [item for page in client.get_paginator(operation).paginate() for item in page.get(key, [])]
+
+
+def _aws_list_region(kind: str, region: Optional[str], profile: Optional[str]) -> Any:
+    if kind == "load_balancer_targets":
+        # instance ID -> [target group ARN, load balancer ARN, scheme]
+        elbv2 = _get_boto3_client("elbv2", region, profile)
+        schemes = {
+            lb["LoadBalancerArn"]: lb.get("Scheme", "")
+            for lb in _aws_paginate(elbv2, "describe_load_balancers", "LoadBalancers")
+        }
+        targets: Dict[str, List[List[str]]] = {}
+        for tg in _aws_paginate(elbv2, "describe_target_groups", "TargetGroups"):
+            if tg.get("TargetType") != "instance":
+                continue
+            health = elbv2.describe_target_health(TargetGroupArn=tg["TargetGroupArn"])
+            for desc in health.get("TargetHealthDescriptions", []):
+                targets.setdefault(desc.get("Target", {}).get("Id", ""), []).extend(
+                    [tg["TargetGroupArn"], arn, schemes.get(arn, "")] for arn in tg.get("LoadBalancerArns", [])
+                )
+        return targets
+    if kind == "db_instances":
+        rds = _get_boto3_client("rds", region, profile)
+        return {db["DBInstanceIdentifier"]: db for db in _aws_paginate(rds, "describe_db_instances", "DBInstances")}
+    ec2 = _get_boto3_client("ec2", region, profile)
+    if kind == "instances":
+        return {
+            instance["InstanceId"]: instance
+            for reservation in _aws_paginate(ec2, "describe_instances", "Reservations")
+            for instance in reservation.get("Instances", [])
+        }
+    if kind == "security_groups":
+        return {sg["GroupId"]: sg for sg in _aws_paginate(ec2, "describe_security_groups", "SecurityGroups")}
+    if kind == "route_tables":
+        return _aws_paginate(ec2, "describe_route_tables", "RouteTables")
+    if kind == "subnets":
+        return {subnet["SubnetId"]: subnet for subnet in _aws_paginate(ec2, "describe_subnets", "Subnets")}
+    if kind == "network_acls":
+        return _aws_paginate(ec2, "describe_network_acls", "NetworkAcls")
+    if kind == "vpc_peerings":
+        return {
+            peering["VpcPeeringConnectionId"]: peering
+            for peering in _aws_paginate(ec2, "describe_vpc_peering_connections", "VpcPeeringConnections")
+        }
+    raise ValueError(f"Unknown AWS listing: {kind}")
+
+
+def _aws_region_listing(kind: str, region: Optional[str], profile: Optional[str]) -> Any:
+    """Region-wide listing of kind, fetched on the first call of the run."""
+    with _AWS_REGION_LISTINGS_LOCK:
+        key = (kind, region, profile)
+        if key not in _AWS_REGION_LISTINGS:
+            _AWS_REGION_LISTINGS[key] = _aws_list_region(kind, region, profile)
+        return _AWS_REGION_LISTINGS[key]
+
+
+def _aws_listed_route_tables(route_tables: List[Dict[str, Any]], subnet_id: str, vpc_id: str) -> List[Dict[str, Any]]:
+    """Route tables of a subnet as _subnet_route_tables finds them, from a listing."""
+    associated = [
+        rt for rt in route_tables
+        if any(assoc.get("SubnetId") == subnet_id for assoc in rt.get("Associations", []))
+    ]
+    return associated or [
+        rt for rt in route_tables
+        if rt.get("VpcId") == vpc_id and any(assoc.get("Main") for assoc in rt.get("Associations", []))
+    ]
+
+
+def _aws_ec2_inputs(resource_id: str, region: Optional[str], profile: Optional[str]) -> Dict[str, Any]:
+    """Everything check_aws_ec2 bases its judgement on, from region-wide listings."""
+    instance = _aws_region_listing("instances", region, profile).get(resource_id)
+    if instance is None:
+        raise ValueError(f"EC2 instance not found: {resource_id}")
+    security_groups = _aws_region_listing("security_groups", region, profile)
+    subnet_id = instance.get("SubnetId", "")
+    route_tables: List[Dict[str, Any]] = []
+    if subnet_id:
+        route_tables = _aws_listed_route_tables(
+            _aws_region_listing("route_tables", region, profile), subnet_id, instance.get("VpcId", "")
+        )
+    return {
+        "state": instance.get("State", {}).get("Name"),
+        "subnet_id": subnet_id,
+        "private_ip": instance.get("PrivateIpAddress"),
+        "public_ip": instance.get("PublicIpAddress"),
+        "security_groups": [security_groups.get(sg["GroupId"]) for sg in instance.get("SecurityGroups", [])],
+        "routes": [rt.get("Routes", []) for rt in route_tables],
+        "load_balancers": sorted(_aws_region_listing("load_balancer_targets", region, profile).get(resource_id, [])),
+    }
+
+
+def _aws_rds_inputs(resource_id: str, region: Optional[str], profile: Optional[str]) -> Dict[str, Any]:
+    """Everything check_aws_rds bases its judgement on, from region-wide listings."""
+    db = _aws_region_listing("db_instances", region, profile).get(resource_id)
+    if db is None:
+        raise ValueError(f"RDS instance not found: {resource_id}")
+    security_groups = _aws_region_listing("security_groups", region, profile)
+    return {
+        "state": db.get("DBInstanceStatus"),
+        "publicly_accessible": db.get("PubliclyAccessible"),
+        "subnet_group": db.get("DBSubnetGroup"),
+        "endpoint": db.get("Endpoint"),
+        "security_groups": [
+            security_groups.get(sg["VpcSecurityGroupId"])
+            for sg in db.get("VpcSecurityGroups", [])
+            if sg.get("Status") == "active"
+        ],
+    }
+
+
+# (provider, resource_type) -> function(resource_id, region, profile) returning
+# the inputs of the resource's judgement from cheap listings
+SNAPSHOT_INPUTS = {
+    ("aws", "ec2"): _aws_ec2_inputs,
+    ("aws", "rds"): _aws_rds_inputs,
+}
+
+
+def _fingerprint(kind: str, value: Any) -> str:
+    canonical = json.dumps([SNAPSHOT_VERSION, value], sort_keys=True, default=str, separators=(",", ":"))
+    return f"{kind}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+def snapshot_key(request: Dict[str, Any]) -> str:
+    """Snapshot entry key of a check request (or of a record labelled with its region and profile)."""
+    fields = [str(request.get(name) or "").lower() for name in ("provider", "resource_type")]
+    fields += [request.get(name) for name in ("resource_id", "region", "profile")]
+    return json.dumps(fields)
+
+
+def load_snapshot(path: str) -> Dict[str, Dict[str, Any]]:
+    """Entries of a snapshot file by snapshot_key; empty for a missing file or an older SNAPSHOT_VERSION."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != SNAPSHOT_VERSION:
+        return {}
+    return data.get("resources", {})
+
+
+def save_snapshot(path: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    """Write a snapshot file, replacing the previous one only once it is complete."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "resources": entries}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def snapshot_entry(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot entry of a result returned by check_with_snapshot."""
+    result = {
+        name: value for name, value in record.items() if name not in ("snapshot", "account", "region", "api_profile")
+    }
+    return {"fingerprint": record["snapshot"]["fingerprint"], "checked_at": record["snapshot"]["checked_at"], "result": result}
+
+
+def check_with_snapshot(request: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    check(**request), or the result of the previous snapshot entry when the
+    inputs of the resource did not change since. The result gets a "snapshot"
+    object: status (new / unchanged / changed), whether it was re-evaluated,
+    its fingerprint and time, and the reachability transitions since the
+    previous entry.
+    """
+    inputs_of = SNAPSHOT_INPUTS.get((str(request["provider"]).lower(), str(request["resource_type"]).lower()))
+    fingerprint = None
+    if inputs_of:
+        try:
+            fingerprint = _fingerprint(
+                "inputs", inputs_of(request["resource_id"], request.get("region"), request.get("profile"))
+            )
+        except Exception:
+            fingerprint = None  # no cheap answer: check the resource
+    if previous and fingerprint == previous["fingerprint"] and not any(
+        reason.startswith(_LOOKUP_ERROR_PREFIXES) for reason in previous["result"].get("reasons", [])
+    ):
+        return {
+            **previous["result"],
+            "snapshot": {
+                "status": "unchanged",
+                "reevaluated": False,
+                "fingerprint": fingerprint,
+                "checked_at": previous["checked_at"],
+                "transitions": {},
+            },
+        }
+
+    result = check(**request)
+    if fingerprint is None:
+        fingerprint = _fingerprint("observed", result["observed"])
+    transitions: Dict[str, List[str]] = {}
+    if previous:
+        for field in ("internet_reachability", "private_reachability"):
+            if previous["result"].get(field) != result[field]:
+                transitions[field] = [previous["result"].get(field), result[field]]
+    if previous is None:
+        status = "new"
+    else:
+        status = "unchanged" if fingerprint == previous["fingerprint"] else "changed"
+    result["snapshot"] = {
+        "status": status,
+        "reevaluated": True,
+        "fingerprint": fingerprint,
+        "checked_at": time.time(),
+        "transitions": transitions,
+    }
+    return result
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Path analysis
+# ─────────────────────────────────────────────────────────────────────────────
+# "Can A reach B on protocol/port" for AWS EC2 / RDS endpoints of one region,
+# answered from region-wide listings (see _aws_region_listing) without any
+# per-pair API call. A path is a chain of hops: the egress security groups of
+# A, the route of A's subnet towards B, the outbound NACL of A's subnet, the
+# inbound NACL of B's subnet and the ingress security groups of B; replies
+# need the route back and both NACLs again on ephemeral ports (security
+# groups are stateful, NACLs are not). Every hop is memoized on what it
+# depends on (a subnet and a destination address, a set of security groups,
+# ...), so a matrix of N x M endpoints evaluates each distinct hop once.
+# Transit gateways, VPN / appliance routes and prefix lists are not modelled.
+
+# Ports replies are sent to: the NACL rules a stateless return path needs.
+_EPHEMERAL_PORTS = (1024, 65535)
+# Route targets of a route, in the order the fields are looked at.
+_ROUTE_TARGET_FIELDS = (
+    "GatewayId", "NatGatewayId", "VpcPeeringConnectionId", "TransitGatewayId", "NetworkInterfaceId", "InstanceId",
+    "EgressOnlyInternetGatewayId", "LocalGatewayId", "CarrierGatewayId", "CoreNetworkArn",
+)
+# Route targets leading out to the internet: a private address behind them is not reachable.
+_INTERNET_ROUTE_PREFIXES = ("igw-", "nat-", "eigw-")
+
+# (hop, region, profile, arguments...) -> memoized hop result
+_AWS_PATH_HOPS: Dict[Tuple[Any, ...], Any] = _run_cache()
+
+
+def _aws_path_hop(key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+    if key not in _AWS_PATH_HOPS:
+        _AWS_PATH_HOPS[key] = compute()
+    return _AWS_PATH_HOPS[key]
+
+
+def _aws_path_endpoint(spec: str, region: Optional[str], profile: Optional[str]) -> Dict[str, Any]:
+    """
+    Resolve "ec2:<instance id>", "rds:<DB identifier>" or a bare instance ID.
+    placements are the (subnet ID, address CIDR) pairs the endpoint may sit
+    at: the private IP of an instance, or the subnets of a DB subnet group in
+    the DB's availability zone (RDS does not expose the address of a DB).
+    """
+    kind, resource_id = spec.split(":", 1) if ":" in spec else ("ec2", spec)
+    if kind == "ec2":
+        instance = _aws_region_listing("instances", region, profile).get(resource_id)
+        if instance is None:
+            raise ValueError(f"EC2 instance not found: {resource_id}")
+        state = instance.get("State", {}).get("Name")
+        address = instance.get("PrivateIpAddress")
+        return {
+            "state": state,
+            "running": state == "running",
+            "vpc_id": instance.get("VpcId", ""),
+            "group_ids": tuple(sorted(sg["GroupId"] for sg in instance.get("SecurityGroups", []))),
+            "placements": [(instance.get("SubnetId", ""), f"{address}/32")] if address else [],
+        }
+    if kind == "rds":
+        db = _aws_region_listing("db_instances", region, profile).get(resource_id)
+        if db is None:
+            raise ValueError(f"RDS instance not found: {resource_id}")
+        subnet_group = db.get("DBSubnetGroup") or {}
+        members = [s for s in subnet_group.get("Subnets", []) if s.get("SubnetStatus", "Active") == "Active"]
+        in_zone = [
+            s for s in members
+            if s.get("SubnetAvailabilityZone", {}).get("Name") == db.get("AvailabilityZone")
+        ]
+        subnets = _aws_region_listing("subnets", region, profile)
+        state = db.get("DBInstanceStatus")
+        return {
+            "state": state,
+            "running": state == "available",
+            "vpc_id": subnet_group.get("VpcId", ""),
+            "group_ids": tuple(sorted(
+                sg["VpcSecurityGroupId"] for sg in db.get("VpcSecurityGroups", []) if sg.get("Status") == "active"
+            )),
+            "placements": [
+                (s["SubnetIdentifier"], subnets[s["SubnetIdentifier"]]["CidrBlock"])
+                for s in in_zone or members
+                if s.get("SubnetIdentifier") in subnets
+            ],
+        }
+    raise ValueError(f"Unsupported path endpoint: {spec} (expected ec2:<instance id> or rds:<DB identifier>)")
+
+
+def _aws_path_sg_rules(
+    group_ids: Tuple[str, ...], egress: bool, region: Optional[str], profile: Optional[str]
+) -> Tuple[ReachIndex, Dict[str, List[Tuple[str, List[Tuple[int, int]]]]]]:
+    """
+    The egress or ingress rules of a set of security groups: a reach index of
+    the CIDR rules and referenced group ID -> [(protocol, port intervals)].
+    """
+    key = ("sg_rules", region, profile, group_ids, egress)
+    if key in _AWS_PATH_HOPS:
+        return _AWS_PATH_HOPS[key]
+    security_groups = _aws_region_listing("security_groups", region, profile)
+    entries: List[Tuple[str, str, List[Tuple[int, int]]]] = []
+    references: Dict[str, List[Tuple[str, List[Tuple[int, int]]]]] = {}
+    for group_id in group_ids:
+        sg = security_groups.get(group_id) or {}
+        for perm in sg.get("IpPermissionsEgress" if egress else "IpPermissions", []):
+            protocol = _normalize_protocol(perm.get("IpProtocol"))
+            ports = _sg_rule_ports(protocol, perm.get("FromPort"), perm.get("ToPort"))
+            entries.extend((protocol, r.get("CidrIp", ""), ports) for r in perm.get("IpRanges", []))
+            entries.extend((protocol, r.get("CidrIpv6", ""), ports) for r in perm.get("Ipv6Ranges", []))
+            for pair in perm.get("UserIdGroupPairs", []):
+                references.setdefault(pair.get("GroupId", ""), []).append((protocol, ports))
+    return _aws_path_hop(key, lambda: (_build_reach_index(entries), references))
+
+
+def _aws_path_sg_allows(
+    group_ids: Tuple[str, ...],
+    egress: bool,
+    peer_group_ids: Tuple[str, ...],
+    peer_cidr: str,
+    protocol: str,
+    port: int,
+    region: Optional[str],
+    profile: Optional[str],
+) -> bool:
+    """Whether security groups allow traffic to (egress) or from (ingress) a peer, by address or group."""
+    index, references = _aws_path_sg_rules(group_ids, egress, region, profile)
+    peer_range = _aws_path_hop(("cidr", peer_cidr), lambda: _cidr_range(peer_cidr))
+    if peer_range is not None and _reach_allows_range(index, peer_range, protocol, port):
+        return True
+    return any(
+        rule_protocol in ("all", protocol) and any(low <= port <= high for low, high in ports)
+        for group_id in peer_group_ids
+        for rule_protocol, ports in references.get(group_id, [])
+    )
+
+
+def _aws_path_subnet_acl(
+    subnet_id: str, vpc_id: str, region: Optional[str], profile: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """The network ACL of a subnet: its associated ACL, or the default ACL of the VPC."""
+    key = ("acl_index", region, profile)
+    if key not in _AWS_PATH_HOPS:
+        by_subnet: Dict[str, Dict[str, Any]] = {}
+        defaults: Dict[str, Dict[str, Any]] = {}
+        for acl in _aws_region_listing("network_acls", region, profile):
+            for association in acl.get("Associations", []):
+                by_subnet[association.get("SubnetId", "")] = acl
+            if acl.get("IsDefault"):
+                defaults[acl.get("VpcId", "")] = acl
+        _AWS_PATH_HOPS[key] = (by_subnet, defaults)
+    by_subnet, defaults = _AWS_PATH_HOPS[key]
+    return by_subnet.get(subnet_id) or defaults.get(vpc_id)
+
+
+def _nacl_allows(acl: Dict[str, Any], egress: bool, cidr: str, protocol: str, ports: Tuple[int, int]) -> bool:
+    """
+    Whether the numbered rules of a network ACL (first match wins) allow
+    traffic in one direction for every address of cidr and every port of
+    ports. A deny rule touching part of them denies.
+    """
+    parsed = _cidr_range(cidr)
+    if parsed is None:
+        return False
+    version, low, high = parsed
+    pending = [ports] if protocol in _PORT_PROTOCOLS else [(0, 0)]
+    entries = sorted(
+        (entry for entry in acl.get("Entries", []) if bool(entry.get("Egress")) == egress),
+        key=lambda entry: entry.get("RuleNumber", 0),
+    )
+    for entry in entries:
+        entry_protocol = _normalize_protocol(entry.get("Protocol"))
+        if entry_protocol not in ("all", protocol):
+            continue
+        rule_range = _cidr_range(entry.get("CidrBlock") or entry.get("Ipv6CidrBlock") or "")
+        if rule_range is None or rule_range[0] != version or rule_range[2] < low or rule_range[1] > high:
+            continue
+        port_range = entry.get("PortRange")
+        if protocol in _PORT_PROTOCOLS and entry_protocol != "all" and port_range:
+            rule_ports = [(port_range.get("From", 0), port_range.get("To", 65535))]
+        else:
+            rule_ports = list(_FULL_PORT_RANGE)
+        covered = [
+            (max(p_low, r_low), min(p_high, r_high))
+            for p_low, p_high in pending
+            for r_low, r_high in rule_ports
+            if max(p_low, r_low) <= min(p_high, r_high)
+        ]
+        if not covered:
+            continue
+        if entry.get("RuleAction") != "allow":
+            return False
+        if rule_range[1] <= low and rule_range[2] >= high:
+            pending = _subtract_intervals(pending, covered)
+            if not pending:
+                return True
+    return False
+
+
+def _aws_path_nacl_hop(
+    name: str,
+    subnet_id: str,
+    vpc_id: str,
+    egress: bool,
+    cidr: str,
+    protocol: str,
+    ports: Tuple[int, int],
+    region: Optional[str],
+    profile: Optional[str],
+) -> Dict[str, Any]:
+    acl = _aws_path_subnet_acl(subnet_id, vpc_id, region, profile)
+    if acl is None:
+        return {"hop": name, "id": subnet_id, "result": UNKNOWN, "detail": "no_network_acl"}
+    allowed = _aws_path_hop(
+        ("nacl", region, profile, acl.get("NetworkAclId"), egress, cidr, protocol, ports),
+        lambda: _nacl_allows(acl, egress, cidr, protocol, ports),
+    )
+    return {
+        "hop": name,
+        "id": acl.get("NetworkAclId", ""),
+        "result": REACHABLE if allowed else NOT_REACHABLE,
+        "detail": "allowed" if allowed else "denied",
+    }
+
+
+def _aws_path_route(
+    subnet_id: str, vpc_id: str, peer_vpc_id: str, cidr: str, region: Optional[str], profile: Optional[str]
+) -> Tuple[str, str, str]:
+    """
+    (reachability, route target, detail) of the most specific route of a
+    subnet covering cidr, an address of peer_vpc_id: reachable through the
+    local route of the same VPC or an active peering with that VPC, unknown
+    behind targets whose own routing is not modelled (transit gateways,
+    network interfaces, VPN gateways).
+    """
+    return _aws_path_hop(
+        ("route", region, profile, subnet_id, peer_vpc_id, cidr),
+        lambda: _aws_path_lookup_route(subnet_id, vpc_id, peer_vpc_id, cidr, region, profile),
+    )
+
+
+def _aws_path_lookup_route(
+    subnet_id: str, vpc_id: str, peer_vpc_id: str, cidr: str, region: Optional[str], profile: Optional[str]
+) -> Tuple[str, str, str]:
+    parsed = _cidr_range(cidr)
+    best: Optional[Tuple[int, Dict[str, Any]]] = None
+    route_tables = _aws_listed_route_tables(_aws_region_listing("route_tables", region, profile), subnet_id, vpc_id)
+    for rt in route_tables:
+        for route in rt.get("Routes", []):
+            destination = _cidr_range(route.get("DestinationCidrBlock") or route.get("DestinationIpv6CidrBlock") or "")
+            if parsed is None or destination is None or destination[0] != parsed[0]:
+                continue
+            if destination[1] <= parsed[1] and destination[2] >= parsed[2]:
+                size = destination[2] - destination[1]
+                if best is None or size < best[0]:
+                    best = (size, route)
+    if best is None:
+        return NOT_REACHABLE, "", "no_route"
+    route = best[1]
+    target = next((route[field] for field in _ROUTE_TARGET_FIELDS if route.get(field)), "")
+    if route.get("State") == "blackhole":
+        return NOT_REACHABLE, target, "blackhole"
+    if target == "local":
+        return (REACHABLE, target, "local") if peer_vpc_id == vpc_id else (NOT_REACHABLE, target, "other_vpc")
+    if target.startswith("pcx-"):
+        peering = _aws_region_listing("vpc_peerings", region, profile).get(target, {})
+        status = peering.get("Status", {}).get("Code", "missing")
+        if status != "active":
+            return NOT_REACHABLE, target, f"peering_{status}"
+        vpcs = {peering.get(side, {}).get("VpcId") for side in ("RequesterVpcInfo", "AccepterVpcInfo")}
+        return (REACHABLE, target, "peering") if vpcs == {vpc_id, peer_vpc_id} else (NOT_REACHABLE, target, "other_vpc")
+    if target.startswith(_INTERNET_ROUTE_PREFIXES):
+        return NOT_REACHABLE, target, "internet_route"
+    return UNKNOWN, target, "not_modelled"
+
+
+def _aws_path_hops(
+    src: Dict[str, Any],
+    src_placement: Tuple[str, str],
+    dst: Dict[str, Any],
+    dst_placement: Tuple[str, str],
+    protocol: str,
+    port: int,
+    region: Optional[str],
+    profile: Optional[str],
+) -> List[Dict[str, Any]]:
+    """Every hop of the path between two placements, in the order a packet and its reply meet them."""
+    src_subnet, src_cidr = src_placement
+    dst_subnet, dst_cidr = dst_placement
+    hops: List[Dict[str, Any]] = []
+
+    # Defined for every pair of a matrix: left unannotated, typing subscripts cost more than the hops
+    def sg_hop(name, group_ids, egress, peer, peer_cidr):
+        allowed = _aws_path_sg_allows(group_ids, egress, peer["group_ids"], peer_cidr, protocol, port, region, profile)
+        return {
+            "hop": name,
+            "id": ",".join(group_ids),
+            "result": REACHABLE if allowed else NOT_REACHABLE,
+            "detail": "allowed" if allowed else "denied",
+        }
+
+    def route_hop(name, subnet_id, vpc_id, peer_vpc_id, cidr):
+        result, target, detail = _aws_path_route(subnet_id, vpc_id, peer_vpc_id, cidr, region, profile)
+        return {"hop": name, "id": target or subnet_id, "result": result, "detail": detail}
+
+    hops.append(sg_hop("source_sg_egress", src["group_ids"], True, dst, dst_cidr))
+    hops.append(route_hop("route", src_subnet, src["vpc_id"], dst["vpc_id"], dst_cidr))
+    # NACLs filter traffic crossing a subnet boundary only
+    crosses_subnets = src_subnet != dst_subnet
+    service_ports = (port, port)
+    if crosses_subnets:
+        hops.append(_aws_path_nacl_hop(
+            "source_nacl_egress", src_subnet, src["vpc_id"], True, dst_cidr, protocol, service_ports, region, profile
+        ))
+        hops.append(_aws_path_nacl_hop(
+            "destination_nacl_ingress", dst_subnet, dst["vpc_id"], False, src_cidr, protocol, service_ports,
+            region, profile,
+        ))
+    hops.append(sg_hop("destination_sg_ingress", dst["group_ids"], False, src, src_cidr))
+    hops.append(route_hop("return_route", dst_subnet, dst["vpc_id"], src["vpc_id"], src_cidr))
+    if crosses_subnets:
+        hops.append(_aws_path_nacl_hop(
+            "destination_nacl_egress", dst_subnet, dst["vpc_id"], True, src_cidr, protocol, _EPHEMERAL_PORTS,
+            region, profile,
+        ))
+        hops.append(_aws_path_nacl_hop(
+            "source_nacl_ingress", src_subnet, src["vpc_id"], False, dst_cidr, protocol, _EPHEMERAL_PORTS,
+            region, profile,
+        ))
+    return hops
+
+
+def _combine_reachability(values: List[str]) -> str:
+    """not_reachable when any value is, else unknown when any value is, else reachable."""
+    if NOT_REACHABLE in values:
+        return NOT_REACHABLE
+    return UNKNOWN if UNKNOWN in values else REACHABLE
+
+
+def analyze_path(
+    source: str,
+    destination: str,
+    port: Optional[int],
+    protocol: str = "tcp",
+    region: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Whether source can open protocol/port connections to destination, two
+    AWS endpoints of one region ("ec2:<instance id>", "rds:<DB identifier>"
+    or a bare instance ID). The record lists every hop of each path with its
+    result; reasons name the hops that block or could not be evaluated.
+    With several placements (an RDS subnet group) the answer is unknown when
+    they disagree.
+    """
+    protocol = _normalize_protocol(protocol)
+    if protocol in _PORT_PROTOCOLS and port is None:
+        raise ValueError(f"A port is required for {protocol} paths")
+    port = port if protocol in _PORT_PROTOCOLS else 0
+    endpoints = [
+        _aws_path_hop(("endpoint", region, profile, spec), lambda spec=spec: _aws_path_endpoint(spec, region, profile))
+        for spec in (source, destination)
+    ]
+    reasons: List[str] = []
+    for role, endpoint in zip(("source", "destination"), endpoints):
+        if not endpoint["running"]:
+            reasons.append(f"{role}_state={endpoint['state']}")
+        if not endpoint["placements"]:
+            reasons.append(f"{role}_address=unknown")
+    src, dst = endpoints
+    paths: List[Dict[str, Any]] = []
+    for src_placement in src["placements"]:
+        for dst_placement in dst["placements"]:
+            hops = _aws_path_hops(src, src_placement, dst, dst_placement, protocol, port, region, profile)
+            paths.append({
+                "source_subnet": src_placement[0],
+                "destination_subnet": dst_placement[0],
+                "reachability": _combine_reachability([hop["result"] for hop in hops]),
+                "hops": hops,
+            })
+            for hop in hops:
+                reason = f"{hop['hop']}={hop['detail']}"
+                if hop["result"] != REACHABLE and reason not in reasons:
+                    reasons.append(reason)
+
+    outcomes = {path["reachability"] for path in paths}
+    if any(reason.startswith(("source_state=", "destination_state=")) for reason in reasons):
+        reachability = NOT_REACHABLE
+    elif not paths:
+        reachability = UNKNOWN
+    elif len(outcomes) > 1:
+        reachability = UNKNOWN
+        reasons.append("placement_dependent")
+    else:
+        reachability = outcomes.pop()
+    return {
+        "source": source,
+        "destination": destination,
+        "protocol": protocol,
+        "port": port if protocol in _PORT_PROTOCOLS else None,
+        "reachability": reachability,
+        "reasons": reasons,
+        "paths": paths,
+    }
+
+
+def analyze_paths(
+    pairs: Iterable[Tuple[str, str]],
+    port: Optional[int],
+    protocol: str = "tcp",
+    region: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    analyze_path for every (source, destination) pair, sharing the listings
+    and memoized hops of the run; a pair that cannot be analyzed yields a
+    record with its error and the others go on.
+    """
+    for source, destination in pairs:
+        try:
+            yield analyze_path(source, destination, port, protocol=protocol, region=region, profile=profile)
+        except Exception as exc:
+            yield {"source": source, "destination": destination, "error": str(exc)}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Batch runs
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Checks run concurrently by iter_checks.
+CHECK_WORKERS = 8
+
+
+def _expand_request(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Split a subscription-wide Azure VM request into one request per VM, and a
+    project-wide Cloud Run / Cloud SQL request into one request per service /
+    instance.
+    """
+    key = (str(request.get("provider", "")).lower(), str(request.get("resource_type", "")).lower())
+    if key in {("gcp", "cloudrun"), ("gcp", "cloudsql")}:
+        parsed = _parse_gcp_resource_id(request["resource_id"])
+        if set(parsed) == {"projects"}:
+            list_project = _gcp_project_cloudrun_services if key[1] == "cloudrun" else _gcp_project_sql_instances
+            return [{**request, "resource_id": resource_id} for resource_id in list_project(parsed["projects"])]
+    if key == ("azure", "vm"):
+        backend = request.get("azure_backend", "arm")
+        parsed = _parse_azure_resource_id(request["resource_id"])
+        if (request.get("azure_inventory") or backend != "arm") and set(parsed) == {"subscriptions"}:
+            return [
+                {**request, "resource_id": vm_id}
+                for vm_id in _azure_subscription_vm_ids(parsed["subscriptions"], backend)
+            ]
+    return [request]
+
+
+def _error_record(request: Dict[str, Any], exc: Exception) -> Dict[str, Any]:
+    """Result line of a check that failed, in place of its result."""
+    return {
+        "provider": request.get("provider"),
+        "resource_type": request.get("resource_type"),
+        "resource_id": request.get("resource_id"),
+        "error": str(exc),
+    }
+
+
+def iter_checks(
+    requests: Iterable[Dict[str, Any]],
+    workers: int = CHECK_WORKERS,
+    run=None,
+    snapshot: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run a stream of check requests (check() keyword arguments) on worker
+    threads and yield each result as soon as it is ready, in completion order.
+    A check that fails yields an error record (see _error_record) and the run
+    goes on. At most 2 * workers requests are in flight, so memory does not
+    grow with the number of requests.
+
+    run replaces check() (e.g. to send requests to a daemon); requests are
+    then passed as is and list results are flattened. Otherwise
+    subscription-wide Azure requests are split into one request per VM.
+    snapshot holds the entries of a previous run (see load_snapshot): every
+    check then goes through check_with_snapshot.
+    """
+    def run_one(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        try:
+            if run:
+                result = run(request)
+            elif snapshot is not None:
+                result = check_with_snapshot(request, snapshot.get(snapshot_key(request)))
+            else:
+                result = check(**request)
+        except Exception as exc:
+            return [_error_record(request, exc)]
+        return result if isinstance(result, list) else [result]
+
+    pending: Set[Any] = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for request in requests:
+            try:
+                expanded = [request] if run else _expand_request(request)
+            except Exception as exc:
+                yield _error_record(request, exc)
+                continue
+            for item in expanded:
+                pending.add(pool.submit(run_one, item))
+                while len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def _open_output(path: str):
+    """Open an output file for text, gzip-compressed when its name ends with .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def _read_resource_ids(path: str) -> Iterator[str]:
+    """Resource IDs (or fan-out accounts) of a file, one per line with # comments, or of stdin for "-"."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# AWS fan-out
+# ─────────────────────────────────────────────────────────────────────────────
+# Every (account, region) pair is checked in a process of a pool: its clients,
+# credentials, request scheduler and run caches stay private to that process,
+# and the results of all pairs are merged into one stream.
+
+# Pool processes of iter_aws_fanout; each runs CHECK_WORKERS checks concurrently.
+FANOUT_PROCESSES = min(8, os.cpu_count() or 1)
+
+# Instance states worth checking (terminated instances linger in DescribeInstances).
+_AWS_EC2_LIVE_STATES = ["pending", "running", "stopping", "stopped"]
+
+
+def _aws_discover_resource_ids(resource_type: str, region: Optional[str], profile: Optional[str]) -> List[str]:
+    """IDs of every EC2 instance or RDS DB instance of an account and region."""
+    if resource_type == "ec2":
+        ec2 = _get_boto3_client("ec2", region, profile)
+        pages = ec2.get_paginator("describe_instances").paginate(
+            Filters=[{"Name": "instance-state-name", "Values": _AWS_EC2_LIVE_STATES}]
+        )
+        return [
+            instance["InstanceId"]
+            for page in pages
+            for reservation in page.get("Reservations", [])
+            for instance in reservation.get("Instances", [])
+        ]
+    if resource_type == "rds":
+        rds = _get_boto3_client("rds", region, profile)
+        pages = rds.get_paginator("describe_db_instances").paginate()
+        return [db["DBInstanceIdentifier"] for page in pages for db in page.get("DBInstances", [])]
+    raise ValueError(f"Unsupported AWS resource_type for a fan-out: {resource_type}")
+
+
+def _aws_check_account_region(
+    resource_type: str,
+    account: Optional[str],
+    region: Optional[str],
+    workers: int,
+    snapshot: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Check every resource of one account (profile or role ARN) and region,
+    against the entries of snapshot if given (see iter_checks). Each record is
+    labelled with "account" and "region"; a failed discovery gives a single
+    error record.
+    """
+    label = {"account": account, "region": region}
+    request = {"provider": "aws", "resource_type": resource_type, "region": region, "profile": account}
+    try:
+        resource_ids = _aws_discover_resource_ids(resource_type, region, account)
+    except Exception as exc:
+        return [{**_error_record({**request, "resource_id": None}, exc), **label}]
+    requests = ({**request, "resource_id": resource_id} for resource_id in resource_ids)
+    return [{**record, **label} for record in iter_checks(requests, workers=workers, snapshot=snapshot)]
+
+
+def _aws_fanout_process_init(
+    cache_dir: str,
+    response_cache: Dict[str, Any],
+    dump_mode: Optional[str],
+    dump_path: Optional[str],
+    profiling: Tuple[bool, bool, float] = (False, False, 0.0),
+) -> None:
+    """Give a pool process the cache, response dump and profiling settings of the parent."""
+    global CACHE_DIR
+    CACHE_DIR = cache_dir
+    _RESPONSE_CACHE_CONFIG.update(response_cache)
+    if dump_mode == "replay":
+        load_response_dump(dump_path)
+    elif dump_mode == "record":
+        record_responses()
+    enabled, trace, origin = profiling
+    if enabled:
+        enable_profiling(trace=trace, origin=origin)
+
+
+def _aws_fanout_process_unit(
+    unit: Tuple[Any, ...]
+) -> Tuple[List[Dict[str, Any]], Dict[str, int], Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    # a pool process checks several pairs one after the other: start each afresh
+    reset_run_state()
+    with _RESPONSE_DUMP_LOCK:
+        _RESPONSE_DUMP["recorded"] = {}
+    records = _aws_check_account_region(*unit)
+    return records, response_cache_stats(), _RESPONSE_DUMP["recorded"], _profile_export()
+
+
+def iter_aws_fanout(
+    resource_type: str,
+    accounts: List[Optional[str]],
+    regions: List[Optional[str]],
+    processes: int = FANOUT_PROCESSES,
+    workers: int = CHECK_WORKERS,
+    snapshot: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Discover and check the EC2 or RDS instances of every account (named
+    profile or IAM role ARN, None for the default credentials) in every
+    region, yielding the records of each (account, region) pair as soon as it
+    is done. Pairs run in a pool of processes; processes=1 runs them one
+    after the other in this process. With snapshot (see load_snapshot) each
+    pair is given the entries of its account and region.
+    """
+    pair_entries: Dict[Tuple[Any, Any], Dict[str, Dict[str, Any]]] = {}
+    for key, entry in (snapshot or {}).items():
+        _, _, _, region, profile = json.loads(key)
+        pair_entries.setdefault((profile, region), {})[key] = entry
+    units = [
+        (resource_type, account, region, workers, None if snapshot is None else pair_entries.get((account, region), {}))
+        for account in accounts
+        for region in regions
+    ]
+    if processes <= 1:
+        for unit in units:
+            yield from _aws_check_account_region(*unit)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(units)),
+        mp_context=multiprocessing.get_context("spawn"),  # no locks or clients inherited from this process
+        initializer=_aws_fanout_process_init,
+        initargs=(
+            CACHE_DIR,
+            dict(_RESPONSE_CACHE_CONFIG),
+            _RESPONSE_DUMP["mode"],
+            _RESPONSE_DUMP["path"],
+            (_PROFILE["enabled"], _PROFILE["trace"] is not None, _PROFILE_ORIGIN[0]),
+        ),
+    ) as pool:
+        futures = {pool.submit(_aws_fanout_process_unit, unit): unit for unit in units}
+        for future in as_completed(futures):
+            _, account, region = futures[future][:3]
+            try:
+                records, stats, recorded, profile = future.result()
+            except Exception as exc:  # e.g. the process died
+                request = {"provider": "aws", "resource_type": resource_type, "resource_id": None}
+                yield {**_error_record(request, exc), "account": account, "region": region}
+                continue
+            with _RESPONSE_CACHE_LOCK:
+                for name, count in stats.items():
+                    _RESPONSE_CACHE_STATS[name] = _RESPONSE_CACHE_STATS.get(name, 0) + count
+            with _RESPONSE_DUMP_LOCK:
+                _RESPONSE_DUMP["recorded"].update(recorded)
+            _profile_merge(profile)
+            yield from records
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Daemon
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _make_check_server(socket_path: str):
+    """
+    Create a Unix socket server answering check requests: each line received
+    is a JSON object of check() keyword arguments and gets one JSON line back,
+    either the result or {"error": "..."}.
+    """
+    class CheckRequestHandler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object of check() arguments")
+                    reset_run_state(keep_clients=True)
+                    response = check(**request)
+                except Exception as exc:
+                    response = {"error": str(exc)}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # stale socket of a previous daemon
+    old_umask = os.umask(0o177)  # checks run with our credentials: owner only
+    try:
+        return socketserver.UnixStreamServer(socket_path, CheckRequestHandler)
+    finally:
+        os.umask(old_umask)
+
+
+def serve(socket_path: str) -> None:
+    """
+    Serve check requests on socket_path until interrupted. SDK modules, clients
+    and credentials stay loaded between requests; cached API data does not.
+    """
+    server = _make_check_server(socket_path)
+    print(f"Serving checks on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _check_via_daemon(socket_path: str, request: Dict[str, Any]) -> Any:
+    """Send one check request to a daemon started with --serve."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as reader:
+            response = json.loads(reader.readline())
+    if isinstance(response, dict) and set(response) == {"error"}:
+        raise RuntimeError(response["error"])
+    return response
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main() -> None:
+    global CACHE_DIR
     parser = argparse.ArgumentParser(
         description="Check network connectivity / reachability of cloud resources.",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -1447,20 +4847,24 @@ def main() -> None:
     )
     parser.add_argument(
         "--provider",
-        required=True,
         choices=["aws", "azure", "gcp"],
         help="Cloud provider (aws | azure | gcp)",
     )
     parser.add_argument(
         "--resource-type",
-        required=True,
         choices=["ec2", "rds", "vm", "compute", "cloudrun", "cloudsql"],
         help="Resource type",
     )
     parser.add_argument(
         "--resource-id",
-        required=True,
-        help="Resource identifier (instance ID, full resource path, etc.)",
+        action="append",
+        help="Resource identifier (instance ID, full resource path, etc.); repeat it to check several resources",
+    )
+    parser.add_argument(
+        "--resource-ids-file",
+        metavar="FILE",
+        default=None,
+        help="Check every resource ID listed in FILE (one per line, - for stdin)",
     )
     parser.add_argument(
         "--region",
@@ -1475,28 +4879,256 @@ def main() -> None:
     parser.add_argument(
         "--profile",
         default=None,
-        help="AWS named profile to use (aws provider only). Overrides default credential chain.",
+        help="AWS named profile or IAM role ARN to use (aws provider only). Overrides default credential chain.",
+    )
+    parser.add_argument(
+        "--account",
+        action="append",
+        help="AWS fan-out: named profile or IAM role ARN of an account whose instances are all checked "
+        "(repeatable; default credentials when only --regions is given)",
+    )
+    parser.add_argument(
+        "--accounts-file",
+        metavar="FILE",
+        default=None,
+        help="AWS fan-out: profiles / role ARNs listed in FILE (one per line, - for stdin)",
+    )
+    parser.add_argument(
+        "--regions",
+        default=None,
+        help="AWS fan-out: comma-separated regions whose instances are all checked (default: --region)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=FANOUT_PROCESSES,
+        help=f"AWS fan-out: (account, region) pairs checked in parallel processes (default: {FANOUT_PROCESSES})",
+    )
+    parser.add_argument(
+        "--path-to",
+        action="append",
+        metavar="ENDPOINT",
+        help="AWS path analysis: report whether each --resource-id can reach ENDPOINT (ec2:<instance id>, "
+        "rds:<DB identifier>, or an ID of --resource-type) on --protocol/--port, from region-wide listings "
+        "(repeatable)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Destination port of --path-to",
+    )
+    parser.add_argument(
+        "--protocol",
+        default="tcp",
+        help="IP protocol of --path-to (default: tcp)",
+    )
+    parser.add_argument(
+        "--azure-inventory",
+        action="store_true",
+        help="Azure: list the subscription's network resources once and resolve VMs from that index "
+        "(--resource-id /subscriptions/<sub> checks every VM of the subscription)",
+    )
+    parser.add_argument(
+        "--azure-backend",
+        choices=list(AZURE_BACKENDS),
+        default="arm",
+        help="Azure inventory source: ARM list calls (arm) or Azure Resource Graph queries (graph, implies "
+        "--azure-inventory)",
     )
     parser.add_argument(
         "--output",
         default=None,
-        help="Write JSON output to this file instead of stdout",
+        help="Write JSON output to this file instead of stdout (gzip-compressed if it ends with .gz)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="json: one document (an array for several resources); "
+        "ndjson: one line per resource, written as soon as it is checked",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=CHECK_WORKERS,
+        help=f"Resources checked concurrently when several are given (default: {CHECK_WORKERS})",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        default=None,
+        help="Re-evaluate only resources whose network inputs changed since the run that wrote FILE, "
+        "report reachability transitions and update FILE",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=f"Directory of the response cache and other files kept between runs (default: {CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the cloud APIs and do not store their responses",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=int,
+        metavar="SECONDS",
+        default=None,
+        help="Reuse cached responses up to this age instead of the per-API TTLs (0 refreshes everything)",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="FILE",
+        default=None,
+        help="Record every cloud API response of the run into FILE (JSON, gzip-compressed if it ends with .gz)",
+    )
+    parser.add_argument(
+        "--offline",
+        metavar="FILE",
+        default=None,
+        help="Evaluate from the responses recorded in FILE with --record, without credentials or network access",
+    )
+    parser.add_argument(
+        "--api-profile",
+        action="store_true",
+        help="Attach the cloud API calls of each check (counts, pages, latency per API) to its result as "
+        "api_profile, and print the totals of the run on stderr",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        default=None,
+        help="Write every cloud API call of the run to FILE as Chrome trace events (Perfetto / chrome://tracing)",
+    )
+    parser.add_argument(
+        "--gcp-async",
+        nargs="?",
+        type=int,
+        const=GCP_ASYNC_CONCURRENCY,
+        default=None,
+        metavar="N",
+        help="GCP: prefetch the independent API calls of project-wide checks (Cloud Run IAM policies, Cloud SQL "
+        f"VPC networks) concurrently over an asyncio httpx transport, N in flight (default: {GCP_ASYNC_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        default=None,
+        help="Run as a daemon answering check requests on this Unix socket",
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        metavar="SOCKET",
+        default=None,
+        help="Send the check to a daemon started with --serve instead of running it in this process",
     )
 
     args = parser.parse_args()
 
+    if args.cache_dir:
+        CACHE_DIR = args.cache_dir
+    configure_response_cache(enabled=not args.no_cache, max_age=args.max_age)
+    if args.serve:
+        serve(args.serve)
+        return
+    fanout = bool(args.account or args.accounts_file or args.regions)
+    if fanout:
+        if args.provider != "aws" or args.resource_type not in ("ec2", "rds"):
+            parser.error("--account, --accounts-file and --regions need --provider aws and --resource-type ec2 or rds")
+        if args.resource_id or args.resource_ids_file or args.daemon_socket:
+            parser.error("a fan-out discovers its resources: drop --resource-id, --resource-ids-file and --daemon-socket")
+    elif not (args.provider and args.resource_type and (args.resource_id or args.resource_ids_file)):
+        parser.error("--provider, --resource-type and --resource-id (or --resource-ids-file) are required")
+    if args.path_to:
+        if args.provider != "aws" or args.resource_type not in ("ec2", "rds"):
+            parser.error("--path-to needs --provider aws and --resource-type ec2 or rds")
+        if fanout or args.snapshot or args.daemon_socket:
+            parser.error("--path-to cannot be combined with a fan-out, --snapshot or --daemon-socket")
+        if args.port is None and _normalize_protocol(args.protocol) in _PORT_PROTOCOLS:
+            parser.error(f"--path-to needs --port for {args.protocol}")
+    if args.snapshot and args.daemon_socket:
+        parser.error("--snapshot cannot be combined with --daemon-socket")
+    if (args.record or args.offline) and args.daemon_socket:
+        parser.error("--record and --offline cannot be combined with --daemon-socket")
+    if args.record and args.offline:
+        parser.error("--record and --offline are mutually exclusive")
+    if (args.api_profile or args.trace) and args.daemon_socket:
+        parser.error("--api-profile and --trace cannot be combined with --daemon-socket")
+    if args.gcp_async is not None:
+        if args.daemon_socket:
+            parser.error("--gcp-async cannot be combined with --daemon-socket")
+        if args.gcp_async < 1:
+            parser.error("--gcp-async needs at least 1 request in flight")
+        configure_gcp_async(concurrency=args.gcp_async)
+
+    request = {
+        "provider": args.provider,
+        "resource_type": args.resource_type,
+        "region": args.region,
+        "lb_backend_service": args.lb_backend_service,
+        "profile": args.profile,
+        "azure_inventory": args.azure_inventory,
+        "azure_backend": args.azure_backend,
+    }
+    reset_run_state()
+    if args.offline:
+        load_response_dump(args.offline)
+    elif args.record:
+        record_responses()
+    if args.api_profile or args.trace:
+        enable_profiling(trace=bool(args.trace))
     try:
-        result = check(
-            provider=args.provider,
-            resource_type=args.resource_type,
-            resource_id=args.resource_id,
-            region=args.region,
-            lb_backend_service=args.lb_backend_service,
-            profile=args.profile,
+        if fanout:
+            _run_aws_fanout(args)
+        elif args.path_to:
+            _run_paths(args)
+        elif args.resource_ids_file or len(args.resource_id) > 1 or args.format == "ndjson" or args.snapshot:
+            _run_batch(args, request)
+        else:
+            _run_single(args, {**request, "resource_id": args.resource_id[0]})
+    finally:
+        if args.record:
+            count = save_response_dump(args.record)
+            print(f"{count} responses recorded in {args.record}", file=sys.stderr)
+        if args.trace:
+            count = write_trace(args.trace)
+            print(f"{count} trace events written to {args.trace}", file=sys.stderr)
+        if args.api_profile:
+            _print_profile_totals()
+
+
+def _print_profile_totals(top: int = 5) -> None:
+    """Print the API accounting of the run on stderr: totals and the APIs that took the most time."""
+    stats = profile_stats()
+    print(
+        f"api_profile: {stats['api_calls']} calls, {stats['api_pages']} pages, {stats['api_ms']:.0f} ms in cloud APIs",
+        file=sys.stderr,
+    )
+    for api, api_stats in list(stats["apis"].items())[:top]:
+        print(
+            f"  {api}: {api_stats['calls']} calls, {api_stats['pages']} pages, {api_stats['total_ms']:.0f} ms"
+            f" (max {api_stats['max_ms']:.0f} ms)",
+            file=sys.stderr,
         )
+
+
+def _run_single(args: argparse.Namespace, request: Dict[str, Any]) -> None:
+    """Check one resource and print its result as a JSON document."""
+    try:
+        if args.daemon_socket:
+            result = _check_via_daemon(args.daemon_socket, request)
+        else:
+            result = check(**request)
+            if not (args.no_cache or args.offline):
+                if isinstance(result, dict):
+                    result["response_cache"] = response_cache_stats()
+                else:
+                    print(f"response_cache: {json.dumps(response_cache_stats())}", file=sys.stderr)
         output = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
-            with open(args.output, "w", encoding="utf-8") as f:
+            with _open_output(args.output) as f:
                 f.write(output)
             print(f"Result written to {args.output}", file=sys.stderr)
         else:
@@ -1506,5 +5138,138 @@ def main() -> None:
         sys.exit(1)
 
 
+def _run_batch(args: argparse.Namespace, base_request: Dict[str, Any]) -> None:
+    """
+    Check every requested resource with iter_checks and write the records
+    (see _write_records).
+    """
+    def requests() -> Iterator[Dict[str, Any]]:
+        for resource_id in args.resource_id or []:
+            yield {**base_request, "resource_id": resource_id}
+        if args.resource_ids_file:
+            for resource_id in _read_resource_ids(args.resource_ids_file):
+                yield {**base_request, "resource_id": resource_id}
+
+    run = None
+    if args.daemon_socket:
+        run = lambda request: _check_via_daemon(args.daemon_socket, request)  # noqa: E731
+    snapshot = load_snapshot(args.snapshot) if args.snapshot else None
+    records = iter_checks(requests(), workers=args.workers, run=run, snapshot=snapshot)
+    _finish_run(args, records, snapshot, {"region": base_request["region"], "profile": base_request["profile"]})
+
+
+def _run_aws_fanout(args: argparse.Namespace) -> None:
+    """Check every EC2 / RDS instance of the requested accounts and regions (see iter_aws_fanout)."""
+    accounts: List[Optional[str]] = list(args.account or [])
+    if args.accounts_file:
+        accounts.extend(_read_resource_ids(args.accounts_file))
+    if not accounts:
+        accounts = [args.profile]
+    regions: List[Optional[str]] = [r.strip() for r in (args.regions or "").split(",") if r.strip()] or [args.region]
+    print(f"Checking {len(accounts)} account(s) x {len(regions)} region(s)", file=sys.stderr)
+    snapshot = load_snapshot(args.snapshot) if args.snapshot else None
+    records = iter_aws_fanout(
+        args.resource_type, accounts, regions, processes=args.processes, workers=args.workers, snapshot=snapshot
+    )
+    _finish_run(args, records, snapshot, {})
+
+
+def _run_paths(args: argparse.Namespace) -> None:
+    """
+    Analyze the path from every requested resource to every --path-to
+    endpoint (see analyze_paths) and write the records (see _write_records).
+    """
+    def endpoint(spec: str) -> str:
+        return spec if ":" in spec else f"{args.resource_type}:{spec}"
+
+    sources = [endpoint(resource_id) for resource_id in args.resource_id or []]
+    if args.resource_ids_file:
+        sources.extend(endpoint(resource_id) for resource_id in _read_resource_ids(args.resource_ids_file))
+    destinations = [endpoint(spec) for spec in args.path_to]
+    pairs = ((source, destination) for source in sources for destination in destinations)
+    records = analyze_paths(pairs, args.port, protocol=args.protocol, region=args.region, profile=args.profile)
+    if _write_records(args, records):
+        sys.exit(2)
+
+
+def _finish_run(
+    args: argparse.Namespace,
+    records: Iterable[Dict[str, Any]],
+    snapshot: Optional[Dict[str, Dict[str, Any]]],
+    labels: Dict[str, Any],
+) -> None:
+    """
+    Write the records (see _write_records) and, with --snapshot, the updated
+    snapshot file; labels give the region / profile of records that do not
+    carry them. Exits with status 2 when some checks failed.
+    """
+    if snapshot is None:
+        failed = _write_records(args, records)
+    else:
+        entries = dict(snapshot)  # resources not checked successfully keep their entry
+        counts = {"reevaluated": 0, "transitions": 0}
+
+        def recorded() -> Iterator[Dict[str, Any]]:
+            for record in records:
+                if "snapshot" in record:
+                    fields = {**labels, **record}
+                    if "account" in record:
+                        fields["profile"] = record["account"]
+                    entries[snapshot_key(fields)] = snapshot_entry(record)
+                    counts["reevaluated"] += record["snapshot"]["reevaluated"]
+                    counts["transitions"] += bool(record["snapshot"]["transitions"])
+                yield record
+
+        failed = _write_records(args, recorded())
+        save_snapshot(args.snapshot, entries)
+        print(
+            f"snapshot: {counts['reevaluated']} re-evaluated, {counts['transitions']} with reachability transitions",
+            file=sys.stderr,
+        )
+    if failed:
+        sys.exit(2)
+
+
+def _write_records(args: argparse.Namespace, records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write check records as they complete (ndjson) or as an array at the end
+    (json), with progress on stderr. Returns the number of failed checks.
+    """
+    out = _open_output(args.output) if args.output else sys.stdout
+    collected: List[Dict[str, Any]] = []
+    count = failed = 0
+    try:
+        for record in records:
+            count += 1
+            if "error" in record:
+                failed += 1
+                status = f"error: {record['error']}"
+            elif "reachability" in record:
+                status = f"reachability={record['reachability']}"
+            else:
+                status = f"internet={record['internet_reachability']} private={record['private_reachability']}"
+                if "snapshot" in record:
+                    status += f" snapshot={record['snapshot']['status']}"
+                    for field, (before, after) in record["snapshot"]["transitions"].items():
+                        status += f" {field}:{before}->{after}"
+            where = f"{record['account'] or 'default'} {record['region'] or 'default'} " if "account" in record else ""
+            label = record["resource_id"] if "resource_id" in record else f"{record['source']} -> {record['destination']}"
+            print(f"[{count}] {where}{label} {status}", file=sys.stderr)
+            if args.format == "ndjson":
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            else:
+                collected.append(record)
+        if args.format == "json":
+            out.write(json.dumps(collected, indent=2, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{count} checked, {failed} failed", file=sys.stderr)
+    if not (args.no_cache or args.daemon_socket or args.offline):
+        print(f"response_cache: {json.dumps(response_cache_stats())}", file=sys.stderr)
+    return failed
+
+
 if __name__ == "__main__":
     main()
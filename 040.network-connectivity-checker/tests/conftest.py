@@ -8,3 +8,49 @@ import pytest
 
 # Make the scripts directory importable
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_run_state():
+    """Each test is its own run: drop caches populated by previous tests."""
+    import check_network_connectivity as cnc
+
+    cnc.reset_run_state()
+    yield
+    cnc.reset_run_state()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep files the checker persists between runs out of the real home directory."""
+    import check_network_connectivity as cnc
+
+    monkeypatch.setattr(cnc, "CACHE_DIR", str(tmp_path / "cache"))
+    # main() enables the response cache; keep that from leaking into later tests
+    monkeypatch.setattr(cnc, "_RESPONSE_CACHE_CONFIG", dict(cnc._RESPONSE_CACHE_CONFIG))
+    # nor recording / replaying a response dump
+    monkeypatch.setattr(cnc, "_RESPONSE_DUMP", {"mode": None, "path": None, "recorded": {}, "replay": {}})
+    # nor API profiling
+    monkeypatch.setattr(cnc, "_PROFILE", {"enabled": False, "run": {"apis": {}, "spans": {}}, "trace": None})
+    # nor the asyncio GCP transport
+    monkeypatch.setattr(cnc, "_GCP_ASYNC_CONFIG", dict(cnc._GCP_ASYNC_CONFIG))
+
+
+@pytest.fixture(scope="session")
+def synthetic_inventories():
+    """
+    build_inventories(sizes, providers=...) of the benchmark harness, generated
+    once per session (per pytest-xdist worker) for each sizes / providers and
+    shared by the tests asking for them. Treat the inventories as read-only.
+    """
+    import benchmark_network_connectivity as bench
+
+    built = {}
+
+    def build(sizes, providers=("aws", "azure", "gcp")):
+        key = (tuple(sorted(sizes.items())), tuple(providers))
+        if key not in built:
+            built[key] = bench.build_inventories(sizes, providers=providers)
+        return built[key]
+
+    return build
@@ -8,6 +8,7 @@ tests run without real cloud credentials.
 import json
 import sys
 import os
+import threading
 from unittest.mock import MagicMock, patch, PropertyMock
 
 import pytest
@@ -15,6 +16,8 @@ import pytest
 # The conftest.py already adds the scripts directory to sys.path.
 import check_network_connectivity as cnc
 
+pytestmark = pytest.mark.unit
+
 
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # Helper factories
@@ -157,6 +160,100 @@ class TestSgRulesWithPorts:
         assert ingress_rules[0]["to_port"] == 8443
 
 
+class TestReachIndex:
+    """Tests for the address / port range engine."""
+
+    def _sg(self, *permissions):
+        return {"GroupId": "sg-1", "IpPermissions": list(permissions), "IpPermissionsEgress": []}
+
+    def _perm(self, cidrs, protocol="tcp", from_port=22, to_port=22):
+        return {
+            "IpProtocol": protocol,
+            "FromPort": from_port,
+            "ToPort": to_port,
+            "IpRanges": [{"CidrIp": c} for c in cidrs if ":" not in c],
+            "Ipv6Ranges": [{"CidrIpv6": c} for c in cidrs if ":" in c],
+        }
+
+    def test_split_ranges_cover_the_internet(self):
+        index = cnc._sg_reach_index([self._sg(self._perm(["0.0.0.0/1", "128.0.0.0/1"]))])
+
+        assert cnc._reach_internet_exposure(index) == (["tcp:22"], [])
+
+    def test_half_of_the_internet_is_partial(self):
+        index = cnc._sg_reach_index([self._sg(self._perm(["0.0.0.0/1"]))])
+
+        assert cnc._reach_internet_exposure(index) == ([], ["tcp:22"])
+
+    def test_private_sources_are_not_exposure(self):
+        index = cnc._sg_reach_index([self._sg(self._perm(["10.0.0.0/8", "192.168.0.0/16"]))])
+
+        assert cnc._reach_internet_exposure(index) == ([], [])
+
+    def test_all_traffic_and_ipv6(self):
+        index = cnc._sg_reach_index([self._sg(
+            self._perm(["::/0"], protocol="-1", from_port=None, to_port=None),
+            self._perm(["0.0.0.0/0"], protocol="icmp", from_port=-1, to_port=-1),
+            self._perm(["0.0.0.0/0"], from_port=8000, to_port=8100),
+            self._perm(["0.0.0.0/0"], from_port=8101, to_port=8200),
+        )])
+
+        assert cnc._reach_internet_exposure(index) == (["all", "icmp", "tcp:8000-8200"], [])
+
+    def test_partial_reported_only_where_not_open(self):
+        index = cnc._sg_reach_index([self._sg(
+            self._perm(["0.0.0.0/0"], from_port=443, to_port=443),
+            self._perm(["0.0.0.0/1"], from_port=400, to_port=500),
+        )])
+
+        assert cnc._reach_internet_exposure(index) == (["tcp:443"], ["tcp:400-442,444-500"])
+
+    def test_source_port_lookups(self):
+        index = cnc._sg_reach_index([self._sg(
+            self._perm(["0.0.0.0/0"], from_port=80, to_port=90),
+            self._perm(["10.0.0.0/8"], from_port=85, to_port=100),
+            self._perm(["172.16.0.0/12"], protocol="-1", from_port=None, to_port=None),
+        )])
+
+        assert cnc._reach_allows(index, "8.8.8.8", "tcp", 85)
+        assert not cnc._reach_allows(index, "8.8.8.8", "tcp", 95)
+        assert cnc._reach_allows(index, "10.1.2.3", "tcp", 95)
+        assert cnc._reach_allows(index, "10.0.0.0/8", "6", 100)
+        assert not cnc._reach_allows(index, "10.0.0.0/7", "tcp", 100)
+        assert cnc._reach_allows(index, "172.16.5.5", "udp", 53)
+        assert not cnc._reach_allows(index, "8.8.8.8", "udp", 85)
+
+    def test_thousands_of_rules(self):
+        permissions = [self._perm([f"10.{i // 256}.{i % 256}.0/24"], from_port=i, to_port=i) for i in range(1, 5001)]
+        permissions.append(self._perm(["0.0.0.0/0"], from_port=443, to_port=443))
+        index = cnc._sg_reach_index([self._sg(*permissions)])
+
+        assert cnc._reach_allows(index, "10.19.136.7", "tcp", 5000)
+        assert not cnc._reach_allows(index, "10.19.136.7", "tcp", 4999)
+        assert cnc._reach_allows(index, "203.0.113.9", "tcp", 443)
+        assert cnc._reach_internet_exposure(index) == (["tcp:443"], [])
+
+    def test_split_default_route_counts_as_public(self):
+        client = MagicMock()
+        client.describe_route_tables.return_value = {"RouteTables": [{"Routes": [
+            {"GatewayId": "igw-1", "DestinationCidrBlock": "0.0.0.0/1"},
+            {"GatewayId": "igw-1", "DestinationCidrBlock": "128.0.0.0/1"},
+            {"GatewayId": "local", "DestinationCidrBlock": "10.0.0.0/16"},
+        ]}]}
+
+        assert cnc._is_public_subnet(client, "subnet-1") is True
+
+    def test_partial_igw_route_is_not_public(self):
+        client = MagicMock()
+        client.describe_route_tables.return_value = {"RouteTables": [{"Routes": [
+            {"GatewayId": "igw-1", "DestinationCidrBlock": "0.0.0.0/1"},
+            {"NatGatewayId": "nat-1", "DestinationIpv6CidrBlock": "::/0"},
+        ]}]}
+
+        assert cnc._is_public_subnet(client, "subnet-1") is False
+        assert cnc._has_nat_route(client, "subnet-1") is True
+
+
 class TestParseAzureResourceId:
     def test_full_id(self):
         rid = "/subscriptions/sub123/resourceGroups/rg1/providers/Microsoft.Compute/virtualMachines/myvm"
@@ -281,6 +378,7 @@ class TestAwsEc2:
         assert "instance_state=running" in result["reasons"]
         assert "public_subnet=true" in result["reasons"]
         assert "public_ip_assigned=true" in result["reasons"]
+        assert "sg_internet_ingress=tcp:443" in result["reasons"]
         assert result["observed"]["public_ip"] == "203.0.113.10"
         assert result["observed"]["private_ip"] == "10.0.1.10"
         assert result["observed"]["public_ip_assigned"] is True
@@ -327,6 +425,8 @@ class TestAwsEc2:
         assert ingress_reason is not None
         assert "10.0.0.0/8" in ingress_reason
         assert "192.168.0.0/16" in ingress_reason
+        assert "sg_internet_ingress=none" in result["reasons"]
+        assert result["observed"]["sg_partial_internet_ingress"] == []
 
     @patch("check_network_connectivity._get_boto3_client")
     def test_not_found_raises(self, mock_client):
@@ -433,6 +533,53 @@ class TestAwsEc2:
         assert "lb_internet_facing=false" in result["reasons"]
         assert result["observed"]["load_balancers"] == []
 
+    @patch("check_network_connectivity._get_boto3_client")
+    def test_route_lookup_failure_is_unknown_not_private(self, mock_client):
+        from botocore.exceptions import ClientError
+
+        client = self._mock_ec2_client(_make_ec2_instance(), _make_sg())
+        client.describe_route_tables.side_effect = ClientError(
+            {"Error": {"Code": "RequestLimitExceeded", "Message": "Request limit exceeded."}}, "DescribeRouteTables"
+        )
+        mock_client.return_value = client
+
+        result = cnc.check_aws_ec2("i-throttled")
+
+        assert result["internet_reachability"] == cnc.UNKNOWN
+        assert result["observed"]["public_subnet"] is None
+        assert "public_subnet=unknown" in result["reasons"]
+        assert "nat_route=unknown" in result["reasons"]
+        assert "throttled:ec2.DescribeRouteTables" in result["reasons"]
+        assert client.describe_route_tables.call_count == 1  # one lookup shared by both route checks
+
+    @patch("check_network_connectivity._get_boto3_client")
+    def test_route_lookup_failure_without_public_ip_is_not_reachable(self, mock_client):
+        client = self._mock_ec2_client(_make_ec2_instance(public_ip=""), _make_sg())
+        client.describe_route_tables.side_effect = RuntimeError("connection reset")
+        mock_client.return_value = client
+
+        result = cnc.check_aws_ec2("i-private")
+
+        assert result["internet_reachability"] == cnc.NOT_REACHABLE
+        assert "api_error:ec2.DescribeRouteTables" in result["reasons"]
+
+    @patch("check_network_connectivity._get_boto3_client")
+    def test_load_balancer_lookup_failure_is_unknown(self, mock_client):
+        from botocore.exceptions import ClientError
+
+        client = self._mock_ec2_client(_make_ec2_instance(public_ip=""), _make_sg(), public_subnet=False)
+        client.describe_target_groups.side_effect = ClientError(
+            {"Error": {"Code": "AccessDenied", "Message": "denied"}}, "DescribeTargetGroups"
+        )
+        mock_client.return_value = client
+
+        result = cnc.check_aws_ec2("i-behind-lb")
+
+        assert result["internet_reachability"] == cnc.UNKNOWN
+        assert result["observed"]["load_balancers"] is None
+        assert "lb_internet_facing=unknown" in result["reasons"]
+        assert "permission_denied:elbv2.DescribeTargetGroups" in result["reasons"]
+
 
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # AWS RDS tests
@@ -563,6 +710,94 @@ class TestAwsRds:
         assert observed_sg["ingress_rules"][0]["to_port"] == 443
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# AWS request scheduler tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestAwsScheduler:
+    """Tests for the token buckets and adaptive concurrency of AWS requests."""
+
+    @pytest.fixture(autouse=True)
+    def _fresh_schedulers(self, monkeypatch):
+        monkeypatch.setattr(cnc, "_AWS_SCHEDULERS", {})
+
+    def test_token_bucket_paces_requests(self, monkeypatch):
+        import time
+
+        monkeypatch.setitem(cnc.AWS_API_RATES, "ec2.DescribeSubnets", (50.0, 2))
+        state = cnc._aws_scheduler(("p", "us-east-1", "ec2"))
+        started = time.monotonic()
+        for _ in range(6):
+            cnc._aws_acquire(state, "ec2", "DescribeSubnets")
+            cnc._aws_release(state, "ec2", "DescribeSubnets", throttled=False)
+        # a burst of 2, then 4 tokens refilled at 50/s
+        assert time.monotonic() - started >= 0.07
+
+    def test_buckets_are_per_api(self):
+        state = cnc._aws_scheduler(("p", "us-east-1", "ec2"))
+        cnc._aws_acquire(state, "ec2", "DescribeInstances")
+        cnc._aws_acquire(state, "ec2", "DescribeSubnets")
+        assert set(state["buckets"]) == {"DescribeInstances", "DescribeSubnets"}
+        assert state["buckets"]["DescribeSubnets"]["tokens"] == cnc.AWS_API_RATES["ec2"][1] - 1
+
+    def test_throttling_halves_limits_and_success_recovers(self):
+        state = cnc._aws_scheduler(("p", "us-east-1", "ec2"))
+        cnc._aws_acquire(state, "ec2", "DescribeRouteTables")
+        cnc._aws_release(state, "ec2", "DescribeRouteTables", throttled=True)
+        bucket = state["buckets"]["DescribeRouteTables"]
+        assert state["limit"] == cnc.AWS_MAX_CONCURRENCY / 2
+        assert bucket["rate"] == bucket["max_rate"] / 2
+        assert state["throttled"] == 1
+
+        for _ in range(40):
+            cnc._aws_acquire(state, "ec2", "DescribeRouteTables")
+            cnc._aws_release(state, "ec2", "DescribeRouteTables", throttled=False)
+        assert cnc.AWS_MAX_CONCURRENCY / 2 < state["limit"] <= cnc.AWS_MAX_CONCURRENCY
+        assert bucket["rate"] == bucket["max_rate"]
+        assert state["in_flight"] == 0
+
+    def test_concurrency_limit_blocks_until_release(self):
+        state = cnc._aws_scheduler(("p", "us-east-1", "rds"))
+        state["limit"] = 1.0
+        cnc._aws_acquire(state, "rds", "DescribeDBInstances")
+        acquired = threading.Event()
+        worker = threading.Thread(target=lambda: (cnc._aws_acquire(state, "rds", "DescribeDBInstances"), acquired.set()))
+        worker.start()
+        assert not acquired.wait(0.1)
+        cnc._aws_release(state, "rds", "DescribeDBInstances", throttled=False)
+        assert acquired.wait(1)
+        worker.join()
+
+    def test_boto3_client_retries_throttled_attempt_through_scheduler(self, monkeypatch):
+        from botocore.awsrequest import AWSResponse
+
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        bodies = [
+            (503, b"<Response><Errors><Error><Code>RequestLimitExceeded</Code><Message>slow down</Message>"
+                  b"</Error></Errors><RequestID>1</RequestID></Response>"),
+            (200, b"<DescribeInstancesResponse><reservationSet/></DescribeInstancesResponse>"),
+        ]
+
+        def send(request, **kwargs):
+            status, body = bodies.pop(0)
+            response = AWSResponse(request.url, status, {}, None)
+            response._content = body
+            return response
+
+        ec2 = cnc._get_boto3_client("ec2", "us-east-1")
+        ec2.meta.events.register("before-send", send)
+        with patch("time.sleep"):
+            assert ec2.describe_instances()["Reservations"] == []
+
+        state = next(s for key, s in cnc._AWS_SCHEDULERS.items() if key[-1] == "ec2")
+        assert bodies == []
+        assert state["throttled"] == 1
+        assert state["in_flight"] == 0
+        assert state["limit"] < cnc.AWS_MAX_CONCURRENCY
+        assert ec2.meta.config.retries["mode"] == "standard"
+
+
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # Azure VM tests
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
@@ -749,6 +984,259 @@ class TestAzureVm:
             cnc.check_azure_vm("just-a-vm-name")
 
 
+class TestAzureInventory:
+    """Tests for check_azure_vm / check_azure_vms with the subscription inventory."""
+
+    SUB = "/subscriptions/sub-123"
+    NET = SUB + "/resourceGroups/net-rg/providers/Microsoft.Network"
+    VM = SUB + "/resourceGroups/rg{0}/providers/Microsoft.Compute/virtualMachines/vm{0}"
+
+    def _ns(self, **kwargs):
+        from types import SimpleNamespace
+
+        return SimpleNamespace(**kwargs)
+
+    def _fleet(self, count):
+        ns = self._ns
+        nsg = ns(
+            id=self.NET + "/networkSecurityGroups/web-nsg",
+            security_rules=[
+                ns(name="AllowHTTPS", access="Allow", direction="Inbound", priority=100, protocol="Tcp",
+                   source_address_prefix="*", destination_address_prefix="*", destination_port_range="443"),
+            ],
+        )
+        route_table = ns(
+            id=self.NET + "/routeTables/to-nva",
+            routes=[
+                ns(address_prefix="0.0.0.0/1", next_hop_type="VirtualAppliance"),
+                ns(address_prefix="128.0.0.0/1", next_hop_type="VirtualAppliance"),
+            ],
+        )
+        subnet = ns(
+            id=self.NET + "/virtualNetworks/vnet/subnets/web",
+            route_table=ns(id=route_table.id),
+            network_security_group=ns(id=nsg.id),
+        )
+        vnet = ns(id=self.NET + "/virtualNetworks/vnet", subnets=[subnet])
+        pool = ns(id=self.NET + "/loadBalancers/web-lb/backendAddressPools/web", name="web")
+        lb = ns(
+            id=self.NET + "/loadBalancers/web-lb", name="web-lb", sku=ns(name="Standard"),
+            backend_address_pools=[pool], frontend_ip_configurations=[ns(name="fe")],
+        )
+        vms, statuses, nics, pips = [], [], [], []
+        for i in range(count):
+            vm_id = self.VM.format(i)
+            nic_id = self.NET + f"/networkInterfaces/nic{i}"
+            pip_id = self.NET + f"/publicIPAddresses/pip{i}"
+            vms.append(ns(id=vm_id, instance_view=None,
+                          network_profile=ns(network_interfaces=[ns(id=nic_id)])))
+            statuses.append(ns(id=vm_id, instance_view=ns(statuses=[ns(code="PowerState/running")])))
+            nics.append(ns(
+                id=nic_id, network_security_group=None,
+                ip_configurations=[ns(
+                    private_ip_address=f"10.0.0.{i + 4}", public_ip_address=ns(id=pip_id),
+                    subnet=ns(id=subnet.id), load_balancer_backend_address_pools=[ns(id=pool.id)],
+                )],
+            ))
+            pips.append(ns(id=pip_id, ip_address=f"20.0.0.{i + 4}"))
+
+        compute = MagicMock()
+        compute.virtual_machines.list_all.side_effect = (
+            lambda status_only=None: iter(statuses if status_only == "true" else vms)
+        )
+        compute.virtual_machines.get.side_effect = lambda rg, name, expand=None: next(
+            self._ns(**{**vm.__dict__, "instance_view": st.instance_view})
+            for vm, st in zip(vms, statuses) if vm.id.endswith("/" + name)
+        )
+        network = MagicMock()
+        network.network_interfaces.list_all.side_effect = lambda: iter(nics)
+        network.public_ip_addresses.list_all.side_effect = lambda: iter(pips)
+        network.virtual_networks.list_all.side_effect = lambda: iter([vnet])
+        network.network_security_groups.list_all.side_effect = lambda: iter([nsg])
+        network.route_tables.list_all.side_effect = lambda: iter([route_table])
+        network.load_balancers.list_all.side_effect = lambda: iter([lb])
+        network.network_interfaces.get.side_effect = lambda rg, name: next(n for n in nics if n.id.endswith("/" + name))
+        network.public_ip_addresses.get.side_effect = lambda rg, name: next(p for p in pips if p.id.endswith("/" + name))
+        network.subnets.get.return_value = subnet
+        network.network_security_groups.get.return_value = nsg
+        network.route_tables.get.return_value = route_table
+        network.load_balancers.list.side_effect = lambda resource_group_name: iter([lb])
+        return compute, network
+
+    def _run(self, compute, network, func):
+        with patch.dict("sys.modules", {
+            "azure.identity": MagicMock(),
+            "azure.mgmt.compute": MagicMock(ComputeManagementClient=MagicMock(return_value=compute)),
+            "azure.mgmt.network": MagicMock(NetworkManagementClient=MagicMock(return_value=network)),
+        }):
+            return func()
+
+    def test_subscription_listed_once_for_many_vms(self):
+        compute, network = self._fleet(5)
+        results = self._run(compute, network, lambda: [
+            cnc.check(provider="azure", resource_type="vm", resource_id=self.VM.format(i), azure_inventory=True)
+            for i in range(5)
+        ])
+        assert [r["internet_reachability"] for r in results] == [cnc.REACHABLE] * 5
+        for lister in (
+            network.network_interfaces.list_all, network.public_ip_addresses.list_all,
+            network.virtual_networks.list_all, network.network_security_groups.list_all,
+            network.route_tables.list_all, network.load_balancers.list_all,
+        ):
+            assert lister.call_count == 1
+        assert compute.virtual_machines.list_all.call_count == 2  # models + status_only
+        compute.virtual_machines.get.assert_not_called()
+        network.network_interfaces.get.assert_not_called()
+        network.public_ip_addresses.get.assert_not_called()
+        network.subnets.get.assert_not_called()
+        network.network_security_groups.get.assert_not_called()
+        network.load_balancers.list.assert_not_called()
+
+    def test_inventory_matches_per_vm_path(self):
+        compute, network = self._fleet(2)
+        vm_id = self.VM.format(1)
+        per_vm = self._run(compute, network, lambda: cnc.check_azure_vm(vm_id))
+        cnc.reset_run_state()
+        indexed = self._run(compute, network, lambda: cnc.check_azure_vm(vm_id.upper(), use_inventory=True))
+        assert indexed["observed"] == per_vm["observed"]
+        assert indexed["reasons"] == per_vm["reasons"]
+        assert "udr_default_next_hop=VirtualAppliance" in per_vm["reasons"]
+        assert per_vm["observed"]["azure_lb_backend_pools"][0]["lb_name"] == "web-lb"
+
+    def test_failed_listing_falls_back_to_get(self):
+        compute, network = self._fleet(1)
+        network.public_ip_addresses.list_all.side_effect = RuntimeError("AuthorizationFailed")
+        result = self._run(compute, network, lambda: cnc.check_azure_vm(self.VM.format(0), use_inventory=True))
+        assert result["observed"]["public_ips"] == ["20.0.0.4"]
+        assert network.public_ip_addresses.get.call_count == 1
+        assert "api_error:public_ip_addresses.list_all" in result["reasons"]
+
+    def test_default_route_next_hop_reports_wire_value(self):
+        from azure.mgmt.network.models import RouteTable
+
+        route_table = RouteTable({"id": "/rt", "properties": {"routes": [
+            {"properties": {"addressPrefix": "0.0.0.0/0", "nextHopType": "VirtualAppliance"}},
+        ]}})
+        assert cnc._azure_default_route_next_hop(route_table) == "VirtualAppliance"
+
+    def test_subscription_resource_id_checks_every_vm(self):
+        compute, network = self._fleet(3)
+        results = self._run(compute, network, lambda: cnc.check(
+            provider="azure", resource_type="vm", resource_id=self.SUB, azure_inventory=True,
+        ))
+        assert [r["resource_id"] for r in results] == [self.VM.format(i) for i in range(3)]
+        assert [r["observed"]["private_ips"] for r in results] == [["10.0.0.4"], ["10.0.0.5"], ["10.0.0.6"]]
+
+
+class TestAzureResourceGraph:
+    """Tests for the Resource Graph inventory backend, replayed from recorded query responses."""
+
+    SUB = "/subscriptions/sub-123"
+    RECORDING = os.path.join(os.path.dirname(__file__), "data", "azure_resource_graph_sub-123.json")
+
+    def _recording(self):
+        with open(self.RECORDING, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _graph_client(self):
+        """Fake ResourceGraphClient answering each projection query with its recorded pages."""
+        from types import SimpleNamespace
+
+        recording = self._recording()
+        kind_by_query = {query: kind for kind, query in cnc._AZURE_GRAPH_QUERIES.items()}
+        client = MagicMock()
+        # queries run on concurrent threads, where MagicMock call counts can miss calls
+        client.queries = []
+
+        def resources(request):
+            client.queries.append(request.query)
+            assert request.subscriptions == ["sub-123"]
+            assert request.options.top == cnc.AZURE_GRAPH_PAGE_SIZE
+            pages = recording[kind_by_query[request.query]]
+            index = 0
+            if request.options.skip_token:
+                index = 1 + next(i for i, page in enumerate(pages) if page.get("$skipToken") == request.options.skip_token)
+            return SimpleNamespace(data=pages[index]["data"], skip_token=pages[index].get("$skipToken"))
+
+        client.resources.side_effect = resources
+        return client
+
+    def _arm_clients(self):
+        """ARM clients listing the same recorded resources, as SDK models."""
+        from azure.mgmt.compute import models as compute_models
+        from azure.mgmt.network import models as network_models
+
+        rows = {kind: [row for page in pages for row in page["data"]] for kind, pages in self._recording().items()}
+        compute = MagicMock()
+        vms = [compute_models.VirtualMachine(row) for row in rows["virtual_machines"]]
+        compute.virtual_machines.list_all.side_effect = lambda status_only=None: iter(vms)
+        network = MagicMock()
+        for kind, model in (
+            ("network_interfaces", network_models.NetworkInterface),
+            ("public_ip_addresses", network_models.PublicIPAddress),
+            ("virtual_networks", network_models.VirtualNetwork),
+            ("network_security_groups", network_models.NetworkSecurityGroup),
+            ("route_tables", network_models.RouteTable),
+            ("load_balancers", network_models.LoadBalancer),
+        ):
+            items = [model(row) for row in rows[kind]]
+            getattr(network, kind).list_all.side_effect = lambda items=items: iter(items)
+        return compute, network
+
+    def _run(self, func, compute=None, network=None, graph=None):
+        clients = (compute or MagicMock(), network or MagicMock())
+        with patch.object(cnc, "_get_azure_clients", return_value=clients), \
+                patch.object(cnc, "_get_azure_graph_client", return_value=graph or self._graph_client()):
+            return func()
+
+    def test_fleet_evaluated_from_a_handful_of_queries(self):
+        graph = self._graph_client()
+        network = MagicMock()
+        results = self._run(lambda: cnc.check(
+            provider="azure", resource_type="vm", resource_id=self.SUB, azure_backend="graph",
+        ), network=network, graph=graph)
+        # one query per resource type, plus the second pages of VMs and NICs
+        assert len(graph.queries) == len(cnc._AZURE_GRAPH_QUERIES) + 2
+        assert [r["observed"]["power_state"] for r in results] == ["running", "running", "deallocated"]
+        assert [r["internet_reachability"] for r in results] == [cnc.REACHABLE, cnc.NOT_REACHABLE, cnc.NOT_REACHABLE]
+        assert results[0]["observed"]["public_ips"] == ["20.10.0.4"]
+        assert results[0]["observed"]["azure_lb_backend_pools"][0]["lb_name"] == "web-lb"
+        assert "udr_default_next_hop=VirtualAppliance" in results[0]["reasons"]
+        network.network_interfaces.get.assert_not_called()
+        network.network_security_groups.get.assert_not_called()
+
+    def test_graph_backend_matches_arm_inventory(self):
+        compute, network = self._arm_clients()
+        graph_results = self._run(lambda: cnc.check_azure_vms("sub-123", backend="graph"))
+        cnc.reset_run_state()
+        arm_results = self._run(lambda: cnc.check_azure_vms("sub-123"), compute=compute, network=network)
+        assert [r["observed"] for r in graph_results] == [r["observed"] for r in arm_results]
+        assert [r["reasons"] for r in graph_results] == [r["reasons"] for r in arm_results]
+
+    def test_failed_query_falls_back_to_get(self):
+        graph = self._graph_client()
+        resources = graph.resources.side_effect
+
+        def fail_public_ips(request):
+            if request.query == cnc._AZURE_GRAPH_QUERIES["public_ip_addresses"]:
+                raise RuntimeError("throttled")
+            return resources(request)
+
+        graph.resources.side_effect = fail_public_ips
+        network = MagicMock()
+        network.public_ip_addresses.get.return_value = MagicMock(ip_address="20.10.0.4")
+        rid = self.SUB + "/resourceGroups/app-rg/providers/Microsoft.Compute/virtualMachines/vm0"
+        result = self._run(lambda: cnc.check_azure_vm(rid, backend="graph"), network=network, graph=graph)
+        assert result["observed"]["public_ips"] == ["20.10.0.4"]
+        assert "api_error:resourcegraph.public_ip_addresses" in result["reasons"]
+        network.public_ip_addresses.get.assert_called_once_with("net-rg", "vm0-pip")
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError, match="Unsupported Azure backend"):
+            self._run(lambda: cnc.check_azure_vm(self.SUB + "/resourceGroups/rg/providers/"
+                                                 "Microsoft.Compute/virtualMachines/vm", backend="rest"))
+
+
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # GCP Compute Engine tests
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
@@ -872,6 +1360,300 @@ class TestGcpCompute:
         assert "external_ip_assigned=false" in result["reasons"]
 
 
+class TestGcpFirewallIndex:
+    """Tests for the per-project firewall index and ingress evaluation."""
+
+    RESOURCE_ID = "projects/my-proj/zones/us-central1-a/instances/my-vm"
+    NETWORK = "https://www.googleapis.com/compute/v1/projects/my-proj/global/networks/default"
+
+    def _make_instance(self, tags=None):
+        return {
+            "status": "RUNNING",
+            "tags": {"items": tags or []},
+            "networkInterfaces": [{
+                "networkIP": "10.128.0.2",
+                "network": self.NETWORK,
+                "accessConfigs": [{"natIP": "34.0.0.1"}],
+            }],
+            "serviceAccounts": [{"email": "sa@my-proj.iam.gserviceaccount.com"}],
+        }
+
+    def _rule(self, name, priority=1000, allowed=None, denied=None, source_ranges=None, **extra):
+        rule = {
+            "name": name,
+            "direction": "INGRESS",
+            "network": self.NETWORK,
+            "priority": priority,
+            "sourceRanges": source_ranges or ["0.0.0.0/0"],
+        }
+        if denied is not None:
+            rule["denied"] = denied
+        else:
+            rule["allowed"] = allowed or [{"IPProtocol": "tcp", "ports": ["443"]}]
+        rule.update(extra)
+        return rule
+
+    def _make_service(self, pages, policies=None, policy_error=None):
+        service = MagicMock()
+        service.instances.return_value.get.return_value.execute.return_value = self._make_instance(tags=["web"])
+        requests = []
+        for page in pages:
+            request = MagicMock()
+            request.execute.return_value = page
+            requests.append(request)
+        service.firewalls.return_value.list.side_effect = requests
+        effective = service.networks.return_value.getEffectiveFirewalls.return_value.execute
+        if policy_error is not None:
+            effective.side_effect = policy_error
+        else:
+            effective.return_value = {"firewallPolicys": policies or []}
+        return service
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_pagination_follows_next_page_token(self, mock_build):
+        service = self._make_service([
+            {"items": [self._rule("page1")], "nextPageToken": "tok"},
+            {"items": [self._rule("page2")]},
+        ])
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        names = [fw["name"] for fw in result["observed"]["firewall_rules"]]
+        assert names == ["page1", "page2"]
+        second_call = service.firewalls.return_value.list.call_args_list[1]
+        assert second_call.kwargs["pageToken"] == "tok"
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_index_reused_across_instances(self, mock_build):
+        service = self._make_service([{"items": [self._rule("allow-https")]}])
+        mock_build.return_value = service
+
+        cnc.check_gcp_compute(self.RESOURCE_ID)
+        cnc.check_gcp_compute("projects/my-proj/zones/us-central1-b/instances/other-vm")
+
+        assert service.firewalls.return_value.list.call_count == 1
+        assert service.networks.return_value.getEffectiveFirewalls.call_count == 1
+
+    def test_index_keys_by_tag_and_service_account(self):
+        rules = [
+            self._rule("all"),
+            self._rule("tagged", targetTags=["web"]),
+            self._rule("by-sa", targetServiceAccounts=["sa@x"]),
+            self._rule("other-net", network="projects/my-proj/global/networks/other"),
+            self._rule("egress", direction="EGRESS"),
+            self._rule("disabled", disabled=True),
+        ]
+        index = cnc._gcp_build_firewall_index(rules)
+
+        assert set(index) == {"default", "other"}
+        assert [r["name"] for r in index["default"]["untargeted"]] == ["all"]
+        assert [r["name"] for r in index["default"]["by_tag"]["web"]] == ["tagged"]
+        assert [r["name"] for r in index["default"]["by_service_account"]["sa@x"]] == ["by-sa"]
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_higher_priority_deny_shadows_allow(self, mock_build):
+        service = self._make_service([{"items": [
+            self._rule("allow-https", priority=1000),
+            self._rule("allow-ssh", priority=1000, allowed=[{"IPProtocol": "tcp", "ports": ["22"]}]),
+            self._rule("deny-https", priority=100, denied=[{"IPProtocol": "tcp", "ports": ["400-500"]}]),
+        ]}])
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert [fw["name"] for fw in result["observed"]["firewall_rules"]][0] == "deny-https"
+        assert result["observed"]["effective_internet_ingress"] == ["tcp:22"]
+        assert "fw_internet_ingress=tcp:22" in result["reasons"]
+        assert result["observed"]["firewall_rules"][0]["action"] == "deny"
+
+    def test_deny_wins_on_equal_priority(self):
+        rules = [
+            self._rule("allow", priority=500),
+            self._rule("deny", priority=500, denied=[{"IPProtocol": "all"}]),
+        ]
+        index = {"networks": cnc._gcp_build_firewall_index(rules), "policies": {}}
+        ordered = cnc._gcp_get_firewall_rules_for_instance(index, "default", [], None)
+
+        assert [r["name"] for r in ordered] == ["deny", "allow"]
+        normalized = [cnc._gcp_normalize_vpc_rule(r) for r in ordered]
+        assert cnc._gcp_effective_ingress(normalized) == []
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_hierarchical_policy_deny_evaluated_first(self, mock_build):
+        policies = [{
+            "name": "123456",
+            "shortName": "org-policy",
+            "type": "HIERARCHY",
+            "rules": [
+                {
+                    "priority": 10,
+                    "direction": "INGRESS",
+                    "action": "deny",
+                    "match": {"srcIpRanges": ["0.0.0.0/0"], "layer4Configs": [{"ipProtocol": "all"}]},
+                },
+                {
+                    "priority": 5,
+                    "direction": "INGRESS",
+                    "action": "goto_next",
+                    "match": {"srcIpRanges": ["10.0.0.0/8"], "layer4Configs": [{"ipProtocol": "all"}]},
+                },
+            ],
+        }]
+        service = self._make_service([{"items": [self._rule("allow-https")]}], policies=policies)
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        policy_rules = result["observed"]["firewall_policy_rules"]
+        assert [r["priority"] for r in policy_rules] == [5, 10]
+        assert policy_rules[1]["policy"] == "org-policy"
+        assert result["observed"]["effective_internet_ingress"] == []
+        assert "fw_internet_ingress=none" in result["reasons"]
+        assert "fw_ingress_allows=0.0.0.0/0" in result["reasons"]
+        assert result["internet_reachability"] == cnc.NOT_REACHABLE
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_policy_lookup_permission_error_is_reported(self, mock_build):
+        service = self._make_service(
+            [{"items": [self._rule("allow-https")]}],
+            policy_error=Exception("403 Forbidden"),
+        )
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert result["observed"]["firewall_lookup_errors"] == ["permission_denied:networks.getEffectiveFirewalls"]
+        assert "permission_denied:networks.getEffectiveFirewalls" in result["reasons"]
+        assert result["observed"]["effective_internet_ingress"] == ["tcp:443"]
+        assert result["internet_reachability"] == cnc.UNKNOWN
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_deny_rule_sources_not_reported_as_allows(self, mock_build):
+        service = self._make_service([{"items": [
+            self._rule("allow-internal", source_ranges=["10.0.0.0/8"]),
+            self._rule("deny-bad", priority=10, source_ranges=["198.51.100.0/24"], denied=[{"IPProtocol": "all"}]),
+        ]}])
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert "fw_ingress_allows=10.0.0.0/8" in result["reasons"]
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_index_fetched_once_per_check(self, mock_build):
+        service = self._make_service([{"items": [self._rule("allow-https")]}])
+        mock_build.return_value = service
+
+        with patch.object(cnc, "_gcp_get_firewall_index", wraps=cnc._gcp_get_firewall_index) as get_index:
+            cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert get_index.call_count == 1
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_shared_vpc_reads_host_project_firewalls(self, mock_build):
+        service = self._make_service([{"items": [self._rule("allow-https")]}])
+        instance = self._make_instance(tags=["web"])
+        instance["networkInterfaces"][0]["network"] = (
+            "https://www.googleapis.com/compute/v1/projects/host-proj/global/networks/default"
+        )
+        service.instances.return_value.get.return_value.execute.return_value = instance
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert result["observed"]["network_project"] == "host-proj"
+        assert service.firewalls.return_value.list.call_args.kwargs["project"] == "host-proj"
+        effective = service.networks.return_value.getEffectiveFirewalls
+        assert effective.call_args.kwargs == {"project": "host-proj", "network": "default"}
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_no_effective_ingress_is_not_reachable(self, mock_build):
+        service = self._make_service([{"items": [self._rule("allow-office", source_ranges=["203.0.113.0/24"])]}])
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert result["internet_reachability"] == cnc.NOT_REACHABLE
+        assert "fw_internet_ingress=none" in result["reasons"]
+
+    def test_split_deny_ranges_are_merged(self):
+        rules = [
+            {"action": "deny", "source_ranges": ["0.0.0.0/1"], "layer4_configs": [{"ipProtocol": "tcp"}]},
+            {"action": "deny", "source_ranges": ["128.0.0.0/1"], "layer4_configs": [{"ipProtocol": "tcp"}]},
+            {"action": "allow", "source_ranges": ["0.0.0.0/0"], "layer4_configs": [{"ipProtocol": "tcp", "ports": ["22"]}]},
+        ]
+
+        assert cnc._gcp_effective_ingress(rules) == []
+
+    def test_split_allow_ranges_in_one_rule_count(self):
+        rules = [{
+            "action": "allow",
+            "source_ranges": ["0.0.0.0/1", "128.0.0.0/1"],
+            "layer4_configs": [{"ipProtocol": "tcp", "ports": ["443"]}],
+        }]
+
+        assert cnc._gcp_effective_ingress(rules) == ["tcp:443"]
+
+    def test_protocol_numbers_are_normalized(self):
+        rules = [
+            self._rule("deny-ssh", priority=100, denied=[{"IPProtocol": "6", "ports": ["22"]}]),
+            self._rule("allow", allowed=[{"IPProtocol": "tcp", "ports": ["22", "443"]}, {"IPProtocol": "17"}]),
+        ]
+        normalized = [cnc._gcp_normalize_vpc_rule(r) for r in rules]
+
+        assert cnc._gcp_effective_ingress(normalized) == ["tcp:443", "udp"]
+
+    def test_all_allow_partly_denied_lists_remaining_protocols(self):
+        rules = [
+            self._rule("deny-tcp", priority=100, denied=[{"IPProtocol": "tcp", "ports": ["0-21", "23-65535"]}]),
+            self._rule("allow-all", allowed=[{"IPProtocol": "all"}]),
+        ]
+        normalized = [cnc._gcp_normalize_vpc_rule(r) for r in rules]
+
+        assert cnc._gcp_effective_ingress(normalized) == ["tcp:22", "udp", "icmp", "esp", "ah", "sctp", "ipip"]
+
+    def test_partial_source_deny_does_not_shadow(self):
+        rules = [
+            self._rule("deny-bad", priority=100, source_ranges=["198.51.100.0/24"], denied=[{"IPProtocol": "all"}]),
+            self._rule("allow-all", allowed=[{"IPProtocol": "all"}]),
+        ]
+        normalized = [cnc._gcp_normalize_vpc_rule(r) for r in rules]
+
+        assert cnc._gcp_effective_ingress(normalized) == ["all"]
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_secure_tag_rules_skipped_are_reported(self, mock_build):
+        policies = [{
+            "name": "net-policy",
+            "type": "NETWORK",
+            "rules": [{
+                "priority": 10,
+                "direction": "INGRESS",
+                "action": "deny",
+                "targetSecureTags": [{"name": "tagValues/123"}],
+                "match": {"srcIpRanges": ["0.0.0.0/0"], "layer4Configs": [{"ipProtocol": "all"}]},
+            }],
+        }]
+        service = self._make_service([{"items": [self._rule("allow-https")]}], policies=policies)
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_compute(self.RESOURCE_ID)
+
+        assert result["observed"]["firewall_policy_rules"] == []
+        assert "fw_secure_tag_rules_skipped=1" in result["reasons"]
+
+    def test_main_starts_with_fresh_run_state(self, capsys):
+        cnc._GCP_FIREWALL_INDEXES["stale-proj"] = {"networks": {}, "policies": {}}
+        argv = ["prog", "--provider", "gcp", "--resource-type", "compute", "--resource-id", self.RESOURCE_ID]
+
+        with patch.object(sys, "argv", argv), patch.object(cnc, "check", return_value={}) as check:
+            cnc.main()
+
+        check.assert_called_once()
+        assert "stale-proj" not in cnc._GCP_FIREWALL_INDEXES
+
+
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # GCP Cloud Run tests
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
@@ -1049,6 +1831,416 @@ class TestGcpCloudRun:
         assert sorted(result["observed"]["matched_lb_names"]) == ["fw-external", "fw-internal"]
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# GCP Compute aggregatedList tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _FakeRequest:
+    def __init__(self, calls, call, response=None, error=None):
+        self._response = response
+        self._error = error
+        calls.append(call)
+
+    def execute(self):
+        if self._error is not None:
+            raise self._error
+        return self._response
+
+
+class _FakeComputeCollection:
+    """Compute collection stand-in answering list / aggregatedList from canned data."""
+
+    def __init__(self, name, calls, scoped_items=None, aggregated=None, aggregated_error=None, pages=None):
+        self._name = name
+        self._calls = calls
+        self._scoped_items = scoped_items or {}
+        self._aggregated = aggregated
+        self._aggregated_error = aggregated_error
+        self._pages = list(pages or [])
+
+    def list(self, project, region=None, **kwargs):
+        items = self._scoped_items.get(f"regions/{region}" if region else "global", [])
+        return _FakeRequest(self._calls, (self._name, "list", region), {"items": items})
+
+    def list_next(self, request, response):
+        return None
+
+    def aggregatedList(self, project, **kwargs):
+        call = (self._name, "aggregatedList", kwargs.get("returnPartialSuccess"))
+        if self._pages:
+            return _FakeRequest(self._calls, call, self._pages.pop(0))
+        if self._aggregated_error is not None:
+            return _FakeRequest(self._calls, call, error=self._aggregated_error)
+        if self._aggregated is not None:
+            return _FakeRequest(self._calls, call, self._aggregated)
+        response = {"items": {scope: {self._name: items} for scope, items in self._scoped_items.items()}}
+        return _FakeRequest(self._calls, call, response)
+
+    def aggregatedList_next(self, request, response):
+        if self._pages:
+            return _FakeRequest(self._calls, (self._name, "aggregatedList", True), self._pages.pop(0))
+        return None
+
+
+class _FakeCompute:
+    """Compute service stand-in; every collection shares one call log."""
+
+    def __init__(self, **collections):
+        self.calls = []
+        self._collections = {
+            name: _FakeComputeCollection(name, self.calls, **spec) for name, spec in collections.items()
+        }
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._collections:
+            self._collections[name] = _FakeComputeCollection(name, self.calls)
+        return lambda: self._collections[name]
+
+
+class TestListComputeRegionalCollection:
+    """Tests for _list_compute_regional_collection / _list_compute_aggregated."""
+
+    def test_single_region_uses_regional_list(self):
+        compute = _FakeCompute(regionNetworkEndpointGroups={"scoped_items": {"regions/us-central1": [{"name": "neg"}]}})
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "regionNetworkEndpointGroups", "my-proj", {"us-central1"}
+        )
+
+        assert [i["name"] for i in items] == ["neg"]
+        assert errors == []
+        assert compute.calls == [("regionNetworkEndpointGroups", "list", "us-central1")]
+
+    def test_regions_and_global_share_one_aggregated_call(self):
+        compute = _FakeCompute(backendServices={"pages": [
+            {
+                "items": {
+                    "global": {"backendServices": [{"name": "be-global"}]},
+                    "regions/us-central1": {"backendServices": [{"name": "be-usc1"}]},
+                    "regions/europe-west1": {"backendServices": [{"name": "be-euw1"}]},
+                }
+            },
+            {"items": {"regions/us-central1": {"backendServices": [{"name": "be-usc1-page2"}]}}},
+        ]})
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "regionBackendServices", "my-proj", {"us-central1"}, include_global=True
+        )
+
+        assert sorted(i["name"] for i in items) == ["be-global", "be-usc1", "be-usc1-page2"]
+        assert errors == []
+        assert denied is False
+        assert compute.calls == [
+            ("backendServices", "aggregatedList", True),
+            ("backendServices", "aggregatedList", True),
+        ]
+
+    def test_multiple_regions_use_aggregated_list(self):
+        compute = _FakeCompute(forwardingRules={"scoped_items": {
+            "regions/us-central1": [{"name": "fr-usc1"}],
+            "regions/asia-east1": [{"name": "fr-ase1"}],
+            "regions/europe-west1": [{"name": "fr-euw1"}],
+        }})
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "forwardingRules", "my-proj", {"us-central1", "asia-east1"}
+        )
+
+        assert sorted(i["name"] for i in items) == ["fr-ase1", "fr-usc1"]
+        assert compute.calls == [("forwardingRules", "aggregatedList", True)]
+
+    def test_unreachable_scopes_are_retried_individually(self):
+        compute = _FakeCompute(
+            backendServices={"aggregated": {
+                "items": {
+                    "global": {"backendServices": [{"name": "be-global"}]},
+                    "regions/us-central1": {"warning": {"code": "UNREACHABLE"}},
+                },
+                "unreachables": ["regions/europe-west1"],
+            }},
+            regionBackendServices={"scoped_items": {
+                "regions/us-central1": [{"name": "be-usc1"}],
+                "regions/europe-west1": [{"name": "be-euw1"}],
+            }},
+        )
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "regionBackendServices", "my-proj", {"us-central1", "europe-west1"}, include_global=True
+        )
+
+        assert sorted(i["name"] for i in items) == ["be-euw1", "be-global", "be-usc1"]
+        assert errors == []
+        assert ("regionBackendServices", "list", "europe-west1") in compute.calls
+        assert ("regionBackendServices", "list", "us-central1") in compute.calls
+
+    def test_unreachable_scope_retry_failure_is_reported(self):
+        compute = _FakeCompute(forwardingRules={"aggregated": {"items": {}, "unreachables": ["regions/us-central1"]}})
+        failing = MagicMock()
+        failing.list.return_value.execute.side_effect = Exception("503 unavailable")
+        compute._collections["forwardingRules"].list = failing.list
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "forwardingRules", "my-proj", {"us-central1", "asia-east1"}
+        )
+
+        assert items == []
+        assert errors == ["api_error:forwardingRules"]
+
+    def test_falls_back_to_per_scope_list_on_permission_denied(self):
+        compute = _FakeCompute(
+            backendServices={
+                "aggregated_error": Exception("403 Forbidden: permission compute.backendServices.list"),
+                "scoped_items": {"global": [{"name": "be-global"}]},
+            },
+            regionBackendServices={"scoped_items": {"regions/us-central1": [{"name": "be-regional"}]}},
+        )
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "regionBackendServices", "my-proj", {"us-central1"}, include_global=True
+        )
+
+        assert sorted(i["name"] for i in items) == ["be-global", "be-regional"]
+        assert errors == []
+        assert denied is False
+        assert compute.calls[1:] == [
+            ("backendServices", "list", None),
+            ("regionBackendServices", "list", "us-central1"),
+        ]
+
+    def test_other_aggregated_errors_are_reported_without_fallback(self):
+        compute = _FakeCompute(backendServices={"aggregated_error": Exception("500 backend error")})
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "regionBackendServices", "my-proj", {"us-central1"}, include_global=True
+        )
+
+        assert items == []
+        assert errors == ["api_error:backendServices.aggregatedList"]
+        assert denied is False
+        assert len(compute.calls) == 1
+
+    def test_client_without_return_partial_success(self):
+        from googleapiclient import discovery
+        from googleapiclient.http import HttpMockSequence
+
+        response = {"items": {
+            "regions/us-central1": {"forwardingRules": [{"name": "fr-usc1"}]},
+            "regions/asia-east1": {"warning": {"code": "UNREACHABLE"}},
+        }}
+        http = HttpMockSequence([
+            ({"status": "200"}, json.dumps(response)),
+            ({"status": "200"}, json.dumps({"items": [{"name": "fr-ase1"}]})),
+        ])
+        compute = discovery.build("compute", "v1", http=http, static_discovery=True, cache_discovery=False)
+
+        items, errors, denied = cnc._list_compute_regional_collection(
+            compute, "forwardingRules", "my-proj", {"us-central1", "asia-east1"}
+        )
+
+        assert sorted(i["name"] for i in items) == ["fr-ase1", "fr-usc1"]
+        assert errors == []
+
+    def test_single_region_discovery_call_count(self):
+        neg_link = "https://www.googleapis.com/compute/v1/projects/my-proj/regions/us-central1/networkEndpointGroups/neg-my-svc"
+        be_link = "https://www.googleapis.com/compute/v1/projects/my-proj/global/backendServices/be-my-svc"
+        um_link = "https://www.googleapis.com/compute/v1/projects/my-proj/global/urlMaps/um-my-svc"
+        proxy_link = "https://www.googleapis.com/compute/v1/projects/my-proj/global/targetHttpsProxies/px-my-svc"
+        compute = _FakeCompute(
+            regionNetworkEndpointGroups={"scoped_items": {"regions/us-central1": [{
+                "name": "neg-my-svc", "selfLink": neg_link, "networkEndpointType": "SERVERLESS",
+                "cloudRun": {"service": "my-svc"},
+            }]}},
+            backendServices={"scoped_items": {"global": [
+                {"name": "be-my-svc", "selfLink": be_link, "backends": [{"group": neg_link}]},
+            ]}},
+            urlMaps={"scoped_items": {"global": [{"name": "um-my-svc", "selfLink": um_link, "defaultService": be_link}]}},
+            targetHttpsProxies={"scoped_items": {"global": [{"name": "px-my-svc", "selfLink": proxy_link, "urlMap": um_link}]}},
+            globalForwardingRules={"scoped_items": {"global": [
+                {"name": "fr-my-svc", "target": proxy_link, "loadBalancingScheme": "EXTERNAL_MANAGED"},
+            ]}},
+        )
+
+        result = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "us-central1", "my-svc")
+
+        assert result["errors"] == []
+        assert result["matched_neg_names"] == ["neg-my-svc"]
+        assert result["matched_backend_names"] == ["be-my-svc"]
+        assert result["matched_lb_details"] == [{"name": "fr-my-svc", "scheme": "EXTERNAL_MANAGED"}]
+        # Previously 11 list calls: NEG 1, backend services 2, URL maps 2, proxies 4, forwarding rules 2.
+        assert sorted(compute.calls) == sorted([
+            ("regionNetworkEndpointGroups", "list", "us-central1"),
+            ("backendServices", "aggregatedList", True),
+            ("urlMaps", "aggregatedList", True),
+            ("targetHttpProxies", "aggregatedList", True),
+            ("targetHttpsProxies", "aggregatedList", True),
+            ("globalForwardingRules", "list", None),
+            ("forwardingRules", "list", "us-central1"),
+        ])
+
+
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GCP Cloud Run load balancer graph tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestGcpCloudRunLbGraph:
+    """Tests for the project load balancer graph shared by Cloud Run checks and check_gcp_cloudruns."""
+
+    COMPUTE = "https://www.googleapis.com/compute/v1/projects/my-proj"
+    SIZES = {
+        "instances": 0, "subnets": 1, "sg_rules": 0, "target_groups": 0, "db_instances": 0,
+        "vms": 0, "nsg_rules": 0, "firewall_rules": 0, "cloudrun_services": 9, "backend_services": 12,
+        "path_rules": 3, "sql_instances": 0,
+    }
+
+    def _compute(self):
+        def neg(name, service, region):
+            return {
+                "name": name, "networkEndpointType": "SERVERLESS", "cloudRun": {"service": service},
+                "selfLink": f"{self.COMPUTE}/regions/{region}/networkEndpointGroups/{name}",
+            }
+
+        negs = {"scoped_items": {
+            "regions/us-central1": [neg("neg-svc-a", "svc-a", "us-central1"), neg("neg-svc-b", "svc-b", "us-central1")],
+            "regions/europe-west1": [neg("neg-svc-a-eu", "svc-a", "europe-west1")],
+        }}
+        return _FakeCompute(
+            regionNetworkEndpointGroups=negs,
+            networkEndpointGroups=negs,
+            backendServices={"scoped_items": {"global": [
+                {"name": f"be-{svc}", "selfLink": f"{self.COMPUTE}/global/backendServices/be-{svc}",
+                 "backends": [{"group": f"{self.COMPUTE}/regions/us-central1/networkEndpointGroups/neg-{svc}"}]}
+                for svc in ("svc-a", "svc-b")
+            ]}},
+        )
+
+    def test_services_of_a_project_share_one_discovery(self):
+        compute = self._compute()
+
+        first = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "us-central1", "svc-a")
+        calls_after_first = list(compute.calls)
+        second = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "us-central1", "svc-b")
+        missing = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "us-central1", "svc-c")
+
+        assert first["matched_backend_names"] == ["be-svc-a"]
+        assert second["matched_backend_names"] == ["be-svc-b"]
+        assert missing["matched_neg_names"] == []
+        assert compute.calls == calls_after_first
+        assert len(compute.calls) == 7
+
+    def test_graph_of_several_regions_answers_each_region(self):
+        compute = self._compute()
+        cnc._gcp_cloudrun_lb_graph("my-proj", {"us-central1", "europe-west1"})
+
+        central = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "us-central1", "svc-a")
+        europe = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "europe-west1", "svc-a")
+
+        # Both regions' NEGs are in the graph; each lookup keeps its own region's
+        assert central["matched_neg_names"] == ["neg-svc-a"]
+        assert central["matched_backend_names"] == ["be-svc-a"]
+        assert europe["matched_neg_names"] == ["neg-svc-a-eu"]
+        assert europe["matched_backend_names"] == []
+        assert ("networkEndpointGroups", "aggregatedList", True) in compute.calls
+        assert not any(call[1] == "list" and call[0] == "regionNetworkEndpointGroups" for call in compute.calls)
+
+    def test_url_map_backend_links_walk_every_route(self):
+        be = f"{self.COMPUTE}/global/backendServices"
+        url_map = {
+            "defaultService": f"{be}/default",
+            "hostRules": [{"hosts": ["a.example.com"], "pathMatcher": "pm"}],
+            "pathMatchers": [{
+                "name": "pm",
+                "defaultService": f"{be}/pm-default",
+                "pathRules": [{"paths": [f"/v{n}/*"], "service": f"{be}/rule-{n}"} for n in range(300)],
+                "routeRules": [{"priority": 1, "routeAction": {
+                    "weightedBackendServices": [{"backendService": f"{be}/weighted", "weight": 100}],
+                    "requestMirrorPolicy": {"backendService": "projects/my-proj/global/backendServices/mirror"},
+                }}],
+            }],
+        }
+
+        links = cnc._gcp_url_map_backend_links(url_map)
+
+        assert len(links) == 304
+        assert {
+            "projects/my-proj/global/backendServices/default",
+            "projects/my-proj/global/backendServices/rule-299",
+            "projects/my-proj/global/backendServices/weighted",
+            "projects/my-proj/global/backendServices/mirror",
+        } <= links
+
+    def test_backend_name_prefix_does_not_match_other_backends(self):
+        neg_link = f"{self.COMPUTE}/regions/us-central1/networkEndpointGroups/neg-svc"
+        be = "https://compute.googleapis.com/compute/v1/projects/my-proj/global/backendServices"
+
+        def url_map(name, service):
+            return {"name": name, "selfLink": f"{self.COMPUTE}/global/urlMaps/{name}", "defaultService": f"{be}/none",
+                    "pathMatchers": [{"name": "pm", "routeRules": [{"service": service}]}]}
+
+        compute = _FakeCompute(
+            regionNetworkEndpointGroups={"scoped_items": {"regions/us-central1": [{
+                "name": "neg-svc", "selfLink": neg_link, "networkEndpointType": "SERVERLESS",
+                "cloudRun": {"service": "svc"},
+            }]}},
+            backendServices={"scoped_items": {"global": [
+                {"name": "be-1", "selfLink": f"{be}/be-1", "backends": [{"group": neg_link}]},
+            ]}},
+            urlMaps={"scoped_items": {"global": [url_map("um-1", f"{be}/be-1"), url_map("um-10", f"{be}/be-10")]}},
+            targetHttpsProxies={"scoped_items": {"global": [
+                {"name": f"px-{um}", "selfLink": f"{self.COMPUTE}/global/targetHttpsProxies/px-{um}",
+                 "urlMap": f"{self.COMPUTE}/global/urlMaps/{um}"}
+                for um in ("um-1", "um-10")
+            ]}},
+            globalForwardingRules={"scoped_items": {"global": [
+                {"name": f"fr-{um}", "target": f"{self.COMPUTE}/global/targetHttpsProxies/px-{um}",
+                 "loadBalancingScheme": "EXTERNAL_MANAGED"}
+                for um in ("um-1", "um-10")
+            ]}},
+        )
+
+        result = cnc._discover_gcp_cloudrun_load_balancers(compute, "my-proj", "us-central1", "svc")
+
+        # be-10 contains "/backendServices/be-1"; only the URL map routing to be-1 leads to the service
+        assert result["matched_lb_names"] == ["fr-um-1"]
+
+    def test_project_resource_id_checks_every_service(self, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+        from collections import Counter
+
+        inventories = synthetic_inventories(self.SIZES, providers=("gcp",))
+        calls = Counter()
+        with bench.fake_clouds(inventories, calls):
+            results = cnc.check("gcp", "cloudrun", f"projects/{bench.GCP_PROJECT}")
+            project_calls = dict(calls)
+            cnc.reset_run_state()
+            single = [cnc.check("gcp", "cloudrun", r["resource_id"]) for r in results]
+
+        assert sorted(r["resource_id"] for r in results) == sorted(inventories["gcp"]["run_services"])
+        assert [r["private_reachability"] for r in results] == [r["private_reachability"] for r in single]
+        assert [r["observed"]["matched_lb_names"] for r in results] == [r["observed"]["matched_lb_names"] for r in single]
+        assert project_calls["run.services.list"] == 1
+        assert "run.services.get" not in project_calls
+        assert project_calls["run.services.getIamPolicy"] == 9
+        # One listing per Compute collection for the 9 services of both regions
+        compute_calls = {api: n for api, n in project_calls.items() if api.startswith("compute.")}
+        assert compute_calls and set(compute_calls.values()) == {1}
+
+    def test_batch_splits_project_request_per_service(self, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+        from collections import Counter
+
+        inventories = synthetic_inventories(self.SIZES, providers=("gcp",))
+        with bench.fake_clouds(inventories, Counter()):
+            requests = cnc._expand_request(
+                {"provider": "gcp", "resource_type": "cloudrun", "resource_id": f"projects/{bench.GCP_PROJECT}"}
+            )
+
+        assert sorted(r["resource_id"] for r in requests) == sorted(inventories["gcp"]["run_services"])
+
+
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # GCP Cloud SQL tests
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
@@ -1113,6 +2305,9 @@ class TestGcpCloudSql:
         )
         service = MagicMock()
         service.instances.return_value.get.return_value.execute.return_value = sql_data
+        service.networks.return_value.get.return_value.execute.return_value = {
+            "name": "default", "peerings": [{"name": "servicenetworking-googleapis-com", "state": "ACTIVE"}],
+        }
         mock_build.return_value = service
 
         result = cnc.check_gcp_cloudsql(self.RESOURCE_ID)
@@ -1120,21 +2315,72 @@ class TestGcpCloudSql:
         assert result["internet_reachability"] == cnc.NOT_REACHABLE
         assert result["private_reachability"] == cnc.REACHABLE
         assert "has_private_ip=true" in result["reasons"]
+        assert result["observed"]["private_service_access"] == "active"
+        service.networks.return_value.get.assert_called_once_with(project="my-proj", network="default")
 
     @patch("check_network_connectivity._build_gcp_service")
-    def test_stopped_db_not_reachable(self, mock_build):
-        sql_data = self._make_sql_instance(state="SUSPENDED", public_ip_enabled=True)
+    def test_private_ip_without_private_service_access(self, mock_build):
+        sql_data = self._make_sql_instance(
+            public_ip_enabled=False,
+            private_network="projects/my-proj/global/networks/default",
+        )
         service = MagicMock()
         service.instances.return_value.get.return_value.execute.return_value = sql_data
+        service.networks.return_value.get.return_value.execute.return_value = {"name": "default", "peerings": []}
         mock_build.return_value = service
 
         result = cnc.check_gcp_cloudsql(self.RESOURCE_ID)
 
-        assert result["internet_reachability"] == cnc.NOT_REACHABLE
         assert result["private_reachability"] == cnc.NOT_REACHABLE
+        assert "private_service_access_missing" in result["reasons"]
 
     @patch("check_network_connectivity._build_gcp_service")
-    def test_output_structure(self, mock_build):
+    def test_private_service_access_lookup_denied(self, mock_build):
+        sql_data = self._make_sql_instance(
+            public_ip_enabled=False,
+            private_network="projects/my-proj/global/networks/default",
+        )
+        service = MagicMock()
+        service.instances.return_value.get.return_value.execute.return_value = sql_data
+        service.networks.return_value.get.return_value.execute.side_effect = Exception("403 Forbidden")
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_cloudsql(self.RESOURCE_ID)
+
+        assert result["private_reachability"] == cnc.UNKNOWN
+        assert "permission_denied:compute.networks.get" in result["reasons"]
+        assert "permission_denied" in result["reasons"]
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_public_authorized_networks(self, mock_build):
+        sql_data = self._make_sql_instance(
+            public_ip_enabled=True,
+            authorized_networks=["10.0.0.0/8", "203.0.113.0/24"],
+        )
+        service = MagicMock()
+        service.instances.return_value.get.return_value.execute.return_value = sql_data
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_cloudsql(self.RESOURCE_ID)
+
+        assert result["observed"]["public_authorized_networks"] == ["203.0.113.0/24"]
+        assert "authorized_networks_public" in result["reasons"]
+        assert "authorized_networks_open_to_any" not in result["reasons"]
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_stopped_db_not_reachable(self, mock_build):
+        sql_data = self._make_sql_instance(state="SUSPENDED", public_ip_enabled=True)
+        service = MagicMock()
+        service.instances.return_value.get.return_value.execute.return_value = sql_data
+        mock_build.return_value = service
+
+        result = cnc.check_gcp_cloudsql(self.RESOURCE_ID)
+
+        assert result["internet_reachability"] == cnc.NOT_REACHABLE
+        assert result["private_reachability"] == cnc.NOT_REACHABLE
+
+    @patch("check_network_connectivity._build_gcp_service")
+    def test_output_structure(self, mock_build):
         sql_data = self._make_sql_instance(
             public_ip_enabled=True,
             private_network="projects/my-proj/global/networks/default",
@@ -1156,6 +2402,57 @@ class TestGcpCloudSql:
         assert "authorized_networks" in result["observed"]
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# GCP Cloud SQL fleet tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestGcpCloudSqlFleet:
+    """Tests for check_gcp_cloudsqls and project-wide Cloud SQL batch runs."""
+
+    SIZES = {
+        "instances": 0, "subnets": 1, "sg_rules": 0, "target_groups": 0, "db_instances": 0,
+        "vms": 0, "nsg_rules": 0, "firewall_rules": 0, "cloudrun_services": 0, "backend_services": 0,
+        "path_rules": 0, "sql_instances": 7,
+    }
+
+    def test_project_resource_id_lists_instances_once(self, monkeypatch, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+        from collections import Counter
+
+        monkeypatch.setattr(bench, "GCP_PAGE_SIZE", 3)
+        inventories = synthetic_inventories(self.SIZES, providers=("gcp",))
+        calls = Counter()
+        with bench.fake_clouds(inventories, calls):
+            results = cnc.check("gcp", "cloudsql", f"projects/{bench.GCP_PROJECT}")
+
+        assert [r["resource_id"] for r in results] == [
+            f"projects/{bench.GCP_PROJECT}/instances/sql-{i}" for i in range(7)
+        ]
+        assert {r["private_reachability"] for r in results} == {cnc.REACHABLE}
+        assert [r["internet_reachability"] for r in results] == [
+            cnc.REACHABLE if i % 2 == 0 else cnc.NOT_REACHABLE for i in range(7)
+        ]
+        # 7 instances in pages of 3; one VPC shared by all of them
+        assert dict(calls) == {"sqladmin.instances.list": 3, "compute.networks.get": 1}
+
+    def test_ndjson_batch_reuses_the_listing(self, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+        from collections import Counter
+
+        inventories = synthetic_inventories(self.SIZES, providers=("gcp",))
+        calls = Counter()
+        request = {"provider": "gcp", "resource_type": "cloudsql", "resource_id": f"projects/{bench.GCP_PROJECT}"}
+        with bench.fake_clouds(inventories, calls):
+            records = list(cnc.iter_checks([request], workers=4))
+
+        assert sorted(r["resource_id"] for r in records) == sorted(
+            f"projects/{bench.GCP_PROJECT}/instances/sql-{i}" for i in range(7)
+        )
+        assert "sqladmin.instances.get" not in calls
+        assert calls["sqladmin.instances.list"] == 1
+        assert calls["compute.networks.get"] == 1
+
+
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
 # JSON serialisability tests
 # 笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏笏
@@ -1289,3 +2586,1448 @@ class TestAwsProfile:
             mock_fn.assert_called_once_with("mydb", region="us-east-1", profile="my-profile")
 
 
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Client registry tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestClientRegistry:
+    """Verify SDK clients, sessions and credentials are reused within a run."""
+
+    def test_boto3_client_reused_for_same_key(self):
+        with patch("boto3.client") as mock_direct_client:
+            mock_direct_client.side_effect = lambda *a, **k: MagicMock()
+
+            first = cnc._get_boto3_client("ec2", "ap-northeast-1")
+            second = cnc._get_boto3_client("ec2", "ap-northeast-1")
+            other_region = cnc._get_boto3_client("ec2", "us-east-1")
+
+        assert first is second
+        assert other_region is not first
+        assert mock_direct_client.call_count == 2
+        config = mock_direct_client.call_args.kwargs["config"]
+        assert config.max_pool_connections == cnc.CLIENT_POOL_SIZE
+
+    def test_profile_session_built_once(self):
+        with patch("boto3.Session") as mock_session_cls:
+            mock_session_cls.return_value.client.side_effect = lambda *a, **k: MagicMock()
+
+            ec2 = cnc._get_boto3_client("ec2", "ap-northeast-1", "my-profile")
+            rds = cnc._get_boto3_client("rds", "ap-northeast-1", "my-profile")
+            assert cnc._get_boto3_client("ec2", "ap-northeast-1", "my-profile") is ec2
+
+        mock_session_cls.assert_called_once_with(profile_name="my-profile")
+        assert mock_session_cls.return_value.client.call_count == 2
+        assert ec2 is not rds
+
+    def test_reset_run_state_drops_clients(self):
+        with patch("boto3.client") as mock_direct_client:
+            mock_direct_client.side_effect = lambda *a, **k: MagicMock()
+            first = cnc._get_boto3_client("ec2")
+            cnc.reset_run_state()
+            assert cnc._get_boto3_client("ec2") is not first
+
+    def test_azure_credential_transport_and_clients_shared(self):
+        mock_cred = MagicMock()
+        mock_compute_cls = MagicMock()
+        mock_network_cls = MagicMock()
+        vm = MagicMock()
+        vm.instance_view.statuses = []
+        vm.network_profile.network_interfaces = []
+        mock_compute_cls.return_value.virtual_machines.get.return_value = vm
+        rid = "/subscriptions/sub-123/resourceGroups/rg1/providers/Microsoft.Compute/virtualMachines/vm{}"
+
+        with patch.dict("sys.modules", {
+            "azure.identity": MagicMock(DefaultAzureCredential=mock_cred),
+            "azure.mgmt.compute": MagicMock(ComputeManagementClient=mock_compute_cls),
+            "azure.mgmt.network": MagicMock(NetworkManagementClient=mock_network_cls),
+        }):
+            cnc.check_azure_vm(rid.format(1))
+            cnc.check_azure_vm(rid.format(2))
+
+        mock_cred.assert_called_once()
+        mock_compute_cls.assert_called_once()
+        mock_network_cls.assert_called_once()
+        compute_transport = mock_compute_cls.call_args.kwargs["transport"]
+        assert mock_network_cls.call_args.kwargs["transport"] is compute_transport
+
+    def test_gcp_credentials_resolved_once_and_service_reused(self):
+        with patch("google.auth.default", return_value=(MagicMock(), "my-proj")) as mock_default, \
+                patch("googleapiclient.discovery.build_from_document", side_effect=lambda *a, **k: MagicMock()) as mock_build:
+            first = cnc._build_gcp_service("compute", "v1")
+            second = cnc._build_gcp_service("compute", "v1")
+            run = cnc._build_gcp_service("run", "v1")
+
+        assert first is second
+        assert run is not first
+        mock_default.assert_called_once()
+        assert mock_build.call_count == 2
+
+    def test_gcp_service_is_per_thread(self):
+        import threading
+
+        with patch("google.auth.default", return_value=(MagicMock(), "my-proj")), \
+                patch("googleapiclient.discovery.build_from_document", side_effect=lambda *a, **k: MagicMock()) as mock_build:
+            main_service = cnc._build_gcp_service("compute", "v1")
+            other = {}
+            worker = threading.Thread(target=lambda: other.setdefault("svc", cnc._build_gcp_service("compute", "v1")))
+            worker.start()
+            worker.join()
+
+            assert other["svc"] is not main_service
+            assert cnc._build_gcp_service("compute", "v1") is main_service
+            cnc.reset_run_state()
+            assert cnc._build_gcp_service("compute", "v1") is not main_service
+
+        assert mock_build.call_count == 3
+        assert not any(key[0] == "gcp" and key[1] == "compute/v1" for key in cnc._CLIENTS)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Response cache tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestResponseCache:
+    """Tests for the on-disk response cache."""
+
+    @pytest.fixture(autouse=True)
+    def _enabled(self):
+        cnc.configure_response_cache()
+
+    def test_hit_after_store_and_stats(self):
+        fetch = MagicMock(return_value={"SecurityGroups": [{"GroupId": "sg-1"}]})
+
+        first = cnc._cached_response("aws", ["p", None, "us-east-1"], "ec2.DescribeSecurityGroups", {"GroupIds": ["sg-1"]}, fetch)
+        second = cnc._cached_response("aws", ["p", None, "us-east-1"], "ec2.DescribeSecurityGroups", {"GroupIds": ["sg-1"]}, fetch)
+
+        assert first == second == {"SecurityGroups": [{"GroupId": "sg-1"}]}
+        fetch.assert_called_once()
+        assert cnc.response_cache_stats() == {"hits": 1, "misses": 1, "stores": 1}
+
+    def test_key_covers_scope_and_arguments(self):
+        fetch = MagicMock(side_effect=lambda: {"n": fetch.call_count})
+        cnc._cached_response("aws", ["a", None, "us-east-1"], "ec2.DescribeSubnets", {"SubnetIds": ["s-1"]}, fetch)
+        cnc._cached_response("aws", ["b", None, "us-east-1"], "ec2.DescribeSubnets", {"SubnetIds": ["s-1"]}, fetch)
+        cnc._cached_response("aws", ["a", None, "us-east-1"], "ec2.DescribeSubnets", {"SubnetIds": ["s-2"]}, fetch)
+        assert fetch.call_count == 3
+
+    def test_ttl_and_max_age(self):
+        fetch = MagicMock(return_value={"items": []})
+        with patch("time.time", return_value=1000.0):
+            cnc._cached_response("gcp", None, "compute.firewalls.list", "uri", fetch)
+        with patch("time.time", return_value=1000.0 + cnc.RESPONSE_CACHE_DEFAULT_TTL - 1):
+            cnc._cached_response("gcp", None, "compute.firewalls.list", "uri", fetch)
+        assert fetch.call_count == 1
+        with patch("time.time", return_value=1000.0 + cnc.RESPONSE_CACHE_TTLS["compute.instances.get"] + 1):
+            cnc._cached_response("gcp", None, "compute.instances.get", "uri", fetch)
+            cnc._cached_response("gcp", None, "compute.instances.get", "uri", fetch)
+        assert fetch.call_count == 2  # stored at the new time, then reused
+
+        cnc.configure_response_cache(max_age=0)
+        cnc._cached_response("gcp", None, "compute.firewalls.list", "uri", fetch)
+        assert fetch.call_count == 3
+
+    def test_disabled_cache_always_fetches(self):
+        cnc.configure_response_cache(enabled=False)
+        fetch = MagicMock(return_value={})
+        cnc._cached_response("aws", None, "ec2.DescribeInstances", {}, fetch)
+        cnc._cached_response("aws", None, "ec2.DescribeInstances", {}, fetch)
+        assert fetch.call_count == 2
+        assert not os.path.exists(os.path.join(cnc.CACHE_DIR, "responses.sqlite3"))
+
+    def test_boto3_describe_served_from_cache(self, monkeypatch):
+        import datetime
+        from types import SimpleNamespace
+
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        response = {"Reservations": [{"Instances": [{
+            "InstanceId": "i-1", "LaunchTime": datetime.datetime(2026, 1, 2, tzinfo=datetime.timezone.utc),
+        }]}]}
+        ec2 = cnc._get_boto3_client("ec2", "us-east-1")
+        http_response = SimpleNamespace(status_code=200, headers={})
+        with patch.object(ec2, "_make_request", return_value=(http_response, response)) as make_request:
+            first = ec2.describe_instances(InstanceIds=["i-1"])
+            second = ec2.describe_instances(InstanceIds=["i-1"])
+            ec2.describe_instances(InstanceIds=["i-2"])
+
+        assert make_request.call_count == 2
+        assert second == first
+        assert second["Reservations"][0]["Instances"][0]["LaunchTime"] == response["Reservations"][0]["Instances"][0]["LaunchTime"]
+        assert cnc.response_cache_stats() == {"hits": 1, "misses": 2, "stores": 2}
+
+    def test_gcp_get_requests_served_from_cache(self):
+        from googleapiclient import discovery
+        from googleapiclient.http import HttpMockSequence
+
+        http = HttpMockSequence([({"status": "200"}, json.dumps({"name": "fw-1"}))])
+        compute = discovery.build(
+            "compute", "v1", http=http, static_discovery=True, cache_discovery=False,
+            requestBuilder=cnc._gcp_cached_request_class(),
+        )
+
+        first = compute.firewalls().get(project="my-proj", firewall="fw-1").execute()
+        second = compute.firewalls().get(project="my-proj", firewall="fw-1").execute()
+
+        assert first == second == {"name": "fw-1"}
+        assert cnc.response_cache_stats() == {"hits": 1, "misses": 1, "stores": 1}
+
+    def test_azure_models_rebuilt_from_cache(self):
+        from azure.mgmt.network.models import NetworkInterface
+
+        nic = NetworkInterface({"id": "/nic", "properties": {"ipConfigurations": [
+            {"properties": {"privateIPAddress": "10.0.0.4"}},
+        ]}})
+        fetch = MagicMock(return_value=nic)
+
+        cnc._azure_cached("network_interfaces.get", "/nic", "network_interfaces", fetch)
+        cached = cnc._azure_cached("network_interfaces.get", "/nic", "network_interfaces", fetch)
+
+        fetch.assert_called_once()
+        assert isinstance(cached, NetworkInterface)
+        assert cached.ip_configurations[0].private_ip_address == "10.0.0.4"
+
+    def test_unserializable_response_is_used_but_not_stored(self):
+        fetch = MagicMock(return_value=MagicMock(name="sdk-object"))
+        cnc._azure_cached("network_interfaces.get", "/nic", "network_interfaces", fetch)
+        cnc._azure_cached("network_interfaces.get", "/nic", "network_interfaces", fetch)
+        assert fetch.call_count == 2
+        assert cnc.response_cache_stats()["stores"] == 0
+
+    def test_cli_flags_and_stats(self, tmp_path, capsys):
+        def fake_check(**kwargs):
+            return cnc._cached_response("aws", None, "ec2.DescribeInstances", kwargs["resource_id"], lambda: {"id": 1})
+
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--resource-id", "i-1",
+                "--cache-dir", str(tmp_path / "audit-cache")]
+        with patch.object(cnc, "check", side_effect=fake_check):
+            with patch.object(sys, "argv", argv):
+                cnc.main()
+            first = json.loads(capsys.readouterr().out)
+            with patch.object(sys, "argv", argv):
+                cnc.main()
+            second = json.loads(capsys.readouterr().out)
+            with patch.object(sys, "argv", argv + ["--no-cache"]):
+                cnc.main()
+            uncached = json.loads(capsys.readouterr().out)
+
+        assert first["response_cache"] == {"hits": 0, "misses": 1, "stores": 1}
+        assert second["response_cache"] == {"hits": 1, "misses": 0, "stores": 0}
+        assert "response_cache" not in uncached
+        assert os.path.exists(tmp_path / "audit-cache" / "responses.sqlite3")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Batch run tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestBatchRuns:
+    """Tests for iter_checks and the streaming CLI output."""
+
+    @staticmethod
+    def _fake_check(provider, resource_type, resource_id, **kwargs):
+        if resource_id.startswith("bad"):
+            raise RuntimeError(f"{resource_id} not found")
+        return cnc._build_result(provider, resource_type, resource_id, cnc.REACHABLE, cnc.REACHABLE, [], {})
+
+    def test_results_and_error_records(self):
+        requests = [{"provider": "aws", "resource_type": "ec2", "resource_id": rid} for rid in ("i-1", "bad-2", "i-3")]
+        with patch.object(cnc, "check", side_effect=self._fake_check):
+            records = list(cnc.iter_checks(requests, workers=2))
+
+        by_id = {r["resource_id"]: r for r in records}
+        assert sorted(by_id) == ["bad-2", "i-1", "i-3"]
+        assert by_id["bad-2"] == {
+            "provider": "aws", "resource_type": "ec2", "resource_id": "bad-2", "error": "bad-2 not found",
+        }
+        assert by_id["i-1"]["internet_reachability"] == cnc.REACHABLE
+
+    def test_requests_are_consumed_lazily(self):
+        consumed = []
+
+        def requests():
+            for i in range(100):
+                consumed.append(i)
+                yield {"provider": "aws", "resource_type": "ec2", "resource_id": f"i-{i}"}
+
+        with patch.object(cnc, "check", side_effect=self._fake_check):
+            stream = cnc.iter_checks(requests(), workers=2)
+            next(stream)
+            assert len(consumed) <= 4
+            assert len(list(stream)) == 99
+
+    def test_subscription_request_split_per_vm(self):
+        vm_ids = [f"/subscriptions/sub-1/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm{i}" for i in range(3)]
+        request = {"provider": "azure", "resource_type": "vm", "resource_id": "/subscriptions/sub-1", "azure_inventory": True}
+        with patch.object(cnc, "_azure_subscription_vm_ids", return_value=vm_ids) as list_ids, \
+                patch.object(cnc, "check", side_effect=self._fake_check) as check:
+            records = list(cnc.iter_checks([request]))
+
+        list_ids.assert_called_once_with("sub-1", "arm")
+        assert sorted(r["resource_id"] for r in records) == vm_ids
+        assert check.call_count == 3
+
+    def test_custom_runner_results_flattened(self):
+        run = MagicMock(return_value=[{"resource_id": "a"}, {"resource_id": "b"}])
+        records = list(cnc.iter_checks([{"resource_id": "/subscriptions/sub-1"}], run=run))
+        assert records == [{"resource_id": "a"}, {"resource_id": "b"}]
+
+    def test_cli_streams_ndjson_gzip_with_partial_failures(self, tmp_path, capsys):
+        import gzip
+
+        output = tmp_path / "audit.ndjson.gz"
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--resource-id", "i-1",
+                "--resource-id", "bad-2", "--format", "ndjson", "--output", str(output), "--no-cache"]
+        with patch.object(sys, "argv", argv), patch.object(cnc, "check", side_effect=self._fake_check), \
+                pytest.raises(SystemExit) as exit_info:
+            cnc.main()
+
+        assert exit_info.value.code == 2
+        with gzip.open(output, "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert sorted(line["resource_id"] for line in lines) == ["bad-2", "i-1"]
+        stderr = capsys.readouterr().err
+        assert "bad-2 error: bad-2 not found" in stderr
+        assert "2 checked, 1 failed" in stderr
+
+    def test_cli_resource_ids_file_as_json_array(self, tmp_path, capsys):
+        ids_file = tmp_path / "ids.txt"
+        ids_file.write_text("# web fleet\ni-1\n\ni-2\n", encoding="utf-8")
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--resource-ids-file", str(ids_file)]
+        with patch.object(sys, "argv", argv), patch.object(cnc, "check", side_effect=self._fake_check):
+            cnc.main()
+
+        results = json.loads(capsys.readouterr().out)
+        assert sorted(r["resource_id"] for r in results) == ["i-1", "i-2"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Snapshot diff tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestSnapshotDiff:
+    """Tests for input fingerprints and re-evaluating only changed resources."""
+
+    REQUEST = {"provider": "aws", "resource_type": "ec2", "resource_id": "i-1", "region": "us-east-1", "profile": None}
+
+    @staticmethod
+    def _listing_clients(sg_rules="0.0.0.0/0"):
+        pages = {
+            "describe_instances": [{"Reservations": [{"Instances": [
+                {"InstanceId": "i-1", "State": {"Name": "running"}, "SubnetId": "subnet-a", "VpcId": "vpc-1",
+                 "SecurityGroups": [{"GroupId": "sg-1"}]},
+                {"InstanceId": "i-2", "State": {"Name": "running"}, "SubnetId": "subnet-b", "VpcId": "vpc-1",
+                 "SecurityGroups": []},
+            ]}]}],
+            "describe_security_groups": [{"SecurityGroups": [
+                {"GroupId": "sg-1", "IpPermissions": [{"IpProtocol": "-1", "IpRanges": [{"CidrIp": sg_rules}]}]},
+            ]}],
+            "describe_route_tables": [{"RouteTables": [
+                {"VpcId": "vpc-1", "Associations": [{"SubnetId": "subnet-a"}], "Routes": [{"GatewayId": "igw-1"}]},
+                {"VpcId": "vpc-1", "Associations": [{"Main": True}], "Routes": [{"GatewayId": "local"}]},
+            ]}],
+            "describe_load_balancers": [{"LoadBalancers": [{"LoadBalancerArn": "lb-1", "Scheme": "internet-facing"}]}],
+            "describe_target_groups": [{"TargetGroups": [
+                {"TargetGroupArn": "tg-1", "TargetType": "instance", "LoadBalancerArns": ["lb-1"]},
+            ]}],
+        }
+        client = MagicMock()
+        client.get_paginator.side_effect = lambda operation: MagicMock(
+            paginate=MagicMock(return_value=pages[operation])
+        )
+        client.describe_target_health.return_value = {"TargetHealthDescriptions": [{"Target": {"Id": "i-1"}}]}
+        return client
+
+    @staticmethod
+    def _result(internet=cnc.REACHABLE, reasons=()):
+        return cnc._build_result("aws", "ec2", "i-1", internet, cnc.REACHABLE, list(reasons), {"subnet_id": "subnet-a"})
+
+    def test_ec2_inputs_from_region_listings(self):
+        client = self._listing_clients()
+        with patch.object(cnc, "_get_boto3_client", return_value=client):
+            inputs = cnc._aws_ec2_inputs("i-1", "us-east-1", None)
+            other = cnc._aws_ec2_inputs("i-2", "us-east-1", None)
+
+        assert inputs["routes"] == [[{"GatewayId": "igw-1"}]]
+        assert other["routes"] == [[{"GatewayId": "local"}]]  # main route table of the VPC
+        assert inputs["security_groups"][0]["GroupId"] == "sg-1"
+        assert inputs["load_balancers"] == [["tg-1", "lb-1", "internet-facing"]]
+        assert other["load_balancers"] == []
+        # each listing is fetched once per run
+        assert client.get_paginator.call_count == 5
+        client.describe_target_health.assert_called_once_with(TargetGroupArn="tg-1")
+
+    def test_unchanged_inputs_reuse_previous_result(self):
+        with patch.object(cnc, "_get_boto3_client", return_value=self._listing_clients()), \
+                patch.object(cnc, "check", return_value=self._result()) as check:
+            first = cnc.check_with_snapshot(self.REQUEST)
+            cnc.reset_run_state()
+            second = cnc.check_with_snapshot(self.REQUEST, cnc.snapshot_entry(first))
+
+        assert check.call_count == 1
+        assert first["snapshot"]["status"] == "new"
+        assert first["snapshot"]["fingerprint"].startswith("inputs:")
+        assert second["snapshot"] == {**first["snapshot"], "status": "unchanged", "reevaluated": False}
+        assert second["internet_reachability"] == cnc.REACHABLE
+
+    def test_changed_inputs_report_transitions(self):
+        with patch.object(cnc, "_get_boto3_client", return_value=self._listing_clients()), \
+                patch.object(cnc, "check", return_value=self._result()):
+            previous = cnc.snapshot_entry(cnc.check_with_snapshot(self.REQUEST))
+        cnc.reset_run_state()
+        with patch.object(cnc, "_get_boto3_client", return_value=self._listing_clients(sg_rules="10.0.0.0/8")), \
+                patch.object(cnc, "check", return_value=self._result(internet=cnc.NOT_REACHABLE)) as check:
+            result = cnc.check_with_snapshot(self.REQUEST, previous)
+
+        check.assert_called_once()
+        assert result["snapshot"]["status"] == "changed"
+        assert result["snapshot"]["transitions"] == {
+            "internet_reachability": [cnc.REACHABLE, cnc.NOT_REACHABLE],
+        }
+
+    def test_result_of_failed_lookup_is_not_reused(self):
+        throttled = self._result(internet=cnc.UNKNOWN, reasons=["throttled:ec2.DescribeRouteTables"])
+        with patch.object(cnc, "_get_boto3_client", return_value=self._listing_clients()), \
+                patch.object(cnc, "check", side_effect=[throttled, self._result()]) as check:
+            previous = cnc.snapshot_entry(cnc.check_with_snapshot(self.REQUEST))
+            result = cnc.check_with_snapshot(self.REQUEST, previous)
+
+        assert check.call_count == 2
+        assert result["snapshot"]["status"] == "unchanged"
+        assert result["snapshot"]["transitions"] == {"internet_reachability": [cnc.UNKNOWN, cnc.REACHABLE]}
+
+    def test_types_without_listing_inputs_are_fingerprinted_from_observed(self):
+        request = {"provider": "gcp", "resource_type": "compute", "resource_id": "projects/p/zones/z/instances/vm"}
+        observed = cnc._build_result("gcp", "compute", request["resource_id"], cnc.REACHABLE, cnc.REACHABLE, [], {"a": 1})
+        with patch.object(cnc, "check", side_effect=lambda **kw: dict(observed)) as check:
+            previous = cnc.snapshot_entry(cnc.check_with_snapshot(request))
+            result = cnc.check_with_snapshot(request, previous)
+
+        assert check.call_count == 2
+        assert previous["fingerprint"].startswith("observed:")
+        assert result["snapshot"]["status"] == "unchanged"
+        assert result["snapshot"]["reevaluated"] is True
+
+    def test_snapshot_of_older_version_is_ignored(self, tmp_path):
+        path = tmp_path / "snapshot.json"
+        cnc.save_snapshot(str(path), {"k": {"fingerprint": "x"}})
+        assert cnc.load_snapshot(str(path)) == {"k": {"fingerprint": "x"}}
+        with patch.object(cnc, "SNAPSHOT_VERSION", cnc.SNAPSHOT_VERSION + 1):
+            assert cnc.load_snapshot(str(path)) == {}
+        assert cnc.load_snapshot(str(tmp_path / "missing.json")) == {}
+
+    def test_fanout_pairs_get_their_snapshot_entries(self):
+        entry = {"fingerprint": "inputs:x", "checked_at": 0, "result": self._result()}
+        key = cnc.snapshot_key({"provider": "aws", "resource_type": "ec2", "resource_id": "i-1",
+                                "region": "us-east-1", "profile": "prod"})
+        seen = []
+
+        def fake_check_with_snapshot(request, previous=None):
+            seen.append((request["profile"], request["region"], previous))
+            return self._result()
+
+        with patch.object(cnc, "_aws_discover_resource_ids", return_value=["i-1"]), \
+                patch.object(cnc, "check_with_snapshot", side_effect=fake_check_with_snapshot):
+            list(cnc.iter_aws_fanout("ec2", ["prod"], ["us-east-1", "eu-west-1"], processes=1, snapshot={key: entry}))
+
+        assert sorted(seen, key=str) == sorted([("prod", "us-east-1", entry), ("prod", "eu-west-1", None)], key=str)
+
+    def test_cli_reports_transitions_and_updates_snapshot(self, tmp_path, capsys):
+        path = tmp_path / "snapshot.json"
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--region", "us-east-1", "--resource-id", "i-1",
+                "--resource-id", "i-2", "--snapshot", str(path), "--format", "ndjson", "--no-cache"]
+        inputs = {"i-1": "a", "i-2": "a"}
+        verdicts = {"i-1": cnc.REACHABLE, "i-2": cnc.REACHABLE}
+
+        def fake_check(provider, resource_type, resource_id, **kwargs):
+            return cnc._build_result(provider, resource_type, resource_id, verdicts[resource_id], cnc.REACHABLE, [], {})
+
+        def run():
+            cnc.reset_run_state()
+            with patch.object(sys, "argv", argv), patch.object(cnc, "check", side_effect=fake_check) as check, \
+                    patch.dict(cnc.SNAPSHOT_INPUTS, {("aws", "ec2"): lambda rid, region, profile: inputs[rid]}):
+                cnc.main()
+            captured = capsys.readouterr()
+            return check.call_count, {r["resource_id"]: r for r in map(json.loads, captured.out.splitlines())}, captured.err
+
+        calls, records, _ = run()
+        assert calls == 2
+        assert {r["snapshot"]["status"] for r in records.values()} == {"new"}
+
+        inputs["i-2"] = "b"
+        verdicts["i-2"] = cnc.NOT_REACHABLE
+        calls, records, err = run()
+        assert calls == 1
+        assert records["i-1"]["snapshot"]["status"] == "unchanged"
+        assert records["i-2"]["snapshot"]["transitions"] == {"internet_reachability": ["reachable", "not_reachable"]}
+        assert "internet_reachability:reachable->not_reachable" in err
+        assert "snapshot: 1 re-evaluated, 1 with reachability transitions" in err
+
+        saved = cnc.load_snapshot(str(path))
+        assert len(saved) == 2
+        assert all("snapshot" not in entry["result"] for entry in saved.values())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Path analysis tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestPathAnalysis:
+    """Tests for answering "can A reach B on a port" from region-wide listings."""
+
+    _ALLOW_ALL_ACL_ENTRIES = [
+        {"RuleNumber": 100, "Protocol": "-1", "RuleAction": "allow", "Egress": egress, "CidrBlock": "0.0.0.0/0"}
+        for egress in (False, True)
+    ] + [
+        {"RuleNumber": 32767, "Protocol": "-1", "RuleAction": "deny", "Egress": egress, "CidrBlock": "0.0.0.0/0"}
+        for egress in (False, True)
+    ]
+
+    @classmethod
+    def _listing_clients(cls, peering_status="active", db_acl_entries=None):
+        """
+        vpc-1 (10.0.0.0/16: app and two DB subnets) peered with vpc-2
+        (10.1.0.0/16); the DB admits sg-app on 5432, the peer instance
+        10.0.0.0/16 on 443.
+        """
+        def instance(instance_id, subnet_id, vpc_id, address, group_id, state="running"):
+            return {"InstanceId": instance_id, "State": {"Name": state}, "SubnetId": subnet_id, "VpcId": vpc_id,
+                    "PrivateIpAddress": address, "SecurityGroups": [{"GroupId": group_id}]}
+
+        egress_all = [{"IpProtocol": "-1", "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}]
+        acls = [
+            {"NetworkAclId": "acl-1", "VpcId": "vpc-1", "IsDefault": True, "Associations": [],
+             "Entries": cls._ALLOW_ALL_ACL_ENTRIES},
+            {"NetworkAclId": "acl-2", "VpcId": "vpc-2", "IsDefault": True, "Associations": [],
+             "Entries": cls._ALLOW_ALL_ACL_ENTRIES},
+        ]
+        if db_acl_entries is not None:
+            acls.append({"NetworkAclId": "acl-db", "VpcId": "vpc-1", "Associations": [{"SubnetId": "subnet-db-a"}],
+                         "Entries": db_acl_entries})
+        pages = {
+            "describe_instances": [{"Reservations": [{"Instances": [
+                instance("i-app", "subnet-app", "vpc-1", "10.0.1.10", "sg-app"),
+                instance("i-app2", "subnet-app", "vpc-1", "10.0.1.11", "sg-app"),
+                instance("i-peer", "subnet-peer", "vpc-2", "10.1.1.10", "sg-peer"),
+                instance("i-stopped", "subnet-app", "vpc-1", "10.0.1.12", "sg-app", state="stopped"),
+            ]}]}],
+            "describe_security_groups": [{"SecurityGroups": [
+                {"GroupId": "sg-app", "IpPermissionsEgress": egress_all, "IpPermissions": [
+                    {"IpProtocol": "tcp", "FromPort": 22, "ToPort": 22, "IpRanges": [{"CidrIp": "10.0.0.0/16"}]},
+                ]},
+                {"GroupId": "sg-db", "IpPermissionsEgress": egress_all, "IpPermissions": [
+                    {"IpProtocol": "tcp", "FromPort": 5432, "ToPort": 5432, "UserIdGroupPairs": [{"GroupId": "sg-app"}]},
+                ]},
+                {"GroupId": "sg-peer", "IpPermissionsEgress": egress_all, "IpPermissions": [
+                    {"IpProtocol": "tcp", "FromPort": 443, "ToPort": 443, "IpRanges": [{"CidrIp": "10.0.0.0/16"}]},
+                ]},
+            ]}],
+            "describe_subnets": [{"Subnets": [
+                {"SubnetId": "subnet-app", "VpcId": "vpc-1", "CidrBlock": "10.0.1.0/24"},
+                {"SubnetId": "subnet-db-a", "VpcId": "vpc-1", "CidrBlock": "10.0.2.0/24"},
+                {"SubnetId": "subnet-db-b", "VpcId": "vpc-1", "CidrBlock": "10.0.3.0/24"},
+                {"SubnetId": "subnet-peer", "VpcId": "vpc-2", "CidrBlock": "10.1.1.0/24"},
+            ]}],
+            "describe_route_tables": [{"RouteTables": [
+                {"VpcId": "vpc-1", "Associations": [{"Main": True}], "Routes": [
+                    {"DestinationCidrBlock": "10.0.0.0/16", "GatewayId": "local"},
+                    {"DestinationCidrBlock": "10.1.0.0/16", "VpcPeeringConnectionId": "pcx-1"},
+                    {"DestinationCidrBlock": "0.0.0.0/0", "NatGatewayId": "nat-1"},
+                ]},
+                {"VpcId": "vpc-2", "Associations": [{"Main": True}], "Routes": [
+                    {"DestinationCidrBlock": "10.1.0.0/16", "GatewayId": "local"},
+                    {"DestinationCidrBlock": "10.0.0.0/16", "VpcPeeringConnectionId": "pcx-1"},
+                ]},
+            ]}],
+            "describe_network_acls": [{"NetworkAcls": acls}],
+            "describe_vpc_peering_connections": [{"VpcPeeringConnections": [
+                {"VpcPeeringConnectionId": "pcx-1", "Status": {"Code": peering_status},
+                 "RequesterVpcInfo": {"VpcId": "vpc-1"}, "AccepterVpcInfo": {"VpcId": "vpc-2"}},
+            ]}],
+            "describe_db_instances": [{"DBInstances": [
+                {"DBInstanceIdentifier": "mydb", "DBInstanceStatus": "available", "AvailabilityZone": "us-east-1a",
+                 "VpcSecurityGroups": [{"VpcSecurityGroupId": "sg-db", "Status": "active"}],
+                 "DBSubnetGroup": {"VpcId": "vpc-1", "Subnets": [
+                     {"SubnetIdentifier": "subnet-db-a", "SubnetAvailabilityZone": {"Name": "us-east-1a"},
+                      "SubnetStatus": "Active"},
+                     {"SubnetIdentifier": "subnet-db-b", "SubnetAvailabilityZone": {"Name": "us-east-1b"},
+                      "SubnetStatus": "Active"},
+                 ]}},
+            ]}],
+        }
+        client = MagicMock()
+        client.get_paginator.side_effect = lambda operation: MagicMock(
+            paginate=MagicMock(return_value=pages[operation])
+        )
+        return client
+
+    def _analyze(self, source, destination, port, client=None, **kwargs):
+        with patch.object(cnc, "_get_boto3_client", return_value=client or self._listing_clients()):
+            return cnc.analyze_path(source, destination, port, region="us-east-1", **kwargs)
+
+    def test_security_group_reference_admits_source(self):
+        result = self._analyze("ec2:i-app", "rds:mydb", 5432)
+
+        assert result["reachability"] == cnc.REACHABLE
+        assert result["reasons"] == []
+        (path,) = result["paths"]  # only the subnet of the DB's availability zone
+        assert path["destination_subnet"] == "subnet-db-a"
+        assert [hop["hop"] for hop in path["hops"]] == [
+            "source_sg_egress", "route", "source_nacl_egress", "destination_nacl_ingress",
+            "destination_sg_ingress", "return_route", "destination_nacl_egress", "source_nacl_ingress",
+        ]
+        assert path["hops"][1] == {"hop": "route", "id": "local", "result": cnc.REACHABLE, "detail": "local"}
+
+    def test_port_not_admitted_by_destination_groups(self):
+        result = self._analyze("i-app", "rds:mydb", 3306)
+
+        assert result["reachability"] == cnc.NOT_REACHABLE
+        assert result["reasons"] == ["destination_sg_ingress=denied"]
+
+    def test_peered_vpc_needs_an_active_peering(self):
+        assert self._analyze("i-app", "i-peer", 443)["reachability"] == cnc.REACHABLE
+
+        cnc.reset_run_state()
+        result = self._analyze("i-app", "i-peer", 443, client=self._listing_clients(peering_status="pending-acceptance"))
+        assert result["reachability"] == cnc.NOT_REACHABLE
+        assert result["reasons"] == ["route=peering_pending-acceptance", "return_route=peering_pending-acceptance"]
+
+    def test_stateless_acl_needs_ephemeral_return_ports(self):
+        entries = [
+            {"RuleNumber": 90, "Protocol": "6", "RuleAction": "deny", "Egress": False, "CidrBlock": "10.0.1.11/32",
+             "PortRange": {"From": 5432, "To": 5432}},
+            {"RuleNumber": 100, "Protocol": "6", "RuleAction": "allow", "Egress": False, "CidrBlock": "10.0.0.0/16",
+             "PortRange": {"From": 5432, "To": 5432}},
+            {"RuleNumber": 100, "Protocol": "6", "RuleAction": "allow", "Egress": True, "CidrBlock": "10.0.0.0/16",
+             "PortRange": {"From": 1024, "To": 60000}},
+        ]
+        client = self._listing_clients(db_acl_entries=entries)
+
+        result = self._analyze("i-app", "rds:mydb", 5432, client=client)
+        assert result["reachability"] == cnc.NOT_REACHABLE
+        assert result["reasons"] == ["destination_nacl_egress=denied"]  # 60001-65535 not allowed back
+
+        # the lower-numbered deny wins over the allow of the whole VPC
+        result = self._analyze("i-app2", "rds:mydb", 5432, client=client)
+        assert "destination_nacl_ingress=denied" in result["reasons"]
+
+    def test_same_subnet_skips_network_acls(self):
+        result = self._analyze("i-app", "i-app2", 22)
+
+        assert result["reachability"] == cnc.REACHABLE
+        assert [hop["hop"] for hop in result["paths"][0]["hops"]] == [
+            "source_sg_egress", "route", "destination_sg_ingress", "return_route",
+        ]
+
+    def test_stopped_endpoint_is_not_reachable(self):
+        result = self._analyze("i-app", "i-stopped", 22)
+
+        assert result["reachability"] == cnc.NOT_REACHABLE
+        assert result["reasons"] == ["destination_state=stopped"]
+
+    def test_port_protocol_needs_a_port(self):
+        with pytest.raises(ValueError, match="port is required"):
+            self._analyze("i-app", "i-app2", None)
+        assert self._analyze("i-app", "i-app2", None, protocol="icmp")["port"] is None
+
+    def test_matrix_lists_each_resource_kind_once_and_memoizes_hops(self):
+        client = self._listing_clients()
+        pairs = [(s, d) for s in ("i-app", "i-app2", "i-peer", "i-missing") for d in ("rds:mydb", "i-peer")]
+        with patch.object(cnc, "_get_boto3_client", return_value=client), \
+                patch.object(cnc, "_nacl_allows", wraps=cnc._nacl_allows) as nacl_allows:
+            records = list(cnc.analyze_paths(pairs, 5432, region="us-east-1"))
+
+        assert len(records) == 8
+        assert [r for r in records if "error" in r] == [
+            {"source": "i-missing", "destination": "rds:mydb", "error": "EC2 instance not found: i-missing"},
+            {"source": "i-missing", "destination": "i-peer", "error": "EC2 instance not found: i-missing"},
+        ]
+        # instances, security groups, subnets, route tables, network ACLs, peerings, DB instances
+        assert client.get_paginator.call_count == 7
+        # i-app and i-app2 share the subnet: the ACL verdicts towards a destination are evaluated once
+        assert nacl_allows.call_count < 4 * 5
+
+    def test_cli_writes_one_record_per_pair(self, capsys):
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--region", "us-east-1", "--resource-id", "i-app",
+                "--resource-id", "i-peer", "--path-to", "rds:mydb", "--port", "5432", "--format", "ndjson",
+                "--no-cache"]
+        with patch.object(sys, "argv", argv), patch.object(cnc, "_get_boto3_client", return_value=self._listing_clients()):
+            cnc.main()
+        captured = capsys.readouterr()
+
+        records = {r["source"]: r for r in map(json.loads, captured.out.splitlines())}
+        assert records["ec2:i-app"]["reachability"] == cnc.REACHABLE
+        assert records["ec2:i-peer"]["reachability"] == cnc.NOT_REACHABLE  # sg-db admits sg-app only
+        assert "ec2:i-app -> rds:mydb reachability=reachable" in captured.err
+
+    def test_cli_path_to_needs_a_port(self, capsys):
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--resource-id", "i-app", "--path-to", "i-peer"]
+        with patch.object(sys, "argv", argv), pytest.raises(SystemExit):
+            cnc.main()
+        assert "--path-to needs --port" in capsys.readouterr().err
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# AWS fan-out tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestAwsFanout:
+    """Tests for multi-account / multi-region AWS fan-out."""
+
+    @staticmethod
+    def _fake_discover(resource_type, region, profile):
+        if profile == "broken":
+            raise RuntimeError("AccessDenied")
+        return [f"i-{profile}-{region}-{n}" for n in range(2)]
+
+    @staticmethod
+    def _fake_check(provider, resource_type, resource_id, region=None, profile=None, **kwargs):
+        assert resource_id.startswith(f"i-{profile}-{region}-")
+        return cnc._build_result(provider, resource_type, resource_id, cnc.REACHABLE, cnc.REACHABLE, [], {})
+
+    def test_role_arn_profile_assumes_role(self, monkeypatch):
+        import datetime
+        from botocore.credentials import AssumeRoleCredentialFetcher
+
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDSOURCE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        expiry = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)).isoformat()
+        fetched = {"access_key": "ASIAROLE", "secret_key": "s", "token": "t", "expiry_time": expiry}
+        role_arn = "arn:aws:iam::111122223333:role/NetworkAudit"
+
+        with patch.object(AssumeRoleCredentialFetcher, "fetch_credentials", return_value=fetched) as fetch:
+            session = cnc._get_boto3_session(role_arn)
+            assert session.get_credentials().get_frozen_credentials().access_key == "ASIAROLE"
+            assert cnc._get_boto3_session(role_arn) is session
+        fetch.assert_called_once()
+
+    def test_discover_ec2_instances_across_pages(self):
+        ec2 = MagicMock()
+        ec2.get_paginator.return_value.paginate.return_value = [
+            {"Reservations": [{"Instances": [{"InstanceId": "i-1"}, {"InstanceId": "i-2"}]}]},
+            {"Reservations": [{"Instances": [{"InstanceId": "i-3"}]}]},
+        ]
+        with patch.object(cnc, "_get_boto3_client", return_value=ec2) as get_client:
+            ids = cnc._aws_discover_resource_ids("ec2", "eu-west-1", "prod")
+
+        assert ids == ["i-1", "i-2", "i-3"]
+        get_client.assert_called_once_with("ec2", "eu-west-1", "prod")
+        ec2.get_paginator.assert_called_once_with("describe_instances")
+        (state_filter,) = ec2.get_paginator.return_value.paginate.call_args.kwargs["Filters"]
+        assert "terminated" not in state_filter["Values"]
+
+    def test_records_labelled_by_account_and_region(self):
+        with patch.object(cnc, "_aws_discover_resource_ids", side_effect=self._fake_discover), \
+                patch.object(cnc, "check", side_effect=self._fake_check):
+            records = list(cnc.iter_aws_fanout("ec2", ["prod", "broken"], ["us-east-1", "eu-west-1"], processes=1))
+
+        checked = [r for r in records if "error" not in r]
+        assert len(checked) == 4
+        assert {(r["account"], r["region"]) for r in checked} == {("prod", "us-east-1"), ("prod", "eu-west-1")}
+        errors = [r for r in records if "error" in r]
+        assert [(r["account"], r["region"], r["error"]) for r in errors] == [
+            ("broken", "us-east-1", "AccessDenied"), ("broken", "eu-west-1", "AccessDenied"),
+        ]
+
+    def test_pairs_run_in_pool_processes(self):
+        # the pool processes do not see this process's patches: an unsupported
+        # resource type fails discovery in each of them
+        records = list(cnc.iter_aws_fanout("vm", ["a", "b"], ["us-east-1"], processes=2))
+
+        assert sorted(r["account"] for r in records) == ["a", "b"]
+        assert all(r["error"].startswith("Unsupported AWS resource_type") for r in records)
+
+    def test_cli_fanout_consolidates_output(self, tmp_path, capsys):
+        accounts_file = tmp_path / "accounts.txt"
+        accounts_file.write_text("# audited accounts\narn:aws:iam::111122223333:role/NetworkAudit\n", encoding="utf-8")
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--account", "prod",
+                "--accounts-file", str(accounts_file), "--regions", "us-east-1, eu-west-1", "--processes", "1",
+                "--format", "ndjson", "--no-cache"]
+        with patch.object(sys, "argv", argv), \
+                patch.object(cnc, "_aws_discover_resource_ids", side_effect=self._fake_discover), \
+                patch.object(cnc, "check", side_effect=self._fake_check):
+            cnc.main()
+
+        captured = capsys.readouterr()
+        lines = [json.loads(line) for line in captured.out.splitlines()]
+        assert len(lines) == 8
+        assert {line["account"] for line in lines} == {"prod", "arn:aws:iam::111122223333:role/NetworkAudit"}
+        assert {line["region"] for line in lines} == {"us-east-1", "eu-west-1"}
+        assert "Checking 2 account(s) x 2 region(s)" in captured.err
+        assert "8 checked, 0 failed" in captured.err
+
+    def test_cli_fanout_rejects_resource_ids(self):
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--regions", "us-east-1", "--resource-id", "i-1"]
+        with patch.object(sys, "argv", argv), pytest.raises(SystemExit) as exit_info:
+            cnc.main()
+        assert exit_info.value.code == 2
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GCP asyncio transport tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _FakeAsyncClient:
+    """httpx.AsyncClient stand-in answering from a URI -> [status, ...] script."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, method, uri, headers=None, content=None):
+        import asyncio
+        from types import SimpleNamespace
+
+        self.sent.append(uri)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        status = self.statuses[uri].pop(0)
+        if isinstance(status, Exception):
+            raise status
+        return SimpleNamespace(status_code=status, headers={"content-type": "application/json"}, content=b"{}")
+
+
+class TestGcpAsyncTransport:
+    """Tests for _gcp_prefetch / _gcp_async_fetch_all."""
+
+    def _compute(self, http=None):
+        from googleapiclient import discovery
+        from googleapiclient.http import HttpMockSequence
+
+        http = http or HttpMockSequence([])
+        return discovery.build_from_document(
+            cnc._gcp_discovery_document("compute", "v1"), http=http, requestBuilder=cnc._gcp_cached_request_class()
+        )
+
+    def _prefetch(self, monkeypatch, requests, responses):
+        from google.auth.credentials import AnonymousCredentials
+
+        sends = []
+
+        def fetch_all(transport, batch):
+            sends.extend(batch)
+            return [responses[uri] for _, uri, _, _ in batch]
+
+        monkeypatch.setattr(cnc, "_get_gcp_credentials", lambda: (AnonymousCredentials(), None))
+        monkeypatch.setattr(cnc, "_gcp_async_transport", lambda: None)
+        monkeypatch.setattr(cnc, "_gcp_async_fetch_all", fetch_all)
+        cnc._gcp_prefetch(requests)
+        return sends
+
+    def test_prefetched_response_answers_execute(self, monkeypatch):
+        from googleapiclient.http import HttpMockSequence
+
+        compute = self._compute(HttpMockSequence([({"status": "200"}, '{"name": "net-b", "fetched": "sync"}')]))
+        net_a = compute.networks().get(project="p", network="net-a")
+        net_b = compute.networks().get(project="p", network="net-b")
+        cnc.configure_gcp_async()
+
+        sends = self._prefetch(monkeypatch, [net_a, net_b], {
+            net_a.uri: (200, {"content-type": "application/json"}, b'{"name": "net-a", "fetched": "async"}'),
+            net_b.uri: (403, {}, b"{}"),
+        })
+
+        assert [uri for _, uri, _, _ in sends] == [net_a.uri, net_b.uri]
+        assert compute.networks().get(project="p", network="net-a").execute()["fetched"] == "async"
+        # Failed prefetches are sent again by execute()
+        assert compute.networks().get(project="p", network="net-b").execute()["fetched"] == "sync"
+        assert cnc._GCP_PREFETCHED == {}
+
+    def test_prefetch_is_off_by_default(self, monkeypatch):
+        compute = self._compute()
+
+        sends = self._prefetch(monkeypatch, [compute.networks().get(project="p", network="net-a")], {})
+
+        assert sends == []
+
+    def test_cached_responses_are_not_prefetched(self, monkeypatch):
+        compute = self._compute()
+        request = compute.networks().get(project="p", network="net-a")
+        cnc.configure_response_cache()
+        key = cnc._response_cache_key("gcp", None, request.methodId, request.uri)
+        cnc._response_cache_put(key, request.methodId, {"name": "net-a"})
+        cnc.configure_gcp_async()
+
+        sends = self._prefetch(monkeypatch, [request], {})
+
+        assert sends == []
+        assert cnc.response_cache_stats()["hits"] == 0
+
+    def test_fetch_all_runs_requests_concurrently_and_retries(self, monkeypatch):
+        import asyncio
+        import random
+        from types import SimpleNamespace
+
+        monkeypatch.setattr(random, "uniform", lambda low, high: 0)
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        statuses = {f"https://example.test/{n}": [200] for n in range(50)}
+        statuses["https://example.test/throttled"] = [429, 503, 200]
+        statuses["https://example.test/down"] = [OSError("connection reset")]
+        client = _FakeAsyncClient(statuses)
+        try:
+            results = cnc._gcp_async_fetch_all(
+                SimpleNamespace(loop=loop, client=client), [("GET", uri, {}, None) for uri in statuses]
+            )
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+
+        assert [r and r[0] for r in results] == [200] * 51 + [None]
+        assert client.sent.count("https://example.test/throttled") == 3
+        assert client.max_in_flight == 52
+
+    def test_missing_httpx_is_reported(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "httpx", None)
+
+        with pytest.raises(ImportError, match="pip install httpx"):
+            cnc._create_gcp_async_transport(10)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Offline evaluation tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestOfflineEvaluation:
+    """Tests for recording response dumps and evaluating from them offline."""
+
+    DUMP = os.path.join(os.path.dirname(__file__), "data", "aws_ec2_dump.json")
+
+    @pytest.fixture(autouse=True)
+    def _no_aws_credentials(self, monkeypatch, tmp_path):
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN", "AWS_PROFILE"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("AWS_CONFIG_FILE", str(tmp_path / "no-config"))
+        monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(tmp_path / "no-credentials"))
+        monkeypatch.setenv("AWS_EC2_METADATA_DISABLED", "true")
+
+    @staticmethod
+    def _what_if(tmp_path, edit):
+        with open(TestOfflineEvaluation.DUMP, encoding="utf-8") as f:
+            dump = json.load(f)
+        edit({entry["api"]: entry["response"] for entry in dump["responses"]})
+        path = tmp_path / "what-if.json"
+        path.write_text(json.dumps(dump), encoding="utf-8")
+        return str(path)
+
+    def test_ec2_evaluated_from_dump_without_credentials(self):
+        from botocore.endpoint import Endpoint
+
+        cnc.load_response_dump(self.DUMP)
+        with patch.object(Endpoint, "make_request", side_effect=AssertionError("network used")):
+            result = cnc.check("aws", "ec2", "i-0abc1234567890def", region="ap-northeast-1", profile="prod")
+
+        assert result["internet_reachability"] == cnc.REACHABLE
+        assert result["observed"]["public_subnet"] is True
+        assert result["observed"]["sg_internet_ingress"] == ["tcp:443"]
+
+    def test_what_if_edited_route_changes_verdict(self, tmp_path):
+        def drop_internet_route(responses):
+            responses["ec2.DescribeRouteTables"]["RouteTables"][0]["Routes"].pop()
+
+        cnc.load_response_dump(self._what_if(tmp_path, drop_internet_route))
+        result = cnc.check("aws", "ec2", "i-0abc1234567890def", region="ap-northeast-1")
+
+        assert result["internet_reachability"] == cnc.NOT_REACHABLE
+        assert "public_subnet=false" in result["reasons"]
+
+    def test_call_missing_from_dump_fails(self):
+        cnc.load_response_dump(self.DUMP)
+        with pytest.raises(LookupError, match="ec2.DescribeInstances"):
+            cnc.check("aws", "ec2", "i-other", region="ap-northeast-1")
+
+    def test_recording_of_the_same_scope_preferred(self, tmp_path):
+        path = tmp_path / "dump.json"
+        path.write_text(json.dumps({"version": 1, "responses": [
+            {"provider": "aws", "scope": [None, None, region], "api": "ec2.DescribeRegions", "params": {},
+             "response": {"Region": region}}
+            for region in ("us-east-1", "eu-west-1")
+        ]}), encoding="utf-8")
+        cnc.load_response_dump(str(path))
+
+        assert cnc._dump_replay("aws", [None, "AKID", "eu-west-1"], "ec2.DescribeRegions", {}) == {"Region": "eu-west-1"}
+        assert cnc._dump_replay("aws", [None, None, "us-east-1"], "ec2.DescribeRegions", {}) == {"Region": "us-east-1"}
+
+    def test_record_then_replay_round_trip(self, tmp_path):
+        import datetime
+
+        launched = datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc)
+        fetch = MagicMock(return_value={"items": [{"name": "vm"}], "created": launched})
+        cnc.record_responses()
+        cnc._cached_response("gcp", None, "compute.instances.get", "https://compute/p/vm", fetch)
+        path = str(tmp_path / "dump.json.gz")
+        assert cnc.save_response_dump(path) == 1
+
+        cnc.load_response_dump(path)
+        replayed = cnc._cached_response("gcp", None, "compute.instances.get", "https://compute/p/vm", fetch)
+
+        fetch.assert_called_once()
+        assert replayed == {"items": [{"name": "vm"}], "created": launched}
+
+    def test_gcp_credentials_not_resolved_offline(self):
+        from google.auth.credentials import AnonymousCredentials
+
+        cnc.load_response_dump(self.DUMP)
+        with patch("google.auth.default", side_effect=AssertionError("ADC used")):
+            credentials, project = cnc._get_gcp_credentials()
+        assert isinstance(credentials, AnonymousCredentials)
+        assert project is None
+
+    def test_cli_records_and_evaluates_offline(self, tmp_path, capsys):
+        from types import SimpleNamespace
+
+        from botocore.endpoint import Endpoint
+
+        with open(self.DUMP, encoding="utf-8") as f:
+            live = {entry["api"].split(".")[1]: entry["response"] for entry in json.load(f)["responses"]}
+
+        def make_request(operation_model, request_dict):
+            return SimpleNamespace(status_code=200, headers={}), json.loads(json.dumps(live[operation_model.name]))
+
+        recorded = str(tmp_path / "recorded.json.gz")
+        argv = ["prog", "--provider", "aws", "--resource-type", "ec2", "--region", "ap-northeast-1",
+                "--resource-id", "i-0abc1234567890def", "--no-cache"]
+        with patch.object(sys, "argv", argv + ["--record", recorded]), \
+                patch.object(Endpoint, "make_request", side_effect=make_request):
+            cnc.main()
+        live_result = json.loads(capsys.readouterr().out)
+
+        cnc.reset_run_state()
+        with patch.object(sys, "argv", argv + ["--offline", recorded]), \
+                patch.object(Endpoint, "make_request", side_effect=AssertionError("network used")):
+            cnc.main()
+        captured = capsys.readouterr()
+
+        assert json.loads(captured.out) == live_result
+        assert live_result["internet_reachability"] == cnc.REACHABLE
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# API profiling tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestApiProfile:
+    """Tests for the API call accounting (enable_profiling / api_profile / write_trace)."""
+
+    def test_boto3_follow_up_pages_add_to_one_call(self):
+        from types import SimpleNamespace
+
+        cnc.enable_profiling()
+        ec2 = cnc._get_boto3_client("ec2", "us-east-1")
+        ok = SimpleNamespace(status_code=200, headers={})
+        pages = [(ok, {"RouteTables": [], "NextToken": "t"}), (ok, {"RouteTables": []})]
+        with patch.object(ec2, "_make_request", side_effect=pages):
+            ec2.describe_route_tables()
+            ec2.describe_route_tables(NextToken="t")
+
+        stats = cnc.profile_stats()["apis"]["ec2.DescribeRouteTables"]
+        assert (stats["calls"], stats["pages"], stats["errors"]) == (1, 2, 0)
+        assert stats["max_ms"] <= stats["total_ms"]
+
+    def test_boto3_error_response_counted(self):
+        from types import SimpleNamespace
+        from botocore.exceptions import ClientError
+
+        cnc.enable_profiling()
+        ec2 = cnc._get_boto3_client("ec2", "us-east-1")
+        denied = (
+            SimpleNamespace(status_code=403, headers={}),
+            {"Error": {"Code": "UnauthorizedOperation", "Message": "no"}, "ResponseMetadata": {"RetryAttempts": 0}},
+        )
+        with patch.object(ec2, "_make_request", return_value=denied):
+            with pytest.raises(ClientError):
+                ec2.describe_instances(InstanceIds=["i-1"])
+
+        assert cnc.profile_stats()["apis"]["ec2.DescribeInstances"]["errors"] == 1
+
+    def test_profiling_disabled_leaves_no_trace(self):
+        from types import SimpleNamespace
+
+        ec2 = cnc._get_boto3_client("ec2", "us-east-1")
+        ok = SimpleNamespace(status_code=200, headers={})
+        with patch.object(ec2, "_make_request", return_value=(ok, {"Reservations": []})):
+            ec2.describe_instances(InstanceIds=["i-1"])
+
+        assert cnc.profile_stats()["apis"] == {}
+
+    def test_gcp_cache_hits_accounted(self):
+        from googleapiclient import discovery
+        from googleapiclient.http import HttpMockSequence
+
+        cnc.configure_response_cache()
+        cnc.enable_profiling()
+        http = HttpMockSequence([({"status": "200"}, json.dumps({"name": "fw-1"}))])
+        compute = discovery.build(
+            "compute", "v1", http=http, static_discovery=True, cache_discovery=False,
+            requestBuilder=cnc._gcp_cached_request_class(),
+        )
+
+        compute.firewalls().get(project="my-proj", firewall="fw-1").execute()
+        compute.firewalls().get(project="my-proj", firewall="fw-1").execute()
+
+        stats = cnc.profile_stats()["apis"]["compute.firewalls.get"]
+        assert (stats["calls"], stats["pages"], stats["cached"]) == (2, 2, 1)
+
+    def test_azure_pages_counted_from_http_responses(self):
+        def list_all():
+            for _ in range(3):  # the SDK iterator fetching three pages
+                cnc._profile_http_page(MagicMock())
+            return []
+
+        cnc.enable_profiling()
+        cnc._azure_cached("network_interfaces.list_all", ["sub-123"], "network_interfaces", list_all)
+
+        stats = cnc.profile_stats()["apis"]["azure.network_interfaces.list_all"]
+        assert (stats["calls"], stats["pages"]) == (1, 3)
+
+    @patch("check_network_connectivity._get_boto3_client")
+    def test_check_result_carries_its_profile(self, mock_client):
+        client = TestAwsEc2()._mock_ec2_client(_make_ec2_instance(), _make_sg())
+        mock_client.return_value = client
+
+        assert "api_profile" not in cnc.check("aws", "ec2", "i-123")
+        cnc.enable_profiling()
+        result = cnc.check("aws", "ec2", "i-123")
+
+        profile = result["api_profile"]
+        assert set(profile["spans"]) == {"_subnet_route_tables", "_find_ec2_load_balancers"}
+        # once for the IGW route, once (memoized) for the NAT route
+        assert profile["spans"]["_subnet_route_tables"]["calls"] == 2
+        assert profile["wall_ms"] >= profile["spans"]["_find_ec2_load_balancers"]["total_ms"]
+        json.dumps(result)
+        record = {**result, "snapshot": {"fingerprint": "f", "checked_at": 0}}
+        assert "api_profile" not in cnc.snapshot_entry(record)["result"]
+
+    def test_trace_file_has_check_and_api_events(self, tmp_path):
+        cnc.enable_profiling(trace=True)
+        cnc._profiled_check(
+            "projects/p/zones/z/instances/vm",
+            lambda: cnc._profiled_call("gcp", "compute.instances.get", lambda: {"status": "RUNNING"}),
+        )
+
+        path = str(tmp_path / "trace.json")
+        assert cnc.write_trace(path) == 2
+        with open(path, encoding="utf-8") as f:
+            trace = json.load(f)
+        events = {event["cat"]: event for event in trace["traceEvents"]}
+        assert events["check"]["name"] == "projects/p/zones/z/instances/vm"
+        assert events["gcp"]["name"] == "compute.instances.get"
+        assert events["check"]["ts"] <= events["gcp"]["ts"]
+        assert events["gcp"]["dur"] <= events["check"]["dur"]
+        assert trace["otherData"]["api_profile"]["api_calls"] == 1
+
+    def test_fanout_process_profiles_merged(self):
+        cnc.enable_profiling()
+        exported = {
+            "run": {
+                "apis": {"ec2.DescribeInstances": {
+                    "calls": 2, "pages": 3, "cached": 0, "errors": 0, "retries": 1, "total_ms": 10.0, "max_ms": 6.0,
+                }},
+                "spans": {},
+            },
+            "trace": None,
+        }
+
+        cnc._profile_merge(exported)
+        cnc._profile_merge(exported)
+
+        stats = cnc.profile_stats()["apis"]["ec2.DescribeInstances"]
+        assert (stats["calls"], stats["pages"], stats["retries"]) == (4, 6, 2)
+        assert (stats["total_ms"], stats["max_ms"]) == (20.0, 6.0)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Benchmark harness tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestBenchmarkHarness:
+    """Tests for benchmark_network_connectivity.py (synthetic inventories and fake clients)."""
+
+    SIZES = {
+        "instances": 8, "subnets": 2, "sg_rules": 40, "target_groups": 5, "db_instances": 2,
+        "vms": 6, "nsg_rules": 12, "firewall_rules": 30, "cloudrun_services": 3, "backend_services": 6,
+        "path_rules": 3, "sql_instances": 2,
+    }
+
+    def test_ec2_call_counts_follow_the_inventory(self, monkeypatch, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+
+        monkeypatch.setattr(bench, "ELBV2_PAGE_SIZE", 2)
+        inventories = synthetic_inventories(self.SIZES, providers=("aws",))
+        requests = bench.check_requests(inventories, samples=8)["aws.ec2"]
+
+        row = bench.benchmark_check_type(inventories, requests, measure_memory=False)
+
+        instance_target_groups = [tg for tg in inventories["aws"]["target_groups"] if tg["TargetType"] == "instance"]
+        assert row["checks"] == 8
+        assert row["api"]["ec2.DescribeInstances"] == 8
+        assert row["api"]["ec2.DescribeSecurityGroups"] == 8
+        # Route tables are read once per subnet per run
+        assert row["api"]["ec2.DescribeRouteTables"] == 2
+        # 5 target groups in pages of 2, walked by every check
+        assert row["api"]["elbv2.DescribeTargetGroups"] == 8 * 3
+        assert row["api"]["elbv2.DescribeTargetHealth"] == 8 * len(instance_target_groups)
+        assert row["api_calls"] == sum(row["api"].values())
+        assert sum(row["internet_reachability"].values()) == 8
+
+    def test_gcp_firewall_rules_listed_once_per_run(self, monkeypatch, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+
+        monkeypatch.setattr(bench, "GCP_PAGE_SIZE", 10)
+        inventories = synthetic_inventories(self.SIZES, providers=("gcp",))
+        requests = bench.check_requests(inventories, samples=5)["gcp.compute"]
+
+        row = bench.benchmark_check_type(inventories, requests, measure_memory=False)
+
+        assert row["api"] == {
+            "compute.instances.get": 5,
+            "compute.firewalls.list": 3,
+            "compute.networks.getEffectiveFirewalls": 1,
+        }
+
+    def test_report_covers_every_check_type(self):
+        import benchmark_network_connectivity as bench
+
+        report = bench.run_benchmark(self.SIZES, samples=2)
+
+        assert list(report) == [
+            "aws.ec2", "aws.rds", "azure.vm", "azure.vm_inventory", "gcp.compute", "gcp.cloudrun", "gcp.cloudsql",
+        ]
+        for row in report.values():
+            assert row["checks"] == 2
+            assert row["api_calls"] > 0
+            assert row["wall_s"] >= 0
+            assert row["peak_mib"] is not None
+        # The subscription inventory replaces per-VM gets with one listing per kind
+        assert report["azure.vm_inventory"]["api_calls"] < report["azure.vm"]["api_calls"]
+        assert report["gcp.cloudrun"]["api"]["run.services.get"] == 2
+        table = bench.format_report(report).splitlines()
+        assert table[0].split()[:2] == ["check", "checks"]
+        assert len(table) == 2 + len(report)
+
+    def test_unknown_check_type_is_rejected(self):
+        import benchmark_network_connectivity as bench
+
+        with pytest.raises(ValueError, match="Unknown check types: aws.lambda"):
+            bench.run_benchmark(self.SIZES, check_types=["aws.lambda"], samples=1)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# API call budget tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+@pytest.mark.benchmark
+class TestApiCallBudgets:
+    """
+    Performance regression guard: the cloud API calls of each check type
+    against a shared synthetic inventory stay within a budget. Run only these
+    with pytest -m benchmark.
+    """
+
+    SIZES = {
+        "instances": 40, "subnets": 4, "sg_rules": 200, "target_groups": 12, "db_instances": 6,
+        "vms": 12, "nsg_rules": 20, "firewall_rules": 60, "cloudrun_services": 10, "backend_services": 16,
+        "path_rules": 5, "sql_instances": 8,
+    }
+    SAMPLES = 10
+
+    # check type -> API -> (calls per check, calls per run) allowed; an API missing here must not be called
+    BUDGETS = {
+        "aws.ec2": {
+            "ec2.DescribeInstances": (1, 0),
+            "ec2.DescribeSecurityGroups": (1, 0),
+            "ec2.DescribeRouteTables": (0, 4),  # once per subnet
+            "elbv2.DescribeTargetGroups": (1, 0),
+            "elbv2.DescribeTargetHealth": (12, 0),  # at most every target group
+            "elbv2.DescribeLoadBalancers": (1, 0),
+        },
+        "aws.rds": {
+            "rds.DescribeDBInstances": (1, 0),
+            "ec2.DescribeSecurityGroups": (1, 0),
+        },
+        "azure.vm": {
+            "compute.virtual_machines.get": (1, 0),
+            "network.network_interfaces.get": (1, 0),
+            "network.subnets.get": (1, 0),
+            "network.route_tables.get": (1, 0),
+            "network.network_security_groups.get": (2, 0),  # NIC and subnet
+            "network.public_ip_addresses.get": (1, 0),
+            "network.load_balancers.list": (1, 0),
+        },
+        "azure.vm_inventory": {
+            "compute.virtual_machines.list_all": (0, 2),  # models and power states
+            "network.network_interfaces.list_all": (0, 1),
+            "network.public_ip_addresses.list_all": (0, 1),
+            "network.virtual_networks.list_all": (0, 1),
+            "network.network_security_groups.list_all": (0, 1),
+            "network.route_tables.list_all": (0, 1),
+            "network.load_balancers.list_all": (0, 1),
+        },
+        "gcp.compute": {
+            "compute.instances.get": (1, 0),
+            "compute.firewalls.list": (0, 1),
+            "compute.networks.getEffectiveFirewalls": (0, 1),
+        },
+        "gcp.cloudrun": {
+            "run.services.get": (1, 0),
+            "run.services.getIamPolicy": (1, 0),
+            # one load balancer graph per region, each collection listed once
+            "compute.regionNetworkEndpointGroups.list": (0, 2),
+            "compute.backendServices.aggregatedList": (0, 2),
+            "compute.urlMaps.aggregatedList": (0, 2),
+            "compute.targetHttpProxies.aggregatedList": (0, 2),
+            "compute.targetHttpsProxies.aggregatedList": (0, 2),
+            "compute.forwardingRules.list": (0, 2),
+            "compute.globalForwardingRules.list": (0, 2),
+        },
+        "gcp.cloudsql": {
+            "sqladmin.instances.get": (1, 0),
+            "compute.networks.get": (0, 1),
+        },
+    }
+
+    @pytest.mark.parametrize("check_type", list(BUDGETS))
+    def test_check_type_stays_within_budget(self, check_type, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+
+        inventories = synthetic_inventories(self.SIZES)
+        requests = bench.check_requests(inventories, samples=self.SAMPLES)[check_type]
+
+        row = bench.benchmark_check_type(inventories, requests, measure_memory=False)
+
+        budget = self.BUDGETS[check_type]
+        assert set(row["api"]) <= set(budget), f"unbudgeted APIs: {sorted(set(row['api']) - set(budget))}"
+        over = {
+            api: (calls, per_check * len(requests) + per_run)
+            for api, calls in row["api"].items()
+            for per_check, per_run in [budget[api]]
+            if calls > per_check * len(requests) + per_run
+        }
+        assert over == {}, f"API calls over budget (calls, budget): {over}"
+
+    @pytest.mark.parametrize("resource_type, budget", [
+        ("cloudrun", {
+            "run.services.list": 1,
+            "run.services.getIamPolicy": 10,
+            # one graph for both regions: regional collections become aggregated lists
+            "compute.networkEndpointGroups.aggregatedList": 1,
+            "compute.backendServices.aggregatedList": 1,
+            "compute.urlMaps.aggregatedList": 1,
+            "compute.targetHttpProxies.aggregatedList": 1,
+            "compute.targetHttpsProxies.aggregatedList": 1,
+            "compute.forwardingRules.aggregatedList": 1,
+            "compute.globalForwardingRules.list": 1,
+        }),
+        ("cloudsql", {"sqladmin.instances.list": 1, "compute.networks.get": 1}),
+    ])
+    def test_project_wide_check_does_not_grow_per_resource(self, resource_type, budget, synthetic_inventories):
+        import benchmark_network_connectivity as bench
+        from collections import Counter
+
+        calls = Counter()
+        with bench.fake_clouds(synthetic_inventories(self.SIZES), calls):
+            results = cnc.check("gcp", resource_type, f"projects/{bench.GCP_PROJECT}")
+
+        assert len(results) == self.SIZES["cloudrun_services" if resource_type == "cloudrun" else "sql_instances"]
+        assert dict(calls) == budget
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Startup / daemon tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "scripts")
+
+
+def _loaded_sdks_after(code: str) -> list:
+    """Run code in a fresh interpreter and return the cloud SDK packages it imported."""
+    import subprocess
+
+    probe = (
+        "import sys\n"
+        f"sys.path.insert(0, {SCRIPTS_DIR!r})\n"
+        "import check_network_connectivity as cnc\n"
+        f"{code}\n"
+        "print(sorted({m.split('.')[0] for m in sys.modules if m.split('.')[0] in "
+        "('boto3', 'botocore', 'azure', 'google', 'googleapiclient')}))\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().replace("'", '"'))
+
+
+class TestStartup:
+    """Provider SDKs are only imported when a check needs them."""
+
+    def test_import_loads_no_cloud_sdk(self):
+        assert _loaded_sdks_after("") == []
+
+    def test_aws_client_loads_only_boto3(self):
+        assert _loaded_sdks_after("cnc._get_boto3_client('ec2', 'us-east-1')") == ["boto3", "botocore"]
+
+    def test_discovery_document_persisted_and_reused(self):
+        from googleapiclient import discovery
+        from google.auth.credentials import AnonymousCredentials
+
+        with patch.dict(cnc._GCP_DISCOVERY_DOCUMENTS, clear=True):
+            document = cnc._gcp_discovery_document("compute", "v1")
+        files = os.listdir(os.path.join(cnc.CACHE_DIR, "discovery"))
+
+        assert len(files) == 1 and files[0].startswith("compute.v1.")
+        assert '"description"' not in document
+        with patch.dict(cnc._GCP_DISCOVERY_DOCUMENTS, clear=True), \
+                patch("googleapiclient.discovery_cache.get_static_doc") as mock_static:
+            assert cnc._gcp_discovery_document("compute", "v1") == document
+        mock_static.assert_not_called()
+
+        service = discovery.build_from_document(document, credentials=AnonymousCredentials())
+        request = service.firewalls().list(project="my-proj", maxResults=500)
+        assert request.uri.startswith("https://compute.googleapis.com/compute/v1/projects/my-proj/global/firewalls")
+
+
+class TestDaemon:
+    """Tests for the --serve / --daemon-socket request loop."""
+
+    @pytest.fixture
+    def socket_path(self, tmp_path):
+        import threading
+
+        path = str(tmp_path / "cnc.sock")
+        server = cnc._make_check_server(path)
+        worker = threading.Thread(target=server.serve_forever, daemon=True)
+        worker.start()
+        yield path
+        server.shutdown()
+        server.server_close()
+
+    def test_request_answered_with_check_result(self, socket_path):
+        request = {"provider": "aws", "resource_type": "ec2", "resource_id": "i-123", "region": "us-east-1"}
+        with patch.object(cnc, "check", return_value={"internet_reachability": "reachable"}) as mock_check:
+            result = cnc._check_via_daemon(socket_path, request)
+
+        assert result == {"internet_reachability": "reachable"}
+        mock_check.assert_called_once_with(**request)
+        assert oct(os.stat(socket_path).st_mode & 0o777) == oct(0o600)
+
+    def test_clients_survive_requests_but_api_data_does_not(self, socket_path):
+        cnc._CLIENTS[("aws", "ec2", None, None)] = client = MagicMock()
+        cnc._GCP_FIREWALL_INDEXES["my-proj"] = {"networks": {}, "policies": {}}
+
+        with patch.object(cnc, "check", return_value={}):
+            cnc._check_via_daemon(socket_path, {"provider": "aws", "resource_type": "ec2", "resource_id": "i-1"})
+
+        assert cnc._CLIENTS[("aws", "ec2", None, None)] is client
+        assert cnc._GCP_FIREWALL_INDEXES == {}
+
+    def test_check_error_is_raised_to_the_caller(self, socket_path):
+        with pytest.raises(RuntimeError, match="Unsupported provider"):
+            cnc._check_via_daemon(socket_path, {"provider": "oci", "resource_type": "vm", "resource_id": "x"})
+
+    def test_main_requires_resource_arguments(self):
+        with patch.object(sys, "argv", ["prog", "--provider", "aws"]), pytest.raises(SystemExit):
+            cnc.main()